@@ -8,20 +8,13 @@ import matplotlib.pyplot as plt
 from new_model.model import ResNet18
 
 
-def predict_single_image(image_path, model_path, class_indices_path):
+def load_model(model_path, class_indices_path):
     """
-    使用ResNet18模型预测单张图像
-    
-    参数:
-        image_path: 图像路径
-        model_path: 模型权重路径
-        class_indices_path: 类别索引文件路径
+    加载ResNet18模型和类别信息，批量预测时只需加载一次
     
     返回:
-        预测类别和置信度
+        (模型, 类别字典, 设备, 预处理)
     """
-    # 检查文件是否存在
-    assert os.path.exists(image_path), f"图像文件 {image_path} 不存在"
     assert os.path.exists(model_path), f"模型文件 {model_path} 不存在"
     assert os.path.exists(class_indices_path), f"类别索引文件 {class_indices_path} 不存在"
     
@@ -40,16 +33,38 @@ def predict_single_image(image_path, model_path, class_indices_path):
         transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
     ])
     
-    # 加载和预处理图像
-    image = Image.open(image_path).convert('RGB')
-    image_tensor = data_transform(image).unsqueeze(0).to(device)
-    
     # 创建模型并加载权重
     model = ResNet18(num_classes=len(class_dict))
     model.load_state_dict(torch.load(model_path, map_location=device))
     model.to(device)
     model.eval()
     
+    return model, class_dict, device, data_transform
+
+
+def predict_single_image(image_path, model_path, class_indices_path, loaded=None):
+    """
+    使用ResNet18模型预测单张图像
+    
+    参数:
+        image_path: 图像路径
+        model_path: 模型权重路径
+        class_indices_path: 类别索引文件路径
+        loaded: load_model的返回值，为None时重新加载模型
+    
+    返回:
+        预测类别和置信度
+    """
+    # 检查文件是否存在
+    assert os.path.exists(image_path), f"图像文件 {image_path} 不存在"
+    if loaded is None:
+        loaded = load_model(model_path, class_indices_path)
+    model, class_dict, device, data_transform = loaded
+    
+    # 加载和预处理图像
+    image = Image.open(image_path).convert('RGB')
+    image_tensor = data_transform(image).unsqueeze(0).to(device)
+    
     # 执行预测
     with torch.no_grad():
         output = torch.squeeze(model(image_tensor)).cpu()
@@ -79,8 +94,11 @@ def main():
     model_path = os.path.join(logs_dir, latest_model_dir, "best.pth")
     class_indices_path = "new_model/class_indices.json"
     
+    # 加载一次模型，之后的预测共用
+    loaded = load_model(model_path, class_indices_path)
+    
     # 进行预测
-    class_name, confidence, image = predict_single_image(image_path, model_path, class_indices_path)
+    class_name, confidence, image = predict_single_image(image_path, model_path, class_indices_path, loaded)
     
     # 显示结果
     result_text = f"预测类别: {class_name}\n置信度: {confidence:.4f}"
@@ -103,7 +121,7 @@ def main():
             image_files = [f for f in os.listdir(class_path) if f.endswith(('.jpg', '.jpeg', '.png'))]
             if image_files:
                 sample_image = os.path.join(class_path, np.random.choice(image_files))
-                class_name, confidence, _ = predict_single_image(sample_image, model_path, class_indices_path)
+                class_name, confidence, _ = predict_single_image(sample_image, model_path, class_indices_path, loaded)
                 print(f"真实类别: {class_folder}, 预测类别: {class_name}, 置信度: {confidence:.4f}, 图像: {sample_image}")
 
 
@@ -1,10 +1,8 @@
-import json
 import os
 import sys
 
 import cv2
 import numpy as np
-import torch
 from PIL import Image
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QPixmap, QImage, QMovie
@@ -18,11 +16,16 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QH
                              QFrame, QStatusBar, QSizePolicy, QRadioButton, QButtonGroup)
 # 导入模型相关代码
 try:
-    from moudle.mobilenet import MobileNetV2
+    from utils.model_registry import registry, ModelLoadError
+    from utils.inference_worker import InferenceWorker, VIDEO_DETECTION_STRIDE, VIDEO_BATCH_SIZE, CAMERA_BATCH_SIZE
 except ImportError:
     # 添加父目录到路径中
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from moudle.mobilenet import MobileNetV2
+    from utils.model_registry import registry, ModelLoadError
+    from utils.inference_worker import InferenceWorker, VIDEO_DETECTION_STRIDE, VIDEO_BATCH_SIZE, CAMERA_BATCH_SIZE
+
+# 摄像头检测：每10帧检测一次（视频检测与批量大小见utils/inference_worker.py）
+CAMERA_DETECTION_STRIDE = 10
 
 # 定义一个工作线程来处理图像分类，避免UI卡顿
 class PredictionThread(QThread):
@@ -36,52 +39,15 @@ class PredictionThread(QThread):
         
     def run(self):
         try:
-            # 加载类别映射
-            json_path = "class_indices.json"
-            if not os.path.exists(json_path):
-                self.error_occurred.emit("找不到类别映射文件")
-                return
-                
-            with open(json_path, 'r') as f:
-                cls_dict = json.load(f)
-                
-            # 加载模型
-            device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
-            model = MobileNetV2(num_classes=len(cls_dict))
-            
-            # 尝试加载模型权重
-            try:
-                model.load_state_dict(torch.load(self.model_path, map_location=device))
-            except Exception as e:
-                self.error_occurred.emit(f"加载模型失败: {str(e)}")
-                return
-                
-            model.to(device)
-            model.eval()
-            
-            # 图像预处理
-            from torchvision import transforms
-            transform = transforms.Compose([
-                transforms.Resize((224, 224)),
-                transforms.ToTensor(),
-                transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
-            ])
-            
-            # 加载并处理图像
+            # 从注册表取已加载的模型，只有第一次使用该权重文件时才会读取
+            loaded = registry.get(self.model_path)
             image = Image.open(self.image_path).convert('RGB')
-            image_tensor = transform(image).unsqueeze(0).to(device)
-            
-            # 进行预测
-            with torch.no_grad():
-                output = torch.squeeze(model(image_tensor)).cpu()
-                predict = torch.softmax(output, dim=0)
-                predict_cls = torch.argmax(predict).numpy()
-                
-            # 发送结果信号
-            class_name = cls_dict[str(predict_cls)]
-            probability = predict[predict_cls].item()
+            # 进行预测并发送结果信号
+            class_name, probability = loaded.predict(image)
             self.prediction_complete.emit(class_name, probability)
             
+        except ModelLoadError as e:
+            self.error_occurred.emit(str(e))
         except Exception as e:
             self.error_occurred.emit(f"预测过程中发生错误: {str(e)}")
 
@@ -129,67 +95,11 @@ class VideoThread(QThread):
         self.running = False
         self.wait()
 
-class ImagePredictionThread(QThread):
-    """处理图像预测的线程"""
-    prediction_complete = pyqtSignal(str, float)
-    error_occurred = pyqtSignal(str)
-    
-    def __init__(self, model_path, pil_image):
-        super().__init__()
-        self.model_path = model_path
-        self.pil_image = pil_image
-        
-    def run(self):
-        try:
-            # 加载类别映射
-            json_path = "class_indices.json"
-            if not os.path.exists(json_path):
-                self.error_occurred.emit("找不到类别映射文件")
-                return
-                
-            with open(json_path, 'r') as f:
-                cls_dict = json.load(f)
-                
-            # 加载模型
-            device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
-            model = MobileNetV2(num_classes=len(cls_dict))
-            
-            # 尝试加载模型权重
-            try:
-                model.load_state_dict(torch.load(self.model_path, map_location=device))
-            except Exception as e:
-                self.error_occurred.emit(f"加载模型失败: {str(e)}")
-                return
-                
-            model.to(device)
-            model.eval()
-            
-            # 图像预处理
-            from torchvision import transforms
-            transform = transforms.Compose([
-                transforms.Resize((224, 224)),
-                transforms.ToTensor(),
-                transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
-            ])
-            
-            # 处理图像
-            image_tensor = transform(self.pil_image).unsqueeze(0).to(device)
-            
-            # 进行预测
-            with torch.no_grad():
-                output = torch.squeeze(model(image_tensor)).cpu()
-                predict = torch.softmax(output, dim=0)
-                predict_cls = torch.argmax(predict).numpy()
-                
-            # 发送结果信号
-            class_name = cls_dict[str(predict_cls)]
-            probability = predict[predict_cls].item()
-            self.prediction_complete.emit(class_name, probability)
-            
-        except Exception as e:
-            self.error_occurred.emit(f"预测过程中发生错误: {str(e)}")
-
 class SwineFeverDetector(QMainWindow):
+    # 推理线程的结果 (帧序号, 被检测的帧, 类别, 置信度)，由Qt转到界面线程处理
+    frame_result = pyqtSignal(int, object, str, float)
+    prediction_error = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
         
@@ -233,8 +143,14 @@ class SwineFeverDetector(QMainWindow):
         
         # 摄像头检测控制参数
         self.camera_detection_active = False
-        self.frame_count = 0
-        self.detection_interval = 10  # 每10帧检测一次
+        
+        # 视频/摄像头帧推理
+        self.inference_worker = None
+        self.frame_id = 0
+        # 停止播放时的帧序号，不大于它的检测结果已过时
+        self.stale_frame_id = 0
+        self.frame_result.connect(self.handle_frame_prediction)
+        self.prediction_error.connect(self.handle_prediction_error)
         
         # 初始化UI
         self.init_ui()
@@ -507,6 +423,10 @@ class SwineFeverDetector(QMainWindow):
         """更新模型信息显示"""
         if model_path:
             self.current_model_path = model_path
+            # 后台预加载并切换模型，首次检测不再等待读取权重
+            registry.preload(model_path)
+            if self.inference_worker is not None:
+                self.inference_worker.model_path = model_path
             
             model_info = f"选择的模型: {model_name}\n路径: {model_path}"
             self.model_info_label.setText(model_info)
@@ -642,7 +562,8 @@ class SwineFeverDetector(QMainWindow):
                 }
             """)
         else:
-            # 启动摄像头 - 总是使用默认摄像头
+            # 启动摄像头 - 总是使用默认摄像头，只检测最新一帧
+            self.start_inference_worker(CAMERA_DETECTION_STRIDE, CAMERA_BATCH_SIZE)
             self.video_thread = VideoThread(self.current_camera_index, True)
             self.video_thread.frame_ready.connect(self.update_frame)
             self.video_thread.connection_error.connect(self.handle_camera_error)
@@ -704,6 +625,11 @@ class SwineFeverDetector(QMainWindow):
             self.video_thread.stop()
             self.video_thread = None
             
+        # 丢弃还没推理的帧，之后到达的旧结果按帧序号忽略
+        if self.inference_worker is not None:
+            self.inference_worker.clear()
+        self.stale_frame_id = self.frame_id
+            
         # 如果是摄像头模式，清除当前帧和更新UI
         if self.detection_mode == "camera":
             self.current_frame = None
@@ -732,13 +658,9 @@ class SwineFeverDetector(QMainWindow):
                 self.detect_btn.setText("暂停检测")
                 self.statusBar.showMessage("摄像头已启动，自动开始检测...", 3000)
         
-        # 检查是否需要对摄像头帧进行检测
+        # 检查是否需要对摄像头帧进行检测，检测间隔由推理线程的步长控制
         if self.detection_mode == "camera" and self.camera_detection_active:
-            self.frame_count += 1
-            if self.frame_count >= self.detection_interval:
-                self.frame_count = 0
-                # 进行检测
-                self.process_camera_frame(frame)
+            self.process_camera_frame(frame)
     
     def display_cv_image(self, cv_img):
         """显示OpenCV图像在QLabel上"""
@@ -830,6 +752,9 @@ class SwineFeverDetector(QMainWindow):
             if self.video_thread is not None and self.video_thread.isRunning():
                 self.stop_video()
             
+            # 视频文件使用吞吐模式：合并多帧推理
+            self.start_inference_worker(VIDEO_DETECTION_STRIDE, VIDEO_BATCH_SIZE)
+            
             # 创建视频线程
             self.video_thread = VideoThread(self.current_image_path, False)
             self.video_thread.frame_ready.connect(self.process_video_frame)
@@ -864,40 +789,45 @@ class SwineFeverDetector(QMainWindow):
             
             self.detect_btn.setEnabled(True)
     
+    def start_inference_worker(self, stride, max_batch):
+        """启动（或重新配置）常驻推理线程"""
+        if self.inference_worker is None:
+            self.inference_worker = InferenceWorker(self.current_model_path, self.frame_result.emit,
+                                                    self.prediction_error.emit, stride, max_batch)
+            self.inference_worker.start()
+        else:
+            self.inference_worker.model_path = self.current_model_path
+            self.inference_worker.configure(stride, max_batch)
+    
+    def stop_inference_worker(self):
+        """程序退出时停止推理线程"""
+        if self.inference_worker is not None:
+            self.inference_worker.stop()
+            self.inference_worker = None
+    
+    def submit_frame(self, frame):
+        """编号后投递给推理线程，推理跟不上时队列丢弃旧帧，不会堆积线程"""
+        self.frame_id += 1
+        if self.inference_worker is not None:
+            self.inference_worker.submit(self.frame_id, frame)
+    
     def process_video_frame(self, frame):
         """处理视频帧进行检测"""
         # 显示当前帧
+        self.current_frame = frame
         self.display_cv_image(frame)
-        
-        # 每隔几帧进行一次检测，以提高效率
-        # 这里可以添加一个帧计数器，每N帧检测一次
-        
-        # 进行检测
-        pil_image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-        
-        # 创建图像预测线程
-        self.image_prediction_thread = ImagePredictionThread(self.current_model_path, pil_image)
-        self.image_prediction_thread.prediction_complete.connect(self.handle_frame_prediction)
-        self.image_prediction_thread.error_occurred.connect(self.handle_prediction_error)
-        self.image_prediction_thread.start()
+        self.submit_frame(frame)
     
     def process_camera_frame(self, frame):
         """处理摄像头帧进行检测"""
-        # 检查是否已有检测线程正在运行
-        if hasattr(self, 'image_prediction_thread') and self.image_prediction_thread.isRunning():
-            return  # 如果上一个检测还未完成，则跳过这一帧的检测
-            
-        # 进行检测
-        pil_image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-        
-        # 创建图像预测线程
-        self.image_prediction_thread = ImagePredictionThread(self.current_model_path, pil_image)
-        self.image_prediction_thread.prediction_complete.connect(self.handle_frame_prediction)
-        self.image_prediction_thread.error_occurred.connect(self.handle_prediction_error)
-        self.image_prediction_thread.start()
+        self.submit_frame(frame)
     
-    def handle_frame_prediction(self, class_name, probability):
+    def handle_frame_prediction(self, frame_id, frame, class_name, probability):
         """处理帧预测结果"""
+        # 视频已停止或重新开始，结果不再对应画面
+        if frame_id <= self.stale_frame_id:
+            return
+        
         # 显示结果但不需要停止视频
         self.result_class_label.setText(f"检测结果: {class_name}")
         self.result_prob_label.setText(f"置信度: {probability:.2%}")
@@ -976,6 +906,7 @@ if __name__ == "__main__":
     app.setStyle("Fusion")  # 使用Fusion风格，在所有平台上看起来一致
     
     window = SwineFeverDetector()
+    app.aboutToQuit.connect(window.stop_inference_worker)
     window.show()
     
     sys.exit(app.exec()) 
\ No newline at end of file
@@ -38,7 +38,8 @@ from PyQt6.QtGui import QPixmap, QIcon
 from PyQt6.QtCore import Qt, QSize
 from datetime import datetime
 
-from utils.detection_history import get_detection_statistics, get_detection_records
+from utils.detection_history import (get_detection_statistics, get_confidence_histogram,
+                                     get_daily_counts, CONFIDENCE_BINS)
 
 
 class MatplotlibCanvas(FigureCanvas):
@@ -201,12 +202,11 @@ class AnalysisPage(QWidget):
         self.refresh_btn.setEnabled(False)
         self.refresh_btn.setText("加载中...")
         
-        # 获取数据
+        # 获取数据，统计都在数据库中聚合完成
         try:
             stats = get_detection_statistics(period)
-            records = get_detection_records(period)
             
-            if not records:
+            if not stats['total_count']:
                 print("未找到检测记录，显示空图表")
                 # 没有数据时显示空图表
                 self.show_empty_charts()
@@ -214,16 +214,16 @@ class AnalysisPage(QWidget):
                 self.refresh_btn.setText("刷新数据")
                 return
                 
-            print(f"加载到{len(records)}条检测记录")
+            print(f"统计到{stats['total_count']}条检测记录")
             
             # 更新结果分布饼图
             self.update_result_distribution(stats)
             
             # 更新置信度直方图
-            self.update_confidence_histogram(records)
+            self.update_confidence_histogram(get_confidence_histogram(period))
             
             # 更新时间趋势
-            self.update_time_trend(records)
+            self.update_time_trend(get_daily_counts(period))
             
             # 更新类型分布
             self.update_type_distribution(stats)
@@ -280,31 +280,36 @@ class AnalysisPage(QWidget):
         
         self.result_canvas.draw()
         
-    def update_confidence_histogram(self, records):
-        """更新置信度直方图"""
+    def update_confidence_histogram(self, histogram):
+        """
+        更新置信度直方图
+        :param histogram: {'health': [每个区间的数量], 'swine_fever': [...]}
+        """
         ax = self.confidence_canvas.axes
         ax.clear()
         
-        if not records:
+        if not histogram or not any(sum(counts) for counts in histogram.values()):
             ax.text(0.5, 0.5, '暂无数据', horizontalalignment='center', verticalalignment='center', transform=ax.transAxes, fontsize=14)
             self.confidence_canvas.draw()
             return
         
         try:
-            # 分别获取健康和猪瘟的置信度
-            health_confidences = [r['confidence'] for r in records if r['result'] == 'health']
-            swine_fever_confidences = [r['confidence'] for r in records if r['result'] == 'swine_fever']
+            # 健康和猪瘟在各置信度区间的数量已在数据库中统计好
+            health_counts = histogram.get('health', [])
+            swine_fever_counts = histogram.get('swine_fever', [])
             
-            bins = np.linspace(0, 1, 11)  # 0到1之间10个区间
+            bins = np.linspace(0, 1, CONFIDENCE_BINS + 1)  # 0到1之间10个区间
+            centers = (bins[:-1] + bins[1:]) / 2
             
             # 将标题放在顶部，增加边距
             ax.set_title('置信度分布', fontsize=14, pad=15)
             
-            if health_confidences:
-                ax.hist(health_confidences, bins=bins, alpha=0.7, label='健康', color='#2ecc71')
+            # 以区间中心加权重绘制，外观与逐条记录绘制的直方图一致
+            if sum(health_counts):
+                ax.hist(centers, bins=bins, weights=health_counts, alpha=0.7, label='健康', color='#2ecc71')
             
-            if swine_fever_confidences:
-                ax.hist(swine_fever_confidences, bins=bins, alpha=0.7, label='猪瘟', color='#e74c3c')
+            if sum(swine_fever_counts):
+                ax.hist(centers, bins=bins, weights=swine_fever_counts, alpha=0.7, label='猪瘟', color='#e74c3c')
             
             ax.set_xlabel('置信度', fontsize=12, labelpad=10)
             ax.set_ylabel('检测数量', fontsize=12, labelpad=10)
@@ -326,39 +331,24 @@ class AnalysisPage(QWidget):
         
         self.confidence_canvas.draw()
         
-    def update_time_trend(self, records):
-        """更新时间趋势图"""
+    def update_time_trend(self, daily_counts):
+        """
+        更新时间趋势图
+        :param daily_counts: [(日期, 健康数量, 猪瘟数量), ...]，按日期升序
+        """
         ax = self.time_canvas.axes
         ax.clear()
         
-        if not records:
+        if not daily_counts:
             ax.text(0.5, 0.5, '暂无数据', horizontalalignment='center', verticalalignment='center', transform=ax.transAxes, fontsize=14)
             self.time_canvas.draw()
             return
         
         try:
-            # 按日期排序
-            records.sort(key=lambda x: x['timestamp'])
-            
-            # 提取日期和结果
-            dates = [r['timestamp'].split()[0] for r in records]  # 只取日期部分
-            results = [1 if r['result'] == 'health' else -1 for r in records]  # 健康为1，猪瘟为-1
-            
-            # 为了方便显示，找出唯一的日期
-            unique_dates = sorted(list(set(dates)))
-            date_indices = {date: i for i, date in enumerate(unique_dates)}
-            
-            # 按日期统计健康和猪瘟的数量
-            health_counts = [0] * len(unique_dates)
-            swine_fever_counts = [0] * len(unique_dates)
-            
-            for i, record in enumerate(records):
-                date = dates[i]
-                idx = date_indices[date]
-                if results[i] > 0:
-                    health_counts[idx] += 1
-                else:
-                    swine_fever_counts[idx] += 1
+            # 按日期统计的健康和猪瘟数量
+            unique_dates = [d[0] for d in daily_counts]
+            health_counts = [d[1] for d in daily_counts]
+            swine_fever_counts = [d[2] for d in daily_counts]
             
             # 简化日期格式，只保留月-日，使标签更短
             short_dates = []
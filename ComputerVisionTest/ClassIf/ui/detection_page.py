@@ -1,11 +1,10 @@
 import sys
 import os
-import json
+import threading
 import cv2
-import torch
 import numpy as np
 from PIL import Image
-from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
+from PyQt6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
                             QFileDialog, QGroupBox, QRadioButton, QButtonGroup, 
                             QFrame, QGridLayout, QSizePolicy, QMessageBox)
 from PyQt6.QtGui import QPixmap, QImage, QMovie
@@ -16,10 +15,14 @@ from utils.detection_history import add_detection_record
 
 # 如果moudle目录不在Python路径中，则添加
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-try:
-    from moudle.mobilenet import MobileNetV2
-except ImportError:
-    print("Error: 找不到MobileNetV2模型")
+from utils.model_registry import registry, ModelLoadError
+from utils.inference_worker import (InferenceWorker, VIDEO_DETECTION_STRIDE, VIDEO_BATCH_SIZE,
+                                    CAMERA_DETECTION_STRIDE, CAMERA_BATCH_SIZE)
+from utils.batch_detect import run_batch
+
+# 界面中的批量检测在QThread里运行，图像在本进程中读取，不从GUI进程fork DataLoader读取进程；
+# 多进程读取只用于命令行 python -m utils.batch_detect
+BATCH_NUM_WORKERS = 0
 
 # 检测结果暂时存储
 class DetectionResult:
@@ -91,56 +94,49 @@ class ImagePredictionThread(QThread):
         
     def run(self):
         try:
-            # 加载类别映射
-            json_path = "class_indices.json"
-            if not os.path.exists(json_path):
-                self.error_occurred.emit("找不到类别映射文件")
-                return
-                
-            with open(json_path, 'r') as f:
-                cls_dict = json.load(f)
-                
-            # 加载模型
-            device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
-            model = MobileNetV2(num_classes=len(cls_dict))
-            
-            # 尝试加载模型权重
-            try:
-                model.load_state_dict(torch.load(self.model_path, map_location=device))
-            except Exception as e:
-                self.error_occurred.emit(f"加载模型失败: {str(e)}")
-                return
-                
-            model.to(device)
-            model.eval()
-            
-            # 图像预处理
-            from torchvision import transforms
-            transform = transforms.Compose([
-                transforms.Resize((224, 224)),
-                transforms.ToTensor(),
-                transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
-            ])
-            
-            # 处理图像
-            image_tensor = transform(self.pil_image).unsqueeze(0).to(device)
-            
-            # 进行预测
-            with torch.no_grad():
-                output = torch.squeeze(model(image_tensor)).cpu()
-                predict = torch.softmax(output, dim=0)
-                predict_cls = torch.argmax(predict).numpy()
-                
-            # 发送结果信号
-            class_name = cls_dict[str(predict_cls)]
-            probability = predict[predict_cls].item()
+            # 从注册表取已加载的模型，只有第一次使用该权重文件时才会读取
+            loaded = registry.get(self.model_path)
+            # 进行预测并发送结果信号
+            class_name, probability = loaded.predict(self.pil_image)
             self.prediction_complete.emit(class_name, probability)
             
+        except ModelLoadError as e:
+            self.error_occurred.emit(str(e))
         except Exception as e:
             self.error_occurred.emit(f"预测过程中发生错误: {str(e)}")
 
 
+class BatchDetectionThread(QThread):
+    """批量检测文件夹的线程，结果写入CSV和检测历史"""
+    progress_updated = pyqtSignal(int, int, float)
+    batch_finished = pyqtSignal(dict)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, model_path, folder):
+        super().__init__()
+        self.model_path = model_path
+        self.folder = folder
+        self.stop_event = threading.Event()
+
+    def run(self):
+        try:
+            summary = run_batch(self.model_path, [self.folder], num_workers=BATCH_NUM_WORKERS,
+                                on_progress=self.progress_updated.emit, stop_event=self.stop_event)
+            self.batch_finished.emit(summary)
+        except ModelLoadError as e:
+            self.error_occurred.emit(str(e))
+        except Exception as e:
+            self.error_occurred.emit(f"批量检测过程中发生错误: {str(e)}")
+
+    def stop(self):
+        self.stop_event.set()
+
+
 class DetectionPage(QWidget):
+    # 推理线程的结果 (帧序号, 被检测的帧, 类别, 置信度)，由Qt转到界面线程处理
+    frame_result = pyqtSignal(int, object, str, float)
+    prediction_error = pyqtSignal(str)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent = parent
@@ -153,6 +149,17 @@ class DetectionPage(QWidget):
         self.current_frame = None
         self.detection_mode = "image"  # 默认模式：image, video, camera
         
+        # 视频/摄像头帧推理
+        self.inference_worker = None
+        self.frame_id = 0
+        # 停止播放时的帧序号，不大于它的检测结果已过时
+        self.stale_frame_id = 0
+        self.frame_result.connect(self.handle_frame_prediction)
+        self.prediction_error.connect(self.handle_prediction_error)
+        self.batch_thread = None
+        # 程序退出前停止后台线程
+        QApplication.instance().aboutToQuit.connect(self.stop_background_threads)
+        
         # 初始化UI
         self.init_ui()
         
@@ -314,6 +321,24 @@ class DetectionPage(QWidget):
         self.detect_btn.setEnabled(False)
         control_layout.addWidget(self.detect_btn)
         
+        # 批量检测按钮：对整个文件夹（含子文件夹）进行检测
+        self.batch_btn = QPushButton("批量检测文件夹")
+        self.batch_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #16a085; 
+                color: white; 
+                padding: 12px; 
+                border-radius: 4px; 
+                font-size: 14px;
+                text-align: center;
+            }
+            QPushButton:hover {
+                background-color: #1abc9c;
+            }
+        """)
+        self.batch_btn.clicked.connect(self.toggle_batch_detection)
+        control_layout.addWidget(self.batch_btn)
+        
         # 填充底部空间
         control_layout.addStretch()
         
@@ -430,6 +455,10 @@ class DetectionPage(QWidget):
         """更新模型信息显示"""
         if model_path:
             self.current_model_path = model_path
+            # 后台预加载并切换模型，首次检测不再等待读取权重
+            registry.preload(model_path)
+            if self.inference_worker is not None:
+                self.inference_worker.model_path = model_path
             model_info = f"选择的模型: {model_name}\n路径: {model_path}"
             self.model_info_label.setText(model_info)
             self.status_label.setText(f"已加载模型: {model_name}")
@@ -581,6 +610,10 @@ class DetectionPage(QWidget):
             self.video_thread.stop()
             self.video_thread = None
             
+        # 丢弃还没推理的帧，之后到达的旧结果按帧序号忽略
+        if self.inference_worker is not None:
+            self.inference_worker.clear()
+        self.stale_frame_id = self.frame_id
         self.current_frame = None
         
         if self.detection_mode == "camera":
@@ -667,6 +700,9 @@ class DetectionPage(QWidget):
             if self.video_thread is not None and self.video_thread.isRunning():
                 self.stop_video()
             
+            # 视频文件使用吞吐模式：合并多帧推理
+            self.start_inference_worker(VIDEO_DETECTION_STRIDE, VIDEO_BATCH_SIZE)
+            
             # 创建视频线程
             self.video_thread = VideoThread(self.current_image_path, False)
             self.video_thread.frame_ready.connect(self.process_video_frame)
@@ -690,6 +726,8 @@ class DetectionPage(QWidget):
             # 创建视频线程，使用之前确认可用的摄像头ID
             try:
                 print(f"尝试启动摄像头，ID: {self.current_image_path}")
+                # 摄像头只检测最新一帧
+                self.start_inference_worker(CAMERA_DETECTION_STRIDE, CAMERA_BATCH_SIZE)
                 self.video_thread = VideoThread(self.current_image_path, True)  # 设置is_camera为True
                 self.video_thread.frame_ready.connect(self.process_video_frame)
                 # 仅使用一个错误处理，避免冲突
@@ -707,19 +745,78 @@ class DetectionPage(QWidget):
             self.detect_btn.setEnabled(True)
             self.file_info_label.setText("摄像头正在运行...")
     
+    def toggle_batch_detection(self):
+        """开始或停止批量检测"""
+        if self.batch_thread is not None and self.batch_thread.isRunning():
+            self.batch_thread.stop()
+            self.batch_btn.setEnabled(False)
+            self.status_label.setText("正在停止批量检测...")
+            return
+        
+        if not self.current_model_path:
+            self.status_label.setText("请先选择模型")
+            return
+        
+        folder = QFileDialog.getExistingDirectory(self, "选择要批量检测的文件夹", "")
+        if not folder:
+            return
+        
+        self.batch_thread = BatchDetectionThread(self.current_model_path, folder)
+        self.batch_thread.progress_updated.connect(self.handle_batch_progress)
+        self.batch_thread.batch_finished.connect(self.handle_batch_finished)
+        self.batch_thread.error_occurred.connect(self.handle_prediction_error)
+        self.batch_thread.finished.connect(self.reset_batch_button)
+        self.batch_thread.start()
+        
+        self.batch_btn.setText("停止批量检测")
+        self.status_label.setText(f"正在批量检测: {folder}")
+    
+    def handle_batch_progress(self, done, total, images_per_sec):
+        """更新批量检测进度"""
+        self.status_label.setText(f"批量检测: {done}/{total}，{images_per_sec:.1f} 张/秒")
+    
+    def handle_batch_finished(self, summary):
+        """批量检测完成，显示统计"""
+        counts = summary['counts']
+        message = (f"共 {summary['total']} 张，已检测 {summary['processed']} 张，读取失败 {summary['failed']} 张\n"
+                   f"健康: {counts.get('health', 0)}，猪瘟: {counts.get('swine_fever', 0)}\n"
+                   f"耗时 {summary['elapsed']:.1f} 秒，{summary['images_per_sec']:.1f} 张/秒\n"
+                   f"结果文件: {summary['output']}")
+        self.status_label.setText(f"批量检测完成: {summary['processed']} 张，{summary['images_per_sec']:.1f} 张/秒")
+        QMessageBox.information(self, "批量检测完成", message)
+    
+    def reset_batch_button(self):
+        self.batch_btn.setText("批量检测文件夹")
+        self.batch_btn.setEnabled(True)
+    
+    def start_inference_worker(self, stride, max_batch):
+        """启动（或重新配置）常驻推理线程"""
+        if self.inference_worker is None:
+            self.inference_worker = InferenceWorker(self.current_model_path, self.frame_result.emit,
+                                                    self.prediction_error.emit, stride, max_batch)
+            self.inference_worker.start()
+        else:
+            self.inference_worker.model_path = self.current_model_path
+            self.inference_worker.configure(stride, max_batch)
+    
+    def stop_background_threads(self):
+        """程序退出时停止批量检测和推理线程"""
+        if self.batch_thread is not None and self.batch_thread.isRunning():
+            self.batch_thread.stop()
+            self.batch_thread.wait()
+        if self.inference_worker is not None:
+            self.inference_worker.stop()
+            self.inference_worker = None
+    
     def process_video_frame(self, frame):
         """处理视频帧进行检测"""
         # 显示当前帧
         self.display_cv_image(frame)
         
-        # 进行检测
-        pil_image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-        
-        # 创建图像预测线程
-        self.image_prediction_thread = ImagePredictionThread(self.current_model_path, pil_image)
-        self.image_prediction_thread.prediction_complete.connect(self.handle_frame_prediction)
-        self.image_prediction_thread.error_occurred.connect(self.handle_prediction_error)
-        self.image_prediction_thread.start()
+        # 编号后投递给推理线程，推理跟不上时队列丢弃旧帧，不会堆积线程
+        self.frame_id += 1
+        if self.inference_worker is not None:
+            self.inference_worker.submit(self.frame_id, frame)
     
     def handle_prediction_result(self, class_name, probability):
         """处理预测结果"""
@@ -763,8 +860,14 @@ class DetectionPage(QWidget):
             "type": self.detection_mode
         }
     
-    def handle_frame_prediction(self, class_name, probability):
+    def handle_frame_prediction(self, frame_id, frame, class_name, probability):
         """处理帧预测结果"""
+        # 视频已停止或重新开始，结果不再对应画面
+        if frame_id <= self.stale_frame_id:
+            return
+        # 保存结果时保存的是被检测的那一帧
+        self.current_frame = frame
+        
         # 将英文结果转为中文显示
         result_cn = "健康" if class_name == "health" else "猪瘟"
         
@@ -805,7 +908,8 @@ class DetectionPage(QWidget):
         
         # 更新状态栏
         detection_type = "视频检测" if self.detection_mode == "video" else "摄像头检测"
-        self.status_label.setText(f"{detection_type}: {result_cn} ({probability:.2%})")
+        dropped = self.inference_worker.queue.dropped if self.inference_worker is not None else 0
+        self.status_label.setText(f"{detection_type}: {result_cn} ({probability:.2%})  第{frame_id}帧，丢弃{dropped}帧")
     
     def handle_video_finished(self):
         """处理视频播放结束"""
@@ -1,13 +1,142 @@
 import sys
 import os
+from collections import OrderedDict
 from datetime import datetime
-from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
-                            QTableWidget, QTableWidgetItem, QFrame, QHeaderView,
+from PyQt6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
+                            QTableView, QAbstractItemView, QFrame, QHeaderView,
                             QFileDialog, QMessageBox)
 from PyQt6.QtGui import QPixmap, QIcon, QColor
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import Qt, QSize, QAbstractTableModel, QModelIndex, pyqtSignal
 
-from utils.detection_history import get_detection_records, delete_detection_record
+from utils.detection_history import get_detection_page, count_detection_records, delete_detection_record
+from utils.image_store import ThumbnailCache, THUMBNAIL_SIZE
+
+# 滚动到底部时每次从数据库加载的记录数
+FETCH_SIZE = 100
+# 内存中保留的缩略图数量
+PIXMAP_CACHE_SIZE = 500
+RESULT_COLORS = {"health": "#157a3c", "swine_fever": "#c0392b"}  # 更深的绿色/红色
+
+
+class HistoryTableModel(QAbstractTableModel):
+    """
+    历史记录表格模型：记录按需分批从数据库加载，
+    缩略图只在视图请求可见行时才在后台生成、解码
+    """
+    HEADERS = ["图像", "ID", "检测结果", "置信度", "检测时间", "检测类型"]
+    # 缩略图线程生成完成后发出，跨线程排队回到界面线程
+    thumbnail_ready = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.records = []
+        self.total = 0
+        self.selected_row = -1
+        self.thumbnails = ThumbnailCache()
+        self._pixmaps = OrderedDict()
+        self.thumbnail_ready.connect(self.on_thumbnail_ready)
+
+    def reload(self):
+        """重新加载第一批记录"""
+        self.beginResetModel()
+        self.total = count_detection_records()
+        self.records = get_detection_page(0, FETCH_SIZE)
+        self.selected_row = -1
+        self.endResetModel()
+
+    def record(self, row):
+        return self.records[row] if 0 <= row < len(self.records) else None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.records)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and len(self.records) < self.total
+
+    def fetchMore(self, parent=QModelIndex()):
+        rows = get_detection_page(len(self.records), FETCH_SIZE)
+        if not rows:
+            self.total = len(self.records)
+            return
+        self.beginInsertRows(QModelIndex(), len(self.records), len(self.records) + len(rows) - 1)
+        self.records.extend(rows)
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        record = self.record(index.row())
+        if record is None:
+            return None
+        column = index.column()
+        if role == Qt.ItemDataRole.DecorationRole and column == 0:
+            return self.thumbnail(record.get("image_path"))
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 1:
+                return str(record["id"])
+            if column == 2:
+                # 将英文结果转换为中文显示
+                return "健康" if record["result"] == "health" else "猪瘟"
+            if column == 3:
+                return "{:.2%}".format(record["confidence"])
+            if column == 4:
+                return record["timestamp"]
+            if column == 5:
+                # 将英文类型转换为中文显示
+                return "视频" if record["type"] == "video" else "图像"
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        if role == Qt.ItemDataRole.ForegroundRole:
+            # 选中行文字为白色；检测结果列按结果着色，其他列使用深灰色
+            if index.row() == self.selected_row:
+                return QColor("white")
+            if column == 2 and record["result"] in RESULT_COLORS:
+                return QColor(RESULT_COLORS[record["result"]])
+            return QColor("#2c3e50")
+        return None
+
+    def thumbnail(self, image_path):
+        """返回已解码的缩略图；还没有缩略图文件时提交后台生成，完成后刷新该行"""
+        if not image_path:
+            return None
+        pixmap = self._pixmaps.get(image_path)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(image_path)
+            return pixmap
+        if not os.path.exists(image_path):
+            return None
+        thumb_path = self.thumbnails.request(image_path, self.thumbnail_ready.emit)
+        if thumb_path is None:
+            return None
+        pixmap = QPixmap(thumb_path)
+        if pixmap.isNull():
+            return None
+        self._pixmaps[image_path] = pixmap
+        while len(self._pixmaps) > PIXMAP_CACHE_SIZE:
+            self._pixmaps.popitem(last=False)
+        return pixmap
+
+    def on_thumbnail_ready(self, image_path, thumb_path):
+        if not thumb_path:
+            return
+        for row, record in enumerate(self.records):
+            if record.get("image_path") == image_path:
+                index = self.index(row, 0)
+                self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+    def set_selected_row(self, row):
+        """记录选中行并刷新新旧两行的文字颜色"""
+        previous, self.selected_row = self.selected_row, row
+        for r in {previous, row}:
+            if 0 <= r < len(self.records):
+                self.dataChanged.emit(self.index(r, 0), self.index(r, self.columnCount() - 1),
+                                      [Qt.ItemDataRole.ForegroundRole])
 
 
 class HistoryPage(QWidget):
@@ -16,8 +145,8 @@ class HistoryPage(QWidget):
         self.parent = parent
         
         # 初始化变量
-        self.history_records = []
         self.selected_record_id = None
+        self.selected_record = None
         
         # 初始化UI
         self.init_ui()
@@ -36,6 +165,12 @@ class HistoryPage(QWidget):
         self.create_history_table()
         main_layout.addWidget(self.history_table)
         
+        # 已加载/总记录数，滚动到底部时自动加载更多
+        self.count_label = QLabel("")
+        self.count_label.setStyleSheet("font-size: 13px; color: #34495e; padding: 5px 0;")
+        self.count_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        main_layout.addWidget(self.count_label)
+        
         # 底部按钮区域
         bottom_panel = QFrame()
         bottom_panel.setStyleSheet("background-color: #f8f9fa; border-radius: 8px; padding: 10px;")
@@ -127,28 +262,34 @@ class HistoryPage(QWidget):
         
     def create_history_table(self):
         """创建历史记录表格"""
-        self.history_table = QTableWidget()
-        self.history_table.setColumnCount(5)
-        self.history_table.setHorizontalHeaderLabels(["ID", "检测结果", "置信度", "检测时间", "检测类型"])
+        self.history_model = HistoryTableModel(self)
+        self.history_model.rowsInserted.connect(self.update_count_label)
+        QApplication.instance().aboutToQuit.connect(self.history_model.thumbnails.shutdown)
+        
+        self.history_table = QTableView()
+        self.history_table.setModel(self.history_model)
+        self.history_table.verticalHeader().setVisible(False)
+        self.history_table.setIconSize(QSize(*THUMBNAIL_SIZE))
+        self.history_table.verticalHeader().setDefaultSectionSize(THUMBNAIL_SIZE[1] + 8)
         
         # 设置表格样式
         self.history_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 border: 1px solid #ddd;
                 border-radius: 4px;
                 background-color: white;
                 gridline-color: #dee2e6;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px;
                 border-bottom: 1px solid #dee2e6;
                 color: #2c3e50;
                 background-color: white;
             }
-            QTableWidget::item:hover {
+            QTableView::item:hover {
                 background-color: #f8f9fa;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #2c3e50;
                 color: white;
                 font-weight: bold;
@@ -164,19 +305,21 @@ class HistoryPage(QWidget):
         """)
         
         # 设置列宽
-        self.history_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
-        self.history_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
-        self.history_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
-        self.history_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
-        self.history_table.horizontalHeader().setSectionResizeMode(4, QHeaderView.ResizeMode.ResizeToContents)
+        # 固定宽度的列不必为计算列宽而读取所有行
+        header = self.history_table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed)
+        header.resizeSection(0, THUMBNAIL_SIZE[0] + 16)
+        for column, width in ((1, 70), (2, 100), (3, 100), (5, 100)):
+            header.setSectionResizeMode(column, QHeaderView.ResizeMode.Fixed)
+            header.resizeSection(column, width)
+        header.setSectionResizeMode(4, QHeaderView.ResizeMode.Stretch)
         
         # 设置选择行为
-        self.history_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.history_table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self.history_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.history_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
         
         # 连接信号
-        self.history_table.itemSelectionChanged.connect(self.on_selection_changed)
-        self.history_table.cellClicked.connect(self.on_cell_clicked)
+        self.history_table.selectionModel().selectionChanged.connect(self.on_selection_changed)
         
         # 禁用行交替颜色
         self.history_table.setAlternatingRowColors(False)
@@ -184,95 +327,45 @@ class HistoryPage(QWidget):
     def load_history(self):
         """加载历史记录"""
         print("正在加载历史记录...")
-        # 重置表格
-        self.history_table.setRowCount(0)
-        self.history_records = []
-        
-        # 从数据库或文件加载记录
-        records = get_detection_records()
+        # 只从数据库加载第一批记录，其余在滚动时加载
+        self.history_model.reload()
+        self.update_count_label()
         
-        if not records:
+        if self.history_model.total == 0:
             print("未找到历史记录")
             self.detail_label.setText("暂无历史记录")
             return
-            
-        self.history_records = records
-        print(f"加载到{len(records)}条历史记录")
         
-        # 填充表格
-        self.history_table.setRowCount(len(records))
+        print(f"共{self.history_model.total}条历史记录，已加载{self.history_model.rowCount()}条")
         
-        for row, record in enumerate(records):
-            # ID
-            id_item = QTableWidgetItem(str(record["id"]))
-            id_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.history_table.setItem(row, 0, id_item)
-            
-            # 结果
-            result = record["result"]
-            # 将英文结果转换为中文显示
-            display_result = "健康" if result == "health" else "猪瘟"
-            result_item = QTableWidgetItem(display_result)
-            result_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            
-            # 根据结果设置颜色，使用更高对比度的颜色
-            if result == "health":
-                result_item.setForeground(QColor("#157a3c"))  # 更深的绿色
-            elif result == "swine_fever":
-                result_item.setForeground(QColor("#c0392b"))  # 更深的红色
-                
-            self.history_table.setItem(row, 1, result_item)
-            
-            # 置信度
-            confidence = "{:.2%}".format(record["confidence"])
-            confidence_item = QTableWidgetItem(confidence)
-            confidence_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.history_table.setItem(row, 2, confidence_item)
-            
-            # 时间
-            time_item = QTableWidgetItem(record["timestamp"])
-            time_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.history_table.setItem(row, 3, time_item)
-            
-            # 类型 - 将英文类型转换为中文显示
-            type_text = "图像"
-            if record["type"] == "video":
-                type_text = "视频"
-                
-            type_item = QTableWidgetItem(type_text)
-            type_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.history_table.setItem(row, 4, type_item)
-        
-        # 确保每个单元格文字颜色正确
-        self.reset_all_text_colors()
+    def update_count_label(self):
+        """更新已加载/总记录数"""
+        self.count_label.setText(f"已加载 {self.history_model.rowCount()} / 共 {self.history_model.total} 条记录")
         
     def on_selection_changed(self):
         """表格选择变化处理"""
-        # 先恢复所有行的文字颜色，再处理新选中行
-        self.reset_all_text_colors()
-        
-        selected_items = self.history_table.selectedItems()
+        selected_rows = self.history_table.selectionModel().selectedRows()
         
-        if not selected_items:
+        if not selected_rows:
             # 重置预览和按钮状态
+            self.history_model.set_selected_row(-1)
             self.preview_label.setText("选择记录查看预览")
             self.detail_label.setText("未选择记录")
             self.export_btn.setEnabled(False)
             self.delete_btn.setEnabled(False)
             self.selected_record_id = None
+            self.selected_record = None
             return
             
         # 获取选中行
-        row = self.history_table.currentRow()
-        if row >= 0 and row < len(self.history_records):
-            record = self.history_records[row]
+        row = selected_rows[0].row()
+        record = self.history_model.record(row)
+        if record is not None:
             self.selected_record_id = record["id"]
+            self.selected_record = record
             
             # 确保选中行的所有文字都是白色，增加可见性
-            for col in range(self.history_table.columnCount()):
-                item = self.history_table.item(row, col)
-                if item:
-                    item.setForeground(QColor("white"))
+            self.history_model.set_selected_row(row)
             
             # 显示图像预览
             if os.path.exists(record["image_path"]):
@@ -306,25 +399,14 @@ class HistoryPage(QWidget):
             self.export_btn.setEnabled(True)
             self.delete_btn.setEnabled(True)
         
-    def on_cell_clicked(self, row, column):
-        """单元格点击处理"""
-        # 先重置所有文字颜色
-        self.reset_all_text_colors()
-        
-        # 确保选中行的所有文字为白色
-        for col in range(self.history_table.columnCount()):
-            item = self.history_table.item(row, col)
-            if item:
-                item.setForeground(QColor("white"))
-        
     def export_record(self):
         """导出所选记录"""
         if self.selected_record_id is None:
             QMessageBox.warning(self, "导出失败", "请先选择要导出的记录")
             return
             
-        # 找到选中的记录
-        record = next((r for r in self.history_records if r["id"] == self.selected_record_id), None)
+        # 选中的记录
+        record = self.selected_record
         if not record:
             QMessageBox.warning(self, "导出失败", "找不到所选记录")
             return
@@ -378,30 +460,7 @@ class HistoryPage(QWidget):
                 self.export_btn.setEnabled(False)
                 self.delete_btn.setEnabled(False)
                 self.selected_record_id = None
+                self.selected_record = None
                 QMessageBox.information(self, "删除成功", "检测记录已成功删除")
             else:
                 QMessageBox.warning(self, "删除失败", "删除记录时发生错误")
-                
-    def reset_all_text_colors(self):
-        """
-        重置所有行的文字颜色
-        - 检测结果列使用特殊颜色（健康为绿色，猪瘟为红色）
-        - 其他列使用深灰色
-        该方法在选择变化、点击和加载数据时都会被调用，确保颜色一致性
-        """
-        for row in range(self.history_table.rowCount()):
-            # 对于检测结果列(索引1)，根据内容设置特定颜色
-            result_item = self.history_table.item(row, 1)
-            if result_item:
-                result_text = result_item.text()
-                if result_text == "健康":
-                    result_item.setForeground(QColor("#157a3c"))  # 更深的绿色
-                elif result_text == "猪瘟":
-                    result_item.setForeground(QColor("#c0392b"))  # 更深的红色
-            
-            # 其他列使用黑色
-            for col in range(self.history_table.columnCount()):
-                if col != 1:  # 跳过检测结果列
-                    item = self.history_table.item(row, col)
-                    if item:
-                        item.setForeground(QColor("#2c3e50"))  # 深灰色，比纯黑色柔和 
\ No newline at end of file
@@ -0,0 +1,204 @@
+"""
+离线批量检测：对整个目录树或图像列表文件进行分类，结果逐批写入CSV/Parquet并批量写入检测历史
+在项目根目录运行：python -m utils.batch_detect --model xxx.pth photos/ [list.txt ...] [--output results.csv]
+"""
+import os
+import sys
+import csv
+import time
+import argparse
+from datetime import datetime
+
+import torch
+from PIL import Image
+from torch.utils.data import Dataset, DataLoader
+
+# 如果utils目录不在Python路径中，则添加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.model_registry import registry, build_transform
+from utils.detection_history import add_detection_records
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+# 列表文件：每行一个图像路径
+LIST_EXTENSIONS = ('.txt', '.lst')
+BATCH_SIZE = 32
+NUM_WORKERS = 4
+# 每积累多少条结果写一次检测历史
+HISTORY_FLUSH = 500
+# 批量检测的记录在历史中按图像检测统计
+HISTORY_TYPE = "image"
+CSV_FIELDS = ['path', 'result', 'confidence', 'timestamp', 'error']
+
+
+def collect_images(inputs):
+    """展开目录（递归）、列表文件和单个图像路径，返回去重后的图像路径列表"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                paths.extend(os.path.join(root, f) for f in sorted(files)
+                             if f.lower().endswith(IMAGE_EXTENSIONS))
+        elif item.lower().endswith(LIST_EXTENSIONS):
+            with open(item, 'r', encoding='utf-8') as f:
+                paths.extend(line.strip() for line in f if line.strip())
+        else:
+            paths.append(item)
+    return list(dict.fromkeys(paths))
+
+
+class ImageListDataset(Dataset):
+    """按路径读取并预处理图像，读取失败的图像返回全零张量并标记为失败"""
+
+    def __init__(self, paths, transform):
+        self.paths = paths
+        self.transform = transform
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, index):
+        try:
+            image = Image.open(self.paths[index]).convert('RGB')
+            return self.transform(image), index, ""
+        except (OSError, ValueError) as e:
+            return torch.zeros(3, 224, 224), index, str(e)
+
+
+class CsvResultWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='', encoding='utf-8-sig')
+        self.writer = csv.DictWriter(self.file, fieldnames=CSV_FIELDS)
+        self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetResultWriter:
+    """每批写一个row group，需要安装pyarrow"""
+
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.schema = pa.schema([('path', pa.string()), ('result', pa.string()), ('confidence', pa.float64()),
+                                 ('timestamp', pa.string()), ('error', pa.string())])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+# 输出文件扩展名 -> 写入器
+WRITERS = {
+    '.csv': CsvResultWriter,
+    '.parquet': ParquetResultWriter,
+}
+
+
+def open_writer(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in WRITERS:
+        raise ValueError(f"不支持的输出格式: {ext}，可选 {', '.join(WRITERS)}")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return WRITERS[ext](path)
+
+
+def default_output_path():
+    return os.path.join("batch_results", f"batch_{datetime.now().strftime('%Y%m%d%H%M%S')}.csv")
+
+
+def run_batch(model_path, inputs, output=None, batch_size=BATCH_SIZE, num_workers=NUM_WORKERS,
+              save_history=True, on_progress=None, stop_event=None):
+    """
+    批量检测
+    :param model_path: 模型权重文件
+    :param inputs: 目录、列表文件或图像路径
+    :param output: 结果文件（.csv/.parquet），为None时写到batch_results目录
+    :param save_history: 是否把结果写入检测历史
+    :param on_progress: 回调 on_progress(已处理数, 总数, 每秒图像数)
+    :param stop_event: threading.Event，置位后在当前批次结束时停止
+    :return: 统计字典
+    """
+    paths = collect_images(inputs)
+    output = output or default_output_path()
+    loaded = registry.get(model_path)
+    summary = {'total': len(paths), 'processed': 0, 'failed': 0, 'counts': {},
+               'elapsed': 0.0, 'images_per_sec': 0.0, 'output': output}
+    if not paths:
+        return summary
+
+    dataset = ImageListDataset(paths, build_transform())
+    # 读取进程预取后续批次；使用GPU时放入锁页内存，拷贝到显存可以异步进行
+    loader_kwargs = {'prefetch_factor': 2} if num_workers > 0 else {}
+    loader = DataLoader(dataset, batch_size=batch_size, shuffle=False, num_workers=num_workers,
+                        pin_memory=loaded.device.type == 'cuda', **loader_kwargs)
+    writer = open_writer(output)
+    history = []
+    start = time.perf_counter()
+    try:
+        for images, indices, errors in loader:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            results = loaded.classify_tensors(images)
+            rows = []
+            for index, error, (class_name, probability) in zip(indices.tolist(), errors, results):
+                path = paths[index]
+                if error:
+                    summary['failed'] += 1
+                    rows.append({'path': path, 'result': '', 'confidence': None, 'timestamp': timestamp, 'error': error})
+                    continue
+                summary['counts'][class_name] = summary['counts'].get(class_name, 0) + 1
+                rows.append({'path': path, 'result': class_name, 'confidence': probability,
+                             'timestamp': timestamp, 'error': ''})
+                history.append((class_name, probability, timestamp, HISTORY_TYPE, path))
+            writer.write(rows)
+            summary['processed'] += len(rows)
+            if save_history and len(history) >= HISTORY_FLUSH:
+                add_detection_records(history)
+                history = []
+            elapsed = time.perf_counter() - start
+            if on_progress is not None:
+                on_progress(summary['processed'], summary['total'], summary['processed'] / elapsed)
+            if stop_event is not None and stop_event.is_set():
+                break
+    finally:
+        writer.close()
+        if save_history and history:
+            add_detection_records(history)
+    summary['elapsed'] = time.perf_counter() - start
+    summary['images_per_sec'] = summary['processed'] / summary['elapsed'] if summary['elapsed'] > 0 else 0.0
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('inputs', nargs='+', help='图像目录（递归）、列表文件（每行一个路径）或图像文件')
+    parser.add_argument('--model', required=True, help='模型权重文件(.pth)')
+    parser.add_argument('--output', default=None, help='结果文件，.csv或.parquet，默认写到batch_results目录')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=NUM_WORKERS, help='DataLoader读取进程数')
+    parser.add_argument('--no-history', action='store_true', help='不写入检测历史')
+    args = parser.parse_args()
+
+    last_report = [0.0]
+
+    def report(done, total, rate):
+        now = time.perf_counter()
+        if now - last_report[0] >= 1.0 or done == total:
+            last_report[0] = now
+            print(f"\r{done}/{total}  {rate:.1f} 张/秒", end='', flush=True)
+
+    summary = run_batch(args.model, args.inputs, args.output, args.batch_size, args.workers,
+                        save_history=not args.no_history, on_progress=report)
+    print()
+    print(f"共 {summary['total']} 张，处理 {summary['processed']} 张，读取失败 {summary['failed']} 张")
+    print(f"分类结果: {summary['counts']}")
+    print(f"耗时 {summary['elapsed']:.1f}s，{summary['images_per_sec']:.1f} 张/秒，结果已写入 {summary['output']}")
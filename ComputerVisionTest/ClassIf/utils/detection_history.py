@@ -1,208 +1,250 @@
 import os
 import json
-import shutil
+import sqlite3
+import threading
 from datetime import datetime, timedelta
 
-# 历史记录文件路径
+from utils.image_store import IMAGE_STORE_DIR, store_image, is_stored_image, remove_thumbnail
+
+# 历史记录数据库路径
+HISTORY_DB = "detection_history.db"
+# 旧版JSON历史记录，首次打开数据库时导入
 HISTORY_FILE = "detection_history.json"
-HISTORY_IMAGE_DIR = "history_images"
+HISTORY_IMAGE_DIR = IMAGE_STORE_DIR
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# 置信度直方图的区间数
+CONFIDENCE_BINS = 10
+
+RECORD_COLUMNS = "id, result, confidence, timestamp, type, image_path"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    result TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    timestamp TEXT NOT NULL,
+    type TEXT NOT NULL,
+    image_path TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_records_timestamp ON records(timestamp);
+CREATE INDEX IF NOT EXISTS idx_records_result ON records(result);
+CREATE INDEX IF NOT EXISTS idx_records_type ON records(type);
+CREATE INDEX IF NOT EXISTS idx_records_image_path ON records(image_path);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# 每个线程各自持有一个连接（批量检测线程和界面线程都会写入）
+_local = threading.local()
+
 
 def ensure_directories():
     """确保历史记录目录存在"""
     os.makedirs(HISTORY_IMAGE_DIR, exist_ok=True)
 
-def add_detection_record(result, confidence, timestamp, detection_type, image_path):
-    """添加新的检测记录"""
-    ensure_directories()
-    
-    # 读取现有历史记录
+def _connect():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(HISTORY_DB, timeout=10)
+        conn.row_factory = sqlite3.Row
+        # WAL模式下读取不阻塞写入
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        migrate_json_history(conn)
+        _local.conn = conn
+    return conn
+
+def migrate_json_history(conn, json_path=HISTORY_FILE):
+    """
+    把旧版JSON历史记录一次性导入数据库，保留原有ID；导入后在meta表中标记，之后不再重复导入
+    :return: 导入的记录数
+    """
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+        return 0
     records = []
-    if os.path.exists(HISTORY_FILE):
+    if os.path.exists(json_path):
         try:
-            with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
+            with open(json_path, 'r', encoding='utf-8') as f:
                 records = json.load(f)
-        except (json.JSONDecodeError, UnicodeDecodeError, FileNotFoundError):
-            # 如果文件损坏，创建新的
-            records = []
-    
-    # 为新记录创建唯一ID
-    new_id = 1
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            print(f"读取旧版历史记录失败，跳过导入: {str(e)}")
+    with conn:
+        conn.executemany(
+            f"INSERT OR IGNORE INTO records ({RECORD_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+            [(r.get('id'), r.get('result', ''), r.get('confidence', 0), r.get('timestamp', ''),
+              r.get('type', ''), r.get('image_path')) for r in records])
+        conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)",
+                     (datetime.now().strftime(TIMESTAMP_FORMAT),))
     if records:
-        new_id = max(record.get('id', 0) for record in records) + 1
-    
-    # 复制图像到历史记录目录
-    image_filename = f"detection_{new_id}_{os.path.basename(image_path)}"
-    history_image_path = os.path.join(HISTORY_IMAGE_DIR, image_filename)
-    
-    try:
-        shutil.copy2(image_path, history_image_path)
-        print(f"已保存图像: {image_path} -> {history_image_path}")
-    except Exception as e:
-        print(f"保存图像失败: {str(e)}")
-        # 如果图像保存失败，尝试直接使用原始图像路径
-        history_image_path = image_path
-    
-    # 创建新记录
-    new_record = {
-        'id': new_id,
-        'result': result,
-        'confidence': confidence,
-        'timestamp': timestamp,
-        'type': detection_type,
-        'image_path': history_image_path
-    }
-    
-    # 添加记录并保存
-    records.append(new_record)
-    
+        print(f"已从{json_path}导入{len(records)}条历史记录")
+    return len(records)
+
+def _period_cutoff(period):
+    """时间段 -> 起始时间字符串，时间戳按固定格式存储，可以直接按字符串比较"""
+    now = datetime.now()
+    if period == "今天":
+        cutoff = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    elif period == "最近7天":
+        cutoff = now - timedelta(days=7)
+    elif period == "最近30天":
+        cutoff = now - timedelta(days=30)
+    else:
+        return None
+    return cutoff.strftime(TIMESTAMP_FORMAT)
+
+def _period_where(period):
+    cutoff = _period_cutoff(period)
+    if cutoff is None:
+        return "", ()
+    return "WHERE timestamp >= ?", (cutoff,)
+
+def _to_dict(row):
+    record = dict(row)
+    # 检查图像文件是否存在，如不存在则尝试在history_images目录中查找
+    image_path = record.get('image_path')
+    if image_path and not os.path.exists(image_path):
+        potential_path = os.path.join(HISTORY_IMAGE_DIR, os.path.basename(image_path.replace('\\', '/')))
+        if os.path.exists(potential_path):
+            record['image_path'] = potential_path
+        else:
+            print(f"警告: 图像文件不存在: {image_path}")
+    return record
+
+def add_detection_record(result, confidence, timestamp, detection_type, image_path):
+    """添加新的检测记录"""
+    return add_detection_records([(result, confidence, timestamp, detection_type, image_path)]) == 1
+
+def add_detection_records(items):
+    """
+    批量添加检测记录，整批在一个事务中写入
+    :param items: [(result, confidence, timestamp, detection_type, image_path), ...]
+    :return: 成功保存的记录数
+    """
+    ensure_directories()
+    rows = []
+    for result, confidence, timestamp, detection_type, image_path in items:
+        # 图像按内容哈希存入历史记录目录，重复检测同一图像不再额外占用空间
+        try:
+            history_image_path = store_image(image_path)
+        except Exception as e:
+            print(f"保存图像失败: {str(e)}")
+            # 如果图像保存失败，直接使用原始图像路径
+            history_image_path = image_path
+        rows.append((result, confidence, timestamp, detection_type, history_image_path))
     try:
-        with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(records, f, ensure_ascii=False, indent=2)
-        print(f"保存记录成功: ID={new_id}, 结果={result}")
-        return True
-    except Exception as e:
+        conn = _connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO records (result, confidence, timestamp, type, image_path) VALUES (?, ?, ?, ?, ?)", rows)
+        print(f"保存记录成功: {len(rows)}条")
+        return len(items)
+    except sqlite3.Error as e:
         print(f"保存记录失败: {str(e)}")
-        return False
+        return 0
 
 def get_detection_records(period=None):
-    """获取检测记录，可以按时间段筛选"""
-    ensure_directories()
-    
-    if not os.path.exists(HISTORY_FILE):
-        print("历史记录文件不存在")
+    """获取检测记录，可以按时间段筛选，按时间倒序排序（最新的在前）"""
+    where, params = _period_where(period)
+    try:
+        rows = _connect().execute(
+            f"SELECT {RECORD_COLUMNS} FROM records {where} ORDER BY timestamp DESC, id DESC", params).fetchall()
+    except sqlite3.Error as e:
+        print(f"读取历史记录失败: {str(e)}")
         return []
-    
+    return [_to_dict(row) for row in rows]
+
+def count_detection_records(period=None):
+    """统计记录条数，用于分页"""
+    where, params = _period_where(period)
+    return _connect().execute(f"SELECT COUNT(*) FROM records {where}", params).fetchone()[0]
+
+def get_detection_page(offset, limit, period=None):
+    """获取一页检测记录（按时间倒序），只有这一页的记录会检查图像路径"""
+    where, params = _period_where(period)
     try:
-        with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-            records = json.load(f)
-        print(f"成功加载{len(records)}条历史记录")
-    except (json.JSONDecodeError, UnicodeDecodeError, FileNotFoundError) as e:
+        rows = _connect().execute(
+            f"SELECT {RECORD_COLUMNS} FROM records {where} ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+            params + (limit, offset)).fetchall()
+    except sqlite3.Error as e:
         print(f"读取历史记录失败: {str(e)}")
         return []
-    
-    # 根据时间段筛选
-    if period and period != "全部时间":
-        now = datetime.now()
-        cutoff_date = None
-        
-        if period == "今天":
-            cutoff_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        elif period == "最近7天":
-            cutoff_date = now - timedelta(days=7)
-        elif period == "最近30天":
-            cutoff_date = now - timedelta(days=30)
-            
-        if cutoff_date:
-            filtered_records = []
-            for record in records:
-                try:
-                    record_time = datetime.strptime(record['timestamp'], "%Y-%m-%d %H:%M:%S")
-                    if record_time >= cutoff_date:
-                        filtered_records.append(record)
-                except ValueError:
-                    # 如果时间戳格式不正确，仍然包含记录
-                    filtered_records.append(record)
-            records = filtered_records
-    
-    # 检查图像文件是否存在，如不存在则更新路径
-    for record in records:
-        if 'image_path' in record and not os.path.exists(record['image_path']):
-            # 尝试在history_images目录中查找
-            basename = os.path.basename(record['image_path'])
-            potential_path = os.path.join(HISTORY_IMAGE_DIR, basename)
-            if os.path.exists(potential_path):
-                record['image_path'] = potential_path
-            else:
-                print(f"警告: 图像文件不存在: {record['image_path']}")
-    
-    # 按时间倒序排序（最新的在前）
-    records.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-    
-    return records
+    return [_to_dict(row) for row in rows]
 
 def delete_detection_record(record_id):
     """删除检测记录"""
-    if not os.path.exists(HISTORY_FILE):
-        print("历史记录文件不存在")
-        return False
-    
     try:
-        with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-            records = json.load(f)
-    except (json.JSONDecodeError, UnicodeDecodeError, FileNotFoundError) as e:
-        print(f"读取历史记录失败: {str(e)}")
-        return False
-    
-    # 查找记录
-    record_to_delete = None
-    remaining_records = []
-    
-    for record in records:
-        if record.get('id') == record_id:
-            record_to_delete = record
-        else:
-            remaining_records.append(record)
-    
-    if not record_to_delete:
-        print(f"未找到ID为{record_id}的记录")
+        conn = _connect()
+        row = conn.execute("SELECT image_path FROM records WHERE id = ?", (record_id,)).fetchone()
+        if row is None:
+            print(f"未找到ID为{record_id}的记录")
+            return False
+        with conn:
+            conn.execute("DELETE FROM records WHERE id = ?", (record_id,))
+        image_path = row['image_path']
+        # 相同内容的图像只存一份，还有其他记录引用时保留
+        shared = image_path and conn.execute(
+            "SELECT 1 FROM records WHERE image_path = ? LIMIT 1", (image_path,)).fetchone()
+    except sqlite3.Error as e:
+        print(f"删除记录失败: {str(e)}")
         return False
-    
-    # 删除相关图像
+
+    # 删除相关图像及其缩略图
     try:
-        image_path = record_to_delete.get('image_path')
-        if image_path and os.path.exists(image_path) and HISTORY_IMAGE_DIR in image_path:
+        if image_path and not shared and os.path.exists(image_path) and is_stored_image(image_path):
+            remove_thumbnail(image_path)
             os.remove(image_path)
             print(f"已删除图像: {image_path}")
     except Exception as e:
         print(f"删除图像失败: {str(e)}")
-        # 即使图像删除失败，继续尝试删除记录
-    
-    # 保存更新后的记录
-    try:
-        with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(remaining_records, f, ensure_ascii=False, indent=2)
-        print(f"成功删除记录: ID={record_id}")
-        return True
-    except Exception as e:
-        print(f"保存记录失败: {str(e)}")
-        return False
+
+    print(f"成功删除记录: ID={record_id}")
+    return True
 
 def get_detection_statistics(period=None):
-    """获取检测统计数据"""
-    records = get_detection_records(period)
-    
-    # 初始化统计数据
-    stats = {
-        'total_count': len(records),
-        'health_count': 0,
-        'swine_fever_count': 0,
-        'image_count': 0,
-        'video_count': 0,
-        'avg_confidence': 0
-    }
-    
-    # 统计各类数据
-    confidence_sum = 0
-    
-    for record in records:
-        result = record.get('result', '')
-        detection_type = record.get('type', '')
-        confidence = record.get('confidence', 0)
-        
-        if result == 'health':
-            stats['health_count'] += 1
-        elif result == 'swine_fever':
-            stats['swine_fever_count'] += 1
-        
-        if detection_type == 'image':
-            stats['image_count'] += 1
-        elif detection_type == 'video':
-            stats['video_count'] += 1
-            
-        confidence_sum += confidence
-    
-    # 计算平均置信度
-    if stats['total_count'] > 0:
-        stats['avg_confidence'] = confidence_sum / stats['total_count']
-        
-    return stats 
\ No newline at end of file
+    """获取检测统计数据，在数据库中聚合"""
+    where, params = _period_where(period)
+    row = _connect().execute(f"""
+        SELECT COUNT(*) AS total_count,
+               COALESCE(SUM(result = 'health'), 0) AS health_count,
+               COALESCE(SUM(result = 'swine_fever'), 0) AS swine_fever_count,
+               COALESCE(SUM(type = 'image'), 0) AS image_count,
+               COALESCE(SUM(type = 'video'), 0) AS video_count,
+               COALESCE(AVG(confidence), 0) AS avg_confidence
+        FROM records {where}""", params).fetchone()
+    return dict(row)
+
+def get_confidence_histogram(period=None, bins=CONFIDENCE_BINS):
+    """
+    按检测结果统计置信度分布
+    :return: {'health': [每个区间的数量], 'swine_fever': [...]}，区间为[0,1]等分
+    """
+    where, params = _period_where(period)
+    rows = _connect().execute(f"""
+        SELECT result, MIN(CAST(confidence * ? AS INTEGER), ? - 1) AS bin, COUNT(*) AS count
+        FROM records {where} GROUP BY result, bin""", (bins, bins) + params).fetchall()
+    histogram = {'health': [0] * bins, 'swine_fever': [0] * bins}
+    for row in rows:
+        if row['result'] in histogram and 0 <= row['bin'] < bins:
+            histogram[row['result']][row['bin']] += row['count']
+    return histogram
+
+def get_daily_counts(period=None):
+    """
+    按日期统计健康和猪瘟的数量
+    :return: [(日期, 健康数量, 猪瘟数量), ...]，按日期升序
+    """
+    where, params = _period_where(period)
+    rows = _connect().execute(f"""
+        SELECT substr(timestamp, 1, 10) AS date,
+               SUM(result = 'health') AS health_count,
+               SUM(result != 'health') AS swine_fever_count
+        FROM records {where} GROUP BY date ORDER BY date""", params).fetchall()
+    return [(row['date'], row['health_count'], row['swine_fever_count']) for row in rows]
+
+
+if __name__ == "__main__":
+    # 打开数据库即完成旧版JSON历史记录的导入
+    print(f"数据库: {HISTORY_DB}，共{count_detection_records()}条记录")
+    print(get_detection_statistics())
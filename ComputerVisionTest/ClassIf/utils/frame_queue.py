@@ -0,0 +1,54 @@
+import threading
+from collections import deque
+
+
+class LatestFrameQueue:
+    """
+    有界的帧队列：队列满时丢弃最旧的帧，保证推理线程拿到的总是最新画面，
+    视频解码比推理快时不会积压越来越旧的帧。
+    """
+
+    def __init__(self, maxsize=1):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, frame_id, frame):
+        """放入一帧，返回因队列已满被丢弃的帧数"""
+        with self._cond:
+            dropped = 0
+            while len(self._items) >= self.maxsize:
+                self._items.popleft()
+                dropped += 1
+            self._items.append((frame_id, frame))
+            self.dropped += dropped
+            self._cond.notify()
+            return dropped
+
+    def get_batch(self, max_batch=1, timeout=None):
+        """
+        等待并取出最多max_batch帧（按帧序号从旧到新）
+        返回: [(frame_id, frame), ...]，超时或队列关闭时为空列表
+        """
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            batch = []
+            while self._items and len(batch) < max_batch:
+                batch.append(self._items.popleft())
+            return batch
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+
+    def close(self):
+        """唤醒等待中的get_batch，之后get_batch不再阻塞"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self._items)
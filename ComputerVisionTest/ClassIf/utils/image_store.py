@@ -0,0 +1,120 @@
+import os
+import hashlib
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+# 历史图像按内容哈希存放：history_images/ab/ab12...ef.jpg，相同图像只存一份
+IMAGE_STORE_DIR = "history_images"
+# 缩略图缓存目录
+THUMBNAIL_DIR = os.path.join(IMAGE_STORE_DIR, "thumbs")
+THUMBNAIL_SIZE = (96, 96)
+# 后台生成缩略图的线程数
+THUMBNAIL_WORKERS = 2
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """计算文件内容的sha256"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def store_image(src_path):
+    """
+    把图像按内容哈希存入历史图像目录，已存在相同内容时直接返回已有路径
+    :return: 存储后的路径
+    """
+    digest = file_hash(src_path)
+    ext = os.path.splitext(src_path)[1].lower() or ".jpg"
+    dest_dir = os.path.join(IMAGE_STORE_DIR, digest[:2])
+    dest_path = os.path.join(dest_dir, digest + ext)
+    if not os.path.exists(dest_path):
+        os.makedirs(dest_dir, exist_ok=True)
+        # 先写临时文件再改名，中途失败不会留下不完整的图像
+        tmp_path = f"{dest_path}.{threading.get_ident()}.tmp"
+        shutil.copyfile(src_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+    return dest_path
+
+
+def is_stored_image(path):
+    """是否为本目录管理的图像（删除记录时只删除这类文件）"""
+    store = os.path.abspath(IMAGE_STORE_DIR)
+    return os.path.commonpath([os.path.abspath(path), store]) == store
+
+
+def thumbnail_path(image_path):
+    """缩略图路径，以图像路径、修改时间和大小为键，原图被替换后会重新生成"""
+    st = os.stat(image_path)
+    key = hashlib.sha1(f"{os.path.abspath(image_path)}:{st.st_mtime_ns}:{st.st_size}".encode('utf-8')).hexdigest()
+    return os.path.join(THUMBNAIL_DIR, key + ".jpg")
+
+
+def make_thumbnail(image_path, size=THUMBNAIL_SIZE):
+    """生成（或直接返回已缓存的）缩略图，返回缩略图路径"""
+    thumb_path = thumbnail_path(image_path)
+    if os.path.exists(thumb_path):
+        return thumb_path
+    os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+    with Image.open(image_path) as image:
+        # JPEG按目标尺寸降采样解码，不必解码整张大图
+        image.draft('RGB', (size[0] * 2, size[1] * 2))
+        image = image.convert('RGB')
+        image.thumbnail(size)
+        tmp_path = f"{thumb_path}.{threading.get_ident()}.tmp"
+        image.save(tmp_path, "JPEG", quality=85)
+    os.replace(tmp_path, thumb_path)
+    return thumb_path
+
+
+def remove_thumbnail(image_path):
+    try:
+        os.remove(thumbnail_path(image_path))
+    except OSError:
+        pass
+
+
+class ThumbnailCache:
+    """
+    在后台线程池中按需生成缩略图；同一图像同时只生成一次，
+    生成完成后调用回调 callback(image_path, thumb_path)，失败时thumb_path为None
+    """
+
+    def __init__(self, workers=THUMBNAIL_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnail")
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def request(self, image_path, callback):
+        """已有缓存时直接返回缩略图路径，否则提交后台生成并返回None"""
+        try:
+            thumb_path = thumbnail_path(image_path)
+        except OSError:
+            return None
+        if os.path.exists(thumb_path):
+            return thumb_path
+        with self._lock:
+            if image_path in self._pending:
+                return None
+            self._pending.add(image_path)
+        self._pool.submit(self._generate, image_path, callback)
+        return None
+
+    def _generate(self, image_path, callback):
+        try:
+            thumb_path = make_thumbnail(image_path)
+        except Exception as e:
+            print(f"生成缩略图失败: {image_path}: {str(e)}")
+            thumb_path = None
+        finally:
+            with self._lock:
+                self._pending.discard(image_path)
+        callback(image_path, thumb_path)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
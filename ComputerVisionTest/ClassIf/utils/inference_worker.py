@@ -0,0 +1,97 @@
+import threading
+
+import cv2
+from PIL import Image
+
+from utils.frame_queue import LatestFrameQueue
+from utils.model_registry import registry, ModelLoadError
+
+# 视频文件检测：每隔几帧检测一次，每次最多合并几帧一起推理（吞吐模式）
+VIDEO_DETECTION_STRIDE = 1
+VIDEO_BATCH_SIZE = 4
+# 摄像头检测：只检测最新的一帧，推理跟不上时丢弃旧帧
+CAMERA_DETECTION_STRIDE = 1
+CAMERA_BATCH_SIZE = 1
+
+
+class InferenceWorker:
+    """
+    常驻的视频帧推理线程：从有界队列取帧，结果连同被检测的那一帧通过回调发回。
+    回调在推理线程中调用，界面中传入pyqtSignal.emit，由Qt转到界面线程处理，
+    因此本模块不依赖具体的Qt版本，PyQt5和PyQt6界面共用。
+    """
+
+    def __init__(self, model_path, on_result, on_error=None, stride=1, max_batch=1):
+        """
+        :param model_path: 模型权重文件，可随时修改，下一批推理生效
+        :param on_result: 回调 on_result(frame_id, frame, class_name, probability)
+        :param on_error: 回调 on_error(错误信息)
+        :param stride: 每隔几帧检测一次
+        :param max_batch: 每次最多合并几帧推理
+        """
+        self.model_path = model_path
+        self.on_result = on_result
+        self.on_error = on_error
+        self.running = False
+        self._thread = None
+        self.configure(stride, max_batch)
+
+    def configure(self, stride, max_batch):
+        """
+        :param stride: 每隔几帧检测一次
+        :param max_batch: 每次最多合并几帧推理，为1时队列只保留最新一帧
+        """
+        self.stride = max(1, stride)
+        self.max_batch = max(1, max_batch)
+        # 批量模式下留出一批的余量，解码稍快于推理时不必丢帧
+        self.queue = LatestFrameQueue(self.max_batch * 2 if self.max_batch > 1 else 1)
+
+    def submit(self, frame_id, frame):
+        """按检测步长投递一帧，返回是否投递"""
+        if frame_id % self.stride:
+            return False
+        self.queue.put(frame_id, frame)
+        return True
+
+    def clear(self):
+        self.queue.clear()
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self.run, name="inference_worker", daemon=True)
+        self._thread.start()
+
+    def run(self):
+        while self.running:
+            batch = self.queue.get_batch(self.max_batch, timeout=0.1)
+            if not batch:
+                continue
+            try:
+                # 从注册表取已加载的模型，切换模型后下一批自动使用新模型
+                loaded = registry.get(self.model_path)
+                images = [Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)) for _, frame in batch]
+                if len(images) == 1:
+                    results = [loaded.predict(images[0])]
+                else:
+                    results = loaded.predict_batch(images)
+            except ModelLoadError as e:
+                self._report_error(str(e))
+                continue
+            except Exception as e:
+                self._report_error(f"预测过程中发生错误: {str(e)}")
+                continue
+            for (frame_id, frame), (class_name, probability) in zip(batch, results):
+                self.on_result(frame_id, frame, class_name, probability)
+
+    def _report_error(self, message):
+        if self.on_error is not None:
+            self.on_error(message)
+        else:
+            print(message)
+
+    def stop(self):
+        self.running = False
+        self.queue.close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import time
+import threading
+from collections import OrderedDict
+
+import torch
+
+# 如果moudle目录不在Python路径中，则添加
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from moudle.mobilenet import MobileNetV2
+
+# 类别映射文件路径
+CLASS_INDICES_FILE = "class_indices.json"
+# 同时保留在内存中的模型数量，切换回之前用过的模型时不必重新加载
+MAX_MODELS = 2
+
+
+class ModelLoadError(Exception):
+    """模型或类别映射加载失败，消息可直接显示给用户"""
+
+
+def build_transform():
+    """与训练时验证集一致的预处理"""
+    from torchvision import transforms
+    return transforms.Compose([
+        transforms.Resize((224, 224)),
+        transforms.ToTensor(),
+        transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+    ])
+
+
+class LoadedModel:
+    """已加载到设备上、处于eval模式的模型，连同类别映射和预处理一起缓存"""
+
+    def __init__(self, model, cls_dict, transform, device, model_path):
+        self.model = model
+        self.cls_dict = cls_dict
+        self.transform = transform
+        self.device = device
+        self.model_path = model_path
+        self.load_time = 0.0
+
+    def predict(self, pil_image):
+        """
+        对单张PIL图像进行分类
+        返回: (类别名称, 置信度)
+        """
+        image_tensor = self.transform(pil_image).unsqueeze(0).to(self.device)
+        with torch.no_grad():
+            output = torch.squeeze(self.model(image_tensor)).cpu()
+            predict = torch.softmax(output, dim=0)
+            predict_cls = torch.argmax(predict).numpy()
+        return self.cls_dict[str(predict_cls)], predict[predict_cls].item()
+
+    def predict_batch(self, pil_images):
+        """
+        一次前向处理多张图像（视频文件的吞吐模式）
+        返回: [(类别名称, 置信度), ...]，与输入顺序一致
+        """
+        return self.classify_tensors(torch.stack([self.transform(image) for image in pil_images]))
+
+    def classify_tensors(self, batch):
+        """
+        对已预处理的图像张量批次[N, 3, 224, 224]进行分类
+        返回: [(类别名称, 置信度), ...]
+        """
+        with torch.inference_mode():
+            output = self.model(batch.to(self.device, non_blocking=True))
+            probs, classes = torch.softmax(output, dim=1).max(dim=1)
+        return [(self.cls_dict[str(c)], p) for c, p in zip(classes.cpu().tolist(), probs.cpu().tolist())]
+
+
+class ModelRegistry:
+    """
+    进程内的模型注册表：按权重文件路径和修改时间缓存已加载的模型，
+    每个权重文件只在第一次使用（或文件被覆盖）时读取一次，之后的图像、视频帧直接推理。
+    当前模型的切换是一次引用赋值，正在进行的预测继续使用它开始时拿到的模型。
+    """
+
+    def __init__(self, json_path=CLASS_INDICES_FILE, max_models=MAX_MODELS):
+        self.json_path = json_path
+        self.max_models = max_models
+        self.device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._transform = None
+        self.active = None
+
+    def _key(self, model_path):
+        try:
+            return (os.path.abspath(model_path), os.path.getmtime(model_path),
+                    os.path.getmtime(self.json_path))
+        except FileNotFoundError:
+            if not os.path.exists(self.json_path):
+                raise ModelLoadError("找不到类别映射文件")
+            raise ModelLoadError(f"加载模型失败: 找不到模型文件 {model_path}")
+
+    def _load(self, model_path):
+        start = time.perf_counter()
+        with open(self.json_path, 'r') as f:
+            cls_dict = json.load(f)
+        model = MobileNetV2(num_classes=len(cls_dict))
+        try:
+            model.load_state_dict(torch.load(model_path, map_location=self.device))
+        except Exception as e:
+            raise ModelLoadError(f"加载模型失败: {str(e)}")
+        model.to(self.device)
+        model.eval()
+        if self._transform is None:
+            self._transform = build_transform()
+        loaded = LoadedModel(model, cls_dict, self._transform, self.device, model_path)
+        loaded.load_time = time.perf_counter() - start
+        print(f"已加载模型: {model_path}，耗时{loaded.load_time * 1000:.0f}ms")
+        return loaded
+
+    def get(self, model_path):
+        """返回已加载的模型，不在缓存中或权重文件已更新时加载"""
+        key = self._key(model_path)
+        with self._lock:
+            loaded = self._models.get(key)
+            if loaded is None:
+                loaded = self._load(model_path)
+                # 同一路径的旧版本不再需要
+                for old_key in [k for k in self._models if k[0] == key[0]]:
+                    del self._models[old_key]
+                self._models[key] = loaded
+                while len(self._models) > self.max_models:
+                    self._models.popitem(last=False)
+            else:
+                self._models.move_to_end(key)
+            return loaded
+
+    def activate(self, model_path):
+        """加载并切换当前模型"""
+        loaded = self.get(model_path)
+        self.active = loaded
+        return loaded
+
+    def preload(self, model_path, on_error=None):
+        """在后台线程中加载并切换当前模型，用户选择模型后调用，首次检测不必再等待加载"""
+        def run():
+            try:
+                self.activate(model_path)
+            except ModelLoadError as e:
+                print(str(e))
+                if on_error is not None:
+                    on_error(str(e))
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def predict(self, model_path, pil_image):
+        """返回: (类别名称, 置信度)"""
+        return self.get(model_path).predict(pil_image)
+
+
+# 全局共享的注册表
+registry = ModelRegistry()
+
+
+if __name__ == "__main__":
+    from PIL import Image
+    model_path, image_path = sys.argv[1], sys.argv[2]
+    image = Image.open(image_path).convert('RGB')
+    loaded = registry.activate(model_path)
+    times = []
+    for _ in range(20):
+        start = time.perf_counter()
+        class_name, probability = registry.predict(model_path, image)
+        times.append(time.perf_counter() - start)
+    print(f"结果: {class_name} {probability:.3f}")
+    print(f"加载耗时 {loaded.load_time * 1000:.0f}ms，之后每次预测平均 {sum(times) / len(times) * 1000:.1f}ms")
@@ -8,39 +8,42 @@ YAMNet麦克风音频分类Demo
 
 import os
 import numpy as np
-import tensorflow as tf
 import librosa
-import pandas as pd
 from typing import Tuple, List, Dict
 import json
 import time
-import threading
-from collections import deque
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.mic import get_audio_16k, get_audio_frame_16k
+from utils.mic import MicStream
+from components.audio_ring import AudioRing
+from components.sound_classifier import create_backend, load_class_names, IncrementalClassifier
 
-# 抑制TensorFlow的内存警告
+# 抑制TensorFlow的内存警告（TensorFlow只在使用SavedModel时由后端加载）
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
-tf.get_logger().setLevel('ERROR')
 
 class YAMNetMicDemo:
-    def __init__(self, model_path: str = "models/yamnet", device=3):
+    def __init__(self, model_path: str = "models/yamnet", device=3, backend=None, incremental=True):
         """
         初始化YAMNet麦克风检测模型
         
         Args:
-            model_path: 本地模型路径，默认为models/yamnet
+            model_path: 本地模型路径，SavedModel目录或导出的.tflite/.onnx文件，默认为models/yamnet
             device: 音频设备索引
+            backend: 模型后端（savedmodel/tflite/onnx），None表示按路径判断
+            incremental: 是否使用增量推理，只计算新到达的0.96秒块并复用重叠部分的分数
         """
         self.model = None
+        self.backend = None
+        self.classifier = None
+        self.incremental = incremental
+        self.backend_name = backend
         self.class_names = None
         self.sample_rate = 16000  # YAMNet要求的采样率
         self.device = device
         self.is_running = False
-        self.audio_buffer = deque(maxlen=int(self.sample_rate * 10))  # 10秒音频缓冲区
+        self.audio_buffer = AudioRing(self.sample_rate * 10, self.sample_rate)  # 10秒float32环形缓冲区
+        self.mic = MicStream(self.audio_buffer, device=device)  # 回调持续采集并重采样到16kHz
         self.detection_interval = 2.0  # 检测间隔（秒）
-        self.frame_duration = 0.5  # 每帧时长（秒）
         
         # 加载本地模型
         if not self.load_local_model(model_path):
@@ -56,20 +59,22 @@ class YAMNetMicDemo:
                 print(f"错误: 模型路径不存在: {model_path}")
                 return False
             
-            # 加载SavedModel
-            self.model = tf.saved_model.load(model_path)
+            # 加载模型后端（SavedModel/TFLite/ONNX）
+            self.backend = create_backend(model_path, self.backend_name)
+            self.model = getattr(self.backend, 'model', None)
+            if self.model is None and not self.incremental:
+                print("导出的单块模型只支持增量推理，已切换为增量模式")
+                self.incremental = True
+            self.classifier = IncrementalClassifier(self.backend, self.audio_buffer)
             print("模型加载成功！")
             
-            # 加载类别映射文件
-            class_map_path = os.path.join(model_path, "assets", "yamnet_class_map.csv")
-            if os.path.exists(class_map_path):
-                class_map_df = pd.read_csv(class_map_path)
-                self.class_names = class_map_df['display_name'].values
-                print(f"已加载 {len(self.class_names)} 个类别")
-            else:
+            # 加载类别映射文件，找不到时使用默认类别名称（YAMNet有521个类别）
+            class_map_path = getattr(self.backend, 'class_map', None)
+            if not class_map_path or not os.path.exists(class_map_path):
                 print("警告: 未找到类别映射文件，将使用默认类别名称")
-                # 创建默认类别名称
-                self.class_names = [f"class_{i}" for i in range(521)]  # YAMNet有521个类别
+            self.class_names = load_class_names(class_map_path)
+            self.classifier.class_names = self.class_names
+            print(f"已加载 {len(self.class_names)} 个类别")
             
             return True
             
@@ -77,22 +82,6 @@ class YAMNetMicDemo:
             print(f"加载本地模型失败: {e}")
             return False
     
-    def audio_collection_thread(self):
-        """音频收集线程"""
-        print("开始音频收集...")
-        while self.is_running:
-            try:
-                # 使用utils/mic获取16kHz音频帧
-                audio_frame = get_audio_frame_16k(self.frame_duration, self.device)
-                
-                # 添加到缓冲区
-                if len(audio_frame) > 0:
-                    self.audio_buffer.extend(audio_frame)
-                
-            except Exception as e:
-                print(f"音频收集错误: {e}")
-                time.sleep(0.1)
-    
     def get_audio_segment(self, duration: float) -> np.ndarray:
         """
         从缓冲区获取指定时长的音频片段
@@ -101,16 +90,14 @@ class YAMNetMicDemo:
             duration: 音频时长（秒）
             
         Returns:
-            音频数据
+            音频数据（环形缓冲区的只读视图，不拷贝）
         """
         samples_needed = int(duration * self.sample_rate)
         
-        # 如果缓冲区数据不足，返回空数组
-        if len(self.audio_buffer) < samples_needed:
-            return np.array([])
-        
-        # 从缓冲区末尾获取最新的音频数据
-        audio_data = np.array(list(self.audio_buffer)[-samples_needed:])
+        # 从缓冲区末尾获取最新的音频数据，数据不足时返回空数组
+        _, audio_data = self.audio_buffer.latest(samples_needed)
+        if audio_data is None:
+            return np.array([], dtype=np.float32)
         return audio_data
     
     def predict(self, audio_data: np.ndarray) -> Dict:
@@ -130,45 +117,55 @@ class YAMNetMicDemo:
             return None
         
         try:
-            # 确保音频数据是float32类型
-            audio_data = audio_data.astype(np.float32)
-            
-            # 运行模型推理
-            scores, embeddings, spectrogram = self.model(audio_data)
+            # 环形缓冲区已是float32，无需转换
+            audio_data = np.asarray(audio_data, dtype=np.float32)
             
-            # 使用本地加载的类别名称
-            class_names = self.class_names
+            # 运行模型推理，embeddings和spectrogram用不到，不转换成numpy
+            scores = self.model(audio_data)[0].numpy()
+            return self._make_results(scores, np.mean(scores, axis=0))
             
-            # 计算平均分数
-            mean_scores = np.mean(scores, axis=0)
-            
-            # 获取前5个最高分数的类别
-            top_indices = np.argsort(mean_scores)[-5:][::-1]
-            
-            results = {
-                'scores': scores.numpy(),
-                'embeddings': embeddings.numpy(),
-                'spectrogram': spectrogram.numpy(),
-                'class_names': class_names,
-                'mean_scores': mean_scores,
-                'top_predictions': []
-            }
-            
-            for i, idx in enumerate(top_indices):
-                score = mean_scores[idx]
-                class_name = class_names[idx]
-                results['top_predictions'].append({
-                    'class_name': class_name,
-                    'score': float(score),
-                    'rank': i + 1
-                })
+        except Exception as e:
+            print(f"预测过程中出现错误: {e}")
+            return None
+    
+    def predict_incremental(self, duration: float) -> Dict:
+        """
+        增量预测：先计算缓冲区中新到达的块，再由缓存的块分数汇总最近duration秒的结果
+        
+        Args:
+            duration: 窗口时长（秒）
             
-            return results
+        Returns:
+            预测结果字典，窗口内还没有完整块时返回None
+        """
+        try:
+            self.classifier.update()
+            scores, mean_scores = self.classifier.window_scores(duration)
+            if scores is None:
+                return None
+            return self._make_results(scores, mean_scores)
             
         except Exception as e:
             print(f"预测过程中出现错误: {e}")
             return None
     
+    def _make_results(self, scores: np.ndarray, mean_scores: np.ndarray) -> Dict:
+        """由逐块分数和平均分数生成结果字典，包含前5个最高分数的类别"""
+        top_indices = np.argsort(mean_scores)[-5:][::-1]
+        results = {
+            'scores': scores,
+            'class_names': self.class_names,
+            'mean_scores': mean_scores,
+            'top_predictions': []
+        }
+        for i, idx in enumerate(top_indices):
+            results['top_predictions'].append({
+                'class_name': self.class_names[idx],
+                'score': float(mean_scores[idx]),
+                'rank': i + 1
+            })
+        return results
+    
     def print_results(self, results: Dict, timestamp: str):
         """
         在控制台打印预测结果
@@ -247,15 +244,15 @@ class YAMNetMicDemo:
         print("=== YAMNet实时音频分类Demo ===")
         print(f"检测间隔: {self.detection_interval} 秒")
         print(f"音频设备: {self.device}")
+        print(f"推理方式: {'增量' if self.incremental else '整段'}")
         print("按 Ctrl+C 停止检测\n")
         
         try:
             self.is_running = True
             
-            # 启动音频收集线程
-            audio_thread = threading.Thread(target=self.audio_collection_thread)
-            audio_thread.daemon = True
-            audio_thread.start()
+            # 启动连续音频采集
+            print("开始音频收集...")
+            self.mic.start()
             
             # 等待缓冲区填充
             print("等待音频缓冲区填充...")
@@ -272,19 +269,19 @@ class YAMNetMicDemo:
                     detection_count += 1
                     timestamp = time.strftime("%H:%M:%S")
                     
-                    # 获取音频片段（使用最近5秒的音频）
-                    audio_data = self.get_audio_segment(5.0)
+                    # 使用最近5秒的音频进行预测
+                    if self.incremental:
+                        results = self.predict_incremental(5.0)
+                    else:
+                        audio_data = self.get_audio_segment(5.0)
+                        results = self.predict(audio_data) if len(audio_data) > 0 else None
                     
-                    if len(audio_data) > 0:
-                        # 进行预测
-                        results = self.predict(audio_data)
+                    if results:
+                        # 显示结果
+                        self.print_results(results, timestamp)
                         
-                        if results:
-                            # 显示结果
-                            self.print_results(results, timestamp)
-                            
-                            # 保存高置信度结果
-                            self.save_results(results, timestamp)
+                        # 保存高置信度结果
+                        self.save_results(results, timestamp)
                     
                     last_detection_time = current_time
                 
@@ -295,12 +292,14 @@ class YAMNetMicDemo:
             print("\n\n检测已停止")
         finally:
             self.is_running = False
-            if audio_thread.is_alive():
-                audio_thread.join(timeout=1)
+            self.mic.stop()
+            if self.mic.overflows:
+                print(f"音频输入溢出 {self.mic.overflows} 次")
     
     def cleanup(self):
         """清理资源"""
         self.is_running = False
+        self.mic.stop()
 
 
 def main():
@@ -309,7 +308,9 @@ def main():
     
     try:
         # 初始化YAMNet麦克风检测
-        yamnet_mic = YAMNetMicDemo("models/yamnet", device=3)
+        # 可在命令行指定模型路径，如导出的models/yamnet.tflite
+        model_path = sys.argv[1] if len(sys.argv) > 1 else "models/yamnet"
+        yamnet_mic = YAMNetMicDemo(model_path, device=3)
         
         # 运行实时检测
         yamnet_mic.run_realtime_detection()
@@ -0,0 +1,156 @@
+import time
+import numpy as np
+from multiprocessing import shared_memory
+
+# 头部字段（int64）
+_HDR_TOTAL = 0      # 累计写入的样本数
+_HDR_CAPACITY = 1
+_HDR_RATE = 2
+_HDR_SIZE = 8
+
+
+class AudioBus:
+    """
+    基于multiprocessing.shared_memory的麦克风音频总线：采集进程独占设备，单写int16 PCM，
+    唤醒词、声音分类等多个进程各自按需读取，麦克风只打开一次。
+    与AudioRing相同，每个样本同时写入 i 和 i+capacity 两处，任意不超过容量的窗口都是连续内存。
+    接口与components.audio_ring.AudioRing一致（total/capacity/sample_rate/latest/read_at），
+    可直接交给IncrementalClassifier使用，读出的是float32（[-1, 1)）副本。
+
+    内存布局：
+        [头部 8*int64] | 2*capacity个int16样本
+    """
+
+    def __init__(self, capacity, sample_rate=16000, name=None, create=True):
+        """
+        :param capacity: 容量（样本数）
+        :param sample_rate: 采样率
+        :param name: 共享内存名称，create=False时必须指定
+        :param create: True创建新的共享内存，False连接已有的共享内存
+        """
+        self.capacity = int(capacity)
+        self.sample_rate = int(sample_rate)
+        self._create = create
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=_HDR_SIZE * 8 + 4 * self.capacity)
+        self._hdr = np.ndarray((_HDR_SIZE,), dtype=np.int64, buffer=self.shm.buf)
+        self._pcm = np.ndarray((2 * self.capacity,), dtype=np.int16, buffer=self.shm.buf, offset=_HDR_SIZE * 8)
+        if create:
+            self._hdr[:] = 0
+            self._hdr[_HDR_CAPACITY] = self.capacity
+            self._hdr[_HDR_RATE] = self.sample_rate
+
+    def __reduce__(self):
+        # spawn方式启动子进程时按名称重新连接
+        return self.__class__, (self.capacity, self.sample_rate, self.shm.name, False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def total(self):
+        return int(self._hdr[_HDR_TOTAL])
+
+    # ----------------- 写者接口 -----------------
+    def write(self, pcm):
+        """写入一块int16样本（如PvRecorder.read()返回的一帧），永不阻塞"""
+        pcm = np.asarray(pcm, dtype=np.int16).ravel()
+        # 超过容量的块只写入最后capacity个样本，但累计样本数按完整长度推进
+        written = len(pcm)
+        skipped = max(0, written - self.capacity)
+        pcm = pcm[skipped:]
+        n = len(pcm)
+        total = int(self._hdr[_HDR_TOTAL]) + skipped
+        i = total % self.capacity
+        first = min(n, self.capacity - i)
+        self._pcm[i:i + first] = pcm[:first]
+        self._pcm[i + self.capacity:i + self.capacity + first] = pcm[:first]
+        if first < n:
+            rest = n - first
+            self._pcm[:rest] = pcm[first:]
+            self._pcm[self.capacity:self.capacity + rest] = pcm[first:]
+        # 数据写完后再推进计数，读者看到的total范围内的样本总是完整的
+        self._hdr[_HDR_TOTAL] = total + n
+
+    # ----------------- 读者接口 -----------------
+    def read_pcm(self, end, n):
+        """
+        拷贝以累计样本数end结束的n个int16样本
+        :return: int16数组，数据已被覆盖或尚未写入时返回None
+        """
+        total = self.total
+        if n <= 0 or end > total or end - n < 0 or total - (end - n) > self.capacity:
+            return None
+        stop = end % self.capacity + self.capacity
+        pcm = self._pcm[stop - n:stop].copy()
+        # 拷贝期间写者可能已经绕回覆盖了这段数据
+        if self.total - (end - n) > self.capacity:
+            return None
+        return pcm
+
+    def read_at(self, end, n):
+        pcm = self.read_pcm(end, n)
+        return None if pcm is None else pcm.astype(np.float32) / 32768.0
+
+    def latest(self, n):
+        total = self.total
+        return total, self.read_at(total, n)
+
+    def reader(self, frame_length=512):
+        return AudioBusReader(self, frame_length)
+
+    def close(self):
+        # 先释放numpy视图再关闭共享内存，否则会报BufferError
+        self._hdr = self._pcm = None
+        self.shm.close()
+
+    def unlink(self):
+        if self._create:
+            self.shm.unlink()
+
+
+class AudioBusReader:
+    """
+    顺序读取句柄：像PvRecorder.read()一样逐帧取出连续的int16样本，没有新数据时等待；
+    落后超过总线容量时跳到最新位置并累计丢弃的样本数
+    """
+
+    def __init__(self, bus, frame_length=512, poll_interval=0.005):
+        """
+        :param bus: AudioBus
+        :param frame_length: read()默认的帧长度（样本数），如porcupine.frame_length
+        :param poll_interval: 等待新数据时的轮询间隔（秒）
+        """
+        self.bus = bus
+        self.frame_length = frame_length
+        self.poll_interval = poll_interval
+        self.cursor = bus.total
+        self.dropped = 0
+
+    def sync(self):
+        """跳过尚未读取的旧音频，从当前位置开始读（如处理完一条语音指令后恢复唤醒词检测）"""
+        self.cursor = self.bus.total
+
+    def read(self, frame_length=None, timeout=None):
+        """
+        :param frame_length: 帧长度（样本数），None表示使用默认帧长度
+        :param timeout: 最长等待时间（秒），None表示一直等待
+        :return: int16数组，超时返回None
+        """
+        frame_length = frame_length or self.frame_length
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            total = self.bus.total
+            if total - self.cursor > self.bus.capacity - frame_length:
+                skip = total - frame_length - self.cursor
+                self.dropped += skip
+                self.cursor += skip
+            if total >= self.cursor + frame_length:
+                pcm = self.bus.read_pcm(self.cursor + frame_length, frame_length)
+                if pcm is not None:
+                    self.cursor += frame_length
+                    return pcm
+                continue
+            if deadline is not None and time.time() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
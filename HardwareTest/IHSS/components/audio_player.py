@@ -0,0 +1,318 @@
+import io
+import os
+import time
+import wave
+import queue
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from multiprocessing import Value, Array
+import numpy as np
+
+OUTPUT_RATE = 16000     # 输出采样率，提示音均为16kHz单声道，其余音频解码时重采样
+OUTPUT_BLOCK = 256      # 每次回调输出的帧数（16ms）
+# 播放通道：同一通道内的音频按顺序依次播放，不同通道叠加混音；提示音在报警音播放期间被压低（ducking）
+CHANNELS = ('prompt', 'alarm')
+DUCK_GAIN = 0.3
+DUCK_RAMP = 0.02        # 压低与恢复的渐变时长（秒），避免突变产生爆音
+
+
+def decode_wav(source, rate=OUTPUT_RATE):
+    """
+    解码wav并转换为rate采样率的单声道float32数组（数值范围与int16一致）
+    :param source: 文件路径或内存中的wav字节
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    with wave.open(source, 'rb') as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"只支持16位PCM wav，当前为{wf.getsampwidth() * 8}位")
+        channels = wf.getnchannels()
+        src_rate = wf.getframerate()
+        data = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    samples = data.reshape(-1, channels).mean(axis=1, dtype=np.float32) if channels > 1 else data.astype(np.float32)
+    if src_rate != rate and len(samples):
+        # 线性插值重采样，只在首次加载时做一次
+        n = int(round(len(samples) * rate / src_rate))
+        samples = np.interp(np.arange(n) * (src_rate / rate), np.arange(len(samples)), samples).astype(np.float32)
+    return samples
+
+
+class ClipCache:
+    """已解码、已重采样的音频LRU缓存，按文件路径和修改时间索引，替换资源文件后自动重新加载"""
+
+    def __init__(self, rate=OUTPUT_RATE, max_bytes=16 * 1024 * 1024):
+        self.rate = rate
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._clips = OrderedDict()
+
+    def get(self, path):
+        key = (path, os.path.getmtime(path))
+        clip = self._clips.get(key)
+        if clip is not None:
+            self._clips.move_to_end(key)
+            self.hits += 1
+            return clip
+        self.misses += 1
+        clip = decode_wav(path, self.rate)
+        self._clips[key] = clip
+        self.nbytes += clip.nbytes
+        # 淘汰最久未使用的音频，至少保留刚加载的一条
+        while self.nbytes > self.max_bytes and len(self._clips) > 1:
+            _, old = self._clips.popitem(last=False)
+            self.nbytes -= old.nbytes
+        return clip
+
+    def preload(self, paths):
+        for path in paths:
+            try:
+                self.get(path)
+            except (OSError, ValueError, wave.Error) as e:
+                print(f"[音频预加载失败] {path}: {e}")
+
+
+class _Voice:
+    __slots__ = ('samples', 'pos', 'gain', 'submitted')
+
+    def __init__(self, samples, gain, submitted):
+        self.samples = samples
+        self.pos = 0
+        self.gain = gain
+        self.submitted = submitted
+
+
+class Mixer:
+    """
+    小型混音器：每个通道一个播放队列，输出回调每次取一块，把各通道当前音频按音量叠加后转为int16，
+    报警音播放期间提示音渐变压低到duck_gain。add()与render()可在不同线程调用。
+    """
+
+    def __init__(self, rate=OUTPUT_RATE, duck_gain=DUCK_GAIN, duck_ramp=DUCK_RAMP, on_start=None, on_done=None):
+        """
+        :param on_start: on_start(voice, offset)，音频的第一个样本被混入输出时调用，offset为该样本在本块中的位置（秒）
+        :param on_done: on_done(voice)，音频播放完时调用
+        """
+        self.rate = rate
+        self.duck_gain = duck_gain
+        self._duck_step = 1.0 / max(duck_ramp * rate, 1.0)
+        self._duck = 1.0
+        self.on_start = on_start
+        self.on_done = on_done
+        self.channels = {name: deque() for name in CHANNELS}
+        self._lock = threading.Lock()
+
+    def add(self, channel, samples, gain=1.0, submitted=None):
+        voice = _Voice(samples, gain, time.time() if submitted is None else submitted)
+        with self._lock:
+            self.channels[channel].append(voice)
+        return voice
+
+    def active(self):
+        return any(self.channels.values())
+
+    def render(self, frames):
+        out = np.zeros(frames, dtype=np.float32)
+        with self._lock:
+            if not self.active() and self._duck == 1.0:
+                return out.astype(np.int16)
+            # 提示音的增益包络：向目标值按固定斜率渐变
+            target = self.duck_gain if self.channels['alarm'] else 1.0
+            if self._duck != target:
+                ramp = self._duck + np.sign(target - self._duck) * self._duck_step * np.arange(1, frames + 1)
+                envelope = np.clip(ramp, min(self._duck, target), max(self._duck, target)).astype(np.float32)
+                self._duck = float(envelope[-1])
+            else:
+                envelope = None
+            for name, voices in self.channels.items():
+                filled = 0
+                while voices and filled < frames:
+                    voice = voices[0]
+                    n = min(frames - filled, len(voice.samples) - voice.pos)
+                    if voice.pos == 0 and self.on_start is not None:
+                        self.on_start(voice, filled / self.rate)
+                    chunk = voice.samples[voice.pos:voice.pos + n] * voice.gain
+                    if name == 'prompt':
+                        if envelope is not None:
+                            chunk *= envelope[filled:filled + n]
+                        elif self._duck != 1.0:
+                            chunk *= self._duck
+                    out[filled:filled + n] += chunk
+                    voice.pos += n
+                    filled += n
+                    if voice.pos >= len(voice.samples):
+                        voices.popleft()
+                        if self.on_done is not None:
+                            self.on_done(voice)
+        np.clip(out, -32768, 32767, out=out)
+        return out.astype(np.int16)
+
+
+class PyAudioOutput:
+    """常驻的PyAudio回调输出流：只在启动时打开一次设备，空闲时输出静音"""
+
+    def __init__(self, render, rate=OUTPUT_RATE, block=OUTPUT_BLOCK, device_index=0):
+        import pyaudio
+        self._continue = pyaudio.paContinue
+        self._render = render
+        self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(format=pyaudio.paInt16, channels=1, rate=rate, output=True,
+                                     output_device_index=device_index, frames_per_buffer=block,
+                                     stream_callback=self._callback)
+        # 从回调写入到声卡发声的延迟（秒）
+        self.latency = self._stream.get_output_latency()
+        self._stream.start_stream()
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        return self._render(frame_count).tobytes(), self._continue
+
+    def close(self):
+        self._stream.stop_stream()
+        self._stream.close()
+        self._pa.terminate()
+
+
+class NullOutput:
+    """不打开声卡，后台线程按实际时长消费输出，用于回放测试和没有扬声器的开发机"""
+
+    def __init__(self, render, rate=OUTPUT_RATE, block=OUTPUT_BLOCK, device_index=0):
+        self._render = render
+        self._interval = block / rate
+        self._block = block
+        self.latency = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        next_time = time.perf_counter()
+        while not self._stop.is_set():
+            self._render(self._block)
+            next_time += self._interval
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_time = time.perf_counter()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+
+OUTPUTS = {
+    'pyaudio': PyAudioOutput,
+    'null': NullOutput,
+}
+
+
+class AudioPlayer:
+    """
+    音频播放：独立的播放进程独占声卡，保持一个常驻输出流，从队列接收播放请求，
+    提示音从预加载的解码缓存中取出后交给混音器，不再每次打开wav文件和输出设备。
+    调用方（语音进程、危险物事件进程）只投递请求，多个进程的音频在同一个混音器中叠加。
+    """
+
+    def __init__(self, backend='pyaudio', device_index=0, rate=OUTPUT_RATE, block=OUTPUT_BLOCK,
+                 preload=(), cache_bytes=16 * 1024 * 1024, duck_gain=DUCK_GAIN, latency_hist=None):
+        """
+        :param backend: 输出后端名称，见OUTPUTS
+        :param device_index: 输出设备编号
+        :param rate: 输出采样率
+        :param block: 每次回调输出的帧数，越小首样本延迟越低、回调越频繁
+        :param preload: 启动时预先解码的wav路径
+        :param cache_bytes: 解码缓存的容量上限（字节）
+        :param duck_gain: 报警音播放期间提示音的音量系数
+        :param latency_hist: components.metrics的直方图句柄，记录首样本延迟，None表示不记录
+        """
+        self.backend = backend
+        self.device_index = device_index
+        self.rate = rate
+        self.block = block
+        self.preload = list(preload)
+        self.cache_bytes = cache_bytes
+        self.duck_gain = duck_gain
+        self.latency_hist = latency_hist
+        self.queue = multiprocessing.Queue()
+        # 已投递但未播放完的音频数
+        self.pending = Value('i', 0)
+        # [已播放条数, 已播放秒数, 首样本延迟总和, 首样本延迟最大值, 最近一次首样本延迟, 缓存命中, 缓存未命中]
+        self.stats_array = Array('d', 7)
+
+    # ----------------- 调用方接口 -----------------
+    def play(self, clip, volume=1.0, channel='prompt'):
+        """
+        :param clip: wav文件路径，或内存中的wav字节（如TTS结果，不进入缓存）
+        :param channel: 'prompt'按顺序播放，'alarm'叠加在提示音上并压低提示音
+        """
+        if channel not in CHANNELS:
+            raise KeyError(f"未知的播放通道: {channel}")
+        with self.pending.get_lock():
+            self.pending.value += 1
+        self.queue.put((clip if isinstance(clip, str) else bytes(clip), float(volume), channel, time.time()))
+
+    def is_playing(self):
+        return self.pending.value > 0
+
+    def stats(self):
+        played, seconds, lat_sum, lat_max, lat_last, hits, misses = self.stats_array[:]
+        return {'backend': self.backend, 'played': int(played), 'seconds': round(seconds, 2),
+                'pending': self.pending.value,
+                'first_sample_ms': {'mean': round(lat_sum / played * 1000, 2) if played else None,
+                                    'max': round(lat_max * 1000, 2), 'last': round(lat_last * 1000, 2)},
+                'cache': {'hits': int(hits), 'misses': int(misses)}}
+
+    def stop(self):
+        self.queue.put(None)
+
+    # ----------------- 播放进程 -----------------
+    def _finish(self, voice=None):
+        if voice is not None:
+            self.stats_array[1] += len(voice.samples) / self.rate
+        with self.pending.get_lock():
+            self.pending.value -= 1
+
+    def run(self):
+        cache = ClipCache(self.rate, self.cache_bytes)
+        cache.preload(self.preload)
+        output_latency = [0.0]
+
+        def on_start(voice, offset):
+            latency = time.time() - voice.submitted + offset + output_latency[0]
+            stats = self.stats_array
+            stats[0] += 1
+            stats[2] += latency
+            stats[3] = max(stats[3], latency)
+            stats[4] = latency
+            if self.latency_hist is not None:
+                self.latency_hist.observe(latency)
+
+        mixer = Mixer(self.rate, self.duck_gain, on_start=on_start, on_done=self._finish)
+        output = OUTPUTS[self.backend](mixer.render, self.rate, self.block, self.device_index)
+        output_latency[0] = output.latency
+        print(f"音频播放进程启动（{self.backend}，预加载 {len(cache._clips)} 条，输出延迟 {output.latency * 1000:.1f}ms）")
+        while True:
+            try:
+                item = self.queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError, ValueError):
+                # 调用方进程退出时队列被关闭
+                break
+            if item is None:
+                break
+            clip, volume, channel, submitted = item
+            try:
+                samples = cache.get(clip) if isinstance(clip, str) else decode_wav(clip, self.rate)
+            except (OSError, ValueError, EOFError, wave.Error) as e:
+                print(f"[音频播放失败] {e}")
+                self._finish()
+                continue
+            self.stats_array[5], self.stats_array[6] = cache.hits, cache.misses
+            if len(samples):
+                mixer.add(channel, samples, volume, submitted)
+            else:
+                self._finish()
+        output.close()
@@ -0,0 +1,130 @@
+import threading
+from math import gcd
+import numpy as np
+
+
+class PolyphaseResampler:
+    """
+    有状态的流式多相重采样器：按块输入任意长度的音频，输出连续无缝的重采样结果，
+    块与块之间保留滤波器历史和相位，不会像逐块调用librosa.resample那样在块边界产生失真。
+    """
+
+    def __init__(self, orig_sr=44100, target_sr=16000, taps_per_phase=32, beta=8.0):
+        """
+        :param orig_sr: 输入采样率
+        :param target_sr: 输出采样率
+        :param taps_per_phase: 每个输出样本使用的输入样本数，越大阻带衰减越好
+        :param beta: Kaiser窗参数
+        """
+        g = gcd(orig_sr, target_sr)
+        self.up = target_sr // g
+        self.down = orig_sr // g
+        self.taps = taps_per_phase
+        # 原型低通滤波器，截止频率取两个采样率中较低者的奈奎斯特频率并留出过渡带
+        n = self.up * taps_per_phase
+        cutoff = 0.9 / max(self.up, self.down)
+        t = np.arange(n) - (n - 1) / 2
+        h = cutoff * np.sinc(cutoff * t) * np.kaiser(n, beta) * self.up
+        # 拆成多相：poly[p, k] = h[p + k * up]
+        self.poly = np.ascontiguousarray(h.reshape(taps_per_phase, self.up).T[:, ::-1], dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._pos = (self.taps - 1) * self.up  # 下一个输出样本在 history+输入 中的位置，单位为 1/up 个输入样本
+
+    def process(self, x):
+        """
+        :param x: 一块float32输入
+        :return: 对应的重采样输出（长度随相位变化）
+        """
+        buf = np.concatenate([self._history, np.asarray(x, dtype=np.float32).ravel()])
+        # 可以计算的输出：base = pos // up 必须落在 buf 内，未算的输出留到下一块，保证其窗口完全落在保留的历史之后
+        last = len(buf) * self.up - 1
+        if self._pos > last:
+            count = 0
+        else:
+            count = (last - self._pos) // self.down + 1
+        positions = self._pos + np.arange(count, dtype=np.int64) * self.down
+        bases = positions // self.up
+        phases = positions % self.up
+        # 每个输出取 [base - taps + 1, base] 共taps个输入，与反转后的多相系数做点积
+        windows = np.lib.stride_tricks.sliding_window_view(buf, self.taps)
+        y = np.einsum('ij,ij->i', windows[bases - self.taps + 1], self.poly[phases])
+        # 保留最后 taps-1 个输入作为下一块的历史
+        self._pos += count * self.down
+        consumed = len(buf) - (self.taps - 1)
+        self._history = buf[consumed:].copy()
+        self._pos -= consumed * self.up
+        return y.astype(np.float32, copy=False)
+
+
+class AudioRing:
+    """
+    预分配的float32音频环形缓冲区：单写多读，读取最新窗口不拷贝。
+    缓冲区长度为容量的两倍，每个样本同时写入 i 和 i+capacity 两处，
+    因此任意不超过容量的最新窗口在内存中都是连续的，可以直接返回只读视图。
+    视图在之后 capacity - 窗口长度 个样本写入之前保持有效。
+    """
+
+    def __init__(self, capacity, sample_rate=16000):
+        """
+        :param capacity: 容量（样本数）
+        :param sample_rate: 采样率，仅用于按秒换算
+        """
+        self.capacity = int(capacity)
+        self.sample_rate = sample_rate
+        self._buf = np.zeros(2 * self.capacity, dtype=np.float32)
+        self._index = 0      # 下一个写入位置（0 ~ capacity-1）
+        self.total = 0       # 累计写入的样本数，可作为样本时间戳
+        self._lock = threading.Lock()
+
+    def write(self, x):
+        x = np.asarray(x, dtype=np.float32).ravel()
+        # 超过容量的块只写入最后capacity个样本，但样本时钟按完整长度推进
+        written = len(x)
+        skipped = max(0, written - self.capacity)
+        x = x[skipped:]
+        n = len(x)
+        with self._lock:
+            i = (self._index + skipped) % self.capacity
+            first = min(n, self.capacity - i)
+            self._buf[i:i + first] = x[:first]
+            self._buf[i + self.capacity:i + self.capacity + first] = x[:first]
+            if first < n:
+                rest = n - first
+                self._buf[:rest] = x[first:]
+                self._buf[self.capacity:self.capacity + rest] = x[first:]
+            self._index = (i + n) % self.capacity
+            self.total += written
+
+    def available(self):
+        return min(self.total, self.capacity)
+
+    def latest(self, n):
+        """
+        :param n: 样本数，不超过容量
+        :return: (窗口结束处的累计样本数, 只读视图)，数据不足返回 (total, None)
+        """
+        with self._lock:
+            total, index = self.total, self._index
+        if n > min(total, self.capacity):
+            return total, None
+        end = index + self.capacity
+        view = self._buf[end - n:end]
+        view.flags.writeable = False
+        return total, view
+
+    def read_at(self, end, n):
+        """
+        读取以累计样本数end结束的n个样本，用于按样本时间对齐的增量处理
+        :return: 只读视图，数据已被覆盖或尚未写入时返回None
+        """
+        with self._lock:
+            total, index = self.total, self._index
+        if end > total or total - (end - n) > self.capacity or end - n < 0:
+            return None
+        stop = index + self.capacity - (total - end)
+        view = self._buf[stop - n:stop]
+        view.flags.writeable = False
+        return view
@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import queue
+import sqlite3
+import threading
+import multiprocessing
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    event_type TEXT NOT NULL,
+    detail TEXT,
+    confidence REAL
+);
+CREATE INDEX IF NOT EXISTS idx_events_type_ts ON events (event_type, ts);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events (ts);
+'''
+
+# 旧版event_log表（ISO文本时间戳，本地时间）迁移到events表
+MIGRATE_LEGACY = '''
+INSERT INTO events (ts, event_type, detail, confidence)
+SELECT (julianday(timestamp, 'utc') - 2440587.5) * 86400.0, event_type, detail, confidence
+FROM event_log WHERE julianday(timestamp) IS NOT NULL ORDER BY id;
+'''
+
+INSERT_SQL = 'INSERT INTO events (ts, event_type, detail, confidence) VALUES (?, ?, ?, ?)'
+
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    # WAL模式下NORMAL只在检查点时fsync，避免每次提交都刷盘
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class EventStore:
+    """
+    事件存储：各进程调用log()把事件放入队列，由唯一的写入进程长期持有WAL连接，
+    按批次合并提交（group commit）；查询按时间与类型下推到SQL并走(event_type, ts)索引。
+    """
+
+    def __init__(self, db_path='events.db', batch_size=256, flush_interval=0.5, max_pending=10000):
+        """
+        :param db_path: 数据库路径
+        :param batch_size: 单次提交的最多事件数
+        :param flush_interval: 收到第一条事件后最多等待多久再提交（秒）
+        :param max_pending: 队列上限，写入进程跟不上时丢弃新事件而不是阻塞调用方
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = multiprocessing.Queue(maxsize=max_pending)
+        self.dropped = multiprocessing.Value('i', 0)
+        self._local = threading.local()
+        self.init_db()
+
+    def init_db(self):
+        conn = _connect(self.db_path)
+        try:
+            conn.executescript(SCHEMA)
+            legacy = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='event_log'").fetchone()
+            if legacy:
+                conn.executescript('BEGIN;' + MIGRATE_LEGACY + 'DROP TABLE event_log; COMMIT;')
+        finally:
+            conn.close()
+
+    # ----------------- 写入 -----------------
+    def log(self, event_type, detail=None, confidence=None, ts=None):
+        """
+        记录一条事件（非阻塞）
+        :return: 是否成功放入队列
+        """
+        ts = time.time() if ts is None else ts
+        detail_str = json.dumps(detail, ensure_ascii=False) if detail is not None else None
+        try:
+            self.queue.put_nowait((ts, event_type, detail_str, confidence))
+            return True
+        except queue.Full:
+            with self.dropped.get_lock():
+                self.dropped.value += 1
+            return False
+
+    def log_many(self, events, ts=None):
+        """
+        一次放入多条事件（非阻塞），写入进程会在同一批次中提交
+        :param events: [(event_type, detail, confidence), ...]
+        :return: 是否成功放入队列
+        """
+        if not events:
+            return True
+        ts = time.time() if ts is None else ts
+        items = [(ts, event_type, json.dumps(detail, ensure_ascii=False) if detail is not None else None, confidence)
+                 for event_type, detail, confidence in events]
+        try:
+            self.queue.put_nowait(items)
+            return True
+        except queue.Full:
+            with self.dropped.get_lock():
+                self.dropped.value += len(items)
+            return False
+
+    def run_writer(self):
+        """写入进程主循环，收到None后提交剩余事件并退出"""
+        conn = _connect(self.db_path)
+        running = True
+        while running:
+            try:
+                item = self.queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            batch = []
+            deadline = time.time() + self.flush_interval
+            while item is not None:
+                # log_many放入的是一组事件
+                if isinstance(item, list):
+                    batch.extend(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if item is None:
+                running = False
+            if batch:
+                try:
+                    with conn:
+                        conn.executemany(INSERT_SQL, batch)
+                except sqlite3.Error as e:
+                    print(f"[事件存储] 批量写入失败，丢弃{len(batch)}条: {e}")
+        conn.close()
+
+    def stop(self):
+        self.queue.put(None)
+
+    # ----------------- 查询 -----------------
+    def _reader(self):
+        # 连接不能跨fork使用，按进程、线程各缓存一个查询连接
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = _connect(self.db_path)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def query(self, start_ts, end_ts, event_types=None, type_prefix=None, detail_keywords=None, limit=None):
+        """
+        查询时间范围内的事件
+        :param start_ts: 开始时间（epoch秒）
+        :param end_ts: 结束时间（epoch秒）
+        :param event_types: 事件类型列表
+        :param type_prefix: 事件类型前缀，如'sound_'
+        :param detail_keywords: detail中包含任一关键字即匹配
+        :param limit: 最多返回条数
+        :return: [(本地时间字符串, event_type, detail, confidence), ...]，按时间升序
+        """
+        q = ("SELECT datetime(ts, 'unixepoch', 'localtime'), event_type, detail, confidence "
+             "FROM events WHERE ts BETWEEN ? AND ?")
+        params = [start_ts, end_ts]
+        if event_types:
+            q += f" AND event_type IN ({','.join('?' * len(event_types))})"
+            params += list(event_types)
+        if type_prefix:
+            # 前缀范围查询可以使用(event_type, ts)索引
+            q += " AND event_type >= ? AND event_type < ?"
+            params += [type_prefix, type_prefix[:-1] + chr(ord(type_prefix[-1]) + 1)]
+        if detail_keywords:
+            q += " AND (" + ' OR '.join(["instr(detail, ?) > 0"] * len(detail_keywords)) + ")"
+            params += list(detail_keywords)
+        q += " ORDER BY ts"
+        if limit:
+            q += " LIMIT ?"
+            params.append(limit)
+        return self._reader().execute(q, params).fetchall()
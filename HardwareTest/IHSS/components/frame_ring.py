@@ -0,0 +1,178 @@
+import numpy as np
+import cv2
+from multiprocessing import shared_memory
+
+# 头部字段（int64）
+_HDR_LATEST = 0   # 最新完整帧序号，0表示尚无帧
+_HDR_SLOTS = 1
+_HDR_H = 2
+_HDR_W = 3
+_HDR_C = 4
+_HDR_READERS = 5
+_HDR_SIZE = 8
+_ALIGN = 64
+_WRITING = -1     # 槽位正在被写入
+
+
+class FrameRing:
+    """
+    基于multiprocessing.shared_memory的多槽位帧环形缓冲区。
+    单写者（摄像头进程）轮流写入N个槽位，每个槽位带有序号；写者从不等待读者，
+    读者直接拿到最新完整帧的只读视图（零拷贝），并统计各自丢掉的帧数。
+    视图在写者绕回一圈后会被覆盖：持有时间短的读者用完后用is_valid(seq)校验，
+    持有时间可能超过一圈的读者（模型推理）传入out，在序号校验内拷贝出私有的一帧。
+
+    内存布局：
+        [头部 8*int64][槽位序号 N*int64][读者丢帧数 R*int64][读者收帧数 R*int64] | 对齐 | N帧图像
+    """
+
+    def __init__(self, shape, slots=4, readers=(), name=None, create=True):
+        """
+        :param shape: 帧形状 (H, W, C)
+        :param slots: 槽位数，读者持有视图期间写者还能写入 slots-1 帧而不覆盖它
+        :param readers: 读者名称列表，各进程需保持一致以便共享丢帧统计
+        :param name: 共享内存名称，create=False时必须指定
+        :param create: True创建新的共享内存，False连接已有的共享内存
+        """
+        self.shape = tuple(shape)
+        self.slots = int(slots)
+        self.readers = tuple(readers)
+        self._create = create
+
+        n_meta = _HDR_SIZE + self.slots + 2 * len(self.readers)
+        self._frames_offset = (n_meta * 8 + _ALIGN - 1) // _ALIGN * _ALIGN
+        frame_size = int(np.prod(self.shape))
+        total = self._frames_offset + frame_size * self.slots
+
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=total)
+        buf = self.shm.buf
+        self._meta = np.ndarray((n_meta,), dtype=np.int64, buffer=buf)
+        self._hdr = self._meta[:_HDR_SIZE]
+        self._slot_seq = self._meta[_HDR_SIZE:_HDR_SIZE + self.slots]
+        self._dropped = self._meta[_HDR_SIZE + self.slots:_HDR_SIZE + self.slots + len(self.readers)]
+        self._received = self._meta[_HDR_SIZE + self.slots + len(self.readers):]
+        self._frames = np.ndarray((self.slots,) + self.shape, dtype=np.uint8,
+                                  buffer=buf, offset=self._frames_offset)
+        # 读者视图只读，防止误改共享帧
+        self._frames_ro = self._frames.view()
+        self._frames_ro.flags.writeable = False
+
+        if create:
+            self._meta[:] = 0
+            self._hdr[_HDR_SLOTS] = self.slots
+            self._hdr[_HDR_H], self._hdr[_HDR_W], self._hdr[_HDR_C] = self.shape
+            self._hdr[_HDR_READERS] = len(self.readers)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __reduce__(self):
+        # spawn方式启动子进程时按名称重新连接
+        return self.__class__, (self.shape, self.slots, self.readers, self.shm.name, False)
+
+    # ----------------- 写者接口 -----------------
+    def write(self, frame, mirror=False):
+        """
+        将一帧写入下一个槽位，永不阻塞。
+        :param frame: 与shape一致的uint8图像
+        :param mirror: 是否在写入时水平翻转（省去每个读者各自cv2.flip一次）
+        :return: 该帧序号
+        """
+        seq = int(self._hdr[_HDR_LATEST]) + 1
+        slot = seq % self.slots
+        self._slot_seq[slot] = _WRITING
+        dst = self._frames[slot]
+        if mirror:
+            cv2.flip(frame, 1, dst=dst)
+        else:
+            np.copyto(dst, frame)
+        self._slot_seq[slot] = seq
+        self._hdr[_HDR_LATEST] = seq
+        return seq
+
+    # ----------------- 读者接口 -----------------
+    def latest_seq(self):
+        return int(self._hdr[_HDR_LATEST])
+
+    def is_valid(self, seq):
+        """判断序号为seq的帧是否仍未被覆盖，读者用完视图后可据此丢弃撕裂的结果"""
+        return seq > 0 and int(self._slot_seq[seq % self.slots]) == seq
+
+    def latest(self, out=None, retries=3):
+        """
+        获取最新完整帧。
+        :param out: 与shape一致的uint8数组，给出时把帧拷贝进去并在拷贝后校验序号，返回的是out
+        :return: (seq, 只读视图或out)，尚无帧时返回 (0, None)
+        """
+        for _ in range(retries):
+            seq = int(self._hdr[_HDR_LATEST])
+            if seq == 0:
+                return 0, None
+            slot = seq % self.slots
+            frame = self._frames_ro[slot]
+            if out is not None:
+                np.copyto(out, frame)
+                frame = out
+            if int(self._slot_seq[slot]) == seq:
+                return seq, frame
+            # 读取期间写者已绕回一圈，重新取最新帧
+        return 0, None
+
+    def reader(self, name):
+        return FrameReader(self, name)
+
+    def reader_stats(self):
+        """
+        :return: {读者名称: {'received': 收到帧数, 'dropped': 丢掉帧数}}
+        """
+        return {
+            r: {'received': int(self._received[i]), 'dropped': int(self._dropped[i])}
+            for i, r in enumerate(self.readers)
+        }
+
+    def close(self):
+        # 先释放numpy视图再关闭共享内存，否则会报BufferError
+        self._meta = self._hdr = self._slot_seq = None
+        self._dropped = self._received = None
+        self._frames = self._frames_ro = None
+        self.shm.close()
+
+    def unlink(self):
+        if self._create:
+            self.shm.unlink()
+
+
+class FrameReader:
+    """单个消费者的读取句柄，记录上次读到的序号并累计丢帧数"""
+
+    def __init__(self, ring, name):
+        self.ring = ring
+        self.name = name
+        self._index = ring.readers.index(name)
+        self.last_seq = 0
+
+    def read(self, repeat=False, out=None):
+        """
+        读取最新帧。
+        :param repeat: 没有新帧时是否仍返回上次那一帧（用于按请求轮询的场景）
+        :param out: 给出时返回校验过的私有拷贝，见FrameRing.latest
+        :return: (seq, 只读视图或out)；没有可用帧时视图为None
+        """
+        seq, frame = self.ring.latest(out)
+        if frame is None:
+            return self.last_seq, None
+        if seq == self.last_seq:
+            return seq, frame if repeat else None
+        if self.last_seq > 0 and seq > self.last_seq + 1:
+            self.ring._dropped[self._index] += seq - self.last_seq - 1
+        self.ring._received[self._index] += 1
+        self.last_seq = seq
+        return seq, frame
+
+    def is_valid(self, seq):
+        return self.ring.is_valid(seq)
+
+    @property
+    def dropped(self):
+        return int(self.ring._dropped[self._index])
@@ -0,0 +1,114 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+
+# 归一化时去掉的标点、称呼和语气词
+_PUNCT = re.compile(r'[\s，。！？、,.!?~…：:；;“”"\'（）()]+')
+_FILLERS = re.compile(r'^(哨兵|你好|喂)+(?!模式)|请|帮我|给我|麻烦|一下|吧$|啊$|呀$|了$')
+
+SWITCH_TARGETS = [
+    # (cmd_content, 关键词)，顺序决定匹配优先级
+    (5, r'(安全)?声音(检测|识别|监测)'),
+    (4, r'(安全|危险物?品?)(检测|识别|监测)'),
+    (2, r'人脸(追踪|跟踪|跟随)|(追踪|跟踪)人脸'),
+    (3, r'(语音)?唤醒(功能)?'),
+]
+SWITCH_ON = r'(开启|打开|启动|开始|启用)'
+SWITCH_OFF = r'(关闭|关掉|关上|停止|停用|禁用)'
+MODES = [(0, r'普通'), (1, r'静音'), (2, r'哨兵'), (3, r'隐私')]
+DIRECTIONS = {'左': (-1, 0), '右': (1, 0), '上': (0, 1), '下': (0, -1)}
+ROTATE_SMALL = r'一点|一些|稍微|一丢丢|微微'
+ROTATE_LARGE = r'很多|多一点|多点|大幅|使劲|到底'
+
+
+def normalize(text):
+    """去掉标点、空白和常见的称呼/语气词，作为缓存键和匹配输入"""
+    text = _PUNCT.sub('', text or '').lower()
+    return _FILLERS.sub('', text)
+
+
+class LocalIntentMatcher:
+    """
+    本地意图匹配：常见的固定说法（开关功能、切换模式、转动方向）直接解析为命令，
+    返回与大模型相同格式的命令字典，无法确定时返回None交给大模型。
+    查找类命令依赖当前时间和模糊理解，始终交给大模型。
+    """
+
+    def match(self, text):
+        text = normalize(text)
+        if not text or len(text) > 16:
+            return None
+        for pattern in (self._match_mode, self._match_switch, self._match_rotate):
+            cmd = pattern(text)
+            if cmd is not None:
+                return cmd
+        return None
+
+    @staticmethod
+    def _control(content, **detail):
+        return {'cmd_type': 1, 'cmd_content': content, 'cmd_detail': detail}
+
+    def _match_mode(self, text):
+        m = re.fullmatch(r'(切换|切|进入|开启|打开|换)?(到|成|为)?(\w{2})模式', text)
+        if not m:
+            return None
+        for mode, name in MODES:
+            if re.fullmatch(name, m.group(3)):
+                return self._control(1, mode=mode)
+        return None
+
+    def _match_switch(self, text):
+        for content, target in SWITCH_TARGETS:
+            if re.fullmatch(f'{SWITCH_ON}({target})', text) or re.fullmatch(f'({target}){SWITCH_ON}', text):
+                return self._control(content, switch=True)
+            if re.fullmatch(f'{SWITCH_OFF}({target})', text) or re.fullmatch(f'({target}){SWITCH_OFF}', text):
+                return self._control(content, switch=False)
+        return None
+
+    def _match_rotate(self, text):
+        m = re.fullmatch(rf'(往|向|朝)?([左右上下])(边|面)?(转|看|移|转动|移动|偏)({ROTATE_SMALL}|{ROTATE_LARGE})?', text)
+        if not m:
+            return None
+        dx, dy = DIRECTIONS[m.group(2)]
+        amount = m.group(5) or ''
+        steps = 1 if re.fullmatch(ROTATE_SMALL, amount) else 4 if re.fullmatch(ROTATE_LARGE, amount) else 2
+        return self._control(0, rotate=[dx * steps, dy * steps])
+
+
+class CommandCache:
+    """
+    识别文本 -> 已解析命令的LRU缓存，条目超过ttl秒失效。
+    只缓存与时间无关的控制命令，查找命令的时间范围依赖说话时间，不能复用。
+    """
+
+    def __init__(self, maxsize=256, ttl=24 * 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text):
+        key = normalize(text)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or time.time() - item[0] > self.ttl:
+                if item is not None:
+                    del self._items[key]
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, text, cmd):
+        if not cmd or cmd.get('cmd_type') != 1:
+            return
+        key = normalize(text)
+        with self._lock:
+            self._items[key] = (time.time(), cmd)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
@@ -0,0 +1,63 @@
+import numpy as np
+import cv2
+
+
+class MotionDetector:
+    """
+    低成本的画面变化检测：缩小后的灰度帧与滑动平均背景做差分，按区域统计变化像素比例。
+    用于在空场景下跳过人脸/危险物模型推理。
+    """
+
+    def __init__(self, frame_shape, scale=8, threshold=25, alpha=0.05, zones=None):
+        """
+        :param frame_shape: 输入帧 (H, W)
+        :param scale: 缩小倍数，640x480在scale=8时按80x60处理
+        :param threshold: 像素灰度差阈值
+        :param alpha: 背景更新速率，越大越快适应光照变化
+        :param zones: 检测区域列表，每项 {'name': str, 'rect': (x1, y1, x2, y2), 'min_area': float}，
+                      rect为相对画面的0~1坐标，min_area为区域内变化像素占比阈值；None表示整幅画面一个区域
+        """
+        h, w = frame_shape[:2]
+        self.size = (max(1, w // scale), max(1, h // scale))
+        self.threshold = threshold
+        self.alpha = alpha
+        if zones is None:
+            zones = [{'name': 'full', 'rect': (0.0, 0.0, 1.0, 1.0), 'min_area': 0.01}]
+        self.zones = []
+        sw, sh = self.size
+        for zone in zones:
+            x1, y1, x2, y2 = zone['rect']
+            mask = np.zeros((sh, sw), dtype=bool)
+            mask[int(y1 * sh):max(int(y2 * sh), int(y1 * sh) + 1),
+                 int(x1 * sw):max(int(x2 * sw), int(x1 * sw) + 1)] = True
+            self.zones.append((zone['name'], mask, int(mask.sum()), zone.get('min_area', 0.01)))
+        self._background = None
+        self._small = np.empty((sh, sw, 3), dtype=np.uint8)
+        self._gray = np.empty((sh, sw), dtype=np.uint8)
+        self._diff = np.empty((sh, sw), dtype=np.uint8)
+
+    def reset(self):
+        self._background = None
+
+    def update(self, frame):
+        """
+        输入一帧，返回是否有运动
+        :return: (是否有运动, 最大区域变化占比, 触发的区域名称列表)
+        """
+        cv2.resize(frame, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        if self._background is None:
+            self._background = self._gray.astype(np.float32)
+            return False, 0.0, []
+        cv2.absdiff(self._gray, cv2.convertScaleAbs(self._background), dst=self._diff)
+        changed = self._diff > self.threshold
+        cv2.accumulateWeighted(self._gray, self._background, self.alpha)
+
+        score = 0.0
+        active = []
+        for name, mask, area, min_area in self.zones:
+            ratio = np.count_nonzero(changed & mask) / area
+            score = max(score, ratio)
+            if ratio >= min_area:
+                active.append(name)
+        return bool(active), float(score), active
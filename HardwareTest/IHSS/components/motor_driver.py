@@ -0,0 +1,223 @@
+import time
+import queue
+import multiprocessing
+from multiprocessing import Value, Array
+from components.gpio import BACKENDS
+
+# 28BYJ-48步进电机，ULN2003驱动，wiringPi引脚编号
+PINS = [3, 4, 6, 9, 10, 13, 15, 16]
+MOTOR_PINS = (PINS[:4], PINS[4:])
+# 八拍半步步序
+SEQUENCE = [
+    [1, 0, 0, 0],
+    [1, 1, 0, 0],
+    [0, 1, 0, 0],
+    [0, 1, 1, 0],
+    [0, 0, 1, 0],
+    [0, 0, 1, 1],
+    [0, 0, 0, 1],
+    [1, 0, 0, 1]
+]
+STEPS_PER_REV = 4096  # 半步模式下输出轴一圈的步数
+
+
+def angle_to_steps(angle):
+    return int(round(angle / 360 * STEPS_PER_REV))
+
+
+def steps_to_angle(steps):
+    return steps * 360 / STEPS_PER_REV
+
+
+class _Axis:
+    """驱动进程内单个电机的运动状态"""
+
+    def __init__(self, pins, limits):
+        self.pins = pins
+        self.lo, self.hi = (angle_to_steps(a) for a in limits)
+        self.pos = 0          # 当前位置（步）
+        self.target = 0       # 目标位置（步）
+        self.speed = 0.0      # 当前步频（步/秒），0表示静止
+        self.direction = 0
+        self.next_time = 0.0
+
+
+class MotorController:
+    """
+    电机控制：独立的驱动进程从队列接收目标角度，按步频调度发出步进脉冲，
+    调用方（识别进程、Web接口、语音进程）只投递目标，不再阻塞等待电机转动。
+    - 队列中被后续命令覆盖的目标会被合并，只执行最新目标
+    - 启停按加速度做梯形加减速，中途换向先减速再反转
+    - 电机当前角度只由驱动进程写入angle_values，是唯一可信的角度状态
+    - 空闲超过idle_sleep秒后线圈断电
+    """
+
+    def __init__(self, limits, angle_values=None, backend='wiringpi', max_rate=1000.0, min_rate=250.0,
+                 accel=4000.0, idle_sleep=30.0):
+        """
+        :param limits: 每个电机的角度范围 ((min1, max1), (min2, max2))
+        :param angle_values: 每个电机当前角度的共享Value('i')，None则内部创建
+        :param backend: GPIO后端名称，见BACKENDS
+        :param max_rate: 最高步频（步/秒），原实现每步sleep 1ms，约为1000
+        :param min_rate: 起步和停止时的步频（步/秒）
+        :param accel: 加速度（步/秒²）
+        :param idle_sleep: 空闲多久后线圈断电（秒）
+        """
+        self.limits = limits
+        self.angle_values = angle_values or tuple(Value('i', 0) for _ in MOTOR_PINS)
+        self.backend = backend
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.accel = accel
+        self.idle_sleep = idle_sleep
+        self.queue = multiprocessing.Queue()
+        # 调用方视角的目标角度，用于相对移动和限位判断
+        self.targets = Array('d', len(MOTOR_PINS))
+        # [是否在转动, 是否休眠, 最近一次转动的时间]
+        self.state = Array('d', [0, 0, time.time()])
+
+    # ----------------- 调用方接口 -----------------
+    def move_to(self, motor_id, angle):
+        """
+        设置电机绝对目标角度，超出范围时裁剪到限位
+        :param motor_id: 电机编号，1或2
+        :return: 目标是否发生变化
+        """
+        lo, hi = self.limits[motor_id - 1]
+        angle = min(max(float(angle), lo), hi)
+        with self.targets.get_lock():
+            if angle == self.targets[motor_id - 1]:
+                return False
+            self.targets[motor_id - 1] = angle
+            self.queue.put((motor_id, angle))
+        return True
+
+    def move_by(self, motor_id, delta):
+        """在当前目标的基础上相对移动，到达限位时返回False"""
+        with self.targets.get_lock():
+            return self.move_to(motor_id, self.targets[motor_id - 1] + delta)
+
+    def angle(self, motor_id):
+        return self.angle_values[motor_id - 1].value
+
+    def target(self, motor_id):
+        return self.targets[motor_id - 1]
+
+    def moving(self):
+        """电机正在转动，或已投递的目标还未被驱动进程执行"""
+        if self.state[0]:
+            return True
+        return any(round(t) != v.value for t, v in zip(self.targets, self.angle_values))
+
+    def sleeping(self):
+        return bool(self.state[1])
+
+    def stop(self):
+        self.queue.put(None)
+
+    # ----------------- 驱动进程 -----------------
+    def run(self):
+        gpio = BACKENDS[self.backend]()
+        gpio.setup(PINS)
+        axes = [_Axis(pins, limits) for pins, limits in zip(MOTOR_PINS, self.limits)]
+        for axis, value in zip(axes, self.angle_values):
+            axis.pos = axis.target = angle_to_steps(value.value)
+        sleeping = False
+        last_active = time.perf_counter()
+        print("电机驱动进程启动...")
+        while True:
+            moving = [axis for axis in axes if axis.speed or axis.pos != axis.target]
+            # 静止时阻塞等待命令；转动时只非阻塞地取出已到达的命令
+            timeout = None if sleeping else max(0.0, last_active + self.idle_sleep - time.perf_counter())
+            if not self._drain(axes, block=not moving, timeout=timeout):
+                break
+            moving = [axis for axis in axes if axis.speed or axis.pos != axis.target]
+            if not moving:
+                self.state[0] = 0
+                if not sleeping and time.perf_counter() - last_active >= self.idle_sleep:
+                    self._release(gpio)
+                    sleeping = True
+                    self.state[1] = 1
+                continue
+            if sleeping:
+                sleeping = False
+                self.state[1] = 0
+            self.state[0] = 1
+            # 在下一次取命令前连续调度一小段时间（5ms）的步进，兼顾脉冲精度与命令响应
+            now = time.perf_counter()
+            slice_end = now + 0.005
+            for axis in moving:
+                if not axis.speed:
+                    axis.next_time = now
+            while moving:
+                axis = min(moving, key=lambda a: a.next_time)
+                if axis.next_time > slice_end:
+                    break
+                delay = axis.next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                self._step(gpio, axis)
+                if not axis.speed:
+                    moving.remove(axis)
+            for axis, value in zip(axes, self.angle_values):
+                angle = int(round(steps_to_angle(axis.pos)))
+                if value.value != angle:
+                    value.value = angle
+            last_active = time.perf_counter()
+            self.state[0] = int(any(axis.speed or axis.pos != axis.target for axis in axes))
+            self.state[2] = time.time()
+        self._release(gpio)
+
+    def _drain(self, axes, block, timeout):
+        """
+        取出队列中的所有命令，同一电机只保留最新目标
+        :return: 收到停止命令时返回False
+        """
+        try:
+            cmd = self.queue.get(timeout=timeout) if block else self.queue.get_nowait()
+            while True:
+                if cmd is None:
+                    return False
+                motor_id, angle = cmd
+                axes[motor_id - 1].target = angle_to_steps(angle)
+                cmd = self.queue.get_nowait()
+        except queue.Empty:
+            return True
+
+    def _step(self, gpio, axis):
+        """按梯形速度曲线为一个电机走一步，并安排下一步的时间"""
+        remaining = axis.target - axis.pos
+        if axis.speed:
+            # 沿当前方向还需走的步数，<=0表示已到达目标或需要换向
+            ahead = remaining * axis.direction
+            faster = min(self.max_rate, (axis.speed ** 2 + 2 * self.accel) ** 0.5)
+            slower = axis.speed ** 2 - 2 * self.accel
+            if ahead > (faster ** 2 - self.min_rate ** 2) / (2 * self.accel):
+                axis.speed = faster
+            elif ahead > (axis.speed ** 2 - self.min_rate ** 2) / (2 * self.accel):
+                pass
+            elif slower > self.min_rate ** 2:
+                axis.speed = slower ** 0.5
+            else:
+                # 已降到起步速度附近，可以直接停下或换向
+                axis.speed = 0.0
+        if not axis.speed:
+            if remaining == 0:
+                return
+            axis.direction = 1 if remaining > 0 else -1
+            axis.speed = self.min_rate
+        if not axis.lo <= axis.pos + axis.direction <= axis.hi:
+            # 减速越过目标时不允许超出限位
+            axis.speed = 0.0
+            return
+        axis.pos += axis.direction
+        for pin, level in zip(axis.pins, SEQUENCE[axis.pos % 8]):
+            gpio.write(pin, level)
+        # 调度被抢占而落后时不补发成串的脉冲，避免失步
+        interval = 1.0 / axis.speed
+        axis.next_time = max(axis.next_time + interval, time.perf_counter() + interval / 2)
+
+    @staticmethod
+    def _release(gpio):
+        for pin in PINS:
+            gpio.write(pin, 0)
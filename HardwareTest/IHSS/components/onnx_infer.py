@@ -1,21 +1,101 @@
+import os
 import onnxruntime as ort
 
 POSENET_MODEL = '../../resource/model_zoo/scrfd_500m_bnkps_shape160x160.onnx'
 
+GRAPH_OPT_LEVELS = {
+    'disable': ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    'basic': ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    'extended': ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    'all': ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+INT8_SUFFIX = '.int8.onnx'      # 量化模型与原模型放在同一目录，如 models/scrfd.int8.onnx
+CACHE_DIR = '.ort_cache'        # 优化后模型的缓存目录，位于模型所在目录下
+
+
+def int8_variant(model_path):
+    """:return: 同目录下的int8量化模型路径，不存在时返回None"""
+    path = os.path.splitext(model_path)[0] + INT8_SUFFIX
+    return path if os.path.exists(path) else None
+
+
+def _cached_model_path(model_path, opt_level):
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(model_path)), CACHE_DIR)
+    return os.path.join(cache_dir, f'{stem}.{opt_level}.ort{ort.__version__}.onnx')
+
+
+def create_session(model_path, threads=1, inter_threads=1, opt_level='all', use_cache=True, prefer_int8=True,
+                   providers=('CPUExecutionProvider',)):
+    """
+    创建调优过的推理会话。
+    多个进程各自创建会话时，默认每个会话的线程池等于核心数，在4核板子上会互相抢占；
+    这里按调用方分到的核心数设置线程，并关闭线程空转，空闲时让出CPU。
+    图优化后的模型缓存在模型目录的.ort_cache下，之后直接加载，省去每次启动的优化时间。
+    :param model_path: ONNX模型路径
+    :param threads: 算子内并行线程数（本进程分到的核心数），None时使用onnxruntime默认值（全部核心）
+    :param inter_threads: 算子间并行线程数，顺序执行模式下只需1
+    :param opt_level: 图优化级别，GRAPH_OPT_LEVELS中的名称
+    :param use_cache: 是否缓存优化后的模型
+    :param prefer_int8: 同目录存在.int8.onnx量化模型时是否优先使用
+    :param providers: 执行后端
+    :return: onnxruntime.InferenceSession
+    """
+    if prefer_int8:
+        model_path = int8_variant(model_path) or model_path
+
+    options = ort.SessionOptions()
+    if threads is not None:
+        options.intra_op_num_threads = threads
+    options.inter_op_num_threads = inter_threads
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.add_session_config_entry('session.intra_op.allow_spinning', '0')
+    options.graph_optimization_level = GRAPH_OPT_LEVELS[opt_level]
+
+    load_path = model_path
+    cache_tmp = None
+    if use_cache and opt_level != 'disable':
+        cached = _cached_model_path(model_path, opt_level)
+        if os.path.exists(cached) and os.path.getmtime(cached) >= os.path.getmtime(model_path):
+            # 缓存的模型已经优化过，不再重复优化
+            load_path = cached
+            options.graph_optimization_level = GRAPH_OPT_LEVELS['disable']
+        else:
+            try:
+                os.makedirs(os.path.dirname(cached), exist_ok=True)
+                # 先写临时文件再改名，多个进程同时启动时不会读到写了一半的缓存
+                cache_tmp = f'{cached}.{os.getpid()}.tmp'
+                options.optimized_model_filepath = cache_tmp
+            except OSError:
+                cache_tmp = None
+
+    session = ort.InferenceSession(load_path, sess_options=options, providers=list(providers))
+    if cache_tmp is not None and os.path.exists(cache_tmp):
+        try:
+            os.replace(cache_tmp, _cached_model_path(model_path, opt_level))
+        except OSError:
+            pass
+    session.model_path = model_path
+    return session
+
+
 # 加载ONNX模型
 class OnnxRun:
-    def __init__(self, model_name="face_detect", model_path=POSENET_MODEL):
+    def __init__(self, model_name="face_detect", model_path=POSENET_MODEL, threads=None, prefer_int8=True):
         """
         model_name: 模型名称
         model_path: 模型路径
+        threads: 推理线程数，见create_session
+        prefer_int8: 存在int8量化模型时是否优先使用
         """
         self.model_name = model_name
 
-        self.ort_session = ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+        self.ort_session = create_session(model_path, threads=threads, prefer_int8=prefer_int8)
         self.input_name = self.ort_session.get_inputs()[0].name
 
         input = self.ort_session.get_inputs()
         output = self.ort_session.get_outputs()
+        print(self.model_name + "_model", self.ort_session.model_path)
         print(self.model_name + "_input_shape", input[0])
 
         for shape in output:
@@ -28,4 +108,4 @@ class OnnxRun:
         return self.ort_session.run(None, {self.input_name: input_data})
 
 if __name__ == "__main__":
-    onnx_run = OnnxRun()
\ No newline at end of file
+    onnx_run = OnnxRun()
@@ -0,0 +1,87 @@
+import time
+import numpy as np
+from multiprocessing import shared_memory
+
+# 头部字段（float64）
+_HDR_SEQ = 0        # 发布序号，奇数表示正在写入
+_HDR_FRAME_SEQ = 1  # 结果对应的帧序号
+_HDR_COUNT = 2      # 有效行数
+_HDR_TS = 3         # 发布时间戳
+_HDR_SIZE = 4
+
+
+class ResultBoard:
+    """
+    共享内存结果公告板：推理服务进程单写，任意进程读取最新一份检测结果。
+    每份结果是最多max_items行、每行item_size个float32的表格，用序号锁（seqlock）保证读到完整结果，
+    读者不需要加锁，也不会阻塞写者。
+    """
+
+    def __init__(self, max_items, item_size, name=None, create=True):
+        """
+        :param max_items: 最多保存的结果行数
+        :param item_size: 每行的float32个数
+        :param name: 共享内存名称，create=False时必须指定
+        :param create: True创建新的共享内存，False连接已有的共享内存
+        """
+        self.max_items = int(max_items)
+        self.item_size = int(item_size)
+        self._create = create
+        total = _HDR_SIZE * 8 + self.max_items * self.item_size * 4
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=total)
+        self._hdr = np.ndarray((_HDR_SIZE,), dtype=np.float64, buffer=self.shm.buf)
+        self._rows = np.ndarray((self.max_items, self.item_size), dtype=np.float32,
+                                buffer=self.shm.buf, offset=_HDR_SIZE * 8)
+        if create:
+            self._hdr[:] = 0
+
+    def __reduce__(self):
+        return self.__class__, (self.max_items, self.item_size, self.shm.name, False)
+
+    def publish(self, rows, frame_seq=0):
+        """
+        发布一份结果，超出max_items的行被截断。
+        :param rows: (n, item_size) 数组
+        :param frame_seq: 结果对应的帧序号
+        :return: 发布序号
+        """
+        rows = np.asarray(rows, dtype=np.float32).reshape(-1, self.item_size)
+        n = min(rows.shape[0], self.max_items)
+        seq = int(self._hdr[_HDR_SEQ])
+        self._hdr[_HDR_SEQ] = seq + 1
+        self._rows[:n] = rows[:n]
+        self._hdr[_HDR_COUNT] = n
+        self._hdr[_HDR_FRAME_SEQ] = frame_seq
+        self._hdr[_HDR_TS] = time.time()
+        self._hdr[_HDR_SEQ] = seq + 2
+        return (seq + 2) // 2
+
+    def version(self):
+        """当前已发布的结果数，可用来判断是否有新结果"""
+        return int(self._hdr[_HDR_SEQ]) // 2
+
+    def read(self, retries=100):
+        """
+        读取最新一份结果的拷贝。
+        :return: (发布序号, 帧序号, 时间戳, rows)，尚未发布过时rows为空
+        """
+        for _ in range(retries):
+            s1 = int(self._hdr[_HDR_SEQ])
+            if s1 & 1:
+                time.sleep(0)
+                continue
+            n = int(self._hdr[_HDR_COUNT])
+            frame_seq = int(self._hdr[_HDR_FRAME_SEQ])
+            ts = float(self._hdr[_HDR_TS])
+            rows = self._rows[:n].copy()
+            if int(self._hdr[_HDR_SEQ]) == s1:
+                return s1 // 2, frame_seq, ts, rows
+        return 0, 0, 0.0, np.empty((0, self.item_size), dtype=np.float32)
+
+    def close(self):
+        self._hdr = self._rows = None
+        self.shm.close()
+
+    def unlink(self):
+        if self._create:
+            self.shm.unlink()
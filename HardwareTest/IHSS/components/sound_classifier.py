@@ -0,0 +1,243 @@
+import os
+import csv
+import time
+from collections import OrderedDict
+import numpy as np
+
+# YAMNet分块参数：25ms窗/10ms步长的log-mel帧，每96帧（0.96s）一块，块步长48帧（0.48s）
+SAMPLE_RATE = 16000
+PATCH_HOP = 7680          # 块步长（样本）
+PATCH_SAMPLES = 15600     # 一块需要的样本数：95 * 160 + 400
+NUM_CLASSES = 521
+
+
+def load_class_names(path):
+    """读取yamnet_class_map.csv，找不到时返回class_i形式的默认名称"""
+    if path and os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return np.array([row['display_name'] for row in csv.DictReader(f)])
+    return np.array([f"class_{i}" for i in range(NUM_CLASSES)])
+
+
+class SavedModelBackend:
+    """完整的TF SavedModel，一次输入任意长度波形，返回其中每个完整块的分数"""
+
+    def __init__(self, model_path, threads=None):
+        import tensorflow as tf
+        os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+        self._tf = tf
+        if threads:
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+        self.model = tf.saved_model.load(model_path)
+        self.class_map = os.path.join(model_path, 'assets', 'yamnet_class_map.csv')
+
+    def scores(self, waveform, n_patches):
+        # 只取scores，embeddings和spectrogram不转成numpy
+        scores = self.model(self._tf.constant(waveform, dtype=self._tf.float32))[0]
+        return scores.numpy()[:n_patches]
+
+
+class _PatchBackend:
+    """导出的单块模型：输入一块15600个样本，输出 (1, 521) 分数，逐块调用"""
+
+    def scores(self, waveform, n_patches):
+        out = np.empty((n_patches, NUM_CLASSES), dtype=np.float32)
+        for i in range(n_patches):
+            start = i * PATCH_HOP
+            out[i] = self._run(np.ascontiguousarray(waveform[start:start + PATCH_SAMPLES])).reshape(-1)[:NUM_CLASSES]
+        return out
+
+
+class TFLiteBackend(_PatchBackend):
+    """TFLite模型，优先使用tflite_runtime，没有时退回tf.lite"""
+
+    def __init__(self, model_path, threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        self.interpreter = Interpreter(model_path=model_path, num_threads=threads)
+        inp = self.interpreter.get_input_details()[0]
+        self.interpreter.resize_tensor_input(inp['index'], [PATCH_SAMPLES], strict=False)
+        self.interpreter.allocate_tensors()
+        self._input = inp['index']
+        self._output = self.interpreter.get_output_details()[0]['index']
+        self.class_map = os.path.join(os.path.dirname(model_path), 'yamnet_class_map.csv')
+
+    def _run(self, patch):
+        self.interpreter.set_tensor(self._input, patch)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self._output)
+
+
+class OnnxBackend(_PatchBackend):
+    """ONNX模型（如tf2onnx导出的单块模型），输入形状为 [15600] 或 [1, 15600]"""
+
+    def __init__(self, model_path, threads=None):
+        from components.onnx_infer import create_session
+        self.session = create_session(model_path, threads=threads or 1)
+        inp = self.session.get_inputs()[0]
+        self._input = inp.name
+        self._batched = len(inp.shape) == 2
+        self.class_map = os.path.join(os.path.dirname(model_path), 'yamnet_class_map.csv')
+
+    def _run(self, patch):
+        return self.session.run(None, {self._input: patch[None] if self._batched else patch})[0]
+
+
+BACKENDS = {
+    'savedmodel': SavedModelBackend,
+    'tflite': TFLiteBackend,
+    'onnx': OnnxBackend,
+}
+
+
+def create_backend(model_path, backend=None, threads=None):
+    """
+    :param model_path: SavedModel目录、.tflite或.onnx文件
+    :param backend: BACKENDS中的名称，None表示按扩展名判断
+    :param threads: 推理线程数，None表示使用框架默认值
+    """
+    if backend is None:
+        ext = os.path.splitext(model_path)[1].lower()
+        backend = {'.tflite': 'tflite', '.onnx': 'onnx'}.get(ext, 'savedmodel')
+    return BACKENDS[backend](model_path, threads=threads)
+
+
+class IncrementalClassifier:
+    """
+    增量YAMNet分类：按绝对样本位置把音频切成与YAMNet相同的0.96s块（步长0.48s），
+    每块的分数只计算一次并缓存，窗口结果由缓存中落在窗口内的块分数取平均。
+    原流程每2秒重算5秒音频，约60%的块是重复计算；这里每个周期只计算新到达的块。
+    """
+
+    def __init__(self, backend, ring, max_window=10.0):
+        """
+        :param backend: create_backend返回的模型后端
+        :param ring: components.audio_ring.AudioRing，16kHz
+        :param max_window: 缓存保留的最长时长（秒），不超过环形缓冲区容量
+        """
+        self.backend = backend
+        self.ring = ring
+        self.class_names = load_class_names(getattr(backend, 'class_map', None))
+        self.max_window = max_window
+        self._cache = OrderedDict()   # 块起始样本位置 -> 分数 (521,)
+        self._next = None             # 下一个待计算块的起始样本位置
+        self.computed = 0             # 累计计算的块数
+        self.new_scores = np.empty((0, NUM_CLASSES), dtype=np.float32)  # 最近一次update计算的块分数
+
+    def reset(self):
+        self._cache.clear()
+        self._next = None
+
+    def skip_to_latest(self):
+        """清空缓存并跳过已有音频，只分析之后到达的声音（如关闭检测一段时间后重新开启）"""
+        self._cache.clear()
+        self._next = -(-self.ring.total // PATCH_HOP) * PATCH_HOP
+
+    def update(self):
+        """
+        计算环形缓冲区中新到达的完整块
+        :return: 本次计算的块数
+        """
+        total = self.ring.total
+        oldest = max(0, total - min(self.ring.capacity, int(self.max_window * SAMPLE_RATE)))
+        if self._next is None or self._next < oldest:
+            # 首次运行或落后太多（数据已被覆盖）：从仍可读取的最早块对齐位置开始
+            self._next = -(-oldest // PATCH_HOP) * PATCH_HOP
+        n_patches = (total - self._next - PATCH_SAMPLES) // PATCH_HOP + 1 if total - self._next >= PATCH_SAMPLES else 0
+        if n_patches <= 0:
+            self.new_scores = self.new_scores[:0]
+            return 0
+        end = self._next + (n_patches - 1) * PATCH_HOP + PATCH_SAMPLES
+        waveform = self.ring.read_at(end, end - self._next)
+        if waveform is None:
+            self._next = None
+            self.new_scores = self.new_scores[:0]
+            return 0
+        scores = self.backend.scores(waveform, n_patches)
+        self.new_scores = scores
+        for i in range(len(scores)):
+            self._cache[self._next + i * PATCH_HOP] = scores[i]
+        self._next += len(scores) * PATCH_HOP
+        self.computed += len(scores)
+        # 淘汰已经滑出最长窗口的块
+        while self._cache and next(iter(self._cache)) < oldest:
+            self._cache.popitem(last=False)
+        return len(scores)
+
+    def window_scores(self, duration):
+        """
+        :param duration: 窗口时长（秒）
+        :return: (逐块分数 (N, 521), 平均分数 (521,))，窗口内没有完整块时返回 (None, None)
+        """
+        start = self.ring.total - int(duration * SAMPLE_RATE)
+        patches = [s for k, s in self._cache.items() if k >= start]
+        if not patches:
+            return None, None
+        scores = np.stack(patches)
+        return scores, scores.mean(axis=0)
+
+    def top(self, mean_scores, k=5):
+        """:return: [(类别名, 分数), ...] 按分数从高到低"""
+        idx = np.argsort(mean_scores)[-k:][::-1]
+        return [(self.class_names[i], float(mean_scores[i])) for i in idx]
+
+
+class SoundEventDetector:
+    """
+    把逐块分数转换为去抖后的声音事件：某类最近window块的平均分数超过该类阈值时触发一次，
+    分数回落到阈值的release倍以下才算结束；同一事件类型触发后cooldown秒内不再记录，
+    持续响铃的报警声因此只产生一条事件而不是每块一条
+    """
+
+    def __init__(self, class_names, rules, cooldown=30.0, window=2, release=0.5):
+        """
+        :param class_names: 模型的类别名称列表
+        :param rules: {YAMNet类别名称: (事件类型, 阈值)}，多个类别可以对应同一事件类型
+        :param cooldown: 同一事件类型两次记录的最小间隔（秒）
+        :param window: 参与平均的最近块数，1块约0.48秒
+        :param release: 结束阈值相对触发阈值的比例
+        """
+        names = list(class_names)
+        self.rules = []
+        self.missing = []
+        for name, (event_type, threshold) in rules.items():
+            if name in names:
+                self.rules.append((names.index(name), name, event_type, threshold))
+            else:
+                self.missing.append(name)
+        self.index = np.array([r[0] for r in self.rules], dtype=np.int64)
+        self.thresholds = np.array([r[3] for r in self.rules], dtype=np.float32)
+        self.cooldown = cooldown
+        self.window = window
+        self.release = release
+        self._recent = []
+        self._active = np.zeros(len(self.rules), dtype=bool)
+        self._last_emit = {}
+
+    def update(self, patch_scores, now=None):
+        """
+        :param patch_scores: 新计算的块分数 (N, 521)，按时间顺序
+        :param now: 当前时间（epoch秒）
+        :return: 新事件列表 [(事件类型, detail字典, 置信度), ...]
+        """
+        now = time.time() if now is None else now
+        events = []
+        if not self.rules:
+            return events
+        for scores in patch_scores:
+            self._recent.append(scores[self.index])
+            self._recent = self._recent[-self.window:]
+            smoothed = np.mean(self._recent, axis=0)
+            onset = (smoothed >= self.thresholds) & ~self._active
+            self._active = np.where(self._active, smoothed >= self.thresholds * self.release, onset)
+            for i in np.flatnonzero(onset):
+                _, name, event_type, _ = self.rules[i]
+                if now - self._last_emit.get(event_type, -np.inf) < self.cooldown:
+                    continue
+                self._last_emit[event_type] = now
+                events.append((event_type, {'label': name, 'confidence': round(float(smoothed[i]), 3)},
+                               float(smoothed[i])))
+        return events
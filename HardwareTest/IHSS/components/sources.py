@@ -0,0 +1,188 @@
+import os
+import glob
+import time
+import cv2
+import numpy as np
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class OpenCVCamera:
+    """cv2.VideoCapture摄像头；摄像头不支持请求的分辨率时缩放到目标分辨率，保证输出尺寸固定"""
+
+    def __init__(self, index=0, width=640, height=480):
+        self.width = width
+        self.height = height
+        self.cap = cv2.VideoCapture(int(index))
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self._size_warned = False
+
+    def read(self, image=None):
+        ret, frame = self.cap.read(image)
+        if ret and frame.shape[:2] != (self.height, self.width):
+            if not self._size_warned:
+                print(f"摄像头输出{frame.shape[1]}x{frame.shape[0]}，不支持{self.width}x{self.height}，将缩放后使用")
+                self._size_warned = True
+            frame = cv2.resize(frame, (self.width, self.height), dst=image)
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class _ReplaySource:
+    """
+    回放源：逐帧输出录制的画面并缩放到目标分辨率，read()/release()与cv2.VideoCapture一致，
+    摄像头进程不用区分真实摄像头和回放。读完后read()返回(False, None)并置finished。
+    """
+
+    def __init__(self, width=640, height=480, fps=None, loop=False, max_frames=None, wait=None, stamps=None):
+        """
+        :param width: 输出宽度
+        :param height: 输出高度
+        :param fps: 回放帧率，None使用录制帧率，0表示不限速尽快输出
+        :param loop: 读完后是否从头循环
+        :param max_frames: 最多输出的帧数，None表示不限
+        :param wait: 每帧输出前调用wait(已输出帧数)，如等待下游取走上一帧，用于基准测试的步进回放
+        :param stamps: 共享数组（如RawArray('d', n)），stamps[i]记录第i帧输出的时间，用于计算端到端延迟
+        """
+        self.width = width
+        self.height = height
+        self.fps = self.default_fps() if fps is None else fps
+        self.loop = loop
+        self.max_frames = max_frames
+        self.wait = wait
+        self.stamps = stamps
+        self.frames_read = 0
+        self.finished = False
+        self._next_time = None
+
+    def default_fps(self):
+        return 30.0
+
+    def _next_frame(self):
+        raise NotImplementedError
+
+    def _rewind(self):
+        raise NotImplementedError
+
+    def read(self, image=None):
+        if self.finished or (self.max_frames is not None and self.frames_read >= self.max_frames):
+            self.finished = True
+            return False, None
+        if self.wait is not None and self.frames_read:
+            self.wait(self.frames_read)
+        frame = self._next_frame()
+        if frame is None and self.loop:
+            self._rewind()
+            frame = self._next_frame()
+        if frame is None:
+            self.finished = True
+            return False, None
+        if frame.shape[:2] != (self.height, self.width):
+            frame = cv2.resize(frame, (self.width, self.height), dst=image)
+        elif image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            frame = image
+        if self.fps:
+            now = time.time()
+            if self._next_time is None:
+                self._next_time = now
+            if self._next_time > now:
+                time.sleep(self._next_time - now)
+            # 落后时不追赶，避免突发输出一串帧
+            self._next_time = max(self._next_time, now) + 1.0 / self.fps
+        if self.stamps is not None and self.frames_read < len(self.stamps):
+            self.stamps[self.frames_read] = time.time()
+        self.frames_read += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+class VideoFileSource(_ReplaySource):
+    """回放视频文件"""
+
+    def __init__(self, path, width=640, height=480, **kwargs):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise IOError(f"无法打开视频: {path}")
+        super().__init__(width, height, **kwargs)
+
+    def default_fps(self):
+        return self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    def frame_count(self):
+        return int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    def _next_frame(self):
+        ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def _rewind(self):
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageDirSource(_ReplaySource):
+    """按文件名顺序回放目录中的图片"""
+
+    def __init__(self, path, width=640, height=480, preload=False, **kwargs):
+        """
+        :param preload: 预先解码全部图片，回放时不再读盘解码（测吞吐时排除源本身的开销）
+        """
+        self.paths = sorted(p for p in glob.glob(os.path.join(path, '*')) if p.lower().endswith(IMAGE_EXTS))
+        if not self.paths:
+            raise IOError(f"目录中没有图片: {path}")
+        self._images = [cv2.imread(p) for p in self.paths] if preload else None
+        self._index = 0
+        super().__init__(width, height, **kwargs)
+
+    def default_fps(self):
+        return 10.0
+
+    def frame_count(self):
+        return len(self.paths)
+
+    def _next_frame(self):
+        while self._index < len(self.paths):
+            i = self._index
+            self._index += 1
+            frame = self._images[i] if self._images is not None else cv2.imread(self.paths[i])
+            if frame is not None:
+                return frame
+        return None
+
+    def _rewind(self):
+        self._index = 0
+
+
+CAMERA_SOURCES = {
+    'camera': OpenCVCamera,
+    'video': VideoFileSource,
+    'images': ImageDirSource,
+}
+
+
+def open_camera(source=0, width=640, height=480, **kwargs):
+    """
+    :param source: 摄像头编号（如0）、'video:路径'、'images:目录'、视频文件或图片目录路径，
+                   也可以是已创建的源对象（原样返回）
+    :param kwargs: 回放源的参数，见_ReplaySource
+    :return: 带read()/release()的源对象
+    """
+    if hasattr(source, 'read'):
+        return source
+    if isinstance(source, int) or str(source).isdigit():
+        return OpenCVCamera(int(source), width, height)
+    kind, sep, path = str(source).partition(':')
+    if sep and kind in CAMERA_SOURCES:
+        return CAMERA_SOURCES[kind](path, width, height, **kwargs)
+    if os.path.isdir(source):
+        return ImageDirSource(source, width, height, **kwargs)
+    return VideoFileSource(source, width, height, **kwargs)
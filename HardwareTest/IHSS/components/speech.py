@@ -0,0 +1,171 @@
+import wave
+import itertools
+from collections import deque
+import numpy as np
+
+
+class Endpointer:
+    """
+    基于能量的语音端点检测：唤醒后逐帧输入录音，检测到开始说话后，静音持续end_silence秒即结束，
+    不再固定录满5秒。底噪在开始说话前的帧上自适应估计，开始说话前的pre_roll秒音频也会保留。
+    唤醒时用户可能已经在说话，底噪取最初noise_seed秒内的最小值，并且不超过max_noise_db。
+    """
+
+    def __init__(self, sample_rate=16000, frame_length=512, start_db=10.0, end_db=6.0, start_frames=3,
+                 end_silence=0.8, start_timeout=4.0, max_duration=8.0, pre_roll=0.3,
+                 noise_seed=0.2, max_noise_db=55.0):
+        """
+        :param sample_rate: 采样率
+        :param frame_length: 每帧采样点数（PvRecorder为porcupine.frame_length）
+        :param start_db: 高于底噪多少dB视为说话
+        :param end_db: 低于底噪+end_db视为静音
+        :param start_frames: 连续多少帧超过阈值才判定开始说话，过滤瞬时噪声
+        :param end_silence: 说话后静音多久结束录音（秒）
+        :param start_timeout: 唤醒后多久没开始说话则放弃（秒）
+        :param max_duration: 单条指令最长录音时长（秒）
+        :param pre_roll: 保留开始说话前的音频时长（秒），避免吞掉首字
+        :param noise_seed: 用最初多长时间（秒）内最安静的一帧作为初始底噪
+        :param max_noise_db: 底噪上限（dB），避免把正在进行的说话当作底噪
+        """
+        self.frame_duration = frame_length / sample_rate
+        self.start_db = start_db
+        self.end_db = end_db
+        self.start_frames = start_frames
+        self.end_frames = max(1, int(round(end_silence / self.frame_duration)))
+        self.timeout_frames = int(start_timeout / self.frame_duration)
+        self.max_frames = int(max_duration / self.frame_duration)
+        self.pre_roll_frames = max(start_frames, int(round(pre_roll / self.frame_duration)))
+        self.seed_frames = max(1, int(round(noise_seed / self.frame_duration)))
+        self.max_noise_db = max_noise_db
+        self.reset()
+
+    def reset(self):
+        self.noise_db = None
+        self.frames = deque(maxlen=self.pre_roll_frames)
+        self.started = False
+        self.finished = False
+        self._loud = 0
+        self._silent = 0
+        self._count = 0
+
+    @staticmethod
+    def frame_db(frame):
+        x = frame.astype(np.float32)
+        return 10 * np.log10(np.dot(x, x) / max(len(x), 1) + 1.0)
+
+    def feed(self, frame):
+        """
+        输入一帧int16音频
+        :return: 录音是否已结束
+        """
+        if self.finished:
+            return True
+        frame = np.asarray(frame, dtype=np.int16)
+        db = self.frame_db(frame)
+        self._count += 1
+        if self._count <= self.seed_frames:
+            # 初始底噪取最初几帧的最小值，唤醒时已在说话的帧不会抬高底噪
+            self.noise_db = min(db, self.max_noise_db) if self.noise_db is None else min(self.noise_db, db)
+        if not self.started:
+            self.frames.append(frame)
+            if db > self.noise_db + self.start_db:
+                self._loud += 1
+                if self._loud >= self.start_frames:
+                    self.started = True
+                    self.frames = list(self.frames)
+            else:
+                self._loud = 0
+                # 底噪下降时立即跟随，上升时缓慢跟随
+                self.noise_db = db if db < self.noise_db else \
+                    min(self.noise_db + 0.05 * (db - self.noise_db), self.max_noise_db)
+                if self._count >= self.timeout_frames:
+                    self.finished = True
+            return self.finished
+        self.frames.append(frame)
+        self._silent = self._silent + 1 if db < self.noise_db + self.end_db else 0
+        if self._silent >= self.end_frames or len(self.frames) >= self.max_frames:
+            self.finished = True
+        return self.finished
+
+    def audio(self):
+        """
+        :return: 本次指令的int16音频（去掉大部分结尾静音），未检测到说话返回None
+        """
+        if not self.started:
+            return None
+        keep = len(self.frames) - max(0, self._silent - int(round(0.2 / self.frame_duration)))
+        return np.concatenate(self.frames[:keep])
+
+    @property
+    def duration(self):
+        return self._count * self.frame_duration
+
+
+def record_utterance(read_frame, endpointer, skip=None):
+    """
+    从录音设备逐帧读取直到端点
+    :param read_frame: 返回一帧int16采样的函数，如PvRecorder.read
+    :param endpointer: Endpointer实例，每次调用前会重置
+    :param skip: 返回True时丢弃当前帧，用于跳过提示音播放期间录到的回声
+    :return: int16音频，未检测到说话返回None
+    """
+    endpointer.reset()
+    while True:
+        frame = read_frame()
+        if skip is not None and skip():
+            continue
+        if endpointer.feed(frame):
+            return endpointer.audio()
+
+
+class BaiduRecognizer:
+    """百度短语音识别，直接上传内存中的16bit PCM"""
+
+    def __init__(self, dev_pid=1537):
+        import utils.baidu as baidu
+        self._baidu = baidu
+        self.dev_pid = dev_pid
+
+    def recognize(self, pcm, sample_rate=16000):
+        return self._baidu.recognize(pcm.astype(np.int16).tobytes(), format='pcm', rate=sample_rate,
+                                     dev_pid=self.dev_pid)
+
+
+class ScriptedRecognizer:
+    """离线替身：不联网，按顺序循环返回预设文本，用于没有网络时调试完整的指令流程"""
+
+    def __init__(self, texts=('向左转一点',)):
+        self._texts = itertools.cycle(texts)
+
+    def recognize(self, pcm, sample_rate=16000):
+        text = next(self._texts)
+        print(f"[本地识别] {len(pcm) / sample_rate:.2f}s 音频 -> {text}")
+        return text
+
+
+RECOGNIZERS = {
+    'baidu': BaiduRecognizer,
+    'scripted': ScriptedRecognizer,
+}
+
+
+class WavFrameSource:
+    """把16kHz单声道wav文件按帧读出，接口与PvRecorder.read一致，用于离线测试端点检测"""
+
+    def __init__(self, path, frame_length=512):
+        with wave.open(path, 'rb') as wf:
+            data = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+            if wf.getnchannels() > 1:
+                data = data[::wf.getnchannels()]
+            self.sample_rate = wf.getframerate()
+        self.data = data
+        self.frame_length = frame_length
+        self.pos = 0
+
+    def read(self):
+        frame = self.data[self.pos:self.pos + self.frame_length]
+        self.pos += self.frame_length
+        if len(frame) < self.frame_length:
+            # 文件读完后补静音，保证端点检测能正常结束
+            frame = np.pad(frame, (0, self.frame_length - len(frame)))
+        return frame
@@ -0,0 +1,141 @@
+import time
+import threading
+import cv2
+
+# 画质档位：(分辨率缩放, JPEG质量)，档位越高越省CPU和带宽
+QUALITY_LEVELS = [(1.0, 80), (1.0, 70), (0.75, 70), (0.75, 60), (0.5, 60), (0.5, 50)]
+# 按客户端数量确定的最低档位：客户端数 <= 阈值时使用该档位
+CLIENT_LEVELS = [(2, 0), (4, 1), (8, 2), (12, 3), (16, 4)]
+
+
+class StreamEncoder:
+    """
+    视频推流编码器：后台线程对每个新帧只做一次JPEG编码，结果分发给所有订阅的客户端。
+    帧序号不变时不编码；根据客户端数量和背压（客户端跟不上而跳帧、编码耗时超出帧间隔）
+    自动调整分辨率与JPEG质量。
+    """
+
+    def __init__(self, frame_reader, max_fps=30, adapt_interval=1.0, encode_hist=None):
+        """
+        :param frame_reader: FrameRing的读取句柄
+        :param max_fps: 最大编码帧率
+        :param adapt_interval: 画质调整周期（秒）
+        :param encode_hist: components.metrics的直方图句柄，记录每帧编码耗时，None表示不记录
+        """
+        self.frame_reader = frame_reader
+        self.encode_hist = encode_hist
+        self.frame_interval = 1.0 / max_fps
+        self.adapt_interval = adapt_interval
+        self.cond = threading.Condition()
+        self.seq = 0            # 当前JPEG对应的帧序号
+        self.jpeg = None
+        self.clients = 0
+        self.level = 0
+        self._pressure_level = 0
+        self._thread = None
+        self._stop = threading.Event()
+        # 统计
+        self.encoded_frames = 0
+        self.encode_ms = 0.0
+        self._window_encoded = 0
+        self._window_delivered = 0
+        self._window_skipped = 0
+        self._window_encode_s = 0.0
+
+    def start(self):
+        with self.cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _client_level(self):
+        for max_clients, level in CLIENT_LEVELS:
+            if self.clients <= max_clients:
+                return level
+        return len(QUALITY_LEVELS) - 1
+
+    def _adapt(self):
+        """根据上一周期的背压调整档位"""
+        busy = self._window_encode_s / self.adapt_interval
+        expected = self._window_encoded * max(self.clients, 1)
+        skip_ratio = self._window_skipped / (self._window_skipped + self._window_delivered) \
+            if self._window_delivered else 0.0
+        if busy > 0.5 or skip_ratio > 0.3:
+            self._pressure_level = min(self._pressure_level + 1, len(QUALITY_LEVELS) - 1)
+        elif busy < 0.25 and skip_ratio < 0.1 and self._window_delivered >= expected * 0.9:
+            self._pressure_level = max(self._pressure_level - 1, 0)
+        self.level = max(self._client_level(), self._pressure_level)
+        self._window_encoded = self._window_delivered = self._window_skipped = 0
+        self._window_encode_s = 0.0
+
+    def _run(self):
+        next_adapt = time.time() + self.adapt_interval
+        while not self._stop.is_set():
+            time.sleep(self.frame_interval)
+            now = time.time()
+            if now >= next_adapt:
+                with self.cond:
+                    self._adapt()
+                next_adapt = now + self.adapt_interval
+            if self.clients == 0:
+                continue
+            seq, frame = self.frame_reader.read()
+            if frame is None:
+                continue
+            st = time.time()
+            scale, quality = QUALITY_LEVELS[self.level]
+            if scale != 1.0:
+                frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            cost = time.time() - st
+            # 编码的是共享帧的视图，编码期间被摄像头进程覆盖时丢弃这一帧
+            if not ok or not self.frame_reader.is_valid(seq):
+                continue
+            if self.encode_hist is not None:
+                self.encode_hist.observe(cost)
+            with self.cond:
+                self.seq = seq
+                self.jpeg = jpeg.tobytes()
+                self.encoded_frames += 1
+                self.encode_ms = self.encode_ms * 0.9 + cost * 100
+                self._window_encoded += 1
+                self._window_encode_s += cost
+                self.cond.notify_all()
+
+    def subscribe(self, timeout=1.0):
+        """
+        客户端生成器：每次产出一帧最新的JPEG字节，客户端慢时直接跳到最新帧
+        """
+        self.start()
+        last_index = 0
+        with self.cond:
+            self.clients += 1
+            self.level = max(self._client_level(), self._pressure_level)
+        try:
+            while True:
+                with self.cond:
+                    if not self.cond.wait_for(lambda: self.encoded_frames != last_index, timeout=timeout):
+                        continue
+                    if last_index:
+                        self._window_skipped += self.encoded_frames - last_index - 1
+                    self._window_delivered += 1
+                    last_index, jpeg = self.encoded_frames, self.jpeg
+                yield jpeg
+        finally:
+            with self.cond:
+                self.clients -= 1
+
+    def stats(self):
+        scale, quality = QUALITY_LEVELS[self.level]
+        return {
+            'clients': self.clients,
+            'encoded_frames': self.encoded_frames,
+            'encode_ms': round(self.encode_ms, 2),
+            'scale': scale,
+            'quality': quality
+        }
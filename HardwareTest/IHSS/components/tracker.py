@@ -0,0 +1,180 @@
+import time
+import numpy as np
+
+REF_DT = 1 / 30  # 过程噪声按30fps的帧间隔标定
+MAX_HORIZON = 0.5  # 距上次命中超过该时长（秒）后不再外推，避免长时间无检测时框漂走
+
+
+def bbox_to_z(bbox):
+    """[x1, y1, x2, y2] -> [cx, cy, 面积, 宽高比]"""
+    w = bbox[2] - bbox[0]
+    h = bbox[3] - bbox[1]
+    return np.array([bbox[0] + w / 2, bbox[1] + h / 2, w * h, w / max(h, 1e-6)], dtype=np.float64)
+
+
+def x_to_bbox(x):
+    """[cx, cy, 面积, 宽高比, ...] -> [x1, y1, x2, y2]"""
+    w = np.sqrt(max(x[2] * x[3], 0.0))
+    h = x[2] / w if w > 0 else 0.0
+    return np.array([x[0] - w / 2, x[1] - h / 2, x[0] + w / 2, x[1] + h / 2])
+
+
+def iou_matrix(a, b):
+    """a (N,4), b (M,4) -> (N,M)"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    xx1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    yy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    xx2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    yy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.maximum(0.0, xx2 - xx1) * np.maximum(0.0, yy2 - yy1)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+class KalmanBoxTrack:
+    """
+    单个目标的匀速卡尔曼滤波器（SORT）：状态 [cx, cy, 面积, 宽高比, vx, vy, v面积]，速度单位为每秒
+    """
+    _next_id = 1
+
+    _H = np.eye(4, 7)
+    _R = np.diag([1.0, 1.0, 10.0, 10.0])
+    _Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001])
+
+    def __init__(self, bbox, score, kps, now):
+        self.id = KalmanBoxTrack._next_id
+        KalmanBoxTrack._next_id += 1
+        self.x = np.zeros(7)
+        self.x[:4] = bbox_to_z(bbox)
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4])
+        self.score = float(score)
+        self.kps = None if kps is None else np.array(kps, dtype=np.float64)
+        self._kps_center = self.x[:2].copy()
+        self.start_time = now
+        self.last_update = now
+        self.last_predict = now
+        self.hits = 1
+        self.misses = 0  # 连续未命中的关键帧数
+
+    def predict(self, now):
+        dt = min(now, self.last_update + MAX_HORIZON) - self.last_predict
+        if dt <= 0:
+            return
+        if self.x[2] + self.x[6] * dt <= 0:
+            self.x[6] = 0.0
+        F = np.eye(7)
+        F[0, 4] = F[1, 5] = F[2, 6] = dt
+        self.x = F @ self.x
+        self.P = F @ self.P @ F.T + self._Q * (dt / REF_DT)
+        self.last_predict = now
+
+    def update(self, bbox, score, kps, now):
+        self.predict(now)
+        z = bbox_to_z(bbox)
+        y = z - self._H @ self.x
+        S = self._H @ self.P @ self._H.T + self._R
+        K = self.P @ self._H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(7) - K @ self._H) @ self.P
+        self.score = float(score)
+        if kps is not None:
+            self.kps = np.array(kps, dtype=np.float64)
+            self._kps_center = self.x[:2].copy()
+        self.last_update = now
+        self.hits += 1
+        self.misses = 0
+
+    @property
+    def bbox(self):
+        return x_to_bbox(self.x)
+
+    @property
+    def keypoints(self):
+        # 关键点随框中心平移，保证非关键帧上也与框对齐
+        if self.kps is None:
+            return np.zeros((5, 2))
+        return self.kps + (self.x[:2] - self._kps_center)
+
+
+class SortTracker:
+    """
+    轻量级SORT跟踪器：检测器只在关键帧运行，关键帧之间用卡尔曼预测给出每帧的框，
+    按IoU贪心关联保持稳定ID；轨迹命中min_hits次才确认，连续max_misses个关键帧未命中则删除。
+    轨迹寿命按关键帧计数而不是按时间，因此关键帧变稀疏（如画面静止）时轨迹不会被误删。
+    """
+
+    def __init__(self, iou_threshold=0.3, max_misses=3, min_hits=2):
+        """
+        :param iou_threshold: 检测与轨迹关联的最小IoU
+        :param max_misses: 轨迹允许连续未命中的关键帧数
+        :param min_hits: 确认轨迹所需的命中次数
+        """
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.tracks = []
+
+    def reset(self):
+        self.tracks = []
+
+    def update(self, dets, kpss=None, now=None):
+        """
+        用关键帧检测结果更新轨迹
+        :param dets: (N, 5) [x1, y1, x2, y2, score]
+        :param kpss: (N, 5, 2) 关键点，可为None
+        :return: 见get_tracks
+        """
+        now = time.time() if now is None else now
+        dets = np.asarray(dets, dtype=np.float64)
+        if len(dets) == 0:
+            dets = np.zeros((0, 5))
+        for trk in self.tracks:
+            trk.predict(now)
+        track_boxes = np.array([t.bbox for t in self.tracks]).reshape(-1, 4)
+        iou = iou_matrix(dets[:, :4], track_boxes)
+
+        matched_dets, matched_trks = set(), set()
+        # 按IoU从大到小贪心关联，目标数很少时与匈牙利算法结果基本一致
+        for flat in np.argsort(-iou, axis=None):
+            d, t = np.unravel_index(flat, iou.shape)
+            if iou[d, t] < self.iou_threshold:
+                break
+            if d in matched_dets or t in matched_trks:
+                continue
+            self.tracks[t].update(dets[d][:4], dets[d][4], None if kpss is None else kpss[d], now)
+            matched_dets.add(d)
+            matched_trks.add(t)
+        for t, trk in enumerate(self.tracks):
+            if t not in matched_trks:
+                trk.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+        for d in range(len(dets)):
+            if d not in matched_dets:
+                self.tracks.append(KalmanBoxTrack(dets[d][:4], dets[d][4],
+                                                  None if kpss is None else kpss[d], now))
+        return self.get_tracks(now)
+
+    def predict(self, now=None):
+        """非关键帧：只做卡尔曼预测"""
+        now = time.time() if now is None else now
+        for trk in self.tracks:
+            trk.predict(now)
+        return self.get_tracks(now)
+
+    def get_tracks(self, now=None):
+        """
+        :return: (boxes (M, 7) [x1, y1, x2, y2, trk_id, score, 存活秒数], kpss (M, 5, 2))，只含已确认的轨迹
+        """
+        now = time.time() if now is None else now
+        confirmed = [t for t in self.tracks if t.hits >= self.min_hits]
+        boxes = np.zeros((len(confirmed), 7), dtype=np.float32)
+        kpss = np.zeros((len(confirmed), 5, 2), dtype=np.float32)
+        for i, t in enumerate(confirmed):
+            boxes[i, :4] = t.bbox
+            boxes[i, 4] = t.id
+            boxes[i, 5] = t.score
+            boxes[i, 6] = now - t.start_time
+            kpss[i] = t.keypoints
+        return boxes, kpss
@@ -0,0 +1,142 @@
+import numpy as np
+import cv2
+
+MAX_WH = 4096  # 类别偏移量，用于一次NMS完成按类别NMS
+
+
+def letterbox(img, new_shape=640, color=(114, 114, 114)):
+    """
+    等比缩放并填充到new_shape（YOLOv5训练时的预处理方式）
+    :param img: BGR图像
+    :param new_shape: 目标尺寸，int或(h, w)
+    :param color: 填充颜色
+    :return: (填充后的图像, 缩放比例, (左填充, 上填充))
+    """
+    if isinstance(new_shape, int):
+        new_shape = (new_shape, new_shape)
+    h, w = img.shape[:2]
+    ratio = min(new_shape[0] / h, new_shape[1] / w)
+    new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+    dw = (new_shape[1] - new_w) / 2
+    dh = (new_shape[0] - new_h) / 2
+    if (w, h) != (new_w, new_h):
+        img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return img, ratio, (left, top)
+
+
+def xywh2xyxy(x):
+    y = np.empty_like(x)
+    half_w = x[:, 2] / 2
+    half_h = x[:, 3] / 2
+    y[:, 0] = x[:, 0] - half_w
+    y[:, 1] = x[:, 1] - half_h
+    y[:, 2] = x[:, 0] + half_w
+    y[:, 3] = x[:, 1] + half_h
+    return y
+
+
+def nms(boxes, scores, iou_thres=0.45):
+    """
+    贪心NMS，循环次数等于保留框数，每轮对剩余框做向量化IoU
+    :param boxes: (N, 4) xyxy
+    :param scores: (N,)
+    :return: 保留下标数组（按分数降序）
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        h = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_thres]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def batched_nms(boxes, scores, classes, iou_thres=0.45):
+    """按类别NMS：给每个类别的框加不同偏移，使不同类别的框互不重叠，一次NMS完成"""
+    if boxes.shape[0] == 0:
+        return np.empty((0,), dtype=np.int64)
+    offset_boxes = boxes + (classes.astype(boxes.dtype) * MAX_WH)[:, None]
+    return nms(offset_boxes, scores, iou_thres)
+
+
+class YoloPostprocessor:
+    """
+    YOLOv5 ONNX输出 (1, N, 5+nc) 的向量化后处理：
+    置信度筛选 -> xywh转xyxy -> 按类别NMS -> 还原到原图坐标
+    """
+
+    def __init__(self, num_classes=None, conf_thres=0.25, iou_thres=0.45,
+                 max_det=300, max_nms=30000, agnostic=False):
+        """
+        :param num_classes: 只取前num_classes个类别分数，None表示全部
+        :param conf_thres: 置信度阈值（obj_conf * cls_conf）
+        :param iou_thres: NMS的IoU阈值
+        :param max_det: 最多保留的检测框数
+        :param max_nms: 进入NMS的最多候选框数
+        :param agnostic: True时不区分类别做NMS
+        """
+        self.num_classes = num_classes
+        self.conf_thres = conf_thres
+        self.iou_thres = iou_thres
+        self.max_det = max_det
+        self.max_nms = max_nms
+        self.agnostic = agnostic
+
+    def __call__(self, pred, conf_thres=None, ratio=1.0, pad=(0, 0), orig_shape=None):
+        """
+        :param pred: 模型输出，(1, N, 5+nc) 或 (N, 5+nc)
+        :param conf_thres: 覆盖默认置信度阈值
+        :param ratio: letterbox缩放比例，或 (ratio_w, ratio_h)（直接resize时）
+        :param pad: letterbox的 (左填充, 上填充)
+        :param orig_shape: 原图 (h, w)，用于裁剪坐标
+        :return: boxes (M, 4) float32 xyxy, scores (M,) float32, classes (M,) int64
+        """
+        conf_thres = self.conf_thres if conf_thres is None else conf_thres
+        if pred.ndim == 3:
+            pred = pred[0]
+
+        # obj_conf是最终置信度的上界，先用它筛掉绝大多数候选框
+        cand = pred[pred[:, 4] > conf_thres]
+        if self.num_classes is None:
+            cls_scores = cand[:, 5:]
+        else:
+            cls_scores = cand[:, 5:5 + self.num_classes]
+        classes = cls_scores.argmax(axis=1)
+        scores = cand[:, 4] * cls_scores[np.arange(cand.shape[0]), classes]
+        mask = scores > conf_thres
+        cand, classes, scores = cand[mask], classes[mask], scores[mask]
+
+        if cand.shape[0] > self.max_nms:
+            top = np.argpartition(-scores, self.max_nms)[:self.max_nms]
+            cand, classes, scores = cand[top], classes[top], scores[top]
+
+        boxes = xywh2xyxy(cand[:, :4])
+        if self.agnostic:
+            keep = nms(boxes, scores, self.iou_thres)
+        else:
+            keep = batched_nms(boxes, scores, classes, self.iou_thres)
+        keep = keep[:self.max_det]
+        boxes, scores, classes = boxes[keep], scores[keep], classes[keep]
+
+        # 还原到原图坐标
+        boxes[:, [0, 2]] -= pad[0]
+        boxes[:, [1, 3]] -= pad[1]
+        if np.isscalar(ratio):
+            boxes /= ratio
+        else:
+            boxes[:, [0, 2]] /= ratio[0]
+            boxes[:, [1, 3]] /= ratio[1]
+        if orig_shape is not None:
+            boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, orig_shape[1])
+            boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, orig_shape[0])
+        return boxes.astype(np.float32, copy=False), scores.astype(np.float32, copy=False), classes.astype(np.int64)
@@ -1,6 +1,7 @@
-from components.utils import getFaceBoxs
+from components.utils import ScrfdPostprocessor
 from components.onnx_infer import OnnxRun
 from components.config import ai_cfg
+from components.tracker import SortTracker
 import numpy as np
 import cv2
 import time
@@ -8,11 +9,14 @@ import time
 FACE_DET_PATH = "models/scrfd.onnx"
 
 class FaceDetectRec(object):
-    def __init__(self, face_det_path=FACE_DET_PATH):
-        self.onnx_run = OnnxRun(model_path=face_det_path)
+    def __init__(self, face_det_path=FACE_DET_PATH, threads=None):
+        self.onnx_run = OnnxRun(model_path=face_det_path, threads=threads)
+        self.postprocess = ScrfdPostprocessor(ai_cfg.INPUT_SIZE)
+        self.tracker = SortTracker()
         self.predictions = []
 
-    def imgPreprocessing(self, img):
+    @staticmethod
+    def imgPreprocessing(img):
         im_ratio = float(img.shape[0]) / img.shape[1]
         model_ratio = float(ai_cfg.INPUT_SIZE[1]) / ai_cfg.INPUT_SIZE[0]
         if im_ratio > model_ratio:
@@ -31,15 +35,33 @@ class FaceDetectRec(object):
                                            (127.5, 127.5, 127.5), swapRB=True)
         return input_data
 
-    def inference(self, img):
+    def detect(self, img):
+        """只运行SCRFD，返回 (bboxes (N, 5), kpss (N, 5, 2))，为后处理器的预分配数组，下次检测时被覆盖"""
         input_data = self.imgPreprocessing(img)
         net_outs = self.onnx_run.inference(input_data)
-        bboxes, kpss = getFaceBoxs(img, net_outs, input_size=(ai_cfg.INPUT_SIZE))
+        return self.postprocess(net_outs, img.shape)
 
-        tracked_boxes = bboxes
+    def inference(self, img, now=None):
+        """
+        关键帧：运行SCRFD并更新跟踪器
+        :return: [tracked_boxes (M, 7) [x1, y1, x2, y2, trk_id, score, 存活秒数], kpss (M, 5, 2)]
+        """
+        bboxes, kpss = self.detect(img)
+        if len(bboxes) == 0:
+            bboxes, kpss = np.zeros((0, 5)), None
+        tracked_boxes, kpss = self.tracker.update(bboxes[:, :5], kpss, now)
         self.predictions = [tracked_boxes, kpss]
         return self.predictions
 
+    def predict(self, now=None):
+        """非关键帧：不跑模型，用跟踪器预测当前帧的人脸框"""
+        self.predictions = list(self.tracker.predict(now))
+        return self.predictions
+
+    def reset(self):
+        self.tracker.reset()
+        self.predictions = []
+
 
 def faceDetecImgDis(img, predictions):
     img = img.copy()
@@ -47,15 +69,15 @@ def faceDetecImgDis(img, predictions):
     if predictions:
         tracked_boxes, kpss = predictions
         for i, bbox in enumerate(tracked_boxes):
-            x, y, w, h, trk_id = bbox
+            x, y, w, h, trk_id = bbox[:5]
 
-            trk_id = i + 1
+            trk_id = int(trk_id)
             if face_name < trk_id:
                 face_name = trk_id
             cv2.rectangle(img, (int(x), int(y)), (int(w), int(h)), (255, 255, 0), 2)
 
-            # cv2.putText(img, str(trk_id), (int(x), int(y)), cv2.FONT_HERSHEY_SIMPLEX,
-            #             1, (0, 0, 255), 2, cv2.LINE_AA)
+            cv2.putText(img, str(trk_id), (int(x), int(y)), cv2.FONT_HERSHEY_SIMPLEX,
+                        1, (0, 0, 255), 2, cv2.LINE_AA)
         for kps in kpss:
             for kp in kps:
                 kp = kp.astype(np.int16)
@@ -65,12 +87,18 @@ def faceDetecImgDis(img, predictions):
 if __name__ == "__main__":
     cap = cv2.VideoCapture(0)
     face_mask_rec = FaceDetectRec()
+    frame_idx = 0
 
     while True:
         ret, img = cap.read()
         img = cv2.resize(img, (640, 480))
         st = time.time()
-        face_mask_pricet = face_mask_rec.inference(img)
+        # 每4帧跑一次检测，其余帧只做跟踪预测
+        if frame_idx % 4 == 0:
+            face_mask_pricet = face_mask_rec.inference(img)
+        else:
+            face_mask_pricet = face_mask_rec.predict()
+        frame_idx += 1
         img, face_num = faceDetecImgDis(img, face_mask_pricet)
         print("onnx_time{}ms".format((time.time() - st) * 1000))
 
@@ -1,28 +1,37 @@
-import cv2
 import numpy as np
 import time
 import re
 import datetime
 from flask import Flask, render_template_string, Response, request, jsonify
-from multiprocessing import Process, Lock, Value, RawArray
+from multiprocessing import Process, Value, Array
 from ctypes import c_char_p, c_bool
-import utils.motor as motor
 import utils.temp_hum as temp_hum
 import utils.time as time_utils
 import utils.speaker as speaker
 from face_detect_rec import FaceDetectRec, faceDetecImgDis
-import sqlite3
+from components.frame_ring import FrameRing
+from components.result_board import ResultBoard
+from components.event_store import EventStore
+from components.motion import MotionDetector
+from components.stream_encoder import StreamEncoder
+from components.motor_driver import MotorController
+from components.speech import Endpointer, record_utterance, RECOGNIZERS
+from components.intent import LocalIntentMatcher, CommandCache
+from components.audio_bus import AudioBus
+from components.sound_classifier import create_backend, IncrementalClassifier, SoundEventDetector
+from components.sources import open_camera
+from components.metrics import SharedMetrics, PerfWindow, counter, histogram, format_samples, process_stats, SLOW_BUCKETS
 import json
 import os
-from danger_rec import DangerDetectRec
+from danger_rec import DangerDetectRec, DANGER_CLASSES
 import utils.baidu as baidu
 import utils.deepseek as deepseek
 import pvporcupine
 from pvrecorder import PvRecorder
 import config.key as key
-import wave
 
 # ----------------- 配置参数 -----------------
+CAMERA_SOURCE = 0       # 摄像头编号，或回放源'video:录像.mp4'/'images:图片目录'，见components/sources.py
 CAM_WIDTH = 640
 CAM_HEIGHT = 480
 MOTOR1_MIN = -175
@@ -30,128 +39,309 @@ MOTOR1_MAX = 175
 MOTOR2_MIN = -65
 MOTOR2_MAX = 65
 MOTOR_STEP = 5
+MOTOR_BACKEND = 'wiringpi'  # 电机GPIO后端，无硬件调试时可改为'sim'
+SENSOR_BACKEND = 'wiringpi' # 温湿度传感器后端，无硬件调试时可改为'sim'
+SPEAKER_BACKEND = 'pyaudio' # 音频输出后端，无扬声器时可改为'null'
+SPEAKER_DEVICE_INDEX = 0    # 扬声器输出设备编号，由音频播放进程独占
+CAM_HFOV = 60           # 摄像头水平视场角（度），用于把人脸偏移换算为电机角度
+CAM_VFOV = 45           # 摄像头垂直视场角（度）
+TRACK_GAIN = 0.7        # 人脸跟踪每次修正偏移的比例，小于1避免画面滞后导致过冲
+ASR_BACKEND = 'baidu'   # 语音识别后端，'scripted'为不联网的本地替身，见components/speech.py
+VAD_END_SILENCE = 0.8   # 说话后静音多久结束录音（秒）
+VAD_MAX_DURATION = 8.0  # 单条语音指令最长录音时长（秒）
+FRAME_SLOTS = 4
+FACE_INTERVAL = 0.5     # 人脸检测（SCRFD关键帧）间隔（秒）
+TRACK_INTERVAL = 1 / 15 # 关键帧之间跟踪器预测并发布人脸框的间隔（秒）
+FACE_MIN_AGE = 1.0      # 轨迹存活超过该时长（秒）才计入在场人数，用于人数消抖
+DANGER_INTERVAL = 0.25  # 危险物检测间隔（秒）
+# 4核板子的核心分配：推理服务进程的ONNX线程数 + 声音分类线程数，其余留给摄像头、推流编码和Web服务
+INFER_THREADS = 2
+SOUND_THREADS = 1
+MAX_FACES = 32
+MAX_DANGERS = 32
+MOTION_GATING = True    # 只在画面变化时运行人脸/危险物模型
+MOTION_HOLD = 2.0       # 检测到运动后继续运行模型的时长（秒）
+MOTION_KEEPALIVE = 5.0  # 无运动时模型的最低运行间隔（秒）
+MOTION_ZONES = None     # 运动检测区域，None为整幅画面，格式见components/motion.py
+MIC_DEVICE_INDEX = 11   # PvRecorder麦克风设备索引，由采集进程独占
+MIC_SAMPLE_RATE = 16000 # 与porcupine.sample_rate一致
+MIC_FRAME_LENGTH = 512  # 与porcupine.frame_length一致
+AUDIO_BUS_SECONDS = 10  # 共享音频缓冲区时长（秒）
+SOUND_MODEL_PATH = 'models/yamnet'  # YAMNet模型，SavedModel目录或导出的.tflite/.onnx文件
+SOUND_INTERVAL = 0.5    # 声音分类的运行间隔（秒），每次只计算新到达的0.96秒块
+SOUND_COOLDOWN = 30.0   # 同一类声音事件两次记录的最小间隔（秒）
+# YAMNet类别名称 -> (事件类型, 触发阈值)，事件类型以sound_开头，供语音查找命令按前缀检索
+SOUND_RULES = {
+    'Smoke detector, smoke alarm': ('sound_alarm', 0.3),
+    'Fire alarm': ('sound_alarm', 0.3),
+    'Alarm': ('sound_alarm', 0.4),
+    'Siren': ('sound_siren', 0.4),
+    'Glass': ('sound_glass_break', 0.4),
+    'Shatter': ('sound_glass_break', 0.3),
+    'Screaming': ('sound_scream', 0.3),
+    'Crying, sobbing': ('sound_crying', 0.4),
+    'Baby cry, infant cry': ('sound_crying', 0.4),
+    'Gunshot, gunfire': ('sound_gunshot', 0.3),
+    'Explosion': ('sound_explosion', 0.3),
+    'Dog': ('sound_dog', 0.5),
+    'Knock': ('sound_knock', 0.4),
+}
 
-# ----------------- 共享内存与锁 -----------------
-frame_lock = Lock()
+temp_hum.use_backend(SENSOR_BACKEND)
+speaker.use_backend(SPEAKER_BACKEND)
 
-frame_dims = RawArray('i', [0, 0, 0])  # [H, W, C]
-frame_buffer = RawArray('B', CAM_HEIGHT * CAM_WIDTH * 3)
+# 语音命令解析：本地意图匹配与控制命令缓存（仅语音进程使用）
+intent_matcher = LocalIntentMatcher()
+command_cache = CommandCache()
+
+# ----------------- 共享内存 -----------------
+# 摄像头进程单写、多进程无锁读取的帧环形缓冲区，写入时已完成水平翻转
+frame_ring = FrameRing((CAM_HEIGHT, CAM_WIDTH, 3), slots=FRAME_SLOTS,
+                       readers=('inference', 'stream'))
+# 推理服务进程发布的最新结果：人脸每行 [x1, y1, x2, y2, trk_id, score, 存活秒数, 5个关键点xy]，
+# 危险物每行 [x1, y1, x2, y2, conf, cls]
+face_board = ResultBoard(MAX_FACES, 17)
+danger_board = ResultBoard(MAX_DANGERS, 6)
 shared_direction = Value(c_char_p, b"center")
 enable_face_detection = Value(c_bool, False)
 enable_face_tracking = Value(c_bool, False)
 enable_face_overlay = Value(c_bool, True)
 motor1_angle = Value('i', 0)
 motor2_angle = Value('i', 0)
-last_motor_activity = Value('d', time.time())
-motor_sleep_status = Value(c_bool, False)
+# 人脸关键帧拍摄时的电机角度：[帧序号, 电机1角度, 电机2角度]，跟踪目标以拍摄时的角度为基准计算
+face_capture = Array('i', 3)
+# 电机驱动进程：各进程只投递目标角度，motor1_angle/motor2_angle由驱动进程按实际位置更新
+motor_ctl = MotorController(((MOTOR1_MIN, MOTOR1_MAX), (MOTOR2_MIN, MOTOR2_MAX)),
+                            angle_values=(motor1_angle, motor2_angle), backend=MOTOR_BACKEND)
 last_face_toggle_time = Value('d', 0.0)  # 新增：记录上次切换人脸追踪的时间
 volume_value = Value('d', 0.05)  # 全局音量（0.0~1.0）
 enable_danger_detection = Value(c_bool, False)
 last_danger_alarm_time = Value('d', 0.0)  # 火焰报警防抖
-# ----------------- 全局人脸检测器实例 -----------------
-face_detector = None
-# ----------------- 全局危险物检测器实例 -----------------
-danger_detector = None
-danger_last_result = {'boxes': [], 'labels': [], 'confs': []}
-# ----------------- SQLite数据库初始化 -----------------
+last_motion_time = Value('d', 0.0)  # 最近一次检测到运动的时间
+motion_frames = Value('i', 0)  # 检测到运动的帧数
+checked_frames = Value('i', 0)  # 做过运动检测的帧数
+# 运动门控统计：[人脸运行次数, 人脸跳过次数, 危险物运行次数, 危险物跳过次数, 人脸平均耗时ms, 危险物平均耗时ms]
+gate_stats = Array('d', 6)
+# 音频采集进程单写的麦克风音频总线，唤醒词进程和声音分类进程各自读取
+audio_bus = AudioBus(MIC_SAMPLE_RATE * AUDIO_BUS_SECONDS, MIC_SAMPLE_RATE)
+enable_sound_detection = Value(c_bool, False)
+# 各进程在热路径上更新的性能指标（共享内存槽位，无锁），/metrics导出为Prometheus文本，网页性能面板汇总显示
+metrics = SharedMetrics('ihss', [
+    counter('camera_frames_total', '摄像头采集的帧数'),
+    counter('camera_read_errors_total', '摄像头读帧失败次数'),
+    histogram('camera_frame_seconds', '每帧写入环形缓冲区与运动检测的耗时'),
+    histogram('inference_seconds', '模型推理耗时（含前后处理）', labels={'model': ('face', 'danger', 'sound')}),
+    counter('inference_skipped_total', '运动门控跳过的推理次数', labels={'model': ('face', 'danger')}),
+    counter('track_predictions_total', '关键帧之间发布跟踪预测的次数'),
+    histogram('stream_encode_seconds', '推流JPEG编码耗时'),
+    counter('audio_frames_total', '写入音频总线的麦克风帧数'),
+    counter('audio_dropped_samples_total', '读者落后于音频总线而跳过的样本数', labels={'reader': ('voice',)}),
+    counter('sound_patches_total', 'YAMNet计算的音频块数'),
+    counter('sound_events_total', '记录的声音事件数'),
+    histogram('voice_stage_seconds', '语音指令各阶段耗时', labels={'stage': ('record', 'asr', 'resolve')},
+              buckets=SLOW_BUCKETS),
+    counter('voice_commands_total', '语音指令的解析来源', labels={'source': ('local', 'cache', 'deepseek', 'failed')}),
+    histogram('speaker_first_sample_seconds', '从投递播放请求到第一个样本送入声卡的延迟'),
+])
+# 进程名 -> pid，Web进程据此从/proc读取各进程的CPU与内存
+worker_pids = {'web': os.getpid()}
+# 音频播放进程：常驻输出流 + 预加载的提示音缓存 + 混音器，各进程的播放请求都投递到它的队列
+audio_player = speaker.init_player(SPEAKER_DEVICE_INDEX,
+                                   latency_hist=metrics.histogram('speaker_first_sample_seconds'))
+# ----------------- SQLite事件存储 -----------------
 DB_PATH = 'events.db'
-def init_db():
-    if not os.path.exists(DB_PATH):
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS event_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                event_type TEXT NOT NULL,
-                detail TEXT,
-                confidence REAL
-            )
-        ''')
-        conn.commit()
-        conn.close()
-
-init_db()
+# 各进程只把事件放入队列，由事件写入进程批量提交
+event_store = EventStore(DB_PATH)
+
+# 查找命令的事件类别（search_type）到事件类型的映射
+SEARCH_SOUND_PREFIX = 'sound_'
+SEARCH_HUMAN_TYPES = ['scene_enter', 'scene_leave', 'person_enter', 'person_leave']
+SEARCH_DANGER_TYPES = ['dangerous_object', 'fire_alarm']
 
 # 事件记录插入函数
 
 def log_event(event_type, detail=None, confidence=None):
-    ts = datetime.datetime.now().isoformat()
-    detail_str = json.dumps(detail, ensure_ascii=False) if detail is not None else None
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(
-        'INSERT INTO event_log (timestamp, event_type, detail, confidence) VALUES (?, ?, ?, ?)',
-        (ts, event_type, detail_str, confidence)
-    )
-    conn.commit()
-    conn.close()
-    print(f"[EVENT LOG] {ts} | {event_type} | detail={detail_str} | confidence={confidence}")
+    event_store.log(event_type, detail, confidence)
+    print(f"[EVENT LOG] {datetime.datetime.now().isoformat()} | {event_type} | detail={detail} | confidence={confidence}")
 
 # ----------------- 摄像头进程 -----------------
-def camera_process(frame_lock, frame_buffer, frame_dims):
-    cap = cv2.VideoCapture(0)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAM_WIDTH)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAM_HEIGHT)
-    with frame_lock:
-        frame_dims[0], frame_dims[1], frame_dims[2] = CAM_HEIGHT, CAM_WIDTH, 3
+def camera_process(frame_ring):
+    cap = open_camera(CAMERA_SOURCE, CAM_WIDTH, CAM_HEIGHT)
+    # 复用采集缓冲区，避免每帧重新分配
+    capture_buf = np.empty((CAM_HEIGHT, CAM_WIDTH, 3), dtype=np.uint8)
+    motion_detector = MotionDetector((CAM_HEIGHT, CAM_WIDTH), zones=MOTION_ZONES)
+    frames = metrics.counter('camera_frames_total')
+    read_errors = metrics.counter('camera_read_errors_total')
+    frame_cost = metrics.histogram('camera_frame_seconds')
     print("摄像头进程启动...")
     while True:
-        ret, frame = cap.read()
+        # 摄像头不支持请求的分辨率时，由open_camera缩放到CAM_WIDTH x CAM_HEIGHT
+        ret, frame = cap.read(capture_buf)
         if ret:
-            with frame_lock:
-                frame_buffer_np = np.frombuffer(frame_buffer, dtype=np.uint8).reshape(frame_dims[:])
-                np.copyto(frame_buffer_np, frame)
+            st = time.perf_counter()
+            seq = frame_ring.write(frame, mirror=True)
+            # 在翻转后的画面上检测，使区域坐标与网页画面一致
+            _, shown = frame_ring.latest()
+            if MOTION_GATING and shown is not None:
+                moving, _, _ = motion_detector.update(shown)
+                # 检测期间该槽位已被覆盖时结果作废
+                if frame_ring.is_valid(seq):
+                    checked_frames.value += 1
+                    if moving:
+                        motion_frames.value += 1
+                        last_motion_time.value = time.time()
+            frame_cost.observe(time.perf_counter() - st)
+            frames.inc()
+        elif getattr(cap, 'finished', False):
+            print("摄像头进程：回放结束")
+            break
         else:
+            read_errors.inc()
             time.sleep(0.05)
     cap.release()
 
+# ----------------- 推理服务进程 -----------------
+def inference_process(frame_ring, face_board, danger_board):
+    """
+    唯一持有人脸/危险物模型的进程：按需从帧环形缓冲区取最新帧推理，结果发布到共享内存公告板，
+    识别进程、危险物事件进程与Web接口都只读取公告板，不再各自加载模型。
+    人脸检测只在关键帧（FACE_INTERVAL）运行，关键帧之间由跟踪器按TRACK_INTERVAL预测并发布人脸框。
+    """
+    face_detector = FaceDetectRec(threads=INFER_THREADS)
+    danger_detector = None  # 首次开启危险物检测时再加载
+    frame_reader = frame_ring.reader('inference')
+    # 推理耗时可能超过写者绕回一圈的时间，在序号校验内拷贝出私有帧再推理
+    frame_buf = np.empty(frame_ring.shape, dtype=np.uint8)
+    last_face_time = 0.0
+    last_danger_time = 0.0
+    last_face_run = 0.0
+    last_danger_run = 0.0
+    last_track_time = 0.0
+    face_cost = metrics.histogram('inference_seconds', model='face')
+    danger_cost = metrics.histogram('inference_seconds', model='danger')
+    face_skipped = metrics.counter('inference_skipped_total', model='face')
+    danger_skipped = metrics.counter('inference_skipped_total', model='danger')
+    track_predictions = metrics.counter('track_predictions_total')
+    print("推理服务进程启动...")
+    while True:
+        now = time.time()
+        face_enabled = enable_face_detection.value or enable_face_tracking.value
+        if not face_enabled and face_detector.tracker.tracks:
+            face_detector.reset()
+        face_due = face_enabled and now - last_face_time >= FACE_INTERVAL
+        danger_due = enable_danger_detection.value and now - last_danger_time >= DANGER_INTERVAL
+        # 运动门控：画面静止时只按保活间隔运行模型
+        if MOTION_GATING and now - last_motion_time.value > MOTION_HOLD:
+            if face_due and now - last_face_run < MOTION_KEEPALIVE:
+                face_due = False
+                last_face_time = now
+                gate_stats[1] += 1
+                face_skipped.inc()
+            if danger_due and now - last_danger_run < MOTION_KEEPALIVE:
+                danger_due = False
+                last_danger_time = now
+                gate_stats[3] += 1
+                danger_skipped.inc()
+        # 非关键帧：不跑模型，只发布跟踪器预测的人脸框
+        if face_enabled and not face_due and face_detector.tracker.tracks \
+                and now - last_track_time >= TRACK_INTERVAL:
+            publish_faces(face_board, face_detector.predict(now), frame_ring.latest_seq())
+            last_track_time = now
+            track_predictions.inc()
+        if not (face_due or danger_due):
+            time.sleep(0.01)
+            continue
+        # 同一时刻到期的请求合并到同一帧上处理
+        seq, frame = frame_reader.read(out=frame_buf)
+        if frame is None:
+            time.sleep(0.01)
+            continue
+        if face_due:
+            capture_angles = (motor1_angle.value, motor2_angle.value)
+            st = time.time()
+            predictions = face_detector.inference(frame, now)
+            with face_capture.get_lock():
+                face_capture[:] = [seq, *capture_angles]
+            publish_faces(face_board, predictions, seq)
+            last_face_time = last_face_run = last_track_time = now
+            cost = time.time() - st
+            update_gate_cost(0, cost * 1000)
+            face_cost.observe(cost)
+        if danger_due:
+            if danger_detector is None:
+                danger_detector = DangerDetectRec(threads=INFER_THREADS)
+            st = time.time()
+            boxes = danger_detector.inference(frame, conf_thres=0.3)
+            rows = [b['bbox'] + [b['conf'], b['cls']] for b in boxes]
+            danger_board.publish(rows, frame_seq=seq)
+            last_danger_time = last_danger_run = now
+            cost = time.time() - st
+            update_gate_cost(1, cost * 1000)
+            danger_cost.observe(cost)
+
+def publish_faces(face_board, predictions, seq):
+    tracked_boxes, kpss = predictions
+    rows = np.hstack([tracked_boxes, kpss.reshape(len(kpss), -1)]) if len(tracked_boxes) else []
+    face_board.publish(rows, frame_seq=seq)
+
+def update_gate_cost(model, cost_ms):
+    """累计模型运行次数并更新平均耗时（指数滑动平均），model: 0人脸 1危险物"""
+    runs = gate_stats[model * 2]
+    avg = gate_stats[4 + model]
+    gate_stats[4 + model] = cost_ms if runs == 0 else avg * 0.9 + cost_ms * 0.1
+    gate_stats[model * 2] = runs + 1
+
+def motion_gate_status():
+    checked = checked_frames.value
+    face_saved = gate_stats[1] * gate_stats[4] / 1000
+    danger_saved = gate_stats[3] * gate_stats[5] / 1000
+    return {
+        'enabled': MOTION_GATING,
+        'hit_rate': round(motion_frames.value / checked, 4) if checked else 0.0,
+        'face_runs': int(gate_stats[0]),
+        'face_skipped': int(gate_stats[1]),
+        'danger_runs': int(gate_stats[2]),
+        'danger_skipped': int(gate_stats[3]),
+        'cpu_saved_s': round(face_saved + danger_saved, 1)
+    }
+
 # ----------------- 识别与控制进程 -----------------
-def recognition_process(frame_lock, frame_buffer, frame_dims, shared_direction):
-    face_detector = FaceDetectRec()
-    frame_count = 0
+def recognition_process(face_board, shared_direction):
+    last_version = 0
+    last_target_seq = 0
     print("识别进程启动...")
-    # 人脸消抖队列和状态
-    from collections import deque
-    face_count_queue = deque(maxlen=5)
-    confirmed_face_count = 0
     last_confirmed_face_count = 0
     while True:
         time.sleep(0.05)
-        frame_count += 1
-        with frame_lock:
-            if frame_dims[0] == 0:
-                continue
-            frame_buffer_np = np.frombuffer(frame_buffer, dtype=np.uint8).reshape(frame_dims[:])
-            frame = frame_buffer_np.copy()
-        frame = cv2.flip(frame, 1)
-        # 人脸检测和跟踪每5帧
-        if (enable_face_detection.value or enable_face_tracking.value) and frame_count % 5 == 0:
-            predictions = face_detector.inference(frame)
-            bboxes = predictions[0] if predictions and predictions[0] is not None else []
+        # 推理服务每发布一次新的人脸结果（关键帧或跟踪预测）处理一次
+        if (enable_face_detection.value or enable_face_tracking.value) and face_board.version() != last_version:
+            last_version, frame_seq, _, bboxes = face_board.read()
             face_count = len(bboxes)
-            face_count_queue.append(face_count)
-            # 消抖：连续5帧人数一致且与上次确认人数不同
-            if len(face_count_queue) == face_count_queue.maxlen and all(x == face_count_queue[0] for x in face_count_queue):
-                confirmed_face_count = face_count_queue[0]
-                if confirmed_face_count != last_confirmed_face_count:
-                    # 事件判定
-                    if last_confirmed_face_count == 0 and confirmed_face_count > 0:
-                        # 场景来人
-                        log_event('scene_enter', detail={'count': confirmed_face_count})
-                    elif last_confirmed_face_count > 0 and confirmed_face_count == 0:
-                        # 场景无人
-                        log_event('scene_leave')
-                    elif last_confirmed_face_count > 0 and confirmed_face_count > 0:
-                        diff = confirmed_face_count - last_confirmed_face_count
-                        if diff > 0:
-                            log_event('person_enter', detail={'count': confirmed_face_count, 'change': diff})
-                        elif diff < 0:
-                            log_event('person_leave', detail={'count': confirmed_face_count, 'change': diff})
-                    last_confirmed_face_count = confirmed_face_count
-            # 人脸跟踪电机控制逻辑
-            if enable_face_tracking.value and face_count > 0:
-                bbox = bboxes[0]
+            # 消抖：只统计存活足够久的轨迹；轨迹连续多个关键帧未命中才删除，离开也自然有延迟
+            confirmed_face_count = int(np.count_nonzero(bboxes[:, 6] >= FACE_MIN_AGE)) if face_count else 0
+            if confirmed_face_count != last_confirmed_face_count:
+                # 事件判定
+                if last_confirmed_face_count == 0 and confirmed_face_count > 0:
+                    # 场景来人
+                    log_event('scene_enter', detail={'count': confirmed_face_count})
+                elif last_confirmed_face_count > 0 and confirmed_face_count == 0:
+                    # 场景无人
+                    log_event('scene_leave')
+                elif last_confirmed_face_count > 0 and confirmed_face_count > 0:
+                    diff = confirmed_face_count - last_confirmed_face_count
+                    if diff > 0:
+                        log_event('person_enter', detail={'count': confirmed_face_count, 'change': diff})
+                    elif diff < 0:
+                        log_event('person_leave', detail={'count': confirmed_face_count, 'change': diff})
+                last_confirmed_face_count = confirmed_face_count
+            # 人脸跟踪电机控制逻辑：只在新的关键帧结果上设置目标，跟踪预测的人脸框不驱动电机
+            with face_capture.get_lock():
+                capture_seq, capture_angle1, capture_angle2 = face_capture[:]
+            if enable_face_tracking.value and face_count > 0 \
+                    and frame_seq == capture_seq and frame_seq != last_target_seq:
+                last_target_seq = frame_seq
+                # 跟随存活最久的轨迹，避免多人时目标来回切换
+                bbox = bboxes[np.argmax(bboxes[:, 6])]
                 face_cx = int((bbox[0] + bbox[2]) / 2)
                 face_cy = int((bbox[1] + bbox[3]) / 2)
                 cx, cy = CAM_WIDTH // 2, CAM_HEIGHT // 2
@@ -159,55 +349,26 @@ def recognition_process(frame_lock, frame_buffer, frame_dims, shared_direction):
                 dead_zone_h = 80
                 dx = face_cx - cx
                 dy = face_cy - cy
+                # 按视场角把像素偏移换算为角度，以该帧拍摄时的电机角度为基准设置目标，
+                # 拍摄后电机已转过的角度不会重复叠加；驱动进程在后台转动，识别进程不再等待电机
                 if abs(dx) > dead_zone_w // 2:
-                    step_x = int(np.clip(abs(dx) / (CAM_WIDTH // 8), 1, 5)) * MOTOR_STEP
-                    if dx > 0 and motor1_angle.value < MOTOR1_MAX:
-                        motor.rotate(motor.motor1, step_x)
-                        motor1_angle.value += step_x
-                    elif dx < 0 and motor1_angle.value > MOTOR1_MIN:
-                        motor.rotate(motor.motor1, -step_x)
-                        motor1_angle.value -= step_x
+                    offset = dx / CAM_WIDTH * CAM_HFOV * TRACK_GAIN
+                    motor_ctl.move_to(1, round(capture_angle1 + offset))
                 if abs(dy) > dead_zone_h // 2:
-                    step_y = int(np.clip(abs(dy) / (CAM_HEIGHT // 8), 1, 5)) * MOTOR_STEP
-                    if dy > 0 and motor2_angle.value > MOTOR2_MIN:
-                        motor.rotate(motor.motor2, -step_y)
-                        motor2_angle.value -= step_y
-                    elif dy < 0 and motor2_angle.value < MOTOR2_MAX:
-                        motor.rotate(motor.motor2, step_y)
-                        motor2_angle.value += step_y
-                last_motor_activity.value = time.time()
-                if motor_sleep_status.value:
-                    motor_sleep_status.value = False
-        # 电机休眠
-        if time.time() - last_motor_activity.value > 30 and not motor_sleep_status.value:
-            motor.sleep_motor()
-            motor_sleep_status.value = True
-
-# ----------------- 危险物检测进程 -----------------
-def danger_recognition_process(frame_lock, frame_buffer, frame_dims):
-    danger_detector = DangerDetectRec()
-    frame_count = 0
-    print("危险物检测进程启动...")
+                    offset = dy / CAM_HEIGHT * CAM_VFOV * TRACK_GAIN
+                    motor_ctl.move_to(2, round(capture_angle2 - offset))
+
+# ----------------- 危险物事件进程 -----------------
+def danger_recognition_process(danger_board):
+    last_version = 0
+    print("危险物事件进程启动...")
     last_fire_alarm = 0
-    global danger_last_result
     while True:
         time.sleep(0.05)
-        frame_count += 1
-        if not enable_danger_detection.value:
+        if not enable_danger_detection.value or danger_board.version() == last_version:
             continue
-        if frame_count % 5 != 0:
-            continue
-        with frame_lock:
-            if frame_dims[0] == 0:
-                continue
-            frame_buffer_np = np.frombuffer(frame_buffer, dtype=np.uint8).reshape(frame_dims[:])
-            frame = frame_buffer_np.copy()
-        frame = cv2.flip(frame, 1)
-        boxes = danger_detector.inference(frame, conf_thres=0.3)
-        out_boxes = [b['bbox'] for b in boxes]
-        out_labels = [b['label'] for b in boxes]
-        out_confs = [b['conf'] for b in boxes]
-        danger_last_result = {'boxes': out_boxes, 'labels': out_labels, 'confs': out_confs}
+        last_version, _, _, rows = danger_board.read()
+        boxes = danger_rows_to_dicts(rows)
         for box in boxes:
             label = box['label']
             conf = box['conf']
@@ -218,14 +379,76 @@ def danger_recognition_process(frame_lock, frame_buffer, frame_dims):
                 if now - last_fire_alarm > 10:  # 10秒防抖
                     log_event('fire_alarm', detail={'confidence': conf})
                     try:
-                        from utils import speaker
-                        speaker.play_wav_file_queued('assets/alarm.wav', volume=volume_value.value)
+                        speaker.play_alarm('assets/alarm.wav', volume=volume_value.value)
                     except Exception as e:
                         print(f"火焰报警音频播放失败: {e}")
                     last_fire_alarm = now
 
+def danger_rows_to_dicts(rows):
+    return [{'bbox': [int(v) for v in r[:4]], 'conf': float(r[4]), 'cls': int(r[5]),
+             'label': DANGER_CLASSES[int(r[5])]} for r in rows]
+
+# ----------------- 音频采集与声音事件进程 -----------------
+def audio_capture_process(audio_bus):
+    """独占麦克风，把每帧音频写入共享音频总线，唤醒词和声音分类不再各自打开设备"""
+    recorder = PvRecorder(device_index=MIC_DEVICE_INDEX, frame_length=MIC_FRAME_LENGTH)
+    audio_frames = metrics.counter('audio_frames_total')
+    print("音频采集进程启动...")
+    try:
+        recorder.start()
+        while True:
+            audio_bus.write(recorder.read())
+            audio_frames.inc()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recorder.stop()
+        recorder.delete()
+
+def sound_event_process(audio_bus):
+    """YAMNet声音分类：增量计算新到达的音频块，去抖后批量记录sound_*事件"""
+    try:
+        backend = create_backend(SOUND_MODEL_PATH, threads=SOUND_THREADS)
+    except Exception as e:
+        print(f"[声音检测] 模型加载失败，声音检测不可用: {e}")
+        return
+    classifier = IncrementalClassifier(backend, audio_bus, max_window=2.0)
+    detector = SoundEventDetector(classifier.class_names, SOUND_RULES, cooldown=SOUND_COOLDOWN)
+    if detector.missing:
+        print(f"[声音检测] 模型中没有这些类别，已忽略: {detector.missing}")
+    sound_cost = metrics.histogram('inference_seconds', model='sound')
+    patches = metrics.counter('sound_patches_total')
+    sound_events = metrics.counter('sound_events_total')
+    print("声音事件进程启动...")
+    enabled = False
+    while True:
+        time.sleep(SOUND_INTERVAL)
+        if not enable_sound_detection.value:
+            enabled = False
+            continue
+        if not enabled:
+            # 刚开启时不分析关闭期间的音频
+            classifier.skip_to_latest()
+            enabled = True
+        try:
+            st = time.perf_counter()
+            n_patches = classifier.update()
+            if n_patches == 0:
+                continue
+            sound_cost.observe(time.perf_counter() - st)
+            patches.inc(n_patches)
+        except Exception as e:
+            print(f"[声音检测] 推理失败: {e}")
+            continue
+        events = detector.update(classifier.new_scores)
+        if events:
+            event_store.log_many(events)
+            sound_events.inc(len(events))
+            for event_type, detail, confidence in events:
+                print(f"[EVENT LOG] {datetime.datetime.now().isoformat()} | {event_type} | detail={detail} | confidence={confidence:.3f}")
+
 # ----------------- 语音指令进程 -----------------
-def voice_command_process():
+def voice_command_process(audio_bus):
     access_key = key.picovoice_access_key
     keywords = ["哨兵"]
     porcupine = pvporcupine.create(
@@ -233,110 +456,67 @@ def voice_command_process():
         keyword_paths=['models/porcupine/哨兵_zh_raspberry-pi_v3_0_0.ppn'],
         model_path='models/porcupine/porcupine_params_zh.pv'
     )
-    recoder = PvRecorder(device_index=11, frame_length=porcupine.frame_length)
+    # 从共享音频总线读取，麦克风由音频采集进程统一打开
+    recoder = audio_bus.reader(porcupine.frame_length)
+    endpointer = Endpointer(sample_rate=porcupine.sample_rate, frame_length=porcupine.frame_length,
+                            end_silence=VAD_END_SILENCE, max_duration=VAD_MAX_DURATION)
+    recognizer = RECOGNIZERS[ASR_BACKEND]()
+    record_cost = metrics.histogram('voice_stage_seconds', stage='record')
+    asr_cost = metrics.histogram('voice_stage_seconds', stage='asr')
+    resolve_cost = metrics.histogram('voice_stage_seconds', stage='resolve')
+    audio_dropped = metrics.counter('audio_dropped_samples_total', reader='voice')
+    reported_dropped = 0
     print("唤醒词检测进程启动... (唤醒词: 哨兵)")
     try:
-        recoder.start()
+        recoder.sync()
         while True:
+            # 处理完一条指令（或中途放弃）后跳过期间积压的音频，恢复实时唤醒词检测
+            if audio_bus.total - recoder.cursor > MIC_SAMPLE_RATE:
+                recoder.sync()
+            if recoder.dropped != reported_dropped:
+                audio_dropped.inc(recoder.dropped - reported_dropped)
+                reported_dropped = recoder.dropped
             keyword_index = porcupine.process(recoder.read())
             if keyword_index >= 0:
                 print(f"[唤醒] 检测到唤醒词: {keywords[keyword_index]}")
                 # 播放“我在”提示音
                 speaker.play_wav_file_queued('assets/iamhere.wav', volume=volume_value.value)
-                # 用PvRecorder录制10秒音频
-                samplerate = 16000
-                frame_length = porcupine.frame_length
-                total_frames = samplerate * 5 // frame_length
-                print("[录音] 开始录音10秒...")
-                audio_frames = []
-                for _ in range(total_frames):
-                    frame = recoder.read()
-                    audio_frames.append(frame)
-                import numpy as np
-                audio_np = np.concatenate(audio_frames).astype('float32') / 32768.0  # PvRecorder输出int16
-                # 保存为wav
-                wav_path = 'voice_cmd.wav'
-                import wave
-                with wave.open(wav_path, 'wb') as wf:
-                    wf.setnchannels(1)
-                    wf.setsampwidth(2)
-                    wf.setframerate(samplerate)
-                    audio_int16 = (audio_np * 32767).astype('int16')
-                    wf.writeframes(audio_int16.tobytes())
-                print(f"[录音] 已保存到 {wav_path}")
+                # 端点检测录音：说完即停，丢弃提示音播放期间录到的回声，音频直接在内存中交给识别
+                print("[录音] 开始录音...")
+                st = time.time()
+                audio = record_utterance(recoder.read, endpointer, skip=speaker.is_playing)
+                record_cost.observe(time.time() - st)
+                if audio is None:
+                    print("[录音] 未检测到说话")
+                    continue
+                print(f"[录音] 录音 {len(audio) / porcupine.sample_rate:.1f}s，耗时 {time.time() - st:.1f}s")
                 # 播放“请稍候”提示音
                 speaker.play_wav_file_queued('assets/please_wait.wav', volume=volume_value.value)
                 # 语音转文字
-                text = baidu.audio2text(wav_path, format='wav', rate=16000)
+                with asr_cost.time():
+                    text = recognizer.recognize(audio, sample_rate=porcupine.sample_rate)
                 if not text:
                     print("[语音识别] 识别失败")
                     continue
                 print(f"[语音识别] 识别结果: {text}")
-                # DeepSeek与命令处理
-                now_str = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                prompt = f"""
-                你是一个智能安防摄像头的语音助手。请根据用户的语音指令，严格返回如下格式的JSON：
-                {{
-                  "cmd_type": 0/1/2, // 0:无效命令 1:控制命令 2:查找命令
-                  "cmd_content": 控制命令内容（0:旋转 1:模式切换 2:控制人脸追踪 3:控制唤醒 4:控制安全检测 5:控制安全声音检测），
-                  "cmd_detail": {{
-                    "rotate": [水平步数, 垂直步数], // 仅旋转命令时填写，根据用户的语气控制步数，两个都控制在[-5,5]区间
-                    "switch": true/false, // 控制开关命令时填写
-                    "mode": 0/1/2/3 // 模式切换命令时填写 0普通 1静音 2哨兵 3隐私
-                  }},
-                  "search_time": ["开始时间", "结束时间"], // 如果是查找命令时填写，格式如"2024-05-01 00:00:00"根据用户命令确定需要的时间
-                  "search_type": 0/1/2, // 0安全声音 1人类活动 2危险物品
-                  "search_extra": [可选附加内容数组]
-                }}
-                注意：
-                - 现在时间是{now_str}
-                - 安全识别类的名字有：fire, gun, knife。
-                - 人类活动类的名字有：scene_enter, scene_leave, person_enter, person_leave。
-                - search_extra如果用户有指定查找内容，请严格填写上述类名。
-                - 只返回JSON，不要有多余解释！！这是关键！！确保回复只有JSON并且格式正确！！
-                - 你需要察觉出用户隐含的含义，进行一定的模糊理解，比如询问可能是查询
-                - 如果无法理解指令，cmd_type设为0。
-                - 控制命令和查找命令的内容必须严格按上述字段填写。
-                - 查找命令必须填写时间范围。
-                """
-                ai_reply = deepseek.chat_with_ai(text, system_prompt=prompt)
-                if not ai_reply:
-                    print("[DeepSeek] 无AI回复")
-                    continue
-                print(f"[DeepSeek] 原始回复: {ai_reply}")
-                try:
-                    cmd = parse_ai_json_reply(ai_reply)
-                except Exception as e:
-                    print(f"[DeepSeek] JSON解析失败: {e}")
+                # 命令解析：本地固定说法 -> 命令缓存 -> DeepSeek
+                with resolve_cost.time():
+                    cmd = resolve_command(text)
+                if cmd is None:
                     continue
                 if cmd.get('cmd_type') == 1:
                     cc = cmd.get('cmd_content')
                     detail = cmd.get('cmd_detail', {})
                     if cc == 0 and 'rotate' in detail:
                         dx, dy = detail['rotate']
-                        global motor1_angle, motor2_angle
-                        # 按步移动，每步MOTOR_STEP，正负方向
+                        # 按步移动，每步MOTOR_STEP，正负方向，到达限位时裁剪
                         steps_x = int(np.clip(dx, -5, 5))
                         steps_y = int(np.clip(dy, -5, 5))
                         moved = False
                         if steps_x != 0:
-                            for _ in range(abs(steps_x)):
-                                if steps_x > 0 and motor1_angle.value < MOTOR1_MAX:
-                                    motor.rotate(motor.motor1, MOTOR_STEP)
-                                    motor1_angle.value += MOTOR_STEP
-                                elif steps_x < 0 and motor1_angle.value > MOTOR1_MIN:
-                                    motor.rotate(motor.motor1, -MOTOR_STEP)
-                                    motor1_angle.value -= MOTOR_STEP
-                                moved = True
+                            moved = motor_ctl.move_by(1, steps_x * MOTOR_STEP) or moved
                         if steps_y != 0:
-                            for _ in range(abs(steps_y)):
-                                if steps_y > 0 and motor2_angle.value < MOTOR2_MAX:
-                                    motor.rotate(motor.motor2, MOTOR_STEP)
-                                    motor2_angle.value += MOTOR_STEP
-                                elif steps_y < 0 and motor2_angle.value > MOTOR2_MIN:
-                                    motor.rotate(motor.motor2, -MOTOR_STEP)
-                                    motor2_angle.value -= MOTOR_STEP
-                                moved = True
+                            moved = motor_ctl.move_by(2, steps_y * MOTOR_STEP) or moved
                         print(f"[控制] 旋转: dx={dx}, dy={dy}")
                         if moved:
                             speaker.play_wav_file_queued('assets/rotated.wav', volume=volume_value.value)
@@ -345,22 +525,24 @@ def voice_command_process():
                         if mode == 0:
                             enable_face_tracking.value = True
                             enable_danger_detection.value = True
+                            enable_sound_detection.value = True
                             speaker.play_wav_file_queued('assets/normal_mode.wav', volume=volume_value.value)
                         elif mode == 1:
                             enable_face_tracking.value = True
                             enable_danger_detection.value = True
+                            enable_sound_detection.value = True
                             speaker.play_wav_file_queued('assets/mute_mode.wav', volume=volume_value.value)
                         elif mode == 2:
                             enable_face_tracking.value = True
                             enable_danger_detection.value = True
+                            enable_sound_detection.value = True
                             speaker.play_wav_file_queued('assets/sentry_mode.wav', volume=volume_value.value)
                         elif mode == 3:
-                            motor.rotate(motor.motor1, 175 - motor1_angle.value)
-                            motor1_angle.value = 175
-                            motor.rotate(motor.motor2, -65 - motor2_angle.value)
-                            motor2_angle.value = -65
+                            motor_ctl.move_to(1, 175)
+                            motor_ctl.move_to(2, -65)
                             enable_face_tracking.value = False
                             enable_danger_detection.value = False
+                            enable_sound_detection.value = False
                             speaker.play_wav_file_queued('assets/privacy_mode.wav', volume=volume_value.value)
                         print(f"[控制] 模式切换: {mode}")
                     elif cc == 2 and 'switch' in detail:
@@ -390,70 +572,102 @@ def voice_command_process():
                             speaker.play_wav_file_queued('assets/danger_detection.wav', volume=volume_value.value)
                             speaker.play_wav_file_queued('assets/off.wav', volume=volume_value.value)
                         print(f"[控制] 安全检测开关: {detail['switch']}")
+                    elif cc == 5 and 'switch' in detail:
+                        enable_sound_detection.value = bool(detail['switch'])
+                        speaker.play_wav_file_queued('assets/on.wav' if detail['switch'] else 'assets/off.wav',
+                                                     volume=volume_value.value)
+                        print(f"[控制] 安全声音检测开关: {detail['switch']}")
                 elif cmd.get('cmd_type') == 2:
                     st, et = cmd.get('search_time', [None, None])
                     s_type = cmd.get('search_type')
                     s_extra = cmd.get('search_extra', [])
-                    q = "SELECT timestamp, event_type, detail, confidence FROM event_log WHERE timestamp BETWEEN ? AND ?"
-                    params = [st, et]
-                    if s_type == 0:
-                        q += " AND event_type LIKE '%sound%'"
-                    elif s_type == 1:
-                        q += " AND event_type LIKE '%scene%'"
-                    elif s_type == 2:
-                        q += " AND event_type LIKE '%danger%'"
-                    conn = sqlite3.connect(DB_PATH)
-                    c = conn.cursor()
-                    c.execute(q, params)
-                    rows = c.fetchall()
-                    conn.close()
-                    # 严格按时间戳筛选
                     try:
-                        def parse_iso(ts):
-                            try:
-                                return datetime.datetime.strptime(ts, '%Y-%m-%dT%H:%M:%S.%f')
-                            except Exception:
-                                return datetime.datetime.strptime(ts, '%Y-%m-%dT%H:%M:%S')
-                        st_dt = parse_iso(st)
-                        et_dt = parse_iso(et)
-                        filtered_rows = []
-                        for row in rows:
-                            ts = row[0]
-                            try:
-                                ts_dt = parse_iso(ts)
-                                if st_dt <= ts_dt <= et_dt:
-                                    filtered_rows.append(row)
-                            except Exception:
-                                continue
-                        rows = filtered_rows
-                    except Exception as e:
-                        print(f"[时间筛选异常] {e}")
-                    if s_extra:
-                        filtered = []
-                        for row in rows:
-                            if any(x in row[2] for x in s_extra):
-                                filtered.append(row)
-                        rows = filtered
+                        st_ts = datetime.datetime.fromisoformat(st).timestamp()
+                        et_ts = datetime.datetime.fromisoformat(et).timestamp()
+                    except (TypeError, ValueError) as e:
+                        print(f"[时间解析异常] {e}")
+                        st_ts, et_ts = 0, time.time()
+                    # 时间范围、类别与附加内容筛选全部在SQL中完成
+                    rows = event_store.query(
+                        st_ts, et_ts,
+                        event_types=SEARCH_HUMAN_TYPES if s_type == 1 else SEARCH_DANGER_TYPES if s_type == 2 else None,
+                        type_prefix=SEARCH_SOUND_PREFIX if s_type == 0 else None,
+                        detail_keywords=s_extra or None
+                    )
                     data_str = '\n'.join([str(r) for r in rows])
                     explain_prompt = (f"你是安防专家，请用最简短的话总结分析如下事件数据，如果有必要可以建议用户重点关注哪些时间段录像以确保安全：\n{data_str}"
                                       f"\n全部信息已经完全插入上文，如果没有信息表示没有任何安全事件。")
                     # 只要求返回自然语言分析，不要JSON
                     explain = deepseek.chat_with_ai(explain_prompt, system_prompt="你是安防专家，请用简洁自然语言总结分析，只要自然语言！")
                     print(f"[查找分析] {explain}")
-                    # TTS转语音并播放
-                    tts_wav = 'explain_reply.wav'
-                    if baidu.text2audio(explain, output_file=tts_wav):
-                        try:
-                            speaker.play_wav_file_queued(tts_wav, volume=volume_value.value)
-                        except Exception as e:
-                            print(f"[TTS播放失败] {e}")
+                    # TTS转语音，直接在内存中播放
+                    tts_data = baidu.synthesize(explain) if explain else None
+                    if tts_data:
+                        speaker.play_wav_bytes_queued(tts_data, volume=volume_value.value)
                 else:
                     print("[AI] 无效命令，忽略。")
                     speaker.play_wav_file_queued('assets/noidea.wav', volume=volume_value.value)
-                recoder.start()  # 录音和处理完毕后恢复唤醒词检测
     except KeyboardInterrupt:
-        recoder.stop()
-        recoder.delete()
+        porcupine.delete()
+
+# ----------------- 工具函数：语音命令解析 -----------------
+def resolve_command(text):
+    """
+    把识别文本解析为命令字典：常见说法由本地匹配直接得到，解析过的控制命令走缓存，
+    其余才请求DeepSeek
+    :return: 命令字典，失败返回None
+    """
+    cmd = intent_matcher.match(text)
+    if cmd is not None:
+        print(f"[命令] 本地匹配: {cmd}")
+        metrics.counter('voice_commands_total', source='local').inc()
+        return cmd
+    cmd = command_cache.get(text)
+    if cmd is not None:
+        print(f"[命令] 命中缓存: {cmd}")
+        metrics.counter('voice_commands_total', source='cache').inc()
+        return cmd
+    now_str = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    prompt = f"""
+    你是一个智能安防摄像头的语音助手。请根据用户的语音指令，严格返回如下格式的JSON：
+    {{
+      "cmd_type": 0/1/2, // 0:无效命令 1:控制命令 2:查找命令
+      "cmd_content": 控制命令内容（0:旋转 1:模式切换 2:控制人脸追踪 3:控制唤醒 4:控制安全检测 5:控制安全声音检测），
+      "cmd_detail": {{
+        "rotate": [水平步数, 垂直步数], // 仅旋转命令时填写，根据用户的语气控制步数，两个都控制在[-5,5]区间
+        "switch": true/false, // 控制开关命令时填写
+        "mode": 0/1/2/3 // 模式切换命令时填写 0普通 1静音 2哨兵 3隐私
+      }},
+      "search_time": ["开始时间", "结束时间"], // 如果是查找命令时填写，格式如"2024-05-01 00:00:00"根据用户命令确定需要的时间
+      "search_type": 0/1/2, // 0安全声音 1人类活动 2危险物品
+      "search_extra": [可选附加内容数组]
+    }}
+    注意：
+    - 现在时间是{now_str}
+    - 安全识别类的名字有：fire, gun, knife。
+    - 人类活动类的名字有：scene_enter, scene_leave, person_enter, person_leave。
+    - search_extra如果用户有指定查找内容，请严格填写上述类名。
+    - 只返回JSON，不要有多余解释！！这是关键！！确保回复只有JSON并且格式正确！！
+    - 你需要察觉出用户隐含的含义，进行一定的模糊理解，比如询问可能是查询
+    - 如果无法理解指令，cmd_type设为0。
+    - 控制命令和查找命令的内容必须严格按上述字段填写。
+    - 查找命令必须填写时间范围。
+    """
+    ai_reply = deepseek.chat_with_ai(text, system_prompt=prompt)
+    if not ai_reply:
+        print("[DeepSeek] 无AI回复")
+        metrics.counter('voice_commands_total', source='failed').inc()
+        return None
+    print(f"[DeepSeek] 原始回复: {ai_reply}")
+    try:
+        cmd = parse_ai_json_reply(ai_reply)
+    except Exception as e:
+        print(f"[DeepSeek] JSON解析失败: {e}")
+        metrics.counter('voice_commands_total', source='failed').inc()
+        return None
+    command_cache.put(text, cmd)
+    metrics.counter('voice_commands_total', source='deepseek').inc()
+    return cmd
 
 # ----------------- 工具函数：解析AI JSON回复 -----------------
 def parse_ai_json_reply(ai_reply):
@@ -512,6 +726,9 @@ HTML_TEMPLATE = '''
         .left-panel, .right-panel {
             height: 100%;
         }
+        .right-panel {
+            overflow-y: auto;
+        }
         .main-content {
             height: 100%;
             display: flex;
@@ -656,6 +873,23 @@ HTML_TEMPLATE = '''
             font-weight: bold;
             color: #2196F3;
         }
+
+        .perf-table {
+            width: 100%;
+            font-size: 13px;
+            border-collapse: collapse;
+        }
+
+        .perf-table td {
+            padding: 2px 4px;
+            color: #555;
+        }
+
+        .perf-table td.num {
+            text-align: right;
+            font-weight: bold;
+            color: #2196F3;
+        }
     </style>
     <script>
         function updateStatus() {
@@ -674,6 +908,7 @@ HTML_TEMPLATE = '''
                     document.getElementById('volume_slider').value = Math.round(data.volume * 100);
                     document.getElementById('volume_value').innerText = Math.round(data.volume * 100);
                     document.getElementById('danger_detection').checked = data.danger_detection;
+                    document.getElementById('sound_detection').checked = data.sound_detection;
                     // 更新按钮状态
                     document.getElementById('m1_left').disabled = (data.motor1 <= -175);
                     document.getElementById('m1_right').disabled = (data.motor1 >= 175);
@@ -840,6 +1075,37 @@ HTML_TEMPLATE = '''
                 });
         }
 
+        function fmt(v, unit) {
+            return (v === null || v === undefined) ? '--' : v + unit;
+        }
+
+        function updatePerf() {
+            fetch('/perf')
+                .then(r => r.json())
+                .then(data => {
+                    const m = data.metrics;
+                    const rows = [
+                        ['采集帧率', fmt(m['camera_frames_total'], ' fps')],
+                        ['每帧处理', fmt(m['camera_frame_seconds'].mean_ms, ' ms')],
+                        ['推流编码', fmt(m['stream_encode_seconds'].mean_ms, ' ms') + ' / ' + fmt(m['stream_encode_seconds'].rate, ' fps')]
+                    ];
+                    [['face', '人脸推理'], ['danger', '危险物推理'], ['sound', '声音推理']].forEach(([model, label]) => {
+                        const h = m['inference_seconds{model="' + model + '"}'];
+                        rows.push([label, fmt(h.mean_ms, ' ms') + ' (p95 ' + fmt(h.p95_ms, ')') + ' ' + fmt(h.rate, '/s')]);
+                    });
+                    Object.entries(data.frame_readers).forEach(([name, r]) => {
+                        rows.push(['丢帧 ' + name, r.dropped + ' / ' + r.received]);
+                    });
+                    rows.push(['丢弃事件', data.events_dropped]);
+                    rows.push(['提示音首样本', fmt(m['speaker_first_sample_seconds'].mean_ms, ' ms')]);
+                    Object.entries(data.processes).forEach(([name, p]) => {
+                        rows.push(['进程 ' + name, fmt(p.cpu, '%') + ' ' + p.rss_mb + ' MB']);
+                    });
+                    document.getElementById('perf_table').innerHTML = rows.map(
+                        ([k, v]) => '<tr><td>' + k + '</td><td class="num">' + v + '</td></tr>').join('');
+                });
+        }
+
         function toggleControl(type) {
             fetch('/toggle_control', {
                 method: 'POST',
@@ -874,6 +1140,7 @@ HTML_TEMPLATE = '''
             setInterval(updateStatus, 500);
             setInterval(updateFaceOverlay, 500);
             setInterval(updateDangerOverlay, 500);
+            setInterval(updatePerf, 2000);
             // 监听窗口大小变化，重新绘制人脸框
             window.addEventListener('resize', function() {
                 if (document.getElementById('face_overlay').checked) {
@@ -919,6 +1186,13 @@ HTML_TEMPLATE = '''
                         <span class="slider"></span>
                     </label>
                 </div>
+                <div class="switch-container">
+                    <span class="switch-label">声音检测</span>
+                    <label class="switch">
+                        <input type="checkbox" id="sound_detection" onchange="toggleControl('sound_detection')">
+                        <span class="slider"></span>
+                    </label>
+                </div>
             </div>
             <div class="control-group">
                 <h3>音量调节</h3>
@@ -986,24 +1260,25 @@ HTML_TEMPLATE = '''
                     <span class="status-value" id="danger_count">0</span>
                 </div>
             </div>
+            <div class="status-bar">
+                <h3>性能</h3>
+                <table class="perf-table" id="perf_table"></table>
+            </div>
         </div>
     </div>
 </body>
 </html>
 '''
 
+# 所有推流客户端共用一个编码线程，每帧只编码一次
+stream_encoder = StreamEncoder(frame_ring.reader('stream'), encode_hist=metrics.histogram('stream_encode_seconds'))
+# 性能面板的区间统计，只在Web进程中使用
+perf_window = PerfWindow(metrics)
+
 def gen_video_stream():
-    while True:
-        time.sleep(1/30)
-        with frame_lock:
-            if frame_dims[0] == 0:
-                continue
-            frame_buffer_np = np.frombuffer(frame_buffer, dtype=np.uint8).reshape(frame_dims[:])
-            frame = frame_buffer_np.copy()
-        frame = cv2.flip(frame, 1)
-        # 只推送原始图像，不再绘制人脸框
-        _, jpeg = cv2.imencode('.jpg', frame)
-        yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg.tobytes() + b'\r\n')
+    # 只推送原始图像，不再绘制人脸框
+    for jpeg in stream_encoder.subscribe():
+        yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
 
 @app.route('/')
 def index():
@@ -1034,11 +1309,16 @@ def status():
         'direction': direction,
         'motor1': motor1_angle.value,
         'motor2': motor2_angle.value,
+        'motor_moving': motor_ctl.moving(),
         'face_detection': enable_face_detection.value,
         'face_tracking': enable_face_tracking.value,
         'face_overlay': enable_face_overlay.value,
         'volume': volume_value.value,
-        'danger_detection': enable_danger_detection.value
+        'danger_detection': enable_danger_detection.value,
+        'sound_detection': enable_sound_detection.value,
+        'frame_readers': frame_ring.reader_stats(),
+        'motion': motion_gate_status(),
+        'stream': stream_encoder.stats()
     })
 
 @app.route('/toggle_control', methods=['POST'])
@@ -1053,6 +1333,8 @@ def toggle_control():
         enable_face_overlay.value = not enable_face_overlay.value
     elif control_type == 'danger_detection':
         enable_danger_detection.value = not enable_danger_detection.value
+    elif control_type == 'sound_detection':
+        enable_sound_detection.value = not enable_sound_detection.value
     return jsonify({'success': True})
 
 @app.route('/move', methods=['POST'])
@@ -1060,21 +1342,13 @@ def move():
     data = request.get_json()
     motor_id = data.get('motor')
     direction = data.get('direction')
-    last_motor_activity.value = time.time()
-    if motor_sleep_status.value:
-        motor_sleep_status.value = False
+    # 只投递目标角度，不在请求线程中等待电机转动
     if motor_id == 1:
-        new_angle = motor1_angle.value + direction * MOTOR_STEP
-        if MOTOR1_MIN <= new_angle <= MOTOR1_MAX:
-            motor.rotate(motor.motor1, direction * MOTOR_STEP)
-            motor1_angle.value = new_angle
+        if motor_ctl.move_by(1, direction * MOTOR_STEP):
             return jsonify({'success': True})
         return jsonify({'success': False, 'error': '电机一已达极限'})
     elif motor_id == 2:
-        new_angle = motor2_angle.value + direction * MOTOR_STEP
-        if MOTOR2_MIN <= new_angle <= MOTOR2_MAX:
-            motor.rotate(motor.motor2, direction * MOTOR_STEP)
-            motor2_angle.value = new_angle
+        if motor_ctl.move_by(2, direction * MOTOR_STEP):
             return jsonify({'success': True})
         return jsonify({'success': False, 'error': '电机二已达极限'})
     return jsonify({'success': False, 'error': '参数错误'})
@@ -1087,92 +1361,121 @@ def set_volume():
     volume_value.value = v
     return jsonify({'success': True, 'volume': v})
 
-# 新增：人脸检测结果API
+# 新增：人脸检测结果API（直接返回推理服务缓存的最新结果，不在请求中推理）
 @app.route('/face_boxes')
 def face_boxes():
-    global face_detector
     try:
-        with frame_lock:
-            if frame_dims[0] == 0:
-                return jsonify({'boxes': [], 'types': []})
-            frame_buffer_np = np.frombuffer(frame_buffer, dtype=np.uint8).reshape(frame_dims[:])
-            frame = frame_buffer_np.copy()
-        
-        frame = cv2.flip(frame, 1)
-        
         if not (enable_face_detection.value or enable_face_tracking.value):
             return jsonify({'boxes': [], 'types': []})
+        _, _, _, rows = face_board.read()
         
-        # 延迟初始化人脸检测器
-        if face_detector is None:
-            face_detector = FaceDetectRec()
-        
-        predictions = face_detector.inference(frame)
-        bboxes = predictions[0] if predictions and predictions[0] is not None else []
-        
-        # boxes: [ [x1, y1, x2, y2], ... ]
+        # boxes: [ [x1, y1, x2, y2], ... ]，ids: 对应的跟踪ID
         boxes = []
-        for b in bboxes:
-            try:
-                x1, y1, x2, y2 = int(b[0]), int(b[1]), int(b[2]), int(b[3])
-                # 确保坐标在有效范围内
-                if 0 <= x1 < x2 <= CAM_WIDTH and 0 <= y1 < y2 <= CAM_HEIGHT:
-                    boxes.append([x1, y1, x2, y2])
-            except (ValueError, IndexError) as e:
-                print(f"Invalid bbox format: {b}, error: {e}")
-                continue
+        ids = []
+        for b in rows:
+            # 跟踪预测的框可能略超出画面，裁剪到有效范围内
+            x1, x2 = int(np.clip(b[0], 0, CAM_WIDTH)), int(np.clip(b[2], 0, CAM_WIDTH))
+            y1, y2 = int(np.clip(b[1], 0, CAM_HEIGHT)), int(np.clip(b[3], 0, CAM_HEIGHT))
+            if x1 < x2 and y1 < y2:
+                boxes.append([x1, y1, x2, y2])
+                ids.append(int(b[4]))
         
         # types: 目前全部为"face"，如有多类型可扩展
         types = ["face"] * len(boxes)
         
-        return jsonify({'boxes': boxes, 'types': types})
+        return jsonify({'boxes': boxes, 'types': types, 'ids': ids})
     except Exception as e:
         print(f"Error in face_boxes API: {e}")
         return jsonify({'boxes': [], 'types': [], 'error': str(e)})
 
-# 新增：危险物检测结果API
+def render_runtime_metrics():
+    """Web进程在抓取时直接读取的指标：帧读者、推流、事件队列与各进程资源占用"""
+    readers = frame_ring.reader_stats()
+    procs = process_stats(worker_pids)
+    stream = stream_encoder.stats()
+    return ''.join([
+        format_samples('ihss_frame_reader_received_total', 'counter', '帧读者收到的帧数',
+                       [({'reader': r}, v['received']) for r, v in readers.items()]),
+        format_samples('ihss_frame_reader_dropped_total', 'counter', '帧读者跟不上而跳过的帧数',
+                       [({'reader': r}, v['dropped']) for r, v in readers.items()]),
+        format_samples('ihss_stream_clients', 'gauge', '推流客户端数', [({}, stream['clients'])]),
+        format_samples('ihss_stream_quality', 'gauge', '推流JPEG质量', [({}, stream['quality'])]),
+        format_samples('ihss_events_dropped_total', 'counter', '事件队列已满而丢弃的事件数',
+                       [({}, event_store.dropped.value)]),
+        format_samples('ihss_events_queue_depth', 'gauge', '等待写入数据库的事件批次数',
+                       [({}, event_store.queue.qsize())]),
+        format_samples('ihss_process_cpu_seconds_total', 'counter', '进程累计CPU时间',
+                       [({'process': n}, cpu) for n, (cpu, _) in procs.items()]),
+        format_samples('ihss_process_resident_memory_bytes', 'gauge', '进程常驻内存',
+                       [({'process': n}, rss) for n, (_, rss) in procs.items()]),
+    ])
+
+# Prometheus抓取接口
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render() + render_runtime_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+# 网页性能面板：上次请求以来的速率、耗时与各进程CPU/内存
+@app.route('/perf')
+def perf():
+    data = perf_window.update(worker_pids)
+    return jsonify({
+        **data,
+        'frame_readers': frame_ring.reader_stats(),
+        'events_dropped': event_store.dropped.value,
+        'stream': stream_encoder.stats()
+    })
+
+# 新增：危险物检测结果API（返回推理服务缓存的最新结果）
 @app.route('/danger_boxes')
 def danger_boxes():
-    global danger_detector
-    global danger_last_result
     try:
-        with frame_lock:
-            if frame_dims[0] == 0:
-                return jsonify(danger_last_result)
-            frame_buffer_np = np.frombuffer(frame_buffer, dtype=np.uint8).reshape(frame_dims[:])
-            frame = frame_buffer_np.copy()
-        frame = cv2.flip(frame, 1)
         if not enable_danger_detection.value:
-            return jsonify(danger_last_result)
-        if danger_detector is None:
-            danger_detector = DangerDetectRec()
-        # 这里不做实时检测，直接返回缓存结果
-        return jsonify(danger_last_result)
+            return jsonify({'boxes': [], 'labels': [], 'confs': []})
+        boxes = danger_rows_to_dicts(danger_board.read()[3])
+        return jsonify({
+            'boxes': [b['bbox'] for b in boxes],
+            'labels': [b['label'] for b in boxes],
+            'confs': [b['conf'] for b in boxes]
+        })
     except Exception as e:
         print(f"Error in danger_boxes API: {e}")
         return jsonify({'boxes': [], 'labels': [], 'confs': [], 'error': str(e)})
 
 if __name__ == '__main__':
-    # 预初始化人脸检测器
-    print("正在初始化人脸检测模型...")
-    face_detector = FaceDetectRec()
-    print("人脸检测模型初始化完成")
-    print("正在初始化危险物检测模型...")
-    danger_detector = DangerDetectRec()
-    print("危险物检测模型初始化完成")
-    
-    p_camera = Process(target=camera_process, args=(frame_lock, frame_buffer, frame_dims))
-    p_recognition = Process(target=recognition_process, args=(frame_lock, frame_buffer, frame_dims, shared_direction))
-    p_danger = Process(target=danger_recognition_process, args=(frame_lock, frame_buffer, frame_dims))
-    p_voice = Process(target=voice_command_process)
+    p_camera = Process(target=camera_process, args=(frame_ring,))
+    p_inference = Process(target=inference_process, args=(frame_ring, face_board, danger_board))
+    p_recognition = Process(target=recognition_process, args=(face_board, shared_direction))
+    p_danger = Process(target=danger_recognition_process, args=(danger_board,))
+    p_audio = Process(target=audio_capture_process, args=(audio_bus,))
+    p_sound = Process(target=sound_event_process, args=(audio_bus,))
+    p_voice = Process(target=voice_command_process, args=(audio_bus,))
+    p_events = Process(target=event_store.run_writer)
+    p_motor = Process(target=motor_ctl.run)
+    p_speaker = Process(target=audio_player.run)
     p_camera.daemon = True
+    p_inference.daemon = True
     p_recognition.daemon = True
     p_danger.daemon = True
+    p_audio.daemon = True
+    p_sound.daemon = True
     p_voice.daemon = True
+    p_events.daemon = True
+    p_motor.daemon = True
+    p_speaker.daemon = True
+    p_events.start()
+    p_motor.start()
+    p_speaker.start()
     p_camera.start()
+    p_inference.start()
     p_recognition.start()
     p_danger.start()
+    p_audio.start()
+    p_sound.start()
     p_voice.start()
+    worker_pids.update(camera=p_camera.pid, inference=p_inference.pid, recognition=p_recognition.pid,
+                       danger=p_danger.pid, audio=p_audio.pid, sound=p_sound.pid, voice=p_voice.pid,
+                       events=p_events.pid, motor=p_motor.pid, speaker=p_speaker.pid)
     print("Web服务已启动，请访问 http://<设备IP>:8081")
     try:
         app.run(host='0.0.0.0', port=8081, debug=False)
@@ -1180,11 +1483,28 @@ if __name__ == '__main__':
         print("\n正在关闭所有进程...")
     finally:
         p_camera.terminate()
+        p_inference.terminate()
         p_recognition.terminate()
         p_danger.terminate()
         p_voice.terminate()
+        p_sound.terminate()
+        p_audio.terminate()
         p_camera.join()
+        p_inference.join()
         p_recognition.join()
         p_danger.join()
         p_voice.join()
+        p_sound.join()
+        p_audio.join()
+        # 写入进程提交完剩余事件后退出
+        event_store.stop()
+        p_events.join(timeout=5)
+        # 驱动进程收到停止命令后线圈断电退出
+        motor_ctl.stop()
+        p_motor.join(timeout=5)
+        audio_player.stop()
+        p_speaker.join(timeout=5)
+        for shm in (frame_ring, face_board, danger_board, audio_bus, metrics):
+            shm.close()
+            shm.unlink()
         print("所有进程已关闭。")
@@ -0,0 +1,80 @@
+"""
+云端接口客户端基准与自检：在本地模拟服务器上对比裸requests.post与连接池客户端的延迟和新建连接数，
+验证503重试、令牌缓存与失效刷新，并统计本地意图匹配+命令缓存省掉的大模型调用
+在项目根目录运行：python -m tools.bench_api [--requests 200]
+"""
+import time
+import random
+import argparse
+import requests
+import numpy as np
+from utils.http_client import HttpClient
+from utils.baidu import BaiduVoice
+from utils.deepseek import DeepseekChat
+from components.intent import LocalIntentMatcher, CommandCache
+from tools.mock_api_server import start_server, baidu_urls, deepseek_url
+
+PHRASES = ['打开人脸追踪', '关闭人脸追踪', '哨兵，向左转一点', '往右转', '切换到哨兵模式', '隐私模式',
+           '关闭安全检测', '开启安全检测', '把摄像头稍微往左边挪挪', '看看门口那边', '查一下昨天有没有人来']
+
+
+def bench_requests(state, url, n, post):
+    state.connections.clear()
+    times = []
+    for _ in range(n):
+        st = time.perf_counter()
+        post(url, json={'messages': [{'role': 'user', 'content': 'hi'}]}, timeout=5).json()
+        times.append((time.perf_counter() - st) * 1000)
+    return np.median(times), np.percentile(times, 95), len(state.connections)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200, help='延迟测试的请求数')
+    args = parser.parse_args()
+
+    server, state, base_url = start_server()
+    url = deepseek_url(base_url)
+    client = HttpClient(backoff=0.05)
+
+    print("== 连接复用 ==")
+    for name, post in (('requests.post', requests.post), ('HttpClient', client.post)):
+        median, p95, conns = bench_requests(state, url, args.requests, post)
+        print(f"{name:<14} 中位 {median:6.2f}ms  P95 {p95:6.2f}ms  新建连接 {conns}")
+
+    print("== 重试 ==")
+    state.fail_next = 2
+    st = time.perf_counter()
+    response = client.post(url, json={})
+    print(f"注入2次503后状态码 {response.status_code}，耗时 {(time.perf_counter() - st) * 1000:.0f}ms")
+
+    print("== 令牌缓存 ==")
+    baidu = BaiduVoice(client=client, base_urls=baidu_urls(base_url))
+    before = state.counts.get('/oauth/2.0/token', 0)
+    for _ in range(5):
+        baidu.recognize(b'\x00\x00' * 1600)
+    print(f"5次识别获取令牌 {state.counts.get('/oauth/2.0/token', 0) - before} 次")
+    state.revoke_tokens()
+    text = baidu.recognize(b'\x00\x00' * 1600)
+    audio = baidu.synthesize('测试')
+    print(f"令牌被吊销后自动刷新：识别结果 {text!r}，合成 {len(audio or b'')} 字节，"
+          f"累计获取令牌 {state.counts.get('/oauth/2.0/token', 0) - before} 次")
+
+    print("== 命令解析 ==")
+    chat = DeepseekChat(client=client, url=url)
+    matcher, cache = LocalIntentMatcher(), CommandCache()
+    rng = random.Random(0)
+    utterances = [rng.choice(PHRASES) for _ in range(200)]
+    local = llm = 0
+    st = time.perf_counter()
+    for text in utterances:
+        if matcher.match(text) is not None:
+            local += 1
+        elif cache.get(text) is None:
+            llm += 1
+            chat.chat(text)
+            # 模拟服务器总是返回控制命令，查找类说法在真实环境中不会进入缓存
+            cache.put(text, {'cmd_type': 1} if '查' not in text else {'cmd_type': 2})
+    print(f"{len(utterances)} 条指令：本地匹配 {local}，缓存命中 {cache.hits}，请求大模型 {llm}"
+          f"（原实现 {len(utterances)} 次），耗时 {(time.perf_counter() - st) * 1000:.0f}ms")
+    server.shutdown()
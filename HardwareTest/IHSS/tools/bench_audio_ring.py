@@ -0,0 +1,92 @@
+"""
+YAMNet音频通路基准：对比原流程（每0.5秒一帧librosa.resample + deque.extend，每2秒np.array(list(deque))取5秒）
+与环形缓冲区流程（每个回调块流式多相重采样写入float32环形缓冲区，取窗口为零拷贝视图）的Python开销，
+并检查流式重采样的精度与分块无关
+在项目根目录运行：python -m tools.bench_audio_ring [--seconds 20 --blocksize 2048]
+"""
+import time
+import argparse
+from collections import deque
+import numpy as np
+import librosa
+from components.audio_ring import AudioRing, PolyphaseResampler
+
+CAPTURE_SR = 44100
+SAMPLE_RATE = 16000
+WINDOW = 5.0            # 每次检测取的音频时长（秒）
+DETECTION_INTERVAL = 2.0
+
+
+def capture(seconds, seed=0):
+    """模拟44.1kHz麦克风输入：1kHz正弦 + 底噪"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * CAPTURE_SR)) / CAPTURE_SR
+    return (0.3 * np.sin(2 * np.pi * 1000 * t) + rng.normal(0, 0.01, len(t))).astype(np.float32)
+
+
+def legacy(audio):
+    """原流程，返回 (采集耗时, 取窗口耗时, 检测次数)"""
+    buffer = deque(maxlen=SAMPLE_RATE * 10)
+    frame = int(0.5 * CAPTURE_SR)
+    t_capture = t_window = 0.0
+    detections = 0
+    librosa.resample(audio[:frame], orig_sr=CAPTURE_SR, target_sr=SAMPLE_RATE)  # 预热，排除首次调用的初始化
+    for i in range(0, len(audio) - frame + 1, frame):
+        st = time.perf_counter()
+        buffer.extend(librosa.resample(audio[i:i + frame], orig_sr=CAPTURE_SR, target_sr=SAMPLE_RATE))
+        t_capture += time.perf_counter() - st
+        if (i // frame + 1) % int(DETECTION_INTERVAL / 0.5) == 0 and len(buffer) >= WINDOW * SAMPLE_RATE:
+            st = time.perf_counter()
+            window = np.array(list(buffer)[-int(WINDOW * SAMPLE_RATE):]).astype(np.float32)
+            t_window += time.perf_counter() - st
+            detections += 1
+    return t_capture, t_window, detections
+
+
+def ring_path(audio, blocksize):
+    """环形缓冲区流程，返回 (采集耗时, 取窗口耗时, 检测次数, 写入样本数)"""
+    ring = AudioRing(SAMPLE_RATE * 10, SAMPLE_RATE)
+    resampler = PolyphaseResampler(CAPTURE_SR, SAMPLE_RATE)
+    per_detection = int(DETECTION_INTERVAL * CAPTURE_SR)
+    t_capture = t_window = 0.0
+    detections = 0
+    for i in range(0, len(audio), blocksize):
+        st = time.perf_counter()
+        ring.write(resampler.process(audio[i:i + blocksize]))
+        t_capture += time.perf_counter() - st
+        if (i + blocksize) // per_detection > i // per_detection:
+            st = time.perf_counter()
+            _, window = ring.latest(int(WINDOW * SAMPLE_RATE))
+            t_window += time.perf_counter() - st
+            if window is not None:
+                detections += 1
+    return t_capture, t_window, detections, ring.total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=20, help='模拟采集的音频时长')
+    parser.add_argument('--blocksize', type=int, default=2048, help='输入流回调块大小（44.1kHz采样点）')
+    args = parser.parse_args()
+    audio = capture(args.seconds)
+
+    cap, win, n = legacy(audio)
+    print(f"原流程     采集+重采样 {cap * 1000 / args.seconds:6.2f}ms/秒音频  "
+          f"取窗口 {win * 1000 / max(n, 1):6.2f}ms/次  检测 {n} 次")
+    cap, win, n, total = ring_path(audio, args.blocksize)
+    print(f"环形缓冲区 采集+重采样 {cap * 1000 / args.seconds:6.2f}ms/秒音频  "
+          f"取窗口 {win * 1000 / max(n, 1):6.4f}ms/次  检测 {n} 次")
+    print(f"写入 {total} 个16kHz样本，期望 {len(audio) * SAMPLE_RATE // CAPTURE_SR}（滤波器时延内的差异属正常）")
+
+    # 精度：整段一次处理与按不同块大小处理的结果一致，且与解析正弦只差固定群时延
+    resampler = PolyphaseResampler(CAPTURE_SR, SAMPLE_RATE)
+    tone = np.sin(2 * np.pi * 1000 * np.arange(CAPTURE_SR * 2) / CAPTURE_SR).astype(np.float32)
+    whole = resampler.process(tone)
+    for blocksize in (1, 441, args.blocksize):
+        resampler.reset()
+        chunked = np.concatenate([resampler.process(tone[i:i + blocksize]) for i in range(0, len(tone), blocksize)])
+        print(f"块大小 {blocksize:5d} 与整段处理最大差异 {np.abs(chunked - whole).max():.2e}")
+    delay = (resampler.poly.size - 1) / 2 / resampler.down
+    n = np.arange(len(whole))
+    reference = np.sin(2 * np.pi * 1000 * (n - delay) / SAMPLE_RATE)
+    print(f"与1kHz解析正弦最大误差 {np.abs(whole - reference)[200:-200].max():.2e}（群时延 {delay:.2f} 样本）")
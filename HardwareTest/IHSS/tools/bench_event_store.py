@@ -0,0 +1,104 @@
+"""
+事件存储基准：逐条连接提交（原log_event） vs EventStore批量提交的写入速率，以及大表上的查询延迟
+在项目根目录运行：python -m tools.bench_event_store [--rows 10000000]
+"""
+import os
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import threading
+import numpy as np
+from components.event_store import EventStore, INSERT_SQL
+
+EVENT_TYPES = ['scene_enter', 'scene_leave', 'person_enter', 'person_leave', 'dangerous_object',
+               'fire_alarm', 'sound_alarm', 'sound_glass', 'sound_scream', 'sound_dog']
+DAY = 24 * 3600
+
+
+def bench_legacy_insert(db_path, n):
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE IF NOT EXISTS event_log (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                 'timestamp TEXT NOT NULL, event_type TEXT NOT NULL, detail TEXT, confidence REAL)')
+    conn.commit()
+    conn.close()
+    st = time.perf_counter()
+    for i in range(n):
+        conn = sqlite3.connect(db_path)
+        conn.execute('INSERT INTO event_log (timestamp, event_type, detail, confidence) VALUES (?, ?, ?, ?)',
+                     (time.strftime('%Y-%m-%dT%H:%M:%S'), 'dangerous_object', '{"label": "fire"}', 0.9))
+        conn.commit()
+        conn.close()
+    return n / (time.perf_counter() - st)
+
+
+def bench_store_insert(store, n):
+    writer = threading.Thread(target=store.run_writer, daemon=True)
+    writer.start()
+    st = time.perf_counter()
+    for i in range(n):
+        while not store.log('dangerous_object', {'label': 'fire'}, 0.9):
+            time.sleep(0.001)
+    store.stop()
+    writer.join()
+    return n / (time.perf_counter() - st)
+
+
+def populate(db_path, rows, now, chunk=200000):
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    rng = random.Random(0)
+    start = now - 30 * DAY
+    done = 0
+    while done < rows:
+        n = min(chunk, rows - done)
+        # 时间戳按顺序递增，模拟真实写入
+        batch = [(start + (done + i) * 30 * DAY / rows, rng.choice(EVENT_TYPES),
+                  '{"label": "%s"}' % rng.choice(['fire', 'gun', 'knife']), rng.random())
+                 for i in range(n)]
+        with conn:
+            conn.executemany(INSERT_SQL, batch)
+        done += n
+        print(f"\r写入 {done}/{rows}", end='', flush=True)
+    print()
+    conn.close()
+
+
+def bench_queries(store, now, repeat=20):
+    cases = {
+        '最近1小时/人类活动': dict(start_ts=now - 3600, end_ts=now,
+                            event_types=['scene_enter', 'scene_leave', 'person_enter', 'person_leave']),
+        '最近1天/声音前缀': dict(start_ts=now - DAY, end_ts=now, type_prefix='sound_'),
+        '最近1天/危险物+关键字': dict(start_ts=now - DAY, end_ts=now,
+                               event_types=['dangerous_object', 'fire_alarm'], detail_keywords=['fire']),
+        '最近1天/全部类型': dict(start_ts=now - DAY, end_ts=now),
+    }
+    for name, kwargs in cases.items():
+        times = []
+        for _ in range(repeat):
+            st = time.perf_counter()
+            rows = store.query(**kwargs)
+            times.append((time.perf_counter() - st) * 1000)
+        print(f"{name:<16} 行数 {len(rows):>8}  中位 {np.median(times):8.2f}ms  P95 {np.percentile(times, 95):8.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10_000_000, help='查询测试的表行数')
+    parser.add_argument('--inserts', type=int, default=2000, help='写入测试的事件数')
+    parser.add_argument('--dir', default=None, help='数据库目录（建议放在设备SD卡上测试）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        legacy = bench_legacy_insert(os.path.join(tmp, 'legacy.db'), args.inserts)
+        store = EventStore(os.path.join(tmp, 'store.db'))
+        batched = bench_store_insert(store, args.inserts)
+        print(f"写入速率: 逐条提交 {legacy:10.0f} 条/秒  批量提交 {batched:10.0f} 条/秒")
+
+        now = time.time()
+        db_path = os.path.join(tmp, 'query.db')
+        EventStore(db_path)
+        populate(db_path, args.rows, now)
+        bench_queries(EventStore(db_path), now)
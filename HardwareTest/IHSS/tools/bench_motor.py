@@ -0,0 +1,88 @@
+"""
+电机控制基准：用模拟GPIO后端对比原阻塞式rotate与MotorController驱动进程，
+统计调用方被阻塞的时间、完成一次转动的时间，以及步进脉冲间隔
+在项目根目录运行：python -m tools.bench_motor [--angles 5,30,90]
+"""
+import time
+import argparse
+import threading
+import numpy as np
+from components.gpio import SimulatedBackend, BACKENDS
+from components.motor_driver import MotorController, MOTOR_PINS, SEQUENCE, STEPS_PER_REV
+
+
+class TimingBackend(SimulatedBackend):
+    """记录每个步进脉冲的时间"""
+    instances = []
+
+    def __init__(self):
+        super().__init__()
+        self.pulses = []
+        TimingBackend.instances.append(self)
+
+    def write(self, pin, value):
+        super().write(pin, value)
+        if pin == MOTOR_PINS[0][0] or pin == MOTOR_PINS[1][0]:
+            self.pulses.append(time.perf_counter())
+
+
+def legacy_rotate(gpio, motor_pins, angle):
+    # 原utils/motor.rotate：每半步sleep 1ms，调用方全程阻塞
+    seq = SEQUENCE if angle >= 0 else SEQUENCE[::-1]
+    for i in range(int(abs(angle) / 360 * STEPS_PER_REV)):
+        for pin, value in zip(motor_pins, seq[i % 8]):
+            gpio.write(pin, value)
+        time.sleep(0.001)
+
+
+def bench_legacy(angle):
+    gpio = SimulatedBackend()
+    st = time.perf_counter()
+    legacy_rotate(gpio, MOTOR_PINS[0], angle)
+    return time.perf_counter() - st
+
+
+def bench_driver(ctl, angle):
+    ctl.move_to(1, 0)
+    while ctl.moving():
+        time.sleep(0.001)
+    st = time.perf_counter()
+    ctl.move_to(1, angle)
+    blocked = time.perf_counter() - st
+    while ctl.moving():
+        time.sleep(0.0005)
+    return blocked, time.perf_counter() - st
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--angles', default='5,30,90', help='转动角度列表')
+    args = parser.parse_args()
+
+    BACKENDS['timing'] = TimingBackend
+    ctl = MotorController(((-175, 175), (-65, 65)), backend='timing')
+    # 驱动在线程中运行，便于读取模拟后端记录的脉冲时间
+    driver = threading.Thread(target=ctl.run, daemon=True)
+    driver.start()
+    time.sleep(0.1)
+
+    # 原实现调用方阻塞到转动完成，阻塞时间即完成时间
+    print(f"{'角度':>6}{'原实现阻塞ms':>14}{'驱动阻塞ms':>12}{'驱动完成ms':>12}")
+    for angle in [int(x) for x in args.angles.split(',')]:
+        legacy = bench_legacy(angle)
+        blocked, done = bench_driver(ctl, angle)
+        print(f"{angle:>6}{legacy * 1000:>14.1f}{blocked * 1000:>12.3f}{done * 1000:>12.1f}")
+
+    # 连续下发100个被覆盖的目标，只应执行最后一个
+    st = time.perf_counter()
+    for i in range(100):
+        ctl.move_to(1, i)
+    print(f"连续投递100个目标耗时 {(time.perf_counter() - st) * 1000:.2f}ms")
+    while ctl.moving():
+        time.sleep(0.001)
+    pulses = np.diff(TimingBackend.instances[0].pulses) * 1000
+    pulses = pulses[pulses < 10]  # 去掉两次转动之间的空闲
+    print(f"步进间隔 中位 {np.median(pulses):.3f}ms  P99 {np.percentile(pulses, 99):.3f}ms  "
+          f"最小 {pulses.min():.3f}ms")
+    ctl.stop()
+    driver.join()
@@ -0,0 +1,117 @@
+"""
+SCRFD后处理微基准：原decodeFaceBoxs+getFaceBoxs（每次重建锚点、先解码全部锚点再筛选、逐点循环解码关键点）
+vs 按输入尺寸创建一次的ScrfdPostprocessor，分别在160/320/640输入下比较耗时并检查结果一致
+在项目根目录运行：python -m tools.bench_scrfd_post [--faces 5]
+"""
+import time
+import argparse
+import numpy as np
+from components.utils import ScrfdPostprocessor, distance2bbox, nms
+from components.config import ai_cfg
+
+STRIDES = ai_cfg.FEAT_STRIDE_FPN
+NUM_ANCHORS = 2
+THRESHOLD = ai_cfg.THRESHOLD
+IMG_SHAPE = (480, 640, 3)
+REPEAT = 50
+
+
+def make_outs(size, num_faces=5, seed=0):
+    """构造SCRFD输出：大部分锚点低分，每张人脸附近的锚点高分且回归到同一个框"""
+    rng = np.random.default_rng(seed)
+    scores, bboxes, kpss = [], [], []
+    faces = [(rng.uniform(0.2, 0.8, 2) * size, rng.uniform(0.08, 0.25) * size) for _ in range(num_faces)]
+    for stride in STRIDES:
+        h = w = size // stride
+        centers = np.stack(np.mgrid[:h, :w][::-1], axis=-1).reshape(-1, 2).astype(np.float32) * stride
+        centers = np.repeat(centers, NUM_ANCHORS, axis=0)
+        score = rng.uniform(0, 0.1, (len(centers), 1)).astype(np.float32)
+        bbox = rng.uniform(0, 2, (len(centers), 4)).astype(np.float32)
+        kps = rng.uniform(-2, 2, (len(centers), 10)).astype(np.float32)
+        for (cx, cy), half in faces:
+            near = np.flatnonzero(np.abs(centers - (cx, cy)).max(axis=1) < half * 0.5)
+            score[near, 0] = rng.uniform(0.3, 0.95, len(near))
+            jitter = rng.normal(0, 1, (len(near), 4))
+            bbox[near] = (np.stack([centers[near, 0] - cx + half, centers[near, 1] - cy + half,
+                                    cx + half - centers[near, 0], cy + half - centers[near, 1]], axis=1) + jitter) / stride
+            kps[near] = (np.tile([cx, cy], 5) - np.tile(centers[near], 5) + rng.normal(0, 1, (len(near), 10))) / stride
+        scores.append(score)
+        bboxes.append(bbox)
+        kpss.append(kps)
+    return scores + bboxes + kpss
+
+
+def legacy_distance2kps(points, distance):
+    preds = []
+    for i in range(0, distance.shape[1], 2):
+        preds.append(points[:, i % 2] + distance[:, i])
+        preds.append(points[:, i % 2 + 1] + distance[:, i + 1])
+    return np.stack(preds, axis=-1)
+
+
+def legacy_decode(net_outs, input_height, input_width, threshold):
+    """原decodeFaceBoxs：center_cache是局部变量，每次调用都重新生成锚点"""
+    scores_list, bboxes_list, kpss_list = [], [], []
+    center_cache = {}
+    fmc = 3
+    for idx, stride in enumerate(STRIDES):
+        scores = net_outs[idx]
+        bbox_preds = net_outs[idx + fmc] * stride
+        kps_preds = net_outs[idx + fmc * 2] * stride
+        height, width = input_height // stride, input_width // stride
+        key = (height, width, stride)
+        if key in center_cache:
+            anchor_centers = center_cache[key]
+        else:
+            anchor_centers = np.stack(np.mgrid[:height, :width][::-1], axis=-1).astype(np.float32)
+            anchor_centers = (anchor_centers * stride).reshape((-1, 2))
+            anchor_centers = np.stack([anchor_centers] * NUM_ANCHORS, axis=1).reshape((-1, 2))
+            center_cache[key] = anchor_centers
+        pos_inds = np.where(scores >= threshold)[0]
+        bboxes = distance2bbox(anchor_centers, bbox_preds)
+        scores_list.append(scores[pos_inds])
+        bboxes_list.append(bboxes[pos_inds])
+        kpss = legacy_distance2kps(anchor_centers, kps_preds)
+        kpss_list.append(kpss.reshape((kpss.shape[0], -1, 2))[pos_inds])
+    return scores_list, bboxes_list, kpss_list
+
+
+def legacy_get_face_boxs(img_shape, net_outs, input_size, threshold=THRESHOLD):
+    scores_list, bboxes_list, kpss_list = legacy_decode(net_outs, input_size[0], input_size[1], threshold)
+    det_scale = input_size[0] / img_shape[1]
+    scores = np.vstack(scores_list)
+    order = scores.ravel().argsort()[::-1]
+    bboxes = np.vstack(bboxes_list) / det_scale
+    kpss = np.vstack(kpss_list) / det_scale
+    pre_det = np.hstack((bboxes, scores)).astype(np.float32, copy=False)[order, :]
+    keep = nms(pre_det)
+    return pre_det[keep, :], kpss[order][keep]
+
+
+def bench(fn, repeat=REPEAT):
+    fn()
+    times = []
+    for _ in range(repeat):
+        st = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - st) * 1000)
+    return np.mean(times), np.median(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--faces', type=int, default=5, help='画面中的人脸数')
+    args = parser.parse_args()
+    for size in (160, 320, 640):
+        outs = make_outs(size, args.faces)
+        post = ScrfdPostprocessor((size, size), threshold=THRESHOLD)
+        legacy_mean, legacy_median = bench(lambda: legacy_get_face_boxs(IMG_SHAPE, outs, (size, size)))
+        post_mean, post_median = bench(lambda: post(outs, IMG_SHAPE))
+        ref_det, ref_kps = legacy_get_face_boxs(IMG_SHAPE, outs, (size, size))
+        det, kps = post(outs, IMG_SHAPE)
+        same = len(det) == len(ref_det) and np.allclose(det, ref_det, atol=1e-3) and np.allclose(kps, ref_kps, atol=1e-3)
+        n_anchors = sum(len(o) for o in outs[:3])
+        candidates = sum(int((o >= THRESHOLD).sum()) for o in outs[:3])
+        print(f"{size}x{size}  锚点 {n_anchors:6d}  过阈值 {candidates:4d}  人脸 {len(det)}  "
+              f"原实现 {legacy_mean:7.3f}ms  ScrfdPostprocessor {post_mean:7.3f}ms  "
+              f"加速 {legacy_mean / post_mean:5.1f}x  结果一致 {same}")
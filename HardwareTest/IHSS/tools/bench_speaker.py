@@ -0,0 +1,128 @@
+"""
+提示音播放基准：原实现每条提示音都打开wav、创建PyAudio并打开输出流，现在由常驻输出流+解码缓存+混音器播放。
+对比两者从投递请求到第一个样本送入声卡的延迟，以及混音器每块的CPU耗时
+在项目根目录运行：python -m tools.bench_speaker [--backend pyaudio] [--device 0] [--repeat 20]
+"""
+import time
+import glob
+import wave
+import argparse
+import threading
+import numpy as np
+from components.audio_player import AudioPlayer, ClipCache, Mixer, decode_wav, OUTPUT_RATE, OUTPUT_BLOCK
+
+PROMPTS = ['assets/on.wav', 'assets/off.wav', 'assets/face_tracking.wav', 'assets/iamhere.wav']
+ALARM = 'assets/alarm.wav'
+
+
+def stats_ms(values):
+    arr = np.asarray(values) * 1000
+    return f"均值 {arr.mean():.2f}ms  p50 {np.percentile(arr, 50):.2f}ms  最大 {arr.max():.2f}ms"
+
+
+def old_first_chunk(path, volume=0.5):
+    """原实现在写入第一块之前的工作：打开wav、读取并缩放第一块（不含打开设备）"""
+    st = time.perf_counter()
+    with wave.open(path, 'rb') as wf:
+        data = wf.readframes(1024)
+        audio_data = (np.frombuffer(data, dtype=np.int16) * volume).astype(np.int16)
+        audio_data.tobytes()
+    return time.perf_counter() - st
+
+
+def old_pyaudio_first_sample(path, device_index, volume=0.5):
+    """原实现的完整路径：打开wav、创建PyAudio、打开输出流、写入第一块"""
+    import pyaudio
+    st = time.perf_counter()
+    with wave.open(path, 'rb') as wf:
+        p = pyaudio.PyAudio()
+        stream = p.open(format=p.get_format_from_width(wf.getsampwidth()), channels=wf.getnchannels(),
+                        rate=wf.getframerate(), output=True, output_device_index=device_index)
+        data = wf.readframes(1024)
+        stream.write((np.frombuffer(data, dtype=np.int16) * volume).astype(np.int16).tobytes())
+        elapsed = time.perf_counter() - st + stream.get_output_latency()
+        stream.stop_stream()
+        stream.close()
+        p.terminate()
+    return elapsed
+
+
+def bench_mixer(prompts, alarm, blocks=20000):
+    mixer = Mixer()
+    idle = time.perf_counter()
+    for _ in range(blocks):
+        mixer.render(OUTPUT_BLOCK)
+    idle = (time.perf_counter() - idle) / blocks
+    # 一条提示音循环播放；再叠加报警音（含压低渐变）
+    results = [idle]
+    for with_alarm in (False, True):
+        st = time.perf_counter()
+        for _ in range(blocks):
+            if not mixer.channels['prompt']:
+                mixer.add('prompt', prompts[0], 0.5)
+            if with_alarm and not mixer.channels['alarm']:
+                mixer.add('alarm', alarm, 0.5)
+            mixer.render(OUTPUT_BLOCK)
+        results.append((time.perf_counter() - st) / blocks)
+    return results
+
+
+def bench_player(backend, device_index, repeat):
+    player = AudioPlayer(backend, device_index, preload=sorted(glob.glob('assets/*.wav')))
+    thread = threading.Thread(target=player.run, daemon=True)
+    thread.start()
+    latencies = []
+    for i in range(repeat):
+        while player.is_playing():
+            time.sleep(0.01)
+        before = player.stats()['played']
+        player.play(PROMPTS[i % len(PROMPTS)], 0.5)
+        while player.stats()['played'] == before:
+            time.sleep(0.0005)
+        latencies.append(player.stats()['first_sample_ms']['last'] / 1000)
+    # 提示音播放中途叠加报警音
+    while player.is_playing():
+        time.sleep(0.01)
+    player.play(PROMPTS[0], 0.5)
+    time.sleep(0.3)
+    player.play(ALARM, 0.5, channel='alarm')
+    while player.is_playing():
+        time.sleep(0.01)
+    stats = player.stats()
+    player.stop()
+    thread.join(timeout=5)
+    return latencies, stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--backend', default='null', choices=['null', 'pyaudio'])
+    parser.add_argument('--device', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    cache = ClipCache()
+    st = time.perf_counter()
+    cache.preload(sorted(glob.glob('assets/*.wav')))
+    print(f"预加载 {len(cache._clips)} 条提示音 {cache.nbytes / 1024:.0f}KB，耗时 {(time.perf_counter() - st) * 1000:.1f}ms")
+    old = [old_first_chunk(PROMPTS[i % len(PROMPTS)]) for i in range(200)]
+    hit = []
+    for i in range(200):
+        st = time.perf_counter()
+        cache.get(PROMPTS[i % len(PROMPTS)])
+        hit.append(time.perf_counter() - st)
+    print(f"原实现打开wav并准备第一块: {stats_ms(old)}")
+    print(f"缓存命中: {stats_ms(hit)}")
+
+    prompts = [cache.get(p) for p in PROMPTS]
+    idle, single, mixed = bench_mixer(prompts, decode_wav(ALARM))
+    block_ms = OUTPUT_BLOCK / OUTPUT_RATE * 1000
+    for name, cost in (('空闲', idle), ('单条提示音', single), ('提示音+报警音', mixed)):
+        print(f"混音 {name}: 每块 {cost * 1e6:.1f}us，占实时 {cost * 1000 / block_ms * 100:.3f}%")
+
+    if args.backend == 'pyaudio':
+        old_full = [old_pyaudio_first_sample(PROMPTS[i % len(PROMPTS)], args.device) for i in range(args.repeat)]
+        print(f"原实现首样本延迟（含打开设备与输出延迟）: {stats_ms(old_full)}")
+    latencies, stats = bench_player(args.backend, args.device, args.repeat)
+    print(f"常驻输出流首样本延迟（{args.backend}，含输出延迟）: {stats_ms(latencies)}")
+    print(f"播放统计: {stats}")
@@ -0,0 +1,114 @@
+"""
+推流基准：用录制的视频模拟摄像头，对比每个客户端各自编码（原gen_video_stream）与共享编码器StreamEncoder
+在1~20个客户端下的CPU占用、编码帧率和客户端实际帧率
+在项目根目录运行：python -m tools.bench_stream --video record.mp4
+"""
+import time
+import argparse
+import threading
+import cv2
+import numpy as np
+from components.frame_ring import FrameRing
+from components.stream_encoder import StreamEncoder
+
+CAM_WIDTH = 640
+CAM_HEIGHT = 480
+
+
+def load_frames(path, max_frames=300):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.resize(frame, (CAM_WIDTH, CAM_HEIGHT)))
+    cap.release()
+    if not frames:
+        raise RuntimeError(f"无法读取视频: {path}")
+    return frames
+
+
+def feeder(ring, frames, fps, stop):
+    i = 0
+    while not stop.is_set():
+        ring.write(frames[i % len(frames)], mirror=True)
+        i += 1
+        time.sleep(1.0 / fps)
+
+
+def legacy_client(ring, counter, idx, stop, client_delay):
+    # 原实现：每个客户端各自定时取帧并编码
+    while not stop.is_set():
+        time.sleep(1 / 30)
+        seq, frame = ring.latest()
+        if frame is None:
+            continue
+        _, jpeg = cv2.imencode('.jpg', frame)
+        jpeg.tobytes()
+        counter[idx] += 1
+        if client_delay:
+            time.sleep(client_delay)
+
+
+def shared_client(encoder, counter, idx, stop, client_delay):
+    for _ in encoder.subscribe(timeout=0.2):
+        if stop.is_set():
+            break
+        counter[idx] += 1
+        if client_delay:
+            time.sleep(client_delay)
+
+
+def run(mode, frames, clients, duration, fps, client_delay):
+    ring = FrameRing((CAM_HEIGHT, CAM_WIDTH, 3), readers=('stream',))
+    stop = threading.Event()
+    threads = [threading.Thread(target=feeder, args=(ring, frames, fps, stop), daemon=True)]
+    counter = [0] * clients
+    encoder = None
+    if mode == 'legacy':
+        for i in range(clients):
+            threads.append(threading.Thread(target=legacy_client, args=(ring, counter, i, stop, client_delay),
+                                            daemon=True))
+    else:
+        encoder = StreamEncoder(ring.reader('stream'), max_fps=fps)
+        for i in range(clients):
+            threads.append(threading.Thread(target=shared_client, args=(encoder, counter, i, stop, client_delay),
+                                            daemon=True))
+    for t in threads:
+        t.start()
+    time.sleep(1.0)  # 预热
+    counter[:] = [0] * clients
+    encoded_start = encoder.encoded_frames if encoder else 0
+    wall_st, cpu_st = time.time(), time.process_time()
+    time.sleep(duration)
+    wall, cpu = time.time() - wall_st, time.process_time() - cpu_st
+    delivered = np.array(counter) / wall
+    encoded = (encoder.encoded_frames - encoded_start) / wall if encoder else delivered.sum()
+    level = encoder.stats() if encoder else {}
+    stop.set()
+    for t in threads:
+        t.join(timeout=1.0)
+    if encoder:
+        encoder.stop()
+    ring.close()
+    ring.unlink()
+    return cpu / wall * 100, encoded, delivered.mean(), level
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--video', required=True, help='录制的视频文件')
+    parser.add_argument('--clients', default='1,2,5,10,20', help='客户端数量列表')
+    parser.add_argument('--duration', type=float, default=5.0, help='每组测试时长（秒）')
+    parser.add_argument('--fps', type=int, default=30, help='模拟摄像头帧率')
+    parser.add_argument('--client-delay', type=float, default=0.0, help='模拟客户端网络发送耗时（秒/帧）')
+    args = parser.parse_args()
+
+    frames = load_frames(args.video)
+    print(f"{'模式':<8}{'客户端':>6}{'CPU%':>10}{'编码fps':>10}{'客户端fps':>10}  画质")
+    for n in [int(x) for x in args.clients.split(',')]:
+        for mode in ('legacy', 'shared'):
+            cpu, encoded, per_client, level = run(mode, frames, n, args.duration, args.fps, args.client_delay)
+            quality = f"{level['scale']}x q{level['quality']}" if level else 'q95'
+            print(f"{mode:<8}{n:>6}{cpu:>10.1f}{encoded:>10.1f}{per_client:>10.1f}  {quality}")
@@ -0,0 +1,81 @@
+"""
+语音指令录音基准：对比原流程（固定录5秒、写voice_cmd.wav、再读回base64）与端点检测的内存流程，
+从唤醒到把音频交给识别接口的延迟。录音按实时帧率计算，其余开销实测
+在项目根目录运行：python -m tools.bench_voice [--wav cmd1.wav cmd2.wav]
+"""
+import os
+import time
+import wave
+import base64
+import argparse
+import tempfile
+import numpy as np
+from components.speech import Endpointer, WavFrameSource, record_utterance
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 512  # 与porcupine.frame_length一致
+
+
+def synth_command(path, speech=1.5, lead=0.6, tail=3.0, seed=0):
+    """生成测试音频：底噪 + 按音节起伏的类语音信号 + 底噪"""
+    rng = np.random.default_rng(seed)
+    n_lead, n_speech, n_tail = (int(x * SAMPLE_RATE) for x in (lead, speech, tail))
+    t = np.arange(n_speech) / SAMPLE_RATE
+    envelope = 0.5 + 0.5 * np.abs(np.sin(2 * np.pi * 3 * t))
+    voice = rng.normal(0, 3000, n_speech) * envelope
+    audio = np.concatenate([rng.normal(0, 60, n_lead), voice, rng.normal(0, 60, n_tail)])
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(np.clip(audio, -32768, 32767).astype(np.int16).tobytes())
+
+
+def legacy(path, tmp):
+    """原流程：录满5秒 -> 写wav -> 读回 -> base64"""
+    source = WavFrameSource(path, FRAME_LENGTH)
+    frames = [source.read() for _ in range(SAMPLE_RATE * 5 // FRAME_LENGTH)]
+    st = time.perf_counter()
+    audio = np.concatenate(frames).astype('float32') / 32768.0
+    wav_path = os.path.join(tmp, 'voice_cmd.wav')
+    with wave.open(wav_path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes((audio * 32767).astype('int16').tobytes())
+    with open(wav_path, 'rb') as f:
+        base64.b64encode(f.read())
+    return len(frames) * FRAME_LENGTH / SAMPLE_RATE, time.perf_counter() - st
+
+
+def streaming(path, endpointer):
+    """端点检测：说完即停，PCM直接base64"""
+    source = WavFrameSource(path, FRAME_LENGTH)
+    audio = record_utterance(source.read, endpointer)
+    st = time.perf_counter()
+    if audio is not None:
+        base64.b64encode(audio.tobytes())
+    return endpointer.duration, time.perf_counter() - st, audio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--wav', nargs='*', help='16kHz单声道录音，不指定则使用合成音频')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = args.wav
+        if not paths:
+            paths = []
+            for i, speech in enumerate((0.8, 1.5, 2.5)):
+                path = os.path.join(tmp, f'synth_{speech}s.wav')
+                synth_command(path, speech=speech, seed=i)
+                paths.append(path)
+        endpointer = Endpointer(SAMPLE_RATE, FRAME_LENGTH)
+        print(f"{'音频':<20}{'原流程录音s':>12}{'原流程处理ms':>14}{'端点录音s':>10}{'处理ms':>8}{'有效语音s':>10}")
+        for path in paths:
+            rec_a, cost_a = legacy(path, tmp)
+            rec_b, cost_b, audio = streaming(path, endpointer)
+            voiced = 0.0 if audio is None else len(audio) / SAMPLE_RATE
+            print(f"{os.path.basename(path):<20}{rec_a:>12.2f}{cost_a * 1000:>14.2f}"
+                  f"{rec_b:>10.2f}{cost_b * 1000:>8.2f}{voiced:>10.2f}")
@@ -0,0 +1,103 @@
+"""
+YAMNet检测周期基准：对比原循环（每2秒把最近5秒音频整段送入模型）与增量推理（只计算新到达的0.96秒块，
+窗口结果由块分数缓存汇总）每个周期的耗时和按2秒周期折算的CPU占用，并检查两者的窗口结果一致。
+指定--model时使用真实模型（SavedModel目录或.tflite/.onnx文件），否则使用计算log-mel和两层全连接的替身后端，
+其每块计算量与YAMNet同一量级，用于比较两种方式的相对开销
+在项目根目录运行：python -m tools.bench_yamnet [--model models/yamnet --seconds 60]
+"""
+import time
+import argparse
+import numpy as np
+import librosa
+from components.audio_ring import AudioRing
+from components.sound_classifier import (create_backend, IncrementalClassifier, SAMPLE_RATE,
+                                         PATCH_HOP, PATCH_SAMPLES, NUM_CLASSES)
+
+WINDOW = 5.0
+DETECTION_INTERVAL = 2.0
+
+
+class StandInBackend:
+    """替身模型：log-mel（25ms窗/10ms步长/64带）-> 96帧一块 -> 6144x4096x4096x521全连接，逐块计算，耗时与块数成正比"""
+
+    def __init__(self, seed=0):
+        rng = np.random.default_rng(seed)
+        self.w1 = rng.normal(0, 0.01, (96 * 64, 4096)).astype(np.float32)
+        self.w2 = rng.normal(0, 0.01, (4096, 4096)).astype(np.float32)
+        self.w3 = rng.normal(0, 0.01, (4096, NUM_CLASSES)).astype(np.float32)
+        self.mel = librosa.filters.mel(sr=SAMPLE_RATE, n_fft=512, n_mels=64, fmin=125, fmax=7500).astype(np.float32)
+        self.window = np.hanning(400).astype(np.float32)
+
+    def scores(self, waveform, n_patches):
+        frames = np.lib.stride_tricks.sliding_window_view(waveform, 400)[::160] * self.window
+        log_mel = np.log(self.mel @ (np.abs(np.fft.rfft(frames, 512)) ** 2).T.astype(np.float32) + 0.001).T
+        patches = np.stack([log_mel[i * 48:i * 48 + 96].ravel() for i in range(n_patches)])
+        out = np.empty((n_patches, NUM_CLASSES), dtype=np.float32)
+        for i, patch in enumerate(patches):
+            hidden = np.maximum(np.maximum(patch @ self.w1, 0) @ self.w2, 0)
+            out[i] = 1 / (1 + np.exp(-(hidden @ self.w3)))
+        return out
+
+
+def full_window(backend, ring):
+    """原循环：最近5秒整段推理，YAMNet会把尾部补零到整数个块"""
+    total, audio = ring.latest(int(WINDOW * SAMPLE_RATE))
+    if audio is None:
+        return None
+    n_patches = -(-(len(audio) - PATCH_SAMPLES) // PATCH_HOP) + 1
+    padded = np.zeros((n_patches - 1) * PATCH_HOP + PATCH_SAMPLES, dtype=np.float32)
+    padded[:len(audio)] = audio
+    return backend.scores(padded, n_patches).mean(axis=0)
+
+
+def run(mode, backend, audio):
+    """按实时顺序写入音频，每2秒检测一次，返回每周期 (墙钟ms, CPU ms) 列表和最后一次的平均分数"""
+    ring = AudioRing(SAMPLE_RATE * 10, SAMPLE_RATE)
+    classifier = IncrementalClassifier(backend, ring)
+    chunk = SAMPLE_RATE // 10
+    per_detection = int(DETECTION_INTERVAL * SAMPLE_RATE)
+    cycles, mean = [], None
+    for i in range(0, len(audio), chunk):
+        ring.write(audio[i:i + chunk])
+        if (i + chunk) % per_detection == 0 and ring.total >= WINDOW * SAMPLE_RATE:
+            wall, cpu = time.perf_counter(), time.process_time()
+            if mode == 'full':
+                mean = full_window(backend, ring)
+            else:
+                classifier.update()
+                mean = classifier.window_scores(WINDOW)[1]
+            cycles.append(((time.perf_counter() - wall) * 1000, (time.process_time() - cpu) * 1000))
+    return cycles, mean, classifier
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default=None, help='YAMNet模型路径，不指定时使用替身后端')
+    parser.add_argument('--seconds', type=float, default=60, help='模拟音频时长')
+    args = parser.parse_args()
+    backend = create_backend(args.model) if args.model else StandInBackend()
+
+    rng = np.random.default_rng(0)
+    audio = (rng.normal(0, 0.05, int(args.seconds * SAMPLE_RATE))).astype(np.float32)
+    # 预热，排除首次调用的初始化
+    backend.scores(np.zeros(PATCH_SAMPLES, dtype=np.float32), 1)
+
+    for mode in ('full', 'incremental'):
+        cycles, mean, classifier = run(mode, backend, audio)
+        wall = np.array([c[0] for c in cycles])
+        cpu = np.array([c[1] for c in cycles])
+        extra = f"  计算块 {classifier.computed}" if mode == 'incremental' else ''
+        print(f"{mode:<12} 周期 {len(cycles)}  中位 {np.median(wall):7.1f}ms  最大 {wall.max():7.1f}ms  "
+              f"CPU {cpu.mean():7.1f}ms/周期（{cpu.mean() / DETECTION_INTERVAL / 10:5.1f}%）{extra}")
+
+    # 一致性：增量缓存中的块分数与对同一对齐窗口整段计算的结果相同
+    ring = AudioRing(SAMPLE_RATE * 10, SAMPLE_RATE)
+    classifier = IncrementalClassifier(backend, ring)
+    for i in range(0, 8 * SAMPLE_RATE, 1600):
+        ring.write(audio[i:i + 1600])
+        classifier.update()
+    cached, _ = classifier.window_scores(WINDOW)
+    end = classifier._next - PATCH_HOP + PATCH_SAMPLES
+    n = len(cached)
+    direct = backend.scores(ring.read_at(end, (n - 1) * PATCH_HOP + PATCH_SAMPLES), n)
+    print(f"缓存块分数与整段计算最大差异 {np.abs(cached - direct).max():.2e}（{n} 块）")
@@ -0,0 +1,72 @@
+"""
+YOLOv5后处理微基准：逐行Python循环（原DangerDetectRec.inference） vs 向量化YoloPostprocessor
+在项目根目录运行：python -m tools.bench_yolo_post
+"""
+import time
+import numpy as np
+from components.yolo_post import YoloPostprocessor
+
+NUM_ANCHORS = 25200
+NUM_OUTPUTS = 85
+NUM_CLASSES = 3
+CONF_THRES = 0.3
+REPEAT = 20
+
+
+def make_pred(num_objects=5, seed=0):
+    """构造一个近似真实分布的输出：大部分anchor低置信度，少数目标周围有一簇重叠框"""
+    rng = np.random.default_rng(seed)
+    pred = np.zeros((1, NUM_ANCHORS, NUM_OUTPUTS), dtype=np.float32)
+    pred[0, :, 0:2] = rng.uniform(0, 640, (NUM_ANCHORS, 2))
+    pred[0, :, 2:4] = rng.uniform(8, 200, (NUM_ANCHORS, 2))
+    pred[0, :, 4] = rng.uniform(0, 0.05, NUM_ANCHORS)
+    pred[0, :, 5:] = rng.uniform(0, 1, (NUM_ANCHORS, NUM_OUTPUTS - 5))
+    for _ in range(num_objects):
+        cx, cy = rng.uniform(100, 540, 2)
+        idx = rng.choice(NUM_ANCHORS, 30, replace=False)
+        pred[0, idx, 0] = cx + rng.normal(0, 3, 30)
+        pred[0, idx, 1] = cy + rng.normal(0, 3, 30)
+        pred[0, idx, 2:4] = 80 + rng.normal(0, 3, (30, 2))
+        pred[0, idx, 4] = rng.uniform(0.6, 0.95, 30)
+        pred[0, idx, 5 + rng.integers(NUM_CLASSES)] = 1.0
+    return pred
+
+
+def legacy_postprocess(pred, frame_shape=(480, 640), conf_thres=CONF_THRES):
+    boxes = []
+    for det in pred[0]:
+        obj_conf = det[4]
+        class_scores = det[5:8]
+        cls = np.argmax(class_scores)
+        conf = obj_conf * class_scores[cls]
+        if conf > conf_thres:
+            x, y, w, h = det[0:4]
+            x1 = int((x - w / 2) * frame_shape[1] / 640)
+            y1 = int((y - h / 2) * frame_shape[0] / 640)
+            x2 = int((x + w / 2) * frame_shape[1] / 640)
+            y2 = int((y + h / 2) * frame_shape[0] / 640)
+            boxes.append([x1, y1, x2, y2, float(conf), int(cls)])
+    return boxes
+
+
+def bench(name, fn, repeat=REPEAT):
+    fn()
+    times = []
+    for _ in range(repeat):
+        st = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - st) * 1000)
+    times = np.array(times)
+    print(f"{name:<12} 平均 {times.mean():8.2f}ms  中位 {np.median(times):8.2f}ms  最大 {times.max():8.2f}ms")
+    return times.mean(), result
+
+
+if __name__ == "__main__":
+    pred = make_pred()
+    post = YoloPostprocessor(num_classes=NUM_CLASSES)
+    scale = (640 / 640, 640 / 480)
+    legacy_ms, legacy_boxes = bench("legacy", lambda: legacy_postprocess(pred))
+    vector_ms, (boxes, _, _) = bench("vectorised",
+                                     lambda: post(pred, conf_thres=CONF_THRES, ratio=scale, orig_shape=(480, 640)))
+    print(f"检测框数: legacy(无NMS) {len(legacy_boxes)}  vectorised(NMS后) {len(boxes)}")
+    print(f"加速比: {legacy_ms / vector_ms:.1f}x")
@@ -0,0 +1,135 @@
+"""
+本地模拟云端接口：百度令牌/语音识别/语音合成与DeepSeek对话，支持注入故障，
+用于在没有网络和密钥的情况下测试utils/baidu.py、utils/deepseek.py与HTTP客户端
+在项目根目录运行：python -m tools.mock_api_server [--port 8900]
+接口地址：/oauth/2.0/token  /server_api  /text2audio  /v1/chat/completions
+"""
+import io
+import json
+import wave
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+def silent_wav(duration=0.2, rate=16000):
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(b'\x00\x00' * int(duration * rate))
+    return buf.getvalue()
+
+
+class MockState:
+    """模拟服务器的状态与故障注入开关"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.connections = set()
+        self.token_seq = 0
+        self.valid_tokens = set()
+        self.expires_in = 2592000
+        self.fail_next = 0          # 接下来多少个请求返回503
+        self.asr_text = '打开人脸追踪'
+        self.chat_reply = '{"cmd_type": 1, "cmd_content": 2, "cmd_detail": {"switch": true}}'
+        self.wav = silent_wav()
+
+    def hit(self, name, client):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+            self.connections.add(client)
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                return False
+            return True
+
+    def new_token(self):
+        with self.lock:
+            self.token_seq += 1
+            token = f'mock-token-{self.token_seq}'
+            self.valid_tokens.add(token)
+            return token
+
+    def revoke_tokens(self):
+        with self.lock:
+            self.valid_tokens.clear()
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # 支持keep-alive，便于观察连接复用
+        disable_nagle_algorithm = True  # 响应头和响应体分两次写出，避免与客户端延迟确认叠加出40ms延迟
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, code, body, content_type='application/json'):
+            if isinstance(body, (dict, list)):
+                body = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0) or 0))
+            if not state.hit(url.path, self.client_address):
+                self._send(503, {'error': 'injected failure'})
+                return
+            if url.path == '/oauth/2.0/token':
+                self._send(200, {'access_token': state.new_token(), 'expires_in': state.expires_in})
+            elif url.path == '/server_api':
+                payload = json.loads(body or b'{}')
+                if payload.get('token') not in state.valid_tokens:
+                    self._send(200, {'err_no': 3302, 'err_msg': 'authentication failed'})
+                else:
+                    self._send(200, {'err_no': 0, 'result': [state.asr_text]})
+            elif url.path == '/text2audio':
+                form = parse_qs(body.decode('utf-8'))
+                if form.get('tok', [''])[0] not in state.valid_tokens:
+                    self._send(200, {'err_no': 502, 'err_msg': 'token invalid'})
+                else:
+                    self._send(200, state.wav, content_type='audio/wav')
+            elif url.path == '/v1/chat/completions':
+                self._send(200, {'choices': [{'message': {'role': 'assistant', 'content': state.chat_reply}}]})
+            else:
+                self._send(404, {'error': 'not found'})
+
+    return Handler
+
+
+def start_server(port=0):
+    """
+    在后台线程启动模拟服务器
+    :return: (server, state, base_url)
+    """
+    state = MockState()
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def baidu_urls(base_url):
+    return {'token': f'{base_url}/oauth/2.0/token', 'asr': f'{base_url}/server_api', 'tts': f'{base_url}/text2audio'}
+
+
+def deepseek_url(base_url):
+    return f'{base_url}/v1/chat/completions'
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8900)
+    args = parser.parse_args()
+    server, state, base_url = start_server(args.port)
+    print(f"模拟接口已启动: {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,164 @@
+"""
+模型int8静态量化：用样本图片校准scrfd.onnx/yolov5n.onnx，再在同一批图片上对比fp32与int8的检测结果和耗时，
+精度下降在--max-drop以内时安装为同目录的<模型名>.int8.onnx，create_session/OnnxRun会自动优先加载
+在项目根目录运行：python -m tools.quantize_models --images data/samples [--models scrfd yolov5n] [--force]
+"""
+import os
+import glob
+import time
+import argparse
+import numpy as np
+import cv2
+from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+from components.onnx_infer import INT8_SUFFIX, create_session
+from components.utils import ScrfdPostprocessor
+from components.config import ai_cfg
+from face_detect_rec import FACE_DET_PATH, FaceDetectRec
+from danger_rec import YOLOV5N_MODEL_PATH, DANGER_CLASSES, DangerDetectRec
+from components.yolo_post import YoloPostprocessor
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+MATCH_IOU = 0.5
+THREADS = 2
+
+
+class ScrfdModel:
+    path = FACE_DET_PATH
+
+    def __init__(self):
+        self.post = ScrfdPostprocessor(ai_cfg.INPUT_SIZE)
+
+    def preprocess(self, img):
+        return FaceDetectRec.imgPreprocessing(img)
+
+    def detect(self, session, img):
+        """:return: (boxes (N, 4), scores (N,))"""
+        outs = session.run(None, {session.get_inputs()[0].name: self.preprocess(img)})
+        det, _ = self.post(outs, img.shape)
+        return det[:, :4].copy(), det[:, 4].copy()
+
+
+class YoloModel:
+    path = YOLOV5N_MODEL_PATH
+
+    def __init__(self):
+        self.post = YoloPostprocessor(num_classes=len(DANGER_CLASSES))
+
+    def preprocess(self, img):
+        return DangerDetectRec.preprocess(img)[0]
+
+    def detect(self, session, img):
+        blob, ratio, pad = DangerDetectRec.preprocess(img)
+        outs = session.run(None, {session.get_inputs()[0].name: blob})
+        boxes, scores, _ = self.post(outs[0], conf_thres=0.3, ratio=ratio, pad=pad, orig_shape=img.shape[:2])
+        return boxes, scores
+
+
+MODELS = {
+    'scrfd': ScrfdModel,
+    'yolov5n': YoloModel,
+}
+
+
+class ImageReader(CalibrationDataReader):
+    """按模型的预处理逐张提供校准输入"""
+
+    def __init__(self, images, preprocess, input_name):
+        self._iter = (({input_name: preprocess(img)}) for img in images)
+
+    def get_next(self):
+        return next(self._iter, None)
+
+
+def load_images(folder):
+    paths = sorted(p for p in glob.glob(os.path.join(folder, '*')) if p.lower().endswith(IMAGE_EXTS))
+    images = [cv2.imread(p) for p in paths]
+    return [img for img in images if img is not None]
+
+
+def box_iou(a, b):
+    """:return: (len(a), len(b)) IoU矩阵"""
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(rb - lt, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def compare(model, ref_session, test_session, images):
+    """以fp32结果为参照，贪心按IoU匹配int8结果"""
+    ref_count = test_count = matched = 0
+    ious, score_deltas, ref_ms, test_ms = [], [], [], []
+    for img in images:
+        st = time.perf_counter()
+        ref_boxes, ref_scores = model.detect(ref_session, img)
+        ref_ms.append((time.perf_counter() - st) * 1000)
+        st = time.perf_counter()
+        test_boxes, test_scores = model.detect(test_session, img)
+        test_ms.append((time.perf_counter() - st) * 1000)
+        ref_count += len(ref_boxes)
+        test_count += len(test_boxes)
+        if len(ref_boxes) == 0 or len(test_boxes) == 0:
+            continue
+        iou = box_iou(ref_boxes, test_boxes)
+        for i in np.argsort(-ref_scores):
+            j = int(iou[i].argmax())
+            if iou[i, j] >= MATCH_IOU:
+                matched += 1
+                ious.append(iou[i, j])
+                score_deltas.append(test_scores[j] - ref_scores[i])
+                iou[:, j] = 0
+    return {
+        'fp32_dets': ref_count,
+        'int8_dets': test_count,
+        'recall': matched / ref_count if ref_count else 1.0,
+        'mean_iou': float(np.mean(ious)) if ious else float('nan'),
+        'mean_score_delta': float(np.mean(score_deltas)) if score_deltas else float('nan'),
+        'fp32_ms': float(np.median(ref_ms[1:] or ref_ms)),
+        'int8_ms': float(np.median(test_ms[1:] or test_ms)),
+    }
+
+
+def quantize(name, images, num_calib, per_channel):
+    model = MODELS[name]()
+    fp32_path = model.path
+    tmp_path = os.path.splitext(fp32_path)[0] + '.int8.tmp.onnx'
+    ref_session = create_session(fp32_path, threads=THREADS, use_cache=False, prefer_int8=False)
+    reader = ImageReader(images[:num_calib], model.preprocess, ref_session.get_inputs()[0].name)
+    st = time.time()
+    quantize_static(fp32_path, tmp_path, reader, quant_format=QuantFormat.QDQ, per_channel=per_channel,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    print(f"[{name}] 量化完成，用时 {time.time() - st:.1f}s，校准图片 {min(num_calib, len(images))} 张")
+    test_session = create_session(tmp_path, threads=THREADS, use_cache=False, prefer_int8=False)
+    return model, ref_session, test_session, tmp_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--images', required=True, help='样本图片目录，用于校准和精度对比')
+    parser.add_argument('--models', nargs='+', default=list(MODELS), choices=list(MODELS))
+    parser.add_argument('--calib', type=int, default=64, help='校准使用的图片数')
+    parser.add_argument('--max-drop', type=float, default=0.02, help='允许的召回率下降（相对fp32结果）')
+    parser.add_argument('--per-channel', action='store_true', help='权重按通道量化')
+    parser.add_argument('--force', action='store_true', help='精度下降超出--max-drop时也安装')
+    args = parser.parse_args()
+
+    images = load_images(args.images)
+    if not images:
+        raise SystemExit(f"{args.images} 中没有图片")
+    print(f"样本图片 {len(images)} 张")
+    for name in args.models:
+        model, ref_session, test_session, tmp_path = quantize(name, images, args.calib, args.per_channel)
+        r = compare(model, ref_session, test_session, images)
+        print(f"[{name}] 检测数 fp32 {r['fp32_dets']} / int8 {r['int8_dets']}  召回 {r['recall']:.3f}  "
+              f"平均IoU {r['mean_iou']:.3f}  平均分数变化 {r['mean_score_delta']:+.4f}  "
+              f"耗时 fp32 {r['fp32_ms']:.1f}ms / int8 {r['int8_ms']:.1f}ms")
+        del test_session
+        int8_path = os.path.splitext(model.path)[0] + INT8_SUFFIX
+        if 1.0 - r['recall'] <= args.max_drop or args.force:
+            os.replace(tmp_path, int8_path)
+            print(f"[{name}] 已安装 {int8_path}")
+        else:
+            os.remove(tmp_path)
+            print(f"[{name}] 召回下降 {1.0 - r['recall']:.3f} 超过 {args.max_drop}，未安装（可用--force强制安装）")
@@ -0,0 +1,237 @@
+"""
+端到端回放基准：用录像或图片目录替代摄像头，把画面送入main.py中真实的多进程流水线
+（摄像头进程 -> 帧环形缓冲区 -> 推理服务 -> 结果公告板 -> 识别/危险物事件进程 -> 事件存储），
+电机、温湿度传感器和扬声器使用模拟后端，不需要任何硬件，可以在x86的CI机器上回归测试性能。
+默认步进回放：每帧等推理服务取走后才输出下一帧，关闭关键帧间隔和运动门控，测流水线的最大吞吐；
+--realtime按录制帧率回放，保留main.py中的间隔与门控配置，测现场负载下的延迟与丢帧。
+在项目根目录运行：python -m tools.replay_bench --source data/session.mp4 [--models face danger] [--frames 300]
+                  [--realtime] [--json result.json] [--baseline base.json --tolerance 0.15]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from collections import Counter
+from multiprocessing import Process, RawArray
+import numpy as np
+import main as app
+from components.event_store import EventStore
+from components.sources import open_camera
+
+WAIT_TIMEOUT = 60.0     # 步进回放等待推理服务取帧的最长时间（首帧包含模型加载）
+POLL_INTERVAL = 0.001
+
+
+def percentiles_ms(values):
+    if not values:
+        return None
+    arr = np.asarray(values) * 1000
+    result = {f'p{q}': round(float(np.percentile(arr, q)), 2) for q in (50, 90, 99)}
+    result['max'] = round(float(arr.max()), 2)
+    return result
+
+
+def make_waiter(frame_ring):
+    """步进回放：输出第n+1帧之前等推理服务读到第n帧"""
+    def wait(n):
+        deadline = time.time() + WAIT_TIMEOUT
+        while frame_ring.reader_stats()['inference']['received'] < n and time.time() < deadline:
+            time.sleep(0.0002)
+    return wait
+
+
+class BoardWatcher:
+    """轮询结果公告板，按结果对应的帧序号找到该帧的输出时间，计算端到端延迟并统计检测结果"""
+
+    def __init__(self, name, board, stamps, warmup):
+        self.name = name
+        self.board = board
+        self.stamps = stamps
+        self.warmup = warmup
+        self.last_version = 0
+        self.latencies = []
+        self.publish_ts = []
+        self.detections = 0
+        self.frames_with_detections = 0
+        self.classes = Counter()
+
+    def poll(self):
+        version = self.board.version()
+        if version == self.last_version:
+            return False
+        self.last_version, frame_seq, ts, rows = self.board.read()
+        # 帧环形缓冲区的序号从1开始，与源输出的第frame_seq-1帧一一对应
+        if frame_seq <= self.warmup or frame_seq > len(self.stamps) or not self.stamps[frame_seq - 1]:
+            return True
+        self.latencies.append(ts - self.stamps[frame_seq - 1])
+        self.publish_ts.append(ts)
+        self.detections += len(rows)
+        self.frames_with_detections += bool(len(rows))
+        if self.name == 'danger':
+            self.classes.update(app.DANGER_CLASSES[int(c)] for c in rows[:, 5])
+        return True
+
+    def report(self, window_start, infer_summary):
+        window = (self.publish_ts[-1] - window_start) if self.publish_ts else 0.0
+        result = {
+            'results': len(self.latencies),
+            'throughput': round(len(self.latencies) / window, 2) if window > 0 else 0.0,
+            'latency_ms': percentiles_ms(self.latencies),
+            'infer_mean_ms': infer_summary['mean_ms'],
+            'infer_p95_ms': infer_summary['p95_ms'],
+            'detections': self.detections,
+            'frames_with_detections': self.frames_with_detections,
+        }
+        if self.classes:
+            result['classes'] = dict(self.classes)
+        return result
+
+
+def configure(args, tmpdir):
+    """修改main的模块全局变量，之后fork的子进程都继承这些配置"""
+    app.event_store = EventStore(os.path.join(tmpdir, 'events.db'))
+    app.motor_ctl.backend = 'sim'
+    app.audio_player.backend = 'null'
+    app.temp_hum.use_backend('sim')
+    # 不发布跟踪预测，公告板上只有模型结果，延迟统计才有意义
+    app.TRACK_INTERVAL = float('inf')
+    if not args.realtime:
+        app.FACE_INTERVAL = app.DANGER_INTERVAL = 0.0
+        app.MOTION_GATING = False
+    app.enable_face_detection.value = 'face' in args.models
+    app.enable_danger_detection.value = 'danger' in args.models
+
+
+def run(args):
+    tmpdir = tempfile.mkdtemp(prefix='replay_bench_')
+    configure(args, tmpdir)
+
+    probe = open_camera(args.source, app.CAM_WIDTH, app.CAM_HEIGHT)
+    if not hasattr(probe, 'frame_count'):
+        raise SystemExit("--source需要是录像文件或图片目录")
+    n_frames = probe.frame_count()
+    probe.release()
+    if args.frames:
+        n_frames = min(n_frames, args.frames) if n_frames > 0 else args.frames
+    if n_frames <= args.warmup:
+        raise SystemExit(f"{args.source} 的帧数 ({n_frames}) 不足，至少需要 {args.warmup + 1} 帧")
+    stamps = RawArray('d', n_frames)
+    app.CAMERA_SOURCE = open_camera(args.source, app.CAM_WIDTH, app.CAM_HEIGHT,
+                                    fps=None if args.realtime else 0, max_frames=n_frames, stamps=stamps,
+                                    wait=None if args.realtime else make_waiter(app.frame_ring))
+
+    procs = {
+        'events': Process(target=app.event_store.run_writer),
+        'motor': Process(target=app.motor_ctl.run),
+        'speaker': Process(target=app.audio_player.run),
+        'inference': Process(target=app.inference_process, args=(app.frame_ring, app.face_board, app.danger_board)),
+        'recognition': Process(target=app.recognition_process, args=(app.face_board, app.shared_direction)),
+        'danger': Process(target=app.danger_recognition_process, args=(app.danger_board,)),
+        'camera': Process(target=app.camera_process, args=(app.frame_ring,)),
+    }
+    watchers = [BoardWatcher(name, board, stamps, args.warmup)
+                for name, board in (('face', app.face_board), ('danger', app.danger_board)) if name in args.models]
+    start = time.time()
+    for p in procs.values():
+        p.daemon = True
+        p.start()
+    last_activity = time.time()
+    try:
+        while True:
+            active = [w.poll() for w in watchers]
+            now = time.time()
+            if any(active):
+                last_activity = now
+            elif not procs['camera'].is_alive() and now - last_activity > args.drain:
+                break
+            else:
+                time.sleep(POLL_INTERVAL)
+    finally:
+        elapsed = time.time() - start
+        for name in ('camera', 'inference', 'recognition', 'danger'):
+            procs[name].terminate()
+            procs[name].join()
+        app.event_store.stop()
+        procs['events'].join(timeout=5)
+        app.motor_ctl.stop()
+        procs['motor'].join(timeout=5)
+        app.audio_player.stop()
+        procs['speaker'].join(timeout=5)
+
+    written = sum(1 for t in stamps if t)
+    window_start = stamps[args.warmup] if written > args.warmup else start
+    summary = app.metrics.summary(None, app.metrics.snapshot(), elapsed)
+    readers = app.frame_ring.reader_stats()
+    events = Counter(row[1] for row in app.event_store.query(0, time.time() + 1))
+    report = {
+        'source': args.source,
+        'mode': 'realtime' if args.realtime else 'lockstep',
+        'frames': written,
+        'elapsed_s': round(elapsed, 2),
+        'replay_fps': round((written - args.warmup) / max(stamps[written - 1] - window_start, 1e-9), 2)
+        if written > args.warmup else 0.0,
+        'inference_frames': readers['inference']['received'],
+        'inference_dropped': readers['inference']['dropped'],
+        'models': {w.name: w.report(window_start, summary[f'inference_seconds{{model="{w.name}"}}'])
+                   for w in watchers},
+        'events': dict(events),
+    }
+    for shm in (app.frame_ring, app.face_board, app.danger_board, app.audio_bus, app.metrics):
+        shm.close()
+        shm.unlink()
+    return report
+
+
+def print_report(r):
+    print(f"\n回放 {r['source']}（{r['mode']}）：{r['frames']} 帧，用时 {r['elapsed_s']}s，输出 {r['replay_fps']} fps")
+    print(f"推理服务取帧 {r['inference_frames']}，丢帧 {r['inference_dropped']}")
+    for name, m in r['models'].items():
+        lat = m['latency_ms'] or {}
+        print(f"[{name}] 结果 {m['results']}  吞吐 {m['throughput']}/s  "
+              f"端到端延迟 p50 {lat.get('p50')}ms p90 {lat.get('p90')}ms p99 {lat.get('p99')}ms  "
+              f"推理 {m['infer_mean_ms']}ms (p95 {m['infer_p95_ms']}ms)  "
+              f"检测数 {m['detections']}（{m['frames_with_detections']} 帧有检测）{m.get('classes', '')}")
+    print(f"事件: {r['events']}")
+
+
+def compare(report, baseline, tolerance):
+    """与基线比较：吞吐下降或p90延迟上升超过tolerance视为性能回退"""
+    failures = []
+    for name, base in baseline.get('models', {}).items():
+        cur = report['models'].get(name)
+        if cur is None:
+            continue
+        if cur['throughput'] < base['throughput'] * (1 - tolerance):
+            failures.append(f"[{name}] 吞吐 {cur['throughput']}/s 低于基线 {base['throughput']}/s")
+        if cur['latency_ms'] and base['latency_ms'] and \
+                cur['latency_ms']['p90'] > base['latency_ms']['p90'] * (1 + tolerance):
+            failures.append(f"[{name}] p90延迟 {cur['latency_ms']['p90']}ms 高于基线 {base['latency_ms']['p90']}ms")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--source', required=True, help='录像文件或图片目录，见components/sources.py')
+    parser.add_argument('--models', nargs='+', default=['face', 'danger'], choices=['face', 'danger'])
+    parser.add_argument('--frames', type=int, default=0, help='最多回放的帧数，0表示全部')
+    parser.add_argument('--warmup', type=int, default=5, help='不计入统计的开头帧数（含模型加载）')
+    parser.add_argument('--realtime', action='store_true', help='按录制帧率回放，保留main.py的间隔与门控配置')
+    parser.add_argument('--drain', type=float, default=2.0, help='回放结束后等待剩余结果的时间（秒）')
+    parser.add_argument('--json', help='把结果写入JSON文件，可作为之后的--baseline')
+    parser.add_argument('--baseline', help='基线JSON，性能回退时以退出码1结束')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='与基线比较的允许波动比例')
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            failures = compare(report, json.load(f), args.tolerance)
+        for msg in failures:
+            print(f"性能回退: {msg}")
+        sys.exit(1 if failures else 0)
@@ -1,61 +1,78 @@
-import requests
 import json
 import os
 import base64
 import config.key as key
+from utils.http_client import default_client, TokenCache
+
+# 令牌失效的错误码：语音识别3302，语音合成502
+ASR_TOKEN_ERRORS = (3302,)
+TTS_TOKEN_ERRORS = (502,)
 
 class BaiduVoice:
-    def __init__(self):
-        self.API_KEY = key.baidu_api_key
-        self.SECRET_KEY = key.baidu_secret_key
-        self.TTS_URL = "https://tsn.baidu.com/text2audio"
-        self.ASR_URL = "https://vop.baidu.com/server_api"
-        self.TOKEN_URL = "https://aip.baidubce.com/oauth/2.0/token"
-        self.token = None
-        
-    def get_access_token(self):
+    def __init__(self, client=None, base_urls=None):
         """
-        使用 AK，SK 生成鉴权签名（Access Token）
-        :return: access_token，或是None(如果错误)
+        Args:
+            client (HttpClient): 共用的HTTP客户端，默认使用utils.http_client.default_client
+            base_urls (dict): 覆盖接口地址，键为tts/asr/token，用于对接本地模拟服务器测试
         """
+        self.API_KEY = key.baidu_api_key
+        self.SECRET_KEY = key.baidu_secret_key
+        base_urls = base_urls or {}
+        self.TTS_URL = base_urls.get('tts', "https://tsn.baidu.com/text2audio")
+        self.ASR_URL = base_urls.get('asr', "https://vop.baidu.com/server_api")
+        self.TOKEN_URL = base_urls.get('token', "https://aip.baidubce.com/oauth/2.0/token")
+        self.http = client or default_client
+        # 令牌有效期30天，按返回的expires_in缓存，不再每个进程只取一次且永不过期
+        self.tokens = TokenCache(self._fetch_token)
+
+    def _fetch_token(self):
         params = {
             "grant_type": "client_credentials", 
             "client_id": self.API_KEY, 
             "client_secret": self.SECRET_KEY
         }
         try:
-            response = requests.post(self.TOKEN_URL, params=params)
-            return response.json().get("access_token")
+            result = self.http.post(self.TOKEN_URL, params=params).json()
+            return result.get("access_token"), float(result.get("expires_in", 0))
         except Exception as e:
             print(f"获取access_token失败: {e}")
-            return None
+            return None, 0
+        
+    def get_access_token(self):
+        """
+        使用 AK，SK 生成鉴权签名（Access Token），有效期内直接返回缓存
+        :return: access_token，或是None(如果错误)
+        """
+        return self.tokens.get()
     
-    def text2audio(self, text, output_file=None, lan='zh', spd=5, pit=5, vol=5, per=1, aue=6):
+    def synthesize(self, text, lan='zh', spd=5, pit=5, vol=5, per=1, aue=6):
         """
-        将文字转换为音频文件（语音合成）
+        语音合成，直接返回音频数据，不落盘
         
         Args:
             text (str): 要转换的文字
-            output_file (str): 输出文件名，如果不指定则使用默认名称
-            lan (str): 语言，默认为中文'zh'
-            spd (int): 语速，取值0-9，默认为5中等语速
-            pit (int): 音调，取值0-9，默认为5中等音调
-            vol (int): 音量，取值0-15，默认为5中等音量
-            per (int): 发音人选择, 0为女声，1为男声，3为情感合成-度逍遥，4为情感合成-度丫丫，默认为1
-            aue (int): 3为mp3格式； 4为pcm-16k；5为pcm-8k；6为wav（内容同pcm-16k），默认为6
+            其余参数同text2audio
             
         Returns:
-            bool: 转换是否成功
+            bytes: 音频数据，失败返回None
         """
-        # 获取token
-        if not self.token:
-            self.token = self.get_access_token()
-            if not self.token:
+        for attempt in range(2):
+            # 获取token
+            token = self.get_access_token()
+            if not token:
                 print("获取token失败")
-                return False
-        
+                return None
+            audio_data, err_no = self._synthesize(token, text, lan, spd, pit, vol, per, aue)
+            if err_no not in TTS_TOKEN_ERRORS:
+                return audio_data
+            # 令牌被服务端判定失效，刷新后重试一次
+            self.tokens.invalidate()
+        return None
+
+    def _synthesize(self, token, text, lan, spd, pit, vol, per, aue):
+        """:return: (音频数据或None, 错误码)"""
         # 构建payload
-        payload = f'tok={self.token}&cuid=wtyiQt5jxuCAgcFwFw7zgZpPmSKvqKun&ctp=1&lan={lan}&spd={spd}&pit={pit}&vol={vol}&per={per}&aue={aue}&tex={text}'
+        payload = f'tok={token}&cuid=wtyiQt5jxuCAgcFwFw7zgZpPmSKvqKun&ctp=1&lan={lan}&spd={spd}&pit={pit}&vol={vol}&per={per}&aue={aue}&tex={text}'
         
         headers = {
             'Content-Type': 'application/x-www-form-urlencoded',
@@ -63,21 +80,50 @@ class BaiduVoice:
         }
         
         try:
-            response = requests.post(self.TTS_URL, headers=headers, data=payload.encode("utf-8"))
+            response = self.http.post(self.TTS_URL, headers=headers, data=payload.encode("utf-8"))
             
             # 检查响应状态
             if response.status_code != 200:
                 print(f"请求失败，状态码: {response.status_code}")
                 print(f"错误信息: {response.text}")
-                return False
+                return None, None
             
             # 检查是否为音频文件
             content_type = response.headers.get('content-type', '')
             if 'audio/' not in content_type:
                 print(f"返回的不是音频文件，content-type: {content_type}")
                 print(f"错误信息: {response.text}")
-                return False
+                try:
+                    return None, response.json().get('err_no')
+                except ValueError:
+                    return None, None
+            return response.content, 0
+            
+        except Exception as e:
+            print(f"语音合成失败: {e}")
+            return None, None
+    
+    def text2audio(self, text, output_file=None, lan='zh', spd=5, pit=5, vol=5, per=1, aue=6):
+        """
+        将文字转换为音频文件（语音合成）
+        
+        Args:
+            text (str): 要转换的文字
+            output_file (str): 输出文件名，如果不指定则使用默认名称
+            lan (str): 语言，默认为中文'zh'
+            spd (int): 语速，取值0-9，默认为5中等语速
+            pit (int): 音调，取值0-9，默认为5中等音调
+            vol (int): 音量，取值0-15，默认为5中等音量
+            per (int): 发音人选择, 0为女声，1为男声，3为情感合成-度逍遥，4为情感合成-度丫丫，默认为1
+            aue (int): 3为mp3格式； 4为pcm-16k；5为pcm-8k；6为wav（内容同pcm-16k），默认为6
             
+        Returns:
+            bool: 转换是否成功
+        """
+        audio_data = self.synthesize(text, lan, spd, pit, vol, per, aue)
+        if audio_data is None:
+            return False
+        try:
             # 确定输出文件名
             if not output_file:
                 # 使用文本前10个字符作为文件名，避免特殊字符
@@ -94,13 +140,13 @@ class BaiduVoice:
             
             # 保存音频文件
             with open(output_file, 'wb') as f:
-                f.write(response.content)
+                f.write(audio_data)
             
             print(f"音频文件已保存: {output_file}")
             return True
             
         except Exception as e:
-            print(f"语音合成失败: {e}")
+            print(f"保存音频文件失败: {e}")
             return False
     
     def audio2text(self, audio_file, format='pcm', rate=16000, channel=1, dev_pid=1537):
@@ -117,36 +163,55 @@ class BaiduVoice:
         Returns:
             str: 识别结果文字，失败返回None
         """
-        # 获取token
-        if not self.token:
-            self.token = self.get_access_token()
-            if not self.token:
-                print("获取token失败")
-                return None
-        
         # 检查音频文件是否存在
         if not os.path.exists(audio_file):
             print(f"音频文件不存在: {audio_file}")
             return None
         
-        try:
-            # 读取音频文件
-            with open(audio_file, 'rb') as f:
-                audio_data = f.read()
-            
-            # 对音频数据进行base64编码
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
+        # 读取音频文件
+        with open(audio_file, 'rb') as f:
+            audio_data = f.read()
+        return self.recognize(audio_data, format, rate, channel, dev_pid)
+    
+    def recognize(self, audio_data, format='pcm', rate=16000, channel=1, dev_pid=1537):
+        """
+        识别内存中的音频数据（语音识别），录音不需要先写成文件
+        
+        Args:
+            audio_data (bytes): 音频数据，pcm格式时为16bit单声道原始采样
+            其余参数同audio2text
             
+        Returns:
+            str: 识别结果文字，失败返回None
+        """
+        # 对音频数据进行base64编码
+        audio_base64 = base64.b64encode(audio_data).decode('utf-8')
+        for attempt in range(2):
+            # 获取token
+            token = self.get_access_token()
+            if not token:
+                print("获取token失败")
+                return None
+            text, err_no = self._recognize(token, audio_base64, len(audio_data), format, rate, channel, dev_pid)
+            if err_no not in ASR_TOKEN_ERRORS:
+                return text
+            # 令牌被服务端判定失效，刷新后重试一次
+            self.tokens.invalidate()
+        return None
+
+    def _recognize(self, token, audio_base64, length, format, rate, channel, dev_pid):
+        """:return: (识别文字或None, 错误码)"""
+        try:
             # 构建请求数据
             payload = {
                 "format": format,
                 "rate": rate,
                 "channel": channel,
                 "cuid": "4m48cWyLk4sSqmMOm8BqwCLgftlQKjn7",
-                "token": self.token,
+                "token": token,
                 "dev_pid": dev_pid,
                 "speech": audio_base64,
-                "len": len(audio_data)
+                "len": length
             }
             
             headers = {
@@ -155,13 +220,13 @@ class BaiduVoice:
             }
             
             # 发送请求
-            response = requests.post(self.ASR_URL, headers=headers, data=json.dumps(payload, ensure_ascii=False))
+            response = self.http.post(self.ASR_URL, headers=headers, data=json.dumps(payload, ensure_ascii=False))
             
             # 检查响应状态
             if response.status_code != 200:
                 print(f"请求失败，状态码: {response.status_code}")
                 print(f"错误信息: {response.text}")
-                return None
+                return None, None
             
             # 解析响应结果
             result = response.json()
@@ -170,16 +235,16 @@ class BaiduVoice:
                 # 识别成功
                 recognized_text = result.get('result', [''])[0]
                 print(f"语音识别成功: {recognized_text}")
-                return recognized_text
+                return recognized_text, 0
             else:
                 # 识别失败
                 error_msg = result.get('err_msg', '未知错误')
                 print(f"语音识别失败: {error_msg}")
-                return None
+                return None, result.get('err_no')
                 
         except Exception as e:
             print(f"语音识别失败: {e}")
-            return None
+            return None, None
 
 
 # 创建全局实例
@@ -206,6 +271,26 @@ def text2audio(text, output_file=None, lan='zh', spd=5, pit=5, vol=5, per=1, aue
     return baidu_voice.text2audio(text, output_file, lan, spd, pit, vol, per, aue)
 
 
+def synthesize(text, lan='zh', spd=5, pit=5, vol=5, per=1, aue=6):
+    """
+    便捷函数：语音合成，返回音频数据（aue=6时为wav）
+    
+    Returns:
+        bytes: 音频数据，失败返回None
+    """
+    return baidu_voice.synthesize(text, lan, spd, pit, vol, per, aue)
+
+
+def recognize(audio_data, format='pcm', rate=16000, channel=1, dev_pid=1537):
+    """
+    便捷函数：识别内存中的音频数据
+    
+    Returns:
+        str: 识别结果文字，失败返回None
+    """
+    return baidu_voice.recognize(audio_data, format, rate, channel, dev_pid)
+
+
 def audio2text(audio_file, format='wav', rate=16000, channel=1, dev_pid=1537):
     """
     便捷函数：将音频文件转换为文字（语音识别）
@@ -1,11 +1,20 @@
-import requests
 import json
 import config.key as key
+from utils.http_client import default_client
+
+# 对话接口的超时 (连接, 读取)：生成长回复可能需要几十秒，读取超时比默认值长
+CHAT_TIMEOUT = (3.05, 60)
 
 class DeepseekChat:
-    def __init__(self):
+    def __init__(self, client=None, url=None):
+        """
+        Args:
+            client (HttpClient): 共用的HTTP客户端，默认使用utils.http_client.default_client
+            url (str): 覆盖接口地址，用于对接本地模拟服务器测试
+        """
         self.API_KEY = key.deepseek_key
-        self.URL = "https://api.deepseek.com/v1/chat/completions"
+        self.URL = url or "https://api.deepseek.com/v1/chat/completions"
+        self.http = client or default_client
         self.headers = {
             "Authorization": f"Bearer {self.API_KEY}",
             "Content-Type": "application/json"
@@ -45,7 +54,7 @@ class DeepseekChat:
                 "max_tokens": max_tokens
             }
             
-            response = requests.post(self.URL, json=data, headers=self.headers)
+            response = self.http.post(self.URL, json=data, headers=self.headers, timeout=CHAT_TIMEOUT)
             
             # 检查响应状态
             if response.status_code != 200:
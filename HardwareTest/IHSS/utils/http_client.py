@@ -0,0 +1,105 @@
+import os
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT = (3.05, 20)  # (连接超时, 读取超时)，单位秒
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class HttpClient:
+    """
+    云端接口共用的HTTP客户端：复用keep-alive连接池，统一超时，
+    连接失败和429/5xx按指数退避自动重试；请求发出后的读取超时/断开不重试，
+    否则大模型和语音识别的POST会被服务端重复处理、重复计费。
+    requests.Session不能跨进程共享，每个进程首次使用时各自创建。
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=3, backoff=0.5, pool_size=4):
+        """
+        :param timeout: 默认超时，(连接, 读取) 或单个秒数
+        :param retries: 最大重试次数
+        :param backoff: 退避系数，第n次重试前等待 backoff * 2^(n-1) 秒
+        :param pool_size: 每个主机保持的连接数
+        """
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None or self._pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    self._session = self._create_session()
+                    self._pid = os.getpid()
+        return self._session
+
+    def _create_session(self):
+        retry = Retry(total=self.retries, connect=self.retries, read=0,
+                      status=self.retries, backoff_factor=self.backoff,
+                      status_forcelist=RETRY_STATUS, allowed_methods=None,
+                      raise_on_status=False, respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+class TokenCache:
+    """
+    访问令牌缓存：按服务端返回的有效期缓存，提前refresh_margin秒刷新；
+    接口报告令牌失效时调用invalidate强制下次重新获取
+    """
+
+    def __init__(self, fetch, refresh_margin=3600):
+        """
+        :param fetch: 获取令牌的函数，返回 (token, 有效期秒数)，失败返回 (None, 0)
+        :param refresh_margin: 提前刷新的时间（秒）
+        """
+        self._fetch = fetch
+        self.refresh_margin = refresh_margin
+        self._token = None
+        self._refresh_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._token is None or time.time() >= self._refresh_at:
+                token, expires_in = self._fetch()
+                if token:
+                    self._token = token
+                    # 有效期很短时（如测试用的令牌）最多提前一半有效期刷新
+                    self._refresh_at = time.time() + expires_in - min(self.refresh_margin, expires_in / 2)
+            return self._token
+
+    def invalidate(self):
+        with self._lock:
+            self._token = None
+            self._refresh_at = 0.0
+
+
+# 进程内共享的默认客户端
+default_client = HttpClient()
@@ -1,6 +1,7 @@
 import sounddevice as sd
 import numpy as np
 import librosa
+from components.audio_ring import PolyphaseResampler
 
 def get_audio(duration=5, samplerate=16000, device=3):
     """
@@ -73,3 +74,44 @@ def get_audio_frame_16k(frame_duration=0.5, device=3):
     else:
         return np.array([])
 
+
+class MicStream:
+    """
+    连续采集的麦克风输入流：sounddevice回调中把每块44.1kHz音频经流式多相重采样后写入16kHz环形缓冲区，
+    块与块之间没有采集间隙；回调报告的溢出次数记录在overflows中
+    """
+
+    def __init__(self, ring, device=3, capture_sr=44100, blocksize=2048):
+        """
+        :param ring: components.audio_ring.AudioRing，写入目标
+        :param device: 音频设备索引
+        :param capture_sr: 设备采集采样率（设备3要求44.1kHz）
+        :param blocksize: 每次回调的采样点数
+        """
+        self.ring = ring
+        self.device = device
+        self.capture_sr = capture_sr
+        self.blocksize = blocksize
+        self.resampler = None if capture_sr == ring.sample_rate else PolyphaseResampler(capture_sr, ring.sample_rate)
+        self.overflows = 0
+        self._stream = None
+
+    def _callback(self, indata, frames, time_info, status):
+        if status.input_overflow:
+            self.overflows += 1
+        audio = indata[:, 0]
+        if self.resampler is not None:
+            audio = self.resampler.process(audio)
+        self.ring.write(audio)
+
+    def start(self):
+        if self._stream is None:
+            self._stream = sd.InputStream(samplerate=self.capture_sr, blocksize=self.blocksize, device=self.device,
+                                          channels=1, dtype='float32', callback=self._callback)
+            self._stream.start()
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
@@ -1,34 +1,21 @@
-import wiringpi
 import time
+from components.gpio import WiringPiBackend
+from components.motor_driver import PINS, MOTOR_PINS, SEQUENCE, STEPS_PER_REV
 
-wiringpi.wiringPiSetup()
-IN1, IN2, IN3, IN4 = 3, 4, 6, 9
-IN5, IN6, IN7, IN8 = 10, 13, 15, 16
-pins = [IN1, IN2, IN3, IN4, IN5, IN6, IN7, IN8]
-motor1 = pins[:4]
-motor2 = pins[4:]
-for pin in pins:
-    wiringpi.pinMode(pin, 1)
-
-# 定义步进电机的步序（2相全步）
-sequence = [
-    [1, 0, 0, 0],
-    [1, 1, 0, 0],
-    [0, 1, 0, 0],
-    [0, 1, 1, 0],
-    [0, 0, 1, 0],
-    [0, 0, 1, 1],
-    [0, 0, 0, 1],
-    [1, 0, 0, 1]
-]
+# 单独调试电机用的阻塞式接口，主程序通过components/motor_driver.py中的驱动进程控制电机
+gpio = WiringPiBackend()
+gpio.setup(PINS)
+pins = PINS
+motor1, motor2 = MOTOR_PINS
+sequence = SEQUENCE
 
 def rotate(motor_pins, angle):
     seq = sequence if angle >= 0 else sequence[::-1]
-    step_num = int(abs(angle) / 360 * 4096)
+    step_num = int(abs(angle) / 360 * STEPS_PER_REV)
     for i in range(step_num):
         step = seq[i % 8]
         for _pin, value in zip(motor_pins, step):
-            wiringpi.digitalWrite(_pin, value)
+            gpio.write(_pin, value)
         time.sleep(0.001)
 
 # 新增：电机休眠与唤醒函数
@@ -38,7 +25,7 @@ def sleep_motor():
     关闭所有电机引脚，进入低功耗状态
     """
     for pin in pins:
-        wiringpi.digitalWrite(pin, 0)
+        gpio.write(pin, 0)
 
 # 主函数， 控制步进电机
 def main():
@@ -53,7 +40,7 @@ def main():
         rotate(motor2, -angle2) # 反向旋转第二个电机
     # 关闭所有电机控制引脚
     for _pin in pins:
-        wiringpi.digitalWrite(_pin, 0)
+        gpio.write(_pin, 0)
 
 if __name__ == "__main__":
-    rotate(motor1, 350)
\ No newline at end of file
+    rotate(motor1, 350)
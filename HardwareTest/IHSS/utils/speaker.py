@@ -1,57 +1,55 @@
-import pyaudio
-import wave
-import numpy as np
+import glob
 import threading
-import queue
+from components.audio_player import AudioPlayer, OUTPUTS
+
+# 输出后端，见components/audio_player.OUTPUTS；'null'不打开声卡，用于回放测试和没有扬声器的开发机
+_backend = 'pyaudio'
+# 当前进程使用的播放器；由init_player创建并在独立进程中运行，未创建时首次播放在本进程的后台线程中启动
+_player = None
+
+def use_backend(name):
+    global _backend
+    if name not in OUTPUTS:
+        raise KeyError(f"未知的音频输出后端: {name}")
+    _backend = name
+
+def init_player(device_index=0, preload='assets/*.wav', **kwargs):
+    """
+    创建播放器，调用方随后用Process(target=player.run)启动播放进程；
+    须在fork其他进程之前调用，各进程的播放请求才会进入同一个播放队列
+    :param preload: 启动时预先解码的wav文件（glob模式）
+    :param kwargs: 传给AudioPlayer的其他参数，如latency_hist
+    """
+    global _player
+    _player = AudioPlayer(_backend, device_index, preload=sorted(glob.glob(preload)), **kwargs)
+    return _player
 
-# 全局音频播放队列
-_audio_queue = queue.Queue()
+def _ensure_player():
+    if _player is None:
+        threading.Thread(target=init_player().run, daemon=True).start()
+    return _player
 
-# 后台音频播放线程
-_def_player_started = False
+def stats():
+    return _player.stats() if _player is not None else {'backend': _backend, 'played': 0, 'seconds': 0.0}
 
-def _audio_player_worker():
-    while True:
-        wav_file, volume, device_index = _audio_queue.get()
-        try:
-            _play_wav_file_sync(wav_file, volume, device_index)
-        except Exception as e:
-            print(f"[音频播放失败] {e}")
-        _audio_queue.task_done()
+# 队列播放接口；device_index保留兼容旧接口，输出设备在init_player时指定
 
-def _ensure_player():
-    global _def_player_started
-    if not _def_player_started:
-        threading.Thread(target=_audio_player_worker, daemon=True).start()
-        _def_player_started = True
-
-# 原始同步播放函数
-def _play_wav_file_sync(wav_file, volume=1.0, device_index=0):
-    with wave.open(wav_file, 'rb') as wf:
-        p = pyaudio.PyAudio()
-        stream = p.open(format=p.get_format_from_width(wf.getsampwidth()),
-                        channels=wf.getnchannels(),
-                        rate=wf.getframerate(),
-                        output=True,
-                        output_device_index=device_index)
-        data = wf.readframes(1024)
-        while data:
-            audio_data = np.frombuffer(data, dtype=np.int16)
-            audio_data = (audio_data * volume).astype(np.int16)
-            stream.write(audio_data.tobytes())
-            data = wf.readframes(1024)
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
-
-# 队列播放接口
-
-def play_wav_file_queued(wav_file, volume=1.0, device_index=0):
-    _ensure_player()
-    _audio_queue.put((wav_file, volume, device_index))
+def play_wav_file_queued(wav_file, volume=1.0, device_index=0, channel='prompt'):
+    _ensure_player().play(wav_file, volume, channel)
+
+def play_wav_bytes_queued(wav_data, volume=1.0, device_index=0, channel='prompt'):
+    """播放内存中的wav数据（如TTS结果），不写临时文件"""
+    _ensure_player().play(bytes(wav_data), volume, channel)
+
+def play_alarm(wav_file, volume=1.0):
+    """报警音：不排在提示音之后，立即叠加播放并压低正在播放的提示音"""
+    _ensure_player().play(wav_file, volume, 'alarm')
+
+def is_playing():
+    """还有未播放完的音频"""
+    return _player is not None and _player.is_playing()
 
 # 兼容原有异步接口
 
 def play_wav_file_async(wav_file, volume=1.0, device_index=0):
     play_wav_file_queued(wav_file, volume, device_index)
-
@@ -0,0 +1,39 @@
+class WiringPiBackend:
+    """通过wiringPi直接写GPIO"""
+    step_delay = 0.001  # 阻塞式转动时每步的等待时间（秒），原实现每步sleep 1ms
+
+    def __init__(self):
+        import wiringpi
+        wiringpi.wiringPiSetup()
+        self._gpio = wiringpi
+
+    def setup(self, pins):
+        for pin in pins:
+            self._gpio.pinMode(pin, 1)
+
+    def write(self, pin, value):
+        self._gpio.digitalWrite(pin, value)
+
+
+class SimulatedBackend:
+    """不访问硬件，只记录引脚电平和写入次数，用于测试和没有GPIO的开发机"""
+    step_delay = 0.0  # 不需要等待电机转动
+
+    def __init__(self):
+        self.levels = {}
+        self.writes = 0
+
+    def setup(self, pins):
+        for pin in pins:
+            self.levels[pin] = 0
+
+    def write(self, pin, value):
+        self.levels[pin] = value
+        self.writes += 1
+
+
+# 后端名称 -> GPIO类，电机驱动与阻塞式电机接口共用
+BACKENDS = {
+    'wiringpi': WiringPiBackend,
+    'sim': SimulatedBackend,
+}
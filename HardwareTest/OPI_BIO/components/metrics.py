@@ -0,0 +1,313 @@
+import os
+import time
+import itertools
+import threading
+from bisect import bisect_left
+import numpy as np
+from multiprocessing import shared_memory
+
+# 默认耗时分桶（秒），覆盖单帧处理到模型推理
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# 网络请求类（语音识别、大模型）的耗时分桶（秒）
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0)
+
+_CLK_TCK = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def counter(name, help, labels=None):
+    """
+    :param name: 指标名称（不含前缀），计数器以_total结尾
+    :param help: 说明文字
+    :param labels: {标签名: (取值, ...)}，每种取值组合一条序列
+    """
+    return ('counter', name, help, labels or {}, ())
+
+
+def gauge(name, help, labels=None):
+    return ('gauge', name, help, labels or {}, ())
+
+
+def histogram(name, help, labels=None, buckets=LATENCY_BUCKETS):
+    """:param buckets: 各桶上界（升序），+Inf桶自动添加"""
+    return ('histogram', name, help, labels or {}, tuple(buckets))
+
+
+def _label_str(labels):
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels.items()) + '}' if labels else ''
+
+
+def _fmt(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _series_key(name, labels):
+    return name + _label_str(labels)
+
+
+class Counter:
+    __slots__ = ('_arr', '_i')
+
+    def __init__(self, arr, index):
+        self._arr = arr
+        self._i = index
+
+    def inc(self, n=1):
+        self._arr[self._i] += n
+
+
+class Gauge(Counter):
+    __slots__ = ()
+
+    def set(self, value):
+        self._arr[self._i] = value
+
+
+class Histogram:
+    """分桶计数（不累计）+ 总和 + 次数，渲染时再转成Prometheus的累计桶"""
+    __slots__ = ('_arr', '_i', '_bounds', '_sum', '_count')
+
+    def __init__(self, arr, index, bounds):
+        self._arr = arr
+        self._i = index
+        self._bounds = bounds
+        self._sum = index + len(bounds) + 1
+        self._count = self._sum + 1
+
+    def observe(self, value):
+        arr = self._arr
+        arr[self._i + bisect_left(self._bounds, value)] += 1
+        arr[self._sum] += value
+        arr[self._count] += 1
+
+    def time(self):
+        """with hist.time(): ... 记录代码块耗时（秒）"""
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ('_hist', '_st')
+
+    def __init__(self, hist):
+        self._hist = hist
+
+    def __enter__(self):
+        self._st = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._hist.observe(time.perf_counter() - self._st)
+        return False
+
+
+class SharedMetrics:
+    """
+    共享内存指标：计数器、仪表和直方图都是一块共享float64数组中的固定槽位，
+    各进程取得句柄后直接在槽位上累加，不加锁、不经过队列，单次更新约1微秒；
+    Web进程读取整块数组的拷贝，渲染为Prometheus文本或汇总给网页的性能面板。
+    每条序列约定只由一个进程（线程）更新，多个写者同时累加可能丢失个别计数。
+    """
+
+    def __init__(self, prefix, specs, name=None, create=True):
+        """
+        :param prefix: 指标名称前缀，如'ihss'
+        :param specs: counter()/gauge()/histogram()返回的指标定义列表
+        :param name: 共享内存名称，create=False时必须指定
+        :param create: True创建新的共享内存，False连接已有的共享内存
+        """
+        self.prefix = prefix
+        self.specs = list(specs)
+        self._create = create
+        # 序列键（名称+标签）-> (类型, 起始槽位, 分桶)
+        self._layout = {}
+        self._families = []
+        size = 0
+        for kind, metric, help, labels, buckets in self.specs:
+            series = []
+            keys = list(labels)
+            for values in itertools.product(*labels.values()) if keys else [()]:
+                label_dict = dict(zip(keys, values))
+                self._layout[_series_key(metric, label_dict)] = (kind, size, buckets)
+                series.append((label_dict, size))
+                size += len(buckets) + 3 if kind == 'histogram' else 1
+            self._families.append((kind, metric, help, buckets, series))
+        self.size = size
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=max(size, 1) * 8)
+        self._arr = np.ndarray((size,), dtype=np.float64, buffer=self.shm.buf)
+        # 句柄通过memoryview更新单个槽位，比numpy标量索引快约一半
+        self._slots = self.shm.buf.cast('d')
+        if create:
+            self._arr[:] = 0
+
+    def __reduce__(self):
+        return self.__class__, (self.prefix, self.specs, self.shm.name, False)
+
+    def _slot(self, metric, labels, kind):
+        key = _series_key(metric, labels)
+        if key not in self._layout or self._layout[key][0] != kind:
+            raise KeyError(f"未定义的{kind}指标: {key}")
+        return self._layout[key]
+
+    # ----------------- 写者接口 -----------------
+    def counter(self, metric, **labels):
+        """:return: Counter句柄，在进程启动时取一次，之后直接inc()"""
+        return Counter(self._slots, self._slot(metric, labels, 'counter')[1])
+
+    def gauge(self, metric, **labels):
+        return Gauge(self._slots, self._slot(metric, labels, 'gauge')[1])
+
+    def histogram(self, metric, **labels):
+        _, index, buckets = self._slot(metric, labels, 'histogram')
+        return Histogram(self._slots, index, buckets)
+
+    # ----------------- 读者接口 -----------------
+    def snapshot(self):
+        """:return: 整块指标数组的拷贝"""
+        return self._arr.copy()
+
+    def render(self, snapshot=None):
+        """:return: Prometheus文本格式"""
+        arr = self.snapshot() if snapshot is None else snapshot
+        lines = []
+        for kind, metric, help, buckets, series in self._families:
+            full = f'{self.prefix}_{metric}'
+            lines.append(f'# HELP {full} {help}')
+            lines.append(f'# TYPE {full} {kind}')
+            for labels, index in series:
+                if kind != 'histogram':
+                    lines.append(f'{full}{_label_str(labels)} {_fmt(arr[index])}')
+                    continue
+                cumulative = np.cumsum(arr[index:index + len(buckets) + 1])
+                for bound, value in zip(buckets + ('+Inf',), cumulative):
+                    lines.append(f'{full}_bucket{_label_str({**labels, "le": bound})} {_fmt(value)}')
+                lines.append(f'{full}_sum{_label_str(labels)} {_fmt(arr[index + len(buckets) + 1])}')
+                lines.append(f'{full}_count{_label_str(labels)} {_fmt(arr[index + len(buckets) + 2])}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self, prev, cur, dt):
+        """
+        两次快照之间的汇总，供性能面板显示
+        :param prev: 上一次snapshot()，None表示从启动开始
+        :param cur: 本次snapshot()
+        :param dt: 两次快照的时间间隔（秒）
+        :return: {序列键: 值}；计数器为每秒速率，仪表为当前值，
+                 直方图为 {'rate': 每秒次数, 'mean_ms': 平均耗时, 'p95_ms': 95分位耗时（按分桶估计）}
+        """
+        delta = cur - prev if prev is not None else cur
+        dt = max(dt, 1e-9)
+        out = {}
+        for kind, metric, _, buckets, series in self._families:
+            for labels, index in series:
+                key = _series_key(metric, labels)
+                if kind == 'counter':
+                    out[key] = round(float(delta[index]) / dt, 2)
+                elif kind == 'gauge':
+                    out[key] = float(cur[index])
+                else:
+                    counts = delta[index:index + len(buckets) + 1]
+                    n = float(delta[index + len(buckets) + 2])
+                    mean = float(delta[index + len(buckets) + 1]) / n * 1000 if n else None
+                    out[key] = {'rate': round(n / dt, 2),
+                                'mean_ms': round(mean, 2) if mean is not None else None,
+                                'p95_ms': _quantile_ms(counts, buckets, n, 0.95)}
+        return out
+
+    def close(self):
+        # 先释放视图再关闭共享内存，之后已取得的句柄不再可用
+        self._arr = None
+        self._slots.release()
+        self.shm.close()
+
+    def unlink(self):
+        if self._create:
+            self.shm.unlink()
+
+
+def _quantile_ms(counts, buckets, n, q):
+    """在分桶内线性插值估计分位数，落在+Inf桶时返回最后一个上界"""
+    if not n:
+        return None
+    target = q * n
+    cumulative = 0.0
+    lower = 0.0
+    for count, upper in zip(counts, buckets):
+        if cumulative + count >= target:
+            frac = (target - cumulative) / count if count else 0.0
+            return round((lower + (upper - lower) * frac) * 1000, 2)
+        cumulative += count
+        lower = upper
+    return round(buckets[-1] * 1000, 2)
+
+
+def format_samples(name, kind, help, samples):
+    """
+    把Web进程中临时采集的值（如帧读者丢帧数、队列长度）格式化为Prometheus文本
+    :param name: 完整指标名称
+    :param kind: 'counter'或'gauge'
+    :param samples: [(标签字典, 值), ...]
+    """
+    lines = [f'# HELP {name} {help}', f'# TYPE {name} {kind}']
+    lines += [f'{name}{_label_str(labels)} {_fmt(value)}' for labels, value in samples]
+    return '\n'.join(lines) + '\n'
+
+
+def process_stats(pids):
+    """
+    从/proc读取各进程的CPU时间与常驻内存，不需要被监控进程配合，不在热路径上产生开销
+    :param pids: {进程名: pid}
+    :return: {进程名: (CPU秒数, RSS字节数)}，读不到的进程（已退出或非Linux）被跳过
+    """
+    stats = {}
+    for name, pid in pids.items():
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                # 进程名可能含空格，从最后一个右括号之后开始按空格切分
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{pid}/statm') as f:
+                rss_pages = int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        stats[name] = ((int(fields[11]) + int(fields[12])) / _CLK_TCK, rss_pages * _PAGE_SIZE)
+    return stats
+
+
+class PerfWindow:
+    """
+    Web进程中的性能面板数据：每次调用与上一次快照做差，得到区间内的速率、耗时和各进程CPU占用。
+    Flask以多线程处理请求，多个页面同时轮询时由锁保证快照按顺序做差。
+    """
+
+    def __init__(self, metrics, min_interval=1.0):
+        """
+        :param metrics: SharedMetrics
+        :param min_interval: 两次计算的最小间隔（秒），间隔内重复请求返回上一次结果
+        """
+        self.metrics = metrics
+        self.min_interval = min_interval
+        self._prev = None
+        self._prev_cpu = {}
+        self._prev_ts = time.time()
+        self._result = None
+        self._lock = threading.Lock()
+
+    def update(self, pids):
+        """
+        :param pids: {进程名: pid}
+        :return: {'metrics': SharedMetrics.summary()结果, 'processes': {进程名: {'cpu': 百分比, 'rss_mb': 内存}}}
+        """
+        with self._lock:
+            now = time.time()
+            if self._result is not None and now - self._prev_ts < self.min_interval:
+                return self._result
+            cur = self.metrics.snapshot()
+            dt = now - self._prev_ts
+            processes = {}
+            for name, (cpu, rss) in process_stats(pids).items():
+                prev_cpu = self._prev_cpu.get(name)
+                processes[name] = {'cpu': round((cpu - prev_cpu) / dt * 100, 1) if prev_cpu is not None else None,
+                                   'rss_mb': round(rss / 1048576, 1)}
+                self._prev_cpu[name] = cpu
+            self._result = {'metrics': self.metrics.summary(self._prev, cur, dt), 'processes': processes}
+            self._prev, self._prev_ts = cur, now
+            return self._result
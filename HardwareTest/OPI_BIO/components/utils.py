@@ -46,33 +46,27 @@ def distance2bbox(points, distance, max_shape=None):
     x2 = points[:, 0] + distance[:, 2]
     y2 = points[:, 1] + distance[:, 3]
     if max_shape is not None:
-        x1 = x1.clamp(min=0, max=max_shape[1])
-        y1 = y1.clamp(min=0, max=max_shape[0])
-        x2 = x2.clamp(min=0, max=max_shape[1])
-        y2 = y2.clamp(min=0, max=max_shape[0])
+        x1 = x1.clip(0, max_shape[1])
+        y1 = y1.clip(0, max_shape[0])
+        x2 = x2.clip(0, max_shape[1])
+        y2 = y2.clip(0, max_shape[0])
     return np.stack([x1, y1, x2, y2], axis=-1)
 
 def distance2kps(points, distance, max_shape=None):
-    """Decode distance prediction to bounding box.
+    """Decode distance prediction to keypoints.
     Args:
-        points (Tensor): Shape (n, 2), [x, y].
-        distance (Tensor): Distance from the given point to 4
-            boundaries (left, top, right, bottom).
+        points (ndarray): Shape (n, 2), [x, y].
+        distance (ndarray): Shape (n, 2k), offsets of k keypoints from the point.
         max_shape (tuple): Shape of the image.
 
     Returns:
-        Tensor: Decoded bboxes.
+        ndarray: Decoded keypoints, shape (n, 2k).
     """
-    preds = []
-    for i in range(0, distance.shape[1], 2):
-        px = points[:, i % 2] + distance[:, i]
-        py = points[:, i % 2 + 1] + distance[:, i + 1]
-        if max_shape is not None:
-            px = px.clamp(min=0, max=max_shape[1])
-            py = py.clamp(min=0, max=max_shape[0])
-        preds.append(px)
-        preds.append(py)
-    return np.stack(preds, axis=-1)
+    preds = (distance.reshape(distance.shape[0], -1, 2) + points[:, None, :]).reshape(distance.shape[0], -1)
+    if max_shape is not None:
+        preds[:, 0::2] = preds[:, 0::2].clip(0, max_shape[1])
+        preds[:, 1::2] = preds[:, 1::2].clip(0, max_shape[0])
+    return preds
 
 def nms(dets, thresh=0.5):
     x1 = dets[:, 0]
@@ -103,88 +97,128 @@ def nms(dets, thresh=0.5):
         order = order[inds + 1]
     return keep
 
-def decodeFaceBoxs(net_outs, input_height, input_width, threshold=0.5):
-    scores_list = []
-    bboxes_list = []
-    kpss_list = []
-    center_cache = {}
-    num_anchors = 2
-    fmc = 3
-    for idx, stride in enumerate(ai_cfg.FEAT_STRIDE_FPN):
-        scores = net_outs[idx]
-        bbox_preds = net_outs[idx + fmc]
-        bbox_preds = bbox_preds * stride
-
-        kps_preds = net_outs[idx + fmc * 2] * stride
-
-        height = input_height // stride
-        width = input_width // stride
-
-        key = (height, width, stride)
-        if key in center_cache:
-            anchor_centers = center_cache[key]
-        else:
-            anchor_centers = np.stack(np.mgrid[:height, :width][::-1], axis=-1).astype(np.float32)
-            anchor_centers = (anchor_centers * stride).reshape((-1, 2))
-
-            anchor_centers = np.stack([anchor_centers] * num_anchors, axis=1).reshape((-1, 2))
-            if len(center_cache) < 100:
-                center_cache[key] = anchor_centers
-
-        # 提取boxs
-        pos_inds = np.where(scores >= threshold)[0]
-        bboxes = distance2bbox(anchor_centers, bbox_preds)
-        pos_scores = scores[pos_inds]
-        pos_bboxes = bboxes[pos_inds]
-        scores_list.append(pos_scores)
-        bboxes_list.append(pos_bboxes)
-
-        # 提取关键点
-        kpss = distance2kps(anchor_centers, kps_preds)
-        kpss = kpss.reshape((kpss.shape[0], -1, 2))
-        pos_kpss = kpss[pos_inds]
-        kpss_list.append(pos_kpss)
-    return scores_list, bboxes_list, kpss_list
+def nms_sorted(dets, thresh=0.5):
+    """
+    与nms结果相同（面积按+1像素计算），输入已按分数降序排列，省去排序；
+    循环次数等于保留框数，每轮对剩余候选框做向量化IoU
+    :param dets: (N, 5) [x1, y1, x2, y2, score]
+    :return: 保留下标数组
+    """
+    x1, y1, x2, y2 = dets[:, 0], dets[:, 1], dets[:, 2], dets[:, 3]
+    areas = (x2 - x1 + 1) * (y2 - y1 + 1)
+    order = np.arange(len(dets))
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]) + 1)
+        h = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]) + 1)
+        inter = w * h
+        order = rest[inter / (areas[i] + areas[rest] - inter) <= thresh]
+    return np.asarray(keep, dtype=np.int64)
+
+
+class ScrfdPostprocessor:
+    """
+    SCRFD输出的向量化后处理，按输入尺寸创建一次：
+    锚点中心预先算好 -> 先按阈值筛选 -> 只解码保留下来的框和关键点 -> NMS -> 写入预分配的输出数组
+    """
+
+    def __init__(self, input_size=ai_cfg.INPUT_SIZE, threshold=ai_cfg.THRESHOLD, nms_thresh=0.5,
+                 strides=ai_cfg.FEAT_STRIDE_FPN, num_anchors=2, max_faces=256, max_nms=2000):
+        """
+        :param input_size: 模型输入尺寸 (h, w)
+        :param threshold: 默认人脸分数阈值
+        :param nms_thresh: NMS的IoU阈值
+        :param strides: 各输出层的步长
+        :param num_anchors: 每个位置的锚点数
+        :param max_faces: 最多返回的人脸数，即预分配输出的行数
+        :param max_nms: 进入NMS的最多候选框数
+        """
+        self.input_size = tuple(input_size)
+        self.threshold = threshold
+        self.nms_thresh = nms_thresh
+        self.strides = list(strides)
+        self.max_nms = max_nms
+        self.centers = []
+        for stride in self.strides:
+            height, width = self.input_size[0] // stride, self.input_size[1] // stride
+            centers = np.stack(np.mgrid[:height, :width][::-1], axis=-1).astype(np.float32) * stride
+            self.centers.append(np.repeat(centers.reshape(-1, 2), num_anchors, axis=0))
+        self._det = np.zeros((max_faces, 5), dtype=np.float32)
+        self._kpss = np.zeros((max_faces, 5, 2), dtype=np.float32)
+
+    def __call__(self, net_outs, img_shape, threshold=None, max_num=0, metric='default'):
+        """
+        :param net_outs: 模型输出，依次为各层分数、框距离、关键点距离
+        :param img_shape: 原图形状 (h, w, ...)
+        :param threshold: 覆盖默认分数阈值
+        :param max_num: 大于0时按面积和居中程度最多保留max_num个
+        :param metric: 'max'只按面积，'default'面积减去偏离中心的惩罚
+        :return: det (M, 5) [x1, y1, x2, y2, score], kpss (M, 5, 2)，原图坐标；
+                 返回的是预分配数组的视图，下一次调用会被覆盖，需要保留时请拷贝
+        """
+        threshold = self.threshold if threshold is None else threshold
+        fmc = len(self.strides)
+        det_scale = self.input_size[0] / img_shape[1]
+        dets, levels, anchors = [], [], []
+        for idx, stride in enumerate(self.strides):
+            scores = net_outs[idx].reshape(-1)
+            pos = np.flatnonzero(scores >= threshold)
+            if pos.size == 0:
+                continue
+            centers = self.centers[idx][pos]
+            dist = net_outs[idx + fmc].reshape(-1, 4)[pos] * stride
+            det = np.empty((pos.size, 5), dtype=np.float32)
+            det[:, :2] = centers - dist[:, :2]
+            det[:, 2:4] = centers + dist[:, 2:]
+            det[:, 4] = scores[pos]
+            dets.append(det)
+            levels.append(np.full(pos.size, idx, dtype=np.int64))
+            anchors.append(pos)
+        if not dets:
+            return self._det[:0], self._kpss[:0]
+        # 记录每个候选框来自哪一层的哪个锚点，关键点留到NMS之后只对保留的框解码
+        det = np.concatenate(dets)
+        level = np.concatenate(levels)
+        anchor = np.concatenate(anchors)
+
+        order = np.argsort(-det[:, 4])[:self.max_nms]
+        det = det[order]
+        det[:, :4] /= det_scale
+        keep = nms_sorted(det, self.nms_thresh)
+        det, level, anchor = det[keep], level[order[keep]], anchor[order[keep]]
+        kps = np.empty((len(det), 5, 2), dtype=np.float32)
+        for idx in np.unique(level):
+            stride = self.strides[idx]
+            mask = level == idx
+            pos = anchor[mask]
+            kps[mask] = (net_outs[idx + fmc * 2].reshape(-1, 5, 2)[pos] * stride
+                         + self.centers[idx][pos][:, None, :]) / det_scale
+
+        if max_num > 0 and det.shape[0] > max_num:
+            area = (det[:, 2] - det[:, 0]) * (det[:, 3] - det[:, 1])
+            offset_x = (det[:, 0] + det[:, 2]) / 2 - img_shape[1] // 2
+            offset_y = (det[:, 1] + det[:, 3]) / 2 - img_shape[0] // 2
+            values = area if metric == 'max' else area - (offset_x ** 2 + offset_y ** 2) * 2.0
+            bindex = np.argsort(values)[::-1][:max_num]
+            det, kps = det[bindex], kps[bindex]
+
+        n = min(len(det), len(self._det))
+        self._det[:n] = det[:n]
+        self._kpss[:n] = kps[:n]
+        return self._det[:n], self._kpss[:n]
+
+
+# 按输入尺寸缓存的后处理器，供getFaceBoxs使用
+_scrfd_postprocessors = {}
 
 # 检测人脸并返回人脸边界框（bounding boxes）和关键点（keypoints）
 def getFaceBoxs(img, net_outs, threshold=ai_cfg.THRESHOLD,  input_size=None, max_num=0, metric='default'):
-    scores_list, bboxes_list, kpss_list = decodeFaceBoxs(net_outs, input_height=input_size[0],
-                                                         input_width=input_size[1], threshold=threshold)
-    det_scale = input_size[0] / img.shape[1]
-
-    scores = np.vstack(scores_list)
-    scores_ravel = scores.ravel()
-    order = scores_ravel.argsort()[::-1]
-    bboxes = np.vstack(bboxes_list) / det_scale
-
-    kpss = np.vstack(kpss_list) / det_scale
-    pre_det = np.hstack((bboxes, scores)).astype(np.float32, copy=False)
-    pre_det = pre_det[order, :]
-    keep = nms(pre_det)
-    det = pre_det[keep, :]
-    buf_boxes = []
-
-    kpss = kpss[order, :, :]
-    kpss = kpss[keep, :, :]
-
-    if max_num > 0 and det.shape[0] > max_num:
-        area = (det[:, 2] - det[:, 0]) * (det[:, 3] -
-                                          det[:, 1])
-        img_center = img.shape[0] // 2, img.shape[1] // 2
-        offsets = np.vstack([
-            (det[:, 0] + det[:, 2]) / 2 - img_center[1],
-            (det[:, 1] + det[:, 3]) / 2 - img_center[0]
-        ])
-        offset_dist_squared = np.sum(np.power(offsets, 2.0), 0)
-        if metric == 'max':
-            values = area
-        else:
-            values = area - offset_dist_squared * 2.0  # some extra weight on the centering
-        bindex = np.argsort(
-            values)[::-1]  # some extra weight on the centering
-        bindex = bindex[0:max_num]
-        det = det[bindex, :]
-        if kpss is not None:
-            kpss = kpss[bindex, :]
-    buf_boxes = det
-    return buf_boxes, kpss
+    input_size = tuple(input_size or ai_cfg.INPUT_SIZE)
+    post = _scrfd_postprocessors.get(input_size)
+    if post is None:
+        post = _scrfd_postprocessors[input_size] = ScrfdPostprocessor(input_size)
+    det, kpss = post(net_outs, img.shape, threshold=threshold, max_num=max_num, metric=metric)
+    return det.copy(), kpss.copy()
@@ -8,8 +8,8 @@ import time
 FACE_DET_PATH = "models/scrfd.onnx"
 
 class FaceDetectRec(object):
-    def __init__(self, face_det_path=FACE_DET_PATH):
-        self.onnx_run = OnnxRun(model_path=face_det_path)
+    def __init__(self, face_det_path=FACE_DET_PATH, threads=None):
+        self.onnx_run = OnnxRun(model_path=face_det_path, threads=threads)
         self.predictions = []
 
     def imgPreprocessing(self, img):
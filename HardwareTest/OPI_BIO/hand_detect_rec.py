@@ -1,86 +1,196 @@
-import onnxruntime
-import cv2
+from components.onnx_infer import create_session
 import numpy as np
+import cv2
 import time
 
-def draw_bd_handpose(img_, hand_, x, y):
-    thick = 3
-    colors = [(0, 215, 255), (255,115,55), (5,255,55), (25,15,255), (225,15,55)]
-
-    cv2.line(img_, (int(hand_['0']['x']+x), int(hand_['0']['y']+y)),(int(hand_['1']['x']+x), int(hand_['1']['y']+y)), colors[0], thick, cv2.LINE_AA)
-    cv2.line(img_, (int(hand_['1']['x']+x), int(hand_['1']['y']+y)),(int(hand_['2']['x']+x), int(hand_['2']['y']+y)), colors[0], thick, cv2.LINE_AA)
-    cv2.line(img_, (int(hand_['2']['x']+x), int(hand_['2']['y']+y)),(int(hand_['3']['x']+x), int(hand_['3']['y']+y)), colors[0], thick, cv2.LINE_AA)
-    cv2.line(img_, (int(hand_['3']['x']+x), int(hand_['3']['y']+y)),(int(hand_['4']['x']+x), int(hand_['4']['y']+y)), colors[0], thick, cv2.LINE_AA)
-
-    cv2.line(img_, (int(hand_['0']['x']+x), int(hand_['0']['y']+y)),(int(hand_['5']['x']+x), int(hand_['5']['y']+y)), colors[1], thick, cv2.LINE_AA)
-    cv2.line(img_, (int(hand_['5']['x']+x), int(hand_['5']['y']+y)),(int(hand_['6']['x']+x), int(hand_['6']['y']+y)), colors[1], thick, cv2.LINE_AA)
-    cv2.line(img_, (int(hand_['6']['x']+x), int(hand_['6']['y']+y)),(int(hand_['7']['x']+x), int(hand_['7']['y']+y)), colors[1], thick, cv2.LINE_AA)
-    cv2.line(img_, (int(hand_['7']['x']+x), int(hand_['7']['y']+y)),(int(hand_['8']['x']+x), int(hand_['8']['y']+y)), colors[1], thick, cv2.LINE_AA)
-
-    cv2.line(img_, (int(hand_['0']['x']+x), int(hand_['0']['y']+y)),(int(hand_['9']['x']+x), int(hand_['9']['y']+y)), colors[2], thick, cv2.LINE_AA)
-    cv2.line(img_, (int(hand_['9']['x']+x), int(hand_['9']['y']+y)),(int(hand_['10']['x']+x), int(hand_['10']['y']+y)), colors[2], thick, cv2.LINE_AA)
-    cv2.line(img_, (int(hand_['10']['x']+x), int(hand_['10']['y']+y)),(int(hand_['11']['x']+x), int(hand_['11']['y']+y)), colors[2], thick, cv2.LINE_AA)
-    cv2.line(img_, (int(hand_['11']['x']+x), int(hand_['11']['y']+y)),(int(hand_['12']['x']+x), int(hand_['12']['y']+y)), colors[2], thick, cv2.LINE_AA)
-
-    cv2.line(img_, (int(hand_['0']['x']+x), int(hand_['0']['y']+y)),(int(hand_['13']['x']+x), int(hand_['13']['y']+y)), colors[3], thick, cv2.LINE_AA)
-    cv2.line(img_, (int(hand_['13']['x']+x), int(hand_['13']['y']+y)),(int(hand_['14']['x']+x), int(hand_['14']['y']+y)), colors[3], thick, cv2.LINE_AA)
-    cv2.line(img_, (int(hand_['14']['x']+x), int(hand_['14']['y']+y)),(int(hand_['15']['x']+x), int(hand_['15']['y']+y)), colors[3], thick, cv2.LINE_AA)
-    cv2.line(img_, (int(hand_['15']['x']+x), int(hand_['15']['y']+y)),(int(hand_['16']['x']+x), int(hand_['16']['y']+y)), colors[3], thick, cv2.LINE_AA)
-
-    cv2.line(img_, (int(hand_['0']['x']+x), int(hand_['0']['y']+y)),(int(hand_['17']['x']+x), int(hand_['17']['y']+y)), colors[4], thick, cv2.LINE_AA)
-    cv2.line(img_, (int(hand_['17']['x']+x), int(hand_['17']['y']+y)),(int(hand_['18']['x']+x), int(hand_['18']['y']+y)), colors[4], thick, cv2.LINE_AA)
-    cv2.line(img_, (int(hand_['18']['x']+x), int(hand_['18']['y']+y)),(int(hand_['19']['x']+x), int(hand_['19']['y']+y)), colors[4], thick, cv2.LINE_AA)
-    cv2.line(img_, (int(hand_['19']['x']+x), int(hand_['19']['y']+y)),(int(hand_['20']['x']+x), int(hand_['20']['y']+y)), colors[4], thick, cv2.LINE_AA)
-
-session = onnxruntime.InferenceSession("./models/hand_shufflenetv2.onnx",providers=['CUDAExecutionProvider', 'CPUExecutionProvider'])
-ort_inputs = session.get_inputs()[0].name
-
-cap = cv2.VideoCapture(0)
-
-while True:
-    ret, frame = cap.read()
-
-    img_width = frame.shape[1]
-    img_height = frame.shape[0]
-
-    # 输入图片预处理
-    img_ = cv2.resize(frame, (256, 256),
-                      interpolation=cv2.INTER_CUBIC)
-    img_ = img_.astype(np.float32)
-    img_ = (img_ - 128.) / 256.
-
-    img_ = np.transpose(img_, [2, 0, 1])
-    img_ = np.expand_dims(img_, axis=0)
-    img_ = img_.astype(np.float32)
-
-    s = time.time()
-    output = session.run(None, {ort_inputs: img_})
-    print('onnx Infer:{} ms.'.format((time.time() - s) * 1000))
-
-    output = np.squeeze(output)
-
-    pts_hand = {}  # 构建关键点连线可视化结构
-    for i in range(int(output.shape[0] / 2)):
-        x = (output[i * 2 + 0] * float(img_width))
-        y = (output[i * 2 + 1] * float(img_height))
-
-        pts_hand[str(i)] = {}
-        pts_hand[str(i)] = {
-            "x": x,
-            "y": y,
-        }
-
-    draw_bd_handpose(frame, pts_hand, 0, 0)  # 绘制关键点连线
-
-    # -------- 绘制关键点
-    for i in range(int(output.shape[0] / 2)):
-        x = (output[i * 2 + 0] * float(img_width))
-        y = (output[i * 2 + 1] * float(img_height))
-
-        cv2.circle(frame, (int(x), int(y)), 3, (255, 50, 60), -1)
-        cv2.circle(frame, (int(x), int(y)), 1, (255, 150, 180), -1)
-
-    # print(output)
-
-    cv2.imshow("handposex", frame)
-    cv2.waitKey(5)
+HAND_MODEL_PATH = "models/hand_shufflenetv2.onnx"
+NUM_LANDMARKS = 21
+# 关键点编号与MediaPipe Hands一致
+WRIST, THUMB_IP, THUMB_TIP = 0, 3, 4
+INDEX_PIP, MIDDLE_PIP, RING_PIP, PINKY_PIP = 6, 10, 14, 18
+# 从手腕出发的五根手指（拇指、食指、中指、无名指、小指）
+FINGERS = [(0, 1, 2, 3, 4), (0, 5, 6, 7, 8), (0, 9, 10, 11, 12), (0, 13, 14, 15, 16), (0, 17, 18, 19, 20)]
+FINGER_COLORS = [(0, 215, 255), (255, 115, 55), (5, 255, 55), (25, 15, 255), (225, 15, 55)]
+# 与mp.solutions.hands.HAND_CONNECTIONS相同的连线，推流绘制不再依赖mediapipe
+HAND_CONNECTIONS = [(0, 1), (1, 2), (2, 3), (3, 4), (0, 5), (5, 6), (6, 7), (7, 8), (9, 10), (10, 11), (11, 12),
+                    (13, 14), (14, 15), (15, 16), (0, 17), (17, 18), (18, 19), (19, 20), (5, 9), (9, 13), (13, 17)]
+
+
+class HandLandmarkBackend(object):
+    """
+    手部关键点后端的统一接口：process()输入BGR画面，输出(21, 3)的关键点数组，
+    x、y为相对整幅画面的归一化坐标，z为相对深度（不支持时为0），未检测到手时返回None。
+    输出格式与landmarks_buffer一致，识别进程和推流不需要区分后端。
+    """
+    name = ''
+
+    def process(self, frame):
+        raise NotImplementedError
+
+    def reset(self):
+        """丢弃跟踪状态，下一帧重新在整幅画面中检测"""
+
+    def close(self):
+        pass
+
+
+class MediaPipeHands(HandLandmarkBackend):
+    """mp.solutions.hands：手掌检测 + 关键点回归，自带跟踪"""
+    name = 'mediapipe'
+
+    def __init__(self, min_detection_confidence=0.7, min_tracking_confidence=0.7):
+        import mediapipe as mp
+        self.hands = mp.solutions.hands.Hands(
+            static_image_mode=False, max_num_hands=1,
+            min_detection_confidence=min_detection_confidence, min_tracking_confidence=min_tracking_confidence)
+
+    def process(self, frame):
+        results = self.hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if not results.multi_hand_landmarks:
+            return None
+        return np.array([[lm.x, lm.y, lm.z] for lm in results.multi_hand_landmarks[0].landmark])
+
+    def close(self):
+        self.hands.close()
+
+
+class OnnxHandLandmarks(HandLandmarkBackend):
+    """
+    hand_shufflenetv2关键点模型：直接回归21个点的xy（相对输入图的比例），没有手掌检测和置信度。
+    有上一帧的手部框时只裁剪框附近的小块送入模型，手在输入中占比更大、缩放开销更小；
+    丢失后回到整幅画面。模型没有“是否有手”的输出，用关键点的分布范围判断结果是否可信。
+    """
+    name = 'onnx'
+
+    def __init__(self, model_path=HAND_MODEL_PATH, threads=1, input_size=256, use_roi=True, roi_scale=1.8,
+                 min_roi=96, min_spread=0.2):
+        """
+        :param model_path: ONNX模型路径
+        :param threads: 推理线程数
+        :param input_size: 模型输入边长
+        :param use_roi: 是否按上一帧的手部框裁剪
+        :param roi_scale: 裁剪框相对关键点外接框的放大倍数，留出手移动的余量
+        :param min_roi: 裁剪框的最小边长（像素）
+        :param min_spread: 关键点外接框边长占输入边长的最小比例，低于此值视为没有手（模型在无手时输出收缩的点）
+        """
+        self.session = create_session(model_path, threads=threads)
+        self.input_name = self.session.get_inputs()[0].name
+        self.input_size = input_size
+        self.use_roi = use_roi
+        self.roi_scale = roi_scale
+        self.min_roi = min_roi
+        self.min_spread = min_spread
+        self.roi = None     # 上一帧的关键点外接框 (x1, y1, x2, y2)，像素坐标
+
+    def reset(self):
+        self.roi = None
+
+    def _crop_box(self, width, height):
+        if not self.use_roi or self.roi is None:
+            return 0, 0, width, height
+        x1, y1, x2, y2 = self.roi
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        side = min(max(max(x2 - x1, y2 - y1) * self.roi_scale, self.min_roi), width, height)
+        left = int(np.clip(cx - side / 2, 0, width - side))
+        top = int(np.clip(cy - side / 2, 0, height - side))
+        return left, top, left + int(side), top + int(side)
+
+    def preprocess(self, patch):
+        img = cv2.resize(patch, (self.input_size, self.input_size), interpolation=cv2.INTER_LINEAR)
+        img = (img.astype(np.float32) - 128.) / 256.
+        return np.ascontiguousarray(img.transpose(2, 0, 1))[np.newaxis]
+
+    def process(self, frame):
+        height, width = frame.shape[:2]
+        x1, y1, x2, y2 = self._crop_box(width, height)
+        output = self.session.run(None, {self.input_name: self.preprocess(frame[y1:y2, x1:x2])})[0]
+        rel = np.asarray(output, dtype=np.float64).reshape(NUM_LANDMARKS, 2)
+        spread = (rel.max(axis=0) - rel.min(axis=0)).max()
+        if spread < self.min_spread:
+            self.roi = None
+            return None
+        points = np.zeros((NUM_LANDMARKS, 3))
+        points[:, 0] = (x1 + rel[:, 0] * (x2 - x1)) / width
+        points[:, 1] = (y1 + rel[:, 1] * (y2 - y1)) / height
+        px, py = points[:, 0] * width, points[:, 1] * height
+        self.roi = (px.min(), py.min(), px.max(), py.max())
+        return points
+
+
+HAND_BACKENDS = {
+    'mediapipe': MediaPipeHands,
+    'onnx': OnnxHandLandmarks,
+}
+
+
+def create_hand_backend(name='mediapipe', **kwargs):
+    """:param name: 后端名称，见HAND_BACKENDS"""
+    if name not in HAND_BACKENDS:
+        raise KeyError(f"未知的手部关键点后端: {name}")
+    return HAND_BACKENDS[name](**kwargs)
+
+
+def classify_gesture(points):
+    """
+    根据关键点判断手势：五指张开为'open'，否则为'closed'；只有握拳时才按拇指方向给出指向
+    :param points: (21, 3)归一化关键点
+    :return: (手势, 方向)，方向为'left'/'right'/'up'/'down'/'center'
+    """
+    palm_center = points[WRIST]
+    finger_tips = points[[4, 8, 12, 16, 20]]
+    avg_distance = np.mean(np.linalg.norm(finger_tips - palm_center, axis=1))
+
+    def is_finger_open(tip, pip):
+        return (np.linalg.norm(points[tip][:2] - points[pip][:2]) > 0.07) and (points[tip][1] < points[pip][1])
+    if avg_distance > 0.25 and all(is_finger_open(tip, pip) for tip, pip in [(4, 3), (8, 6), (12, 10), (16, 14), (20, 18)]):
+        return 'open', 'center'
+    thumb_tip = points[THUMB_TIP]
+    index_finger_pip = points[INDEX_PIP]
+    pinky_pip = points[PINKY_PIP]
+    wrist = points[WRIST]
+    if thumb_tip[0] < wrist[0] and thumb_tip[0] < pinky_pip[0]:
+        direction = 'left'
+    elif thumb_tip[0] > wrist[0] and thumb_tip[0] > index_finger_pip[0]:
+        direction = 'right'
+    elif thumb_tip[1] < index_finger_pip[1] and thumb_tip[1] < wrist[1]:
+        direction = 'up'
+    elif thumb_tip[1] > wrist[1]:
+        direction = 'down'
+    else:
+        direction = 'center'
+    return 'closed', direction
+
+
+def draw_hand(img, points, finger_colors=None, thick=2):
+    """
+    :param points: (21, 3)归一化关键点
+    :param finger_colors: 每根手指一种颜色（如FINGER_COLORS），None则按HAND_CONNECTIONS画绿色连线
+    """
+    height, width = img.shape[:2]
+    pts = [(int(x * width), int(y * height)) for x, y in points[:, :2]]
+    if finger_colors is None:
+        for start_idx, end_idx in HAND_CONNECTIONS:
+            cv2.line(img, pts[start_idx], pts[end_idx], (0, 255, 0), thick)
+    else:
+        for finger, color in zip(FINGERS, finger_colors):
+            for start_idx, end_idx in zip(finger[:-1], finger[1:]):
+                cv2.line(img, pts[start_idx], pts[end_idx], color, thick, cv2.LINE_AA)
+    for point in pts:
+        cv2.circle(img, point, 5 if finger_colors is None else 3, (255, 0, 0), -1)
+    return img
+
+
+if __name__ == "__main__":
+    cap = cv2.VideoCapture(0)
+    hand_rec = OnnxHandLandmarks()
+
+    while True:
+        ret, frame = cap.read()
+        st = time.time()
+        points = hand_rec.process(frame)
+        print("onnx_time{}ms".format((time.time() - st) * 1000))
+        if points is not None:
+            draw_hand(frame, points, FINGER_COLORS)
+            print(classify_gesture(points))
+        cv2.imshow("handposex", frame)
+        cv2.waitKey(1)
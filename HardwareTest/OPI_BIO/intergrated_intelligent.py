@@ -1,7 +1,7 @@
 import cv2
-import mediapipe as mp
 import numpy as np
 import time
+import os
 from flask import Flask, render_template_string, Response, request, jsonify
 from multiprocessing import Process, Lock, Value, RawArray
 from ctypes import c_char_p, c_bool
@@ -10,6 +10,9 @@ import utils.temp_hum as temp_hum
 import utils.time as time_utils
 import utils.speaker as speaker
 from face_detect_rec import FaceDetectRec, faceDetecImgDis
+from hand_detect_rec import create_hand_backend, classify_gesture, draw_hand
+from components.metrics import SharedMetrics, PerfWindow, counter, histogram, format_samples, process_stats
+from components.sources import open_camera
 
 # ----------------- 配置参数 -----------------
 CAM_WIDTH = 640
@@ -19,14 +22,31 @@ MOTOR1_MAX = 175
 MOTOR2_MIN = -65
 MOTOR2_MAX = 65
 MOTOR_STEP = 5
+HAND_BACKEND = 'mediapipe'  # 手部关键点后端：'mediapipe'或'onnx'（models/hand_shufflenetv2.onnx），见hand_detect_rec.py
+MAX_FACES = 16          # 共享人脸结果的最大人脸数
+FACE_RESULT_TTL = 1.0   # 人脸结果超过该时长（秒）未更新则推流不再绘制
+FACE_THREADS = 2        # 人脸检测的推理线程数，其余核心留给摄像头、手部检测和推流
+# 画面来源：摄像头编号，或'video:录像文件'/'images:图片目录'离线回放（见components/sources.py）
+CAMERA_SOURCE = 0
+# 硬件后端：没有GPIO/声卡的开发机上改为'sim'/'null'
+MOTOR_BACKEND = 'wiringpi'
+SENSOR_BACKEND = 'wiringpi'
+SPEAKER_BACKEND = 'pyaudio'
+motor.use_backend(MOTOR_BACKEND)
+temp_hum.use_backend(SENSOR_BACKEND)
+speaker.use_backend(SPEAKER_BACKEND)
 
 # ----------------- 共享内存与锁 -----------------
 frame_lock = Lock()
 landmarks_lock = Lock()
+faces_lock = Lock()
 
 frame_dims = RawArray('i', [0, 0, 0])  # [H, W, C]
 frame_buffer = RawArray('B', CAM_HEIGHT * CAM_WIDTH * 3)
 landmarks_buffer = RawArray('d', 21 * 3)
+# 识别进程发布的人脸结果：每行 [x1, y1, x2, y2, score, 5个关键点xy]；faces_meta为 [人脸数, 检测时间戳]
+faces_buffer = RawArray('d', MAX_FACES * 15)
+faces_meta = RawArray('d', 2)
 shared_direction = Value(c_char_p, b"center")
 show_hand_overlay = Value(c_bool, False)
 show_face_overlay = Value(c_bool, False)
@@ -38,14 +58,25 @@ last_motor_activity = Value('d', time.time())
 motor_sleep_status = Value(c_bool, False)
 last_face_toggle_time = Value('d', 0.0)  # 新增：记录上次切换人脸追踪的时间
 volume_value = Value('d', 0.05)  # 全局音量（0.0~1.0）
+# 各进程在热路径上更新的性能指标（共享内存槽位，无锁），/metrics导出为Prometheus文本，网页性能面板汇总显示
+metrics = SharedMetrics('opi_bio', [
+    counter('camera_frames_total', '摄像头采集的帧数'),
+    counter('camera_read_errors_total', '摄像头读帧失败次数'),
+    histogram('frame_read_seconds', '加锁拷贝共享帧的耗时', labels={'reader': ('recognition', 'stream')}),
+    histogram('inference_seconds', '模型推理耗时', labels={'model': ('hand', 'face')}),
+    histogram('overlay_draw_seconds', '推流叠加绘制耗时', labels={'overlay': ('hand', 'face')}),
+    histogram('stream_encode_seconds', '推流JPEG编码耗时'),
+])
+# 进程名 -> pid，Web进程据此从/proc读取各进程的CPU与内存
+worker_pids = {'web': os.getpid()}
 
 # ----------------- 摄像头进程 -----------------
 def camera_process(frame_lock, frame_buffer, frame_dims):
-    cap = cv2.VideoCapture(0)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAM_WIDTH)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAM_HEIGHT)
+    cap = open_camera(CAMERA_SOURCE, CAM_WIDTH, CAM_HEIGHT)
     with frame_lock:
         frame_dims[0], frame_dims[1], frame_dims[2] = CAM_HEIGHT, CAM_WIDTH, 3
+    frames = metrics.counter('camera_frames_total')
+    read_errors = metrics.counter('camera_read_errors_total')
     print("摄像头进程启动...")
     while True:
         ret, frame = cap.read()
@@ -53,55 +84,67 @@ def camera_process(frame_lock, frame_buffer, frame_dims):
             with frame_lock:
                 frame_buffer_np = np.frombuffer(frame_buffer, dtype=np.uint8).reshape(frame_dims[:])
                 np.copyto(frame_buffer_np, frame)
+            frames.inc()
+        elif getattr(cap, 'finished', False):
+            print("摄像头进程：回放结束")
+            break
         else:
+            read_errors.inc()
             time.sleep(0.05)
     cap.release()
 
 # ----------------- 识别与控制进程 -----------------
-def recognition_process(frame_lock, frame_buffer, frame_dims, landmarks_lock, landmarks_buffer, shared_direction):
-    mp_hands = mp.solutions.hands
-    hands = mp_hands.Hands(
-        static_image_mode=False, max_num_hands=1,
-        min_detection_confidence=0.7, min_tracking_confidence=0.7)
-    face_detector = FaceDetectRec()
+def publish_faces(faces_lock, faces_buffer, faces_meta, predictions, ts):
+    """把人脸检测结果写入共享缓冲区，推流只读取绘制，不再自己运行模型"""
+    bboxes, kpss = predictions if predictions else (None, None)
+    n = 0 if bboxes is None else min(len(bboxes), MAX_FACES)
+    with faces_lock:
+        if n:
+            rows = np.frombuffer(faces_buffer, dtype=np.float64).reshape(MAX_FACES, 15)
+            rows[:n, :5] = bboxes[:n, :5]
+            rows[:n, 5:] = np.asarray(kpss[:n]).reshape(n, 10) if kpss is not None else 0
+        faces_meta[0], faces_meta[1] = n, ts
+
+def read_faces(faces_lock, faces_buffer, faces_meta):
+    """:return: ([bboxes, kpss], 检测时间戳)，与FaceDetectRec.inference的返回格式一致"""
+    with faces_lock:
+        n, ts = int(faces_meta[0]), faces_meta[1]
+        rows = np.frombuffer(faces_buffer, dtype=np.float64).reshape(MAX_FACES, 15)[:n].copy()
+    return [rows[:, :5], rows[:, 5:].reshape(n, 5, 2)], ts
+
+def recognition_process(frame_lock, frame_buffer, frame_dims, landmarks_lock, landmarks_buffer, shared_direction,
+                        faces_lock, faces_buffer, faces_meta):
+    hands = create_hand_backend(HAND_BACKEND)
+    face_detector = FaceDetectRec(threads=FACE_THREADS)
+    frame_read_cost = metrics.histogram('frame_read_seconds', reader='recognition')
+    hand_cost = metrics.histogram('inference_seconds', model='hand')
+    face_cost = metrics.histogram('inference_seconds', model='face')
     frame_count = 0
     print("识别进程启动...")
     while True:
         time.sleep(0.05)
         frame_count += 1
+        st = time.perf_counter()
         with frame_lock:
             if frame_dims[0] == 0:
                 continue
             frame_buffer_np = np.frombuffer(frame_buffer, dtype=np.uint8).reshape(frame_dims[:])
             frame = frame_buffer_np.copy()
+        frame_read_cost.observe(time.perf_counter() - st)
         frame = cv2.flip(frame, 1)
         # 手势识别
         do_hand = enable_hand_control.value
         do_face = enable_face_tracking.value
         # 手势识别每5帧
         if do_hand and frame_count % 5 == 0:
-            image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = hands.process(image_rgb)
+            with hand_cost.time():
+                points = hands.process(frame)
             direction = b"center"
-            found_hand = False
-            if results.multi_hand_landmarks:
-                found_hand = True
-                hand_landmarks = results.multi_hand_landmarks[0]
-                lm_array = np.array([[lm.x, lm.y, lm.z] for lm in hand_landmarks.landmark]).flatten()
+            found_hand = points is not None
+            if found_hand:
                 with landmarks_lock:
-                    np.copyto(np.frombuffer(landmarks_buffer, dtype=np.float64), lm_array)
-                # 判断张开/握拳
-                points = np.array([[lm.x, lm.y, lm.z] for lm in hand_landmarks.landmark])
-                palm_center = points[0]
-                finger_tips = points[[4, 8, 12, 16, 20]]
-                avg_distance = np.mean(np.linalg.norm(finger_tips - palm_center, axis=1))
-                # 五指张开判定
-                def is_finger_open(tip, pip):
-                    return (np.linalg.norm(points[tip][:2] - points[pip][:2]) > 0.07) and (points[tip][1] < points[pip][1])
-                if avg_distance > 0.25 and all(is_finger_open(tip, pip) for tip, pip in [(4,3),(8,6),(12,10),(16,14),(20,18)]):
-                    gesture = "open"
-                else:
-                    gesture = "closed"
+                    np.copyto(np.frombuffer(landmarks_buffer, dtype=np.float64), points.ravel())
+                gesture, hand_direction = classify_gesture(points)
                 # 张开手掌切换人脸追踪（带冷却时间）
                 now = time.time()
                 if gesture == "open" and now - last_face_toggle_time.value > 2.0:
@@ -114,22 +157,7 @@ def recognition_process(frame_lock, frame_buffer, frame_dims, landmarks_lock, la
                         speaker.play_wav_file_async('assets/close.wav', volume_value.value)
                 # 只有握拳时才允许方向识别
                 if gesture == "closed":
-                    thumb_tip = points[mp_hands.HandLandmark.THUMB_TIP.value]
-                    index_finger_pip = points[mp_hands.HandLandmark.INDEX_FINGER_PIP.value]
-                    pinky_pip = points[mp_hands.HandLandmark.PINKY_PIP.value]
-                    wrist = points[mp_hands.HandLandmark.WRIST.value]
-                    if thumb_tip[0] < wrist[0] and thumb_tip[0] < pinky_pip[0]:
-                        direction = b"left"
-                    elif thumb_tip[0] > wrist[0] and thumb_tip[0] > index_finger_pip[0]:
-                        direction = b"right"
-                    elif thumb_tip[1] < index_finger_pip[1] and thumb_tip[1] < wrist[1]:
-                        direction = b"up"
-                    elif thumb_tip[1] > wrist[1]:
-                        direction = b"down"
-                    else:
-                        direction = b"center"
-                else:
-                    direction = b"center"
+                    direction = hand_direction.encode()
             with landmarks_lock:
                 if not found_hand:
                     np.frombuffer(landmarks_buffer, dtype=np.float64)[0] = -1.0
@@ -155,7 +183,9 @@ def recognition_process(frame_lock, frame_buffer, frame_dims, landmarks_lock, la
                         motor1_angle.value += MOTOR_STEP
         # 人脸跟踪每15帧
         if do_face and frame_count % 5 == 0:
-            predictions = face_detector.inference(frame)
+            with face_cost.time():
+                predictions = face_detector.inference(frame)
+            publish_faces(faces_lock, faces_buffer, faces_meta, predictions, time.time())
             if predictions and predictions[0] is not None and len(predictions[0]) > 0:
                 bbox = predictions[0][0]
                 face_cx = int((bbox[0] + bbox[2]) / 2)
@@ -231,6 +261,9 @@ HTML_TEMPLATE = '''
         .left-panel, .right-panel {
             height: 100%;
         }
+        .right-panel {
+            overflow-y: auto;
+        }
         .main-content {
             height: 100%;
             display: flex;
@@ -365,6 +398,23 @@ HTML_TEMPLATE = '''
             font-weight: bold;
             color: #2196F3;
         }
+
+        .perf-table {
+            width: 100%;
+            font-size: 13px;
+            border-collapse: collapse;
+        }
+
+        .perf-table td {
+            padding: 2px 4px;
+            color: #555;
+        }
+
+        .perf-table td.num {
+            text-align: right;
+            font-weight: bold;
+            color: #2196F3;
+        }
     </style>
     <script>
         function updateStatus() {
@@ -392,6 +442,39 @@ HTML_TEMPLATE = '''
                 });
         }
 
+        function fmt(v, unit) {
+            return (v === null || v === undefined) ? '--' : v + unit;
+        }
+
+        function updatePerf() {
+            fetch('/perf')
+                .then(r => r.json())
+                .then(data => {
+                    const m = data.metrics;
+                    const rows = [
+                        ['采集帧率', fmt(m['camera_frames_total'], ' fps')],
+                        ['推流编码', fmt(m['stream_encode_seconds'].mean_ms, ' ms') + ' / ' + fmt(m['stream_encode_seconds'].rate, ' fps')]
+                    ];
+                    [['recognition', '识别取帧'], ['stream', '推流取帧']].forEach(([reader, label]) => {
+                        const h = m['frame_read_seconds{reader="' + reader + '"}'];
+                        rows.push([label, fmt(h.mean_ms, ' ms') + ' (p95 ' + fmt(h.p95_ms, ')')]);
+                    });
+                    [['hand', '手势推理'], ['face', '人脸推理']].forEach(([model, label]) => {
+                        const h = m['inference_seconds{model="' + model + '"}'];
+                        rows.push([label, fmt(h.mean_ms, ' ms') + ' (p95 ' + fmt(h.p95_ms, ')') + ' ' + fmt(h.rate, '/s')]);
+                    });
+                    [['hand', '手势叠加'], ['face', '人脸叠加']].forEach(([overlay, label]) => {
+                        const h = m['overlay_draw_seconds{overlay="' + overlay + '"}'];
+                        rows.push([label, fmt(h.mean_ms, ' ms') + ' ' + fmt(h.rate, '/s')]);
+                    });
+                    Object.entries(data.processes).forEach(([name, p]) => {
+                        rows.push(['进程 ' + name, fmt(p.cpu, '%') + ' ' + p.rss_mb + ' MB']);
+                    });
+                    document.getElementById('perf_table').innerHTML = rows.map(
+                        ([k, v]) => '<tr><td>' + k + '</td><td class="num">' + v + '</td></tr>').join('');
+                });
+        }
+
         function toggleControl(type) {
             fetch('/toggle_control', {
                 method: 'POST',
@@ -424,6 +507,7 @@ HTML_TEMPLATE = '''
         window.onload = function() {
             updateStatus();
             setInterval(updateStatus, 500);
+            setInterval(updatePerf, 2000);
         };
     </script>
 </head>
@@ -525,44 +609,49 @@ HTML_TEMPLATE = '''
                     <span class="status-value" id="motor2">0°</span>
                 </div>
             </div>
+            <div class="status-bar">
+                <h3>性能</h3>
+                <table class="perf-table" id="perf_table"></table>
+            </div>
         </div>
     </div>
 </body>
 </html>
 '''
 
+# 推流生成器在每个客户端的线程中运行，多客户端时这几条序列有多个写者，个别计数可能丢失
+stream_read_cost = metrics.histogram('frame_read_seconds', reader='stream')
+hand_overlay_cost = metrics.histogram('overlay_draw_seconds', overlay='hand')
+face_overlay_cost = metrics.histogram('overlay_draw_seconds', overlay='face')
+encode_cost = metrics.histogram('stream_encode_seconds')
+# 性能面板的区间统计，只在Web进程中使用
+perf_window = PerfWindow(metrics)
+
 def gen_video_stream():
-    mp_hands = mp.solutions.hands
-    face_detector = FaceDetectRec()
     while True:
         time.sleep(1/30)
+        st = time.perf_counter()
         with frame_lock:
             if frame_dims[0] == 0:
                 continue
             frame_buffer_np = np.frombuffer(frame_buffer, dtype=np.uint8).reshape(frame_dims[:])
             frame = frame_buffer_np.copy()
+        stream_read_cost.observe(time.perf_counter() - st)
         frame = cv2.flip(frame, 1)
         # 手势overlay
         if show_hand_overlay.value:
-            with landmarks_lock:
+            with hand_overlay_cost.time(), landmarks_lock:
                 landmarks_np = np.frombuffer(landmarks_buffer, dtype=np.float64)
                 if landmarks_np[0] != -1.0:
-                    landmarks_np = landmarks_np.reshape((21, 3))
-                    height, width, _ = frame.shape
-                    for connection in mp_hands.HAND_CONNECTIONS:
-                        start_idx, end_idx = connection
-                        start_point = (int(landmarks_np[start_idx][0] * width), int(landmarks_np[start_idx][1] * height))
-                        end_point = (int(landmarks_np[end_idx][0] * width), int(landmarks_np[end_idx][1] * height))
-                        cv2.line(frame, start_point, end_point, (0,255,0), 2)
-                    for i in range(landmarks_np.shape[0]):
-                        point = (int(landmarks_np[i][0] * width), int(landmarks_np[i][1] * height))
-                        cv2.circle(frame, point, 5, (255,0,0), -1)
-        # 人脸overlay
+                    draw_hand(frame, landmarks_np.reshape((21, 3)))
+        # 人脸overlay：只绘制识别进程发布的最新结果
         if show_face_overlay.value and enable_face_tracking.value:
-            predictions = face_detector.inference(frame)
-            if predictions and predictions[0] is not None and len(predictions[0]) > 0:
-                frame, _ = faceDetecImgDis(frame, predictions)
-        _, jpeg = cv2.imencode('.jpg', frame)
+            with face_overlay_cost.time():
+                predictions, ts = read_faces(faces_lock, faces_buffer, faces_meta)
+                if len(predictions[0]) and time.time() - ts < FACE_RESULT_TTL:
+                    frame, _ = faceDetecImgDis(frame, predictions)
+        with encode_cost.time():
+            _, jpeg = cv2.imencode('.jpg', frame)
         yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg.tobytes() + b'\r\n')
 
 @app.route('/')
@@ -601,6 +690,22 @@ def status():
         'volume': volume_value.value
     })
 
+# Prometheus抓取接口
+@app.route('/metrics')
+def prometheus_metrics():
+    procs = process_stats(worker_pids)
+    text = metrics.render() + format_samples(
+        'opi_bio_process_cpu_seconds_total', 'counter', '进程累计CPU时间',
+        [({'process': n}, cpu) for n, (cpu, _) in procs.items()]) + format_samples(
+        'opi_bio_process_resident_memory_bytes', 'gauge', '进程常驻内存',
+        [({'process': n}, rss) for n, (_, rss) in procs.items()])
+    return Response(text, mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+# 网页性能面板：上次请求以来的速率、耗时与各进程CPU/内存
+@app.route('/perf')
+def perf():
+    return jsonify(perf_window.update(worker_pids))
+
 @app.route('/toggle_control', methods=['POST'])
 def toggle_control():
     data = request.get_json()
@@ -649,11 +754,13 @@ def set_volume():
 
 if __name__ == '__main__':
     p_camera = Process(target=camera_process, args=(frame_lock, frame_buffer, frame_dims))
-    p_recognition = Process(target=recognition_process, args=(frame_lock, frame_buffer, frame_dims, landmarks_lock, landmarks_buffer, shared_direction))
+    p_recognition = Process(target=recognition_process, args=(frame_lock, frame_buffer, frame_dims, landmarks_lock, landmarks_buffer, shared_direction,
+                                                              faces_lock, faces_buffer, faces_meta))
     p_camera.daemon = True
     p_recognition.daemon = True
     p_camera.start()
     p_recognition.start()
+    worker_pids.update(camera=p_camera.pid, recognition=p_recognition.pid)
     print("Web服务已启动，请访问 http://<设备IP>:8081")
     try:
         app.run(host='0.0.0.0', port=8081, debug=False)
@@ -664,4 +771,6 @@ if __name__ == '__main__':
         p_recognition.terminate()
         p_camera.join()
         p_recognition.join()
+        metrics.close()
+        metrics.unlink()
         print("所有进程已关闭。")
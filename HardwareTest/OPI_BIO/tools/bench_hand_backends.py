@@ -0,0 +1,93 @@
+"""
+手部关键点后端对比：在同一段录像（或图片目录）上逐帧运行MediaPipe Hands与ONNX关键点模型（带/不带ROI裁剪），
+统计每帧耗时、检出率，并以MediaPipe为参照统计检出一致率、关键点平均偏差和手势/方向分类一致率
+在项目根目录运行：python -m tools.bench_hand_backends --source data/hands.mp4 [--frames 300] [--stride 1]
+"""
+import time
+import argparse
+from collections import Counter
+import numpy as np
+from components.sources import open_camera
+from hand_detect_rec import create_hand_backend, classify_gesture
+
+CAM_WIDTH = 640
+CAM_HEIGHT = 480
+# 名称 -> (后端, 参数)
+VARIANTS = {
+    'mediapipe': ('mediapipe', {}),
+    'onnx_roi': ('onnx', {'use_roi': True}),
+    'onnx_full': ('onnx', {'use_roi': False}),
+}
+REFERENCE = 'mediapipe'
+
+
+def run_backend(name, frames, threads):
+    backend_name, kwargs = VARIANTS[name]
+    if backend_name == 'onnx':
+        kwargs = dict(kwargs, threads=threads)
+    backend = create_hand_backend(backend_name, **kwargs)
+    backend.process(frames[0])
+    backend.reset()
+    times, outputs = [], []
+    for frame in frames:
+        st = time.perf_counter()
+        points = backend.process(frame)
+        times.append(time.perf_counter() - st)
+        outputs.append(points)
+    backend.close()
+    return np.asarray(times) * 1000, outputs
+
+
+def compare(ref, outputs):
+    both = [(r, o) for r, o in zip(ref, outputs) if r is not None and o is not None]
+    detect_agree = np.mean([(r is None) == (o is None) for r, o in zip(ref, outputs)])
+    if not both:
+        return detect_agree, None, None, None
+    # 关键点偏差：归一化坐标下的欧氏距离（只比较xy）
+    error = np.mean([np.linalg.norm(r[:, :2] - o[:, :2], axis=1).mean() for r, o in both])
+    labels = [(classify_gesture(r), classify_gesture(o)) for r, o in both]
+    gesture_agree = np.mean([a[0] == b[0] for a, b in labels])
+    command_agree = np.mean([a == b for a, b in labels])
+    return detect_agree, error, gesture_agree, command_agree
+
+
+def fmt(v, spec='.3f'):
+    return '--' if v is None else format(v, spec)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--source', required=True, help='录像文件或图片目录，见components/sources.py')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--stride', type=int, default=1, help='每隔几帧取一帧，识别进程每5帧处理一次时可设为5')
+    parser.add_argument('--threads', type=int, default=1, help='ONNX推理线程数')
+    parser.add_argument('--variants', nargs='+', default=list(VARIANTS), choices=list(VARIANTS))
+    args = parser.parse_args()
+
+    source = open_camera(args.source, CAM_WIDTH, CAM_HEIGHT, fps=0)
+    frames = []
+    index = 0
+    while len(frames) < args.frames:
+        ret, frame = source.read()
+        if not ret:
+            break
+        if index % args.stride == 0:
+            # 与识别进程一致：镜像后再识别
+            frames.append(frame[:, ::-1].copy())
+        index += 1
+    source.release()
+    print(f"{len(frames)} 帧（步长 {args.stride}）")
+
+    results = {name: run_backend(name, frames, args.threads) for name in args.variants}
+    ref = results.get(REFERENCE)
+    print(f"{'后端':<10} {'均值ms':>8} {'p95ms':>8} {'检出率':>7} {'检出一致':>8} {'关键点偏差':>10} {'手势一致':>8} {'指令一致':>8}")
+    for name, (times, outputs) in results.items():
+        detected = np.mean([o is not None for o in outputs])
+        if ref is not None and name != REFERENCE:
+            detect_agree, error, gesture_agree, command_agree = compare(ref[1], outputs)
+        else:
+            detect_agree = error = gesture_agree = command_agree = None
+        print(f"{name:<12} {times.mean():>8.2f} {np.percentile(times, 95):>8.2f} {detected:>8.1%} "
+              f"{fmt(detect_agree):>10} {fmt(error, '.4f'):>12} {fmt(gesture_agree):>10} {fmt(command_agree):>10}")
+        commands = Counter('/'.join(classify_gesture(o)) for o in outputs if o is not None)
+        print(f"  手势/方向分布: {dict(commands)}")
@@ -0,0 +1,100 @@
+"""
+推流观看人数基准：对运行中的intergrated_intelligent.py依次打开1~5个/video_feed连接，
+统计每个客户端实际帧率，并通过/perf读取该区间内Web进程和识别进程的CPU占用与人脸推理/叠加耗时。
+默认打开人脸追踪和人脸叠加，覆盖原先每个推流连接各自运行人脸模型的场景；切换到改动前的版本运行即可对比
+在项目根目录运行：python -m tools.bench_stream_viewers [--url http://127.0.0.1:8081] [--max-viewers 5] [--duration 10]
+"""
+import time
+import argparse
+import threading
+import requests
+
+BOUNDARY = b'--frame'
+
+
+class Viewer:
+    """模拟一个网页客户端：持续读取multipart流并按边界计数帧"""
+
+    def __init__(self, url):
+        self.url = url
+        self.frames = 0
+        self.bytes = 0
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        tail = b''
+        try:
+            with requests.get(self.url + '/video_feed', stream=True, timeout=10) as r:
+                for chunk in r.iter_content(chunk_size=65536):
+                    if self._stop.is_set():
+                        break
+                    data = tail + chunk
+                    self.frames += data.count(BOUNDARY)
+                    self.bytes += len(chunk)
+                    tail = data[-(len(BOUNDARY) - 1):]
+        except requests.RequestException as e:
+            self.error = e
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+
+def set_toggle(url, name, value):
+    """/toggle_control只能翻转开关，先读/status再决定是否切换"""
+    if requests.get(url + '/status', timeout=5).json().get(name) != value:
+        requests.post(url + '/toggle_control', json={'type': name}, timeout=5)
+
+
+def measure(url, n, duration, warmup):
+    viewers = [Viewer(url) for _ in range(n)]
+    for v in viewers:
+        v.start()
+    time.sleep(warmup)
+    # 以/perf的两次调用为区间边界，第二次返回区间内的CPU占用与耗时
+    requests.get(url + '/perf', timeout=5)
+    start_frames = [v.frames for v in viewers]
+    st = time.time()
+    time.sleep(duration)
+    perf = requests.get(url + '/perf', timeout=5).json()
+    elapsed = time.time() - st
+    fps = [(v.frames - f0) / elapsed for v, f0 in zip(viewers, start_frames)]
+    for v in viewers:
+        v.stop()
+    errors = [v.error for v in viewers if v.error]
+    return fps, perf, errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://127.0.0.1:8081')
+    parser.add_argument('--max-viewers', type=int, default=5)
+    parser.add_argument('--duration', type=float, default=10.0, help='每档统计时长（秒）')
+    parser.add_argument('--warmup', type=float, default=2.0, help='打开连接后等待稳定的时长（秒）')
+    parser.add_argument('--no-face', action='store_true', help='不打开人脸追踪和人脸叠加')
+    args = parser.parse_args()
+
+    url = args.url.rstrip('/')
+    face = not args.no_face
+    set_toggle(url, 'face_tracking', face)
+    set_toggle(url, 'show_face', face)
+    print(f"人脸追踪与叠加: {'开' if face else '关'}")
+    print(f"{'观看数':>4} {'平均fps':>8} {'最低fps':>8} {'Web CPU':>8} {'识别CPU':>8} {'人脸推理/s':>10} {'人脸叠加ms':>10} {'编码ms':>8}")
+    for n in range(1, args.max_viewers + 1):
+        fps, perf, errors = measure(url, n, args.duration, args.warmup)
+        procs = perf['processes']
+        m = perf['metrics']
+        web_cpu = procs.get('web', {}).get('cpu')
+        rec_cpu = procs.get('recognition', {}).get('cpu')
+        face_rate = m.get('inference_seconds{model="face"}', {}).get('rate')
+        overlay = m.get('overlay_draw_seconds{overlay="face"}', {}).get('mean_ms')
+        encode = m.get('stream_encode_seconds', {}).get('mean_ms')
+        print(f"{n:>6} {sum(fps) / n:>10.1f} {min(fps):>10.1f} {web_cpu!s:>9}% {rec_cpu!s:>9}% "
+              f"{face_rate!s:>12} {overlay!s:>12} {encode!s:>10}")
+        for e in errors:
+            print(f"  客户端错误: {e}")
@@ -4,6 +4,10 @@ from PIL import Image, ImageDraw
 import sys
 import os
 
+# 在项目根目录运行 python tools/export.py 时，把项目根目录加入路径以导入components
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from components.yolo_post import YoloPostprocessor
+
 def preprocess(img_path, img_size=640):
     img = Image.open(img_path).convert('RGB')
     img = img.resize((img_size, img_size))
@@ -14,36 +18,9 @@ def preprocess(img_path, img_size=640):
     return img_np, img
 
 def postprocess(pred, conf_thres=0.25, iou_thres=0.45):
-    # pred: [1, num_boxes, 85] (YOLOv5 ONNX输出)
-    pred = np.squeeze(pred, axis=0)
-    boxes = []
-    for det in pred:
-        conf = det[4]
-        if conf < conf_thres:
-            continue
-        x1, y1, x2, y2 = det[:4]
-        cls = np.argmax(det[5:])
-        boxes.append([x1, y1, x2, y2, conf, cls])
-    # 简单NMS（可用更优实现）
-    boxes = sorted(boxes, key=lambda x: x[4], reverse=True)
-    keep = []
-    while boxes:
-        box = boxes.pop(0)
-        keep.append(box)
-        boxes = [b for b in boxes if iou(box, b) < iou_thres]
-    return keep
-
-def iou(box1, box2):
-    # 计算两个框的IoU
-    x1 = max(box1[0], box2[0])
-    y1 = max(box1[1], box2[1])
-    x2 = min(box1[2], box2[2])
-    y2 = min(box1[3], box2[3])
-    inter = max(0, x2 - x1) * max(0, y2 - y1)
-    area1 = (box1[2] - box1[0]) * (box1[3] - box1[1])
-    area2 = (box2[2] - box2[0]) * (box2[3] - box2[1])
-    union = area1 + area2 - inter
-    return inter / union if union > 0 else 0
+    # pred: [1, num_boxes, 85] (YOLOv5 ONNX输出)，向量化筛选 + 按类别NMS
+    boxes, scores, classes = YoloPostprocessor(conf_thres=conf_thres, iou_thres=iou_thres)(pred)
+    return [[*box, conf, cls] for box, conf, cls in zip(boxes.tolist(), scores.tolist(), classes.tolist())]
 
 def save_results(boxes, save_path):
     with open(save_path, 'w') as f:
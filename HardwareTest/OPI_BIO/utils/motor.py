@@ -1,14 +1,31 @@
-import wiringpi
 import time
+from components.gpio import BACKENDS
 
-wiringpi.wiringPiSetup()
 IN1, IN2, IN3, IN4 = 3, 4, 6, 9
 IN5, IN6, IN7, IN8 = 10, 13, 15, 16
 pins = [IN1, IN2, IN3, IN4, IN5, IN6, IN7, IN8]
 motor1 = pins[:4]
 motor2 = pins[4:]
-for pin in pins:
-    wiringpi.pinMode(pin, 1)
+
+
+_backend = 'wiringpi'
+_gpio = None
+
+
+def use_backend(name):
+    """选择电机后端（见components/gpio.py中的BACKENDS），首次转动时才初始化，导入本模块不再访问硬件"""
+    global _backend, _gpio
+    if name not in BACKENDS:
+        raise KeyError(f"未知的电机后端: {name}")
+    _backend, _gpio = name, None
+
+
+def _get_gpio():
+    global _gpio
+    if _gpio is None:
+        _gpio = BACKENDS[_backend]()
+        _gpio.setup(pins)
+    return _gpio
 
 # 定义步进电机的步序（2相全步）
 sequence = [
@@ -25,11 +42,14 @@ sequence = [
 def rotate(motor_pins, angle):
     seq = sequence if angle >= 0 else sequence[::-1]
     step_num = int(abs(angle) / 360 * 4096)
+    gpio = _get_gpio()
+    step_delay = gpio.step_delay
     for i in range(step_num):
         step = seq[i % 8]
         for _pin, value in zip(motor_pins, step):
-            wiringpi.digitalWrite(_pin, value)
-        time.sleep(0.001)
+            gpio.write(_pin, value)
+        if step_delay:
+            time.sleep(step_delay)
 
 # 新增：电机休眠与唤醒函数
 
@@ -37,8 +57,9 @@ def sleep_motor():
     """
     关闭所有电机引脚，进入低功耗状态
     """
+    gpio = _get_gpio()
     for pin in pins:
-        wiringpi.digitalWrite(pin, 0)
+        gpio.write(pin, 0)
 
 # 主函数， 控制步进电机
 def main():
@@ -52,8 +73,7 @@ def main():
         rotate(motor1, -angle1) # 反向旋转第一个电机
         rotate(motor2, -angle2) # 反向旋转第二个电机
     # 关闭所有电机控制引脚
-    for _pin in pins:
-        wiringpi.digitalWrite(_pin, 0)
+    sleep_motor()
 
 if __name__ == "__main__":
     rotate(motor1, 350)
\ No newline at end of file
@@ -1,10 +1,34 @@
-import pyaudio
 import wave
 import numpy as np
 import threading
 
+_backend = 'pyaudio'
+_played = 0
+
+
+def use_backend(name):
+    """选择播放后端（见PLAYERS），'null'只解析WAV不出声，用于回放测试和没有声卡的开发机"""
+    global _backend
+    if name not in PLAYERS:
+        raise KeyError(f"未知的播放后端: {name}")
+    _backend = name
+
+
+def stats():
+    return {'backend': _backend, 'played': _played}
+
+
+def _play_null(wav_file, volume=1.0, device_index=0):
+    global _played
+    with wave.open(wav_file, 'rb') as wf:
+        wf.readframes(wf.getnframes())
+    _played += 1
+
+
 # 播放WAV音频文件
-def play_wav_file(wav_file, volume=1.0, device_index=0):
+def _play_pyaudio(wav_file, volume=1.0, device_index=0):
+    global _played
+    import pyaudio
     # 打开WAV文件
     with wave.open(wav_file, 'rb') as wf:
         # 初始化PyAudio
@@ -28,6 +52,17 @@ def play_wav_file(wav_file, volume=1.0, device_index=0):
         stream.close()
         # 终止PyAudio
         p.terminate()
+    _played += 1
+
+
+PLAYERS = {
+    'pyaudio': _play_pyaudio,
+    'null': _play_null,
+}
+
+
+def play_wav_file(wav_file, volume=1.0, device_index=0):
+    PLAYERS[_backend](wav_file, volume, device_index)
 
 def play_wav_file_async(wav_file, volume=1.0, device_index=0):
     t = threading.Thread(target=play_wav_file, args=(wav_file, volume, device_index), daemon=True)
@@ -1,25 +1,85 @@
-import wiringpi
 import time
 import sys
+import math
 
-wiringpi.wiringPiSetup()
 BASE = 64
 A0 = BASE + 0
 A1 = BASE + 1
-wiringpi.htu21dSetup(BASE)
+
+
+class WiringPiSensor:
+    """HTU21D温湿度传感器，读数单位为0.1℃ / 0.1%"""
+
+    def __init__(self):
+        import wiringpi
+        wiringpi.wiringPiSetup()
+        wiringpi.htu21dSetup(BASE)
+        self._gpio = wiringpi
+
+    def get_temp(self):
+        return self._gpio.analogRead(A0)
+
+    def get_hum(self):
+        return self._gpio.analogRead(A1)
+
+
+class SimulatedSensor:
+    """不访问硬件，返回缓慢变化的温湿度，单位与WiringPiSensor一致，用于回放测试和没有GPIO的开发机"""
+
+    def __init__(self, temp=25.0, hum=50.0, period=600.0):
+        self.temp = temp
+        self.hum = hum
+        self.period = period
+        self._t0 = time.time()
+
+    def _phase(self):
+        return math.sin(2 * math.pi * (time.time() - self._t0) / self.period)
+
+    def get_temp(self):
+        return int(round((self.temp + 0.5 * self._phase()) * 10))
+
+    def get_hum(self):
+        return int(round((self.hum - 2.0 * self._phase()) * 10))
+
+
+BACKENDS = {
+    'wiringpi': WiringPiSensor,
+    'sim': SimulatedSensor,
+}
+
+_backend = 'wiringpi'
+_sensor = None
+
+
+def use_backend(name):
+    """选择传感器后端（见BACKENDS），首次读数时才初始化，导入本模块不再访问硬件"""
+    global _backend, _sensor
+    if name not in BACKENDS:
+        raise KeyError(f"未知的温湿度传感器后端: {name}")
+    _backend, _sensor = name, None
+
+
+def _get_sensor():
+    global _sensor
+    if _sensor is None:
+        _sensor = BACKENDS[_backend]()
+    return _sensor
+
 
 def get_temp():
-    return wiringpi.analogRead(A0)
+    return _get_sensor().get_temp()
+
 
 def get_hum():
-    return wiringpi.analogRead(A1)
+    return _get_sensor().get_hum()
+
 
 def main():
     while True:
         try:
-            value = wiringpi.analogRead(A0)
+            value = get_temp()
             print("Temp value: {}".format(value / 10))
-            value = wiringpi.analogRead(A1)
+            value = get_hum()
             print("Hum value: {}".format(value / 10))
             time.sleep(2)
         except KeyboardInterrupt:
@@ -27,4 +87,4 @@ def main():
             sys.exit(0)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()